@@ -11,11 +11,16 @@ from enum import Enum
 from typing import Dict, List, Optional, Any, Union
 from dataclasses import dataclass, asdict
 import logging
-import statistics
 from collections import defaultdict
 import pandas as pd
 import numpy as np
 
+from .columnar_engine import (
+    Categorical, ColumnarReportEngine, ColumnarTable, aggregate_values, filter_mask
+)
+from .report_jobs import REPORT_JOBS_ENABLED, ReportJobQueue, shared_report_store
+from .rollups import RollupPlanner, RollupStore, calculation_rollups
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -142,39 +147,53 @@ class KPI:
 class DataProcessor:
     """Data processing and aggregation engine"""
     
+    # Column that date_range filters and time-series charts use, per data source type
+    TIME_COLUMNS = {
+        "projects": "start_date",
+        "calculations": "created_at",
+        "users": "last_login",
+        "system": "timestamp"
+    }
+    
     def __init__(self):
         self.data_cache: Dict[str, Any] = {}
         self.cache_expiry: Dict[str, datetime] = {}
     
-    async def process_data(self, data_source: DataSource, filters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
-        """Process data from source with filters"""
+    async def process_table(self, data_source: DataSource) -> ColumnarTable:
+        """Load a data source as a columnar table; filtering happens in the report engine"""
         try:
             # Check cache first
-            cache_key = f"{data_source.id}_{hash(str(filters))}"
+            cache_key = f"{data_source.id}_table"
             if self._is_cache_valid(cache_key):
                 return self.data_cache[cache_key]
             
             # Simulate data processing
             if data_source.type == "projects":
-                data = await self._get_project_data(filters)
+                table = await self._get_project_data()
             elif data_source.type == "calculations":
-                data = await self._get_calculation_data(filters)
+                table = await self._get_calculation_data()
             elif data_source.type == "users":
-                data = await self._get_user_data(filters)
+                table = await self._get_user_data()
             elif data_source.type == "system":
-                data = await self._get_system_data(filters)
+                table = await self._get_system_data()
             else:
-                data = await self._get_sample_data(data_source, filters)
+                table = await self._get_sample_data(data_source)
             
             # Cache the result
-            self.data_cache[cache_key] = data
+            self.data_cache[cache_key] = table
             self.cache_expiry[cache_key] = datetime.utcnow() + timedelta(minutes=data_source.refresh_interval)
             
-            return data
+            return table
             
         except Exception as e:
             logger.error(f"Data processing failed: {e}")
-            return []
+            return ColumnarTable({})
+    
+    async def process_data(self, data_source: DataSource, filters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """Process data from source with filters, as row dicts"""
+        table = await self.process_table(data_source)
+        mask = filter_mask(table, filters)
+        return (table if mask is None else table.take(mask)).to_records()
     
     def _is_cache_valid(self, cache_key: str) -> bool:
         """Check if cached data is still valid"""
@@ -183,179 +202,127 @@ class DataProcessor:
         
         expiry = self.cache_expiry.get(cache_key)
         if not expiry or datetime.utcnow() > expiry:
+            # Drop the stale table rather than keeping it until it is replaced
+            self.data_cache.pop(cache_key, None)
+            self.cache_expiry.pop(cache_key, None)
             return False
         
         return True
     
-    async def _get_project_data(self, filters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+    @staticmethod
+    def _random_categorical(choices: List[str], size: int, p: List[float] = None) -> Categorical:
+        """Column of random choices, generated as codes"""
+        return Categorical(np.random.choice(len(choices), size=size, p=p).astype(np.int32), list(choices))
+    
+    @staticmethod
+    def _days_ago(low: int, high: int, size: int) -> np.ndarray:
+        """Timestamps a random number of days before now"""
+        now = np.datetime64(datetime.utcnow(), 'ms')
+        return now - np.random.randint(low, high, size).astype('timedelta64[D]')
+    
+    async def _get_project_data(self, size: int = 50) -> ColumnarTable:
         """Get project data"""
         # Simulate project data
-        projects = []
-        for i in range(50):
-            project = {
-                "id": f"proj_{i:03d}",
-                "name": f"Project {i+1}",
-                "status": np.random.choice(["Active", "Completed", "On Hold", "Cancelled"], p=[0.4, 0.3, 0.2, 0.1]),
-                "budget": np.random.uniform(50000, 500000),
-                "actual_cost": np.random.uniform(40000, 450000),
-                "start_date": datetime.utcnow() - timedelta(days=np.random.randint(1, 365)),
-                "completion_percentage": np.random.uniform(0, 100),
-                "team_size": np.random.randint(3, 15),
-                "client_satisfaction": np.random.uniform(3.0, 5.0),
-                "energy_savings": np.random.uniform(10, 40),  # percentage
-                "hvac_type": np.random.choice(["Commercial", "Residential", "Industrial", "Healthcare"]),
-                "region": np.random.choice(["North America", "Europe", "Asia", "Other"])
-            }
-            projects.append(project)
-        
-        # Apply filters
-        if filters:
-            filtered_projects = []
-            for project in projects:
-                include = True
-                
-                if "status" in filters and project["status"] not in filters["status"]:
-                    include = False
-                if "hvac_type" in filters and project["hvac_type"] not in filters["hvac_type"]:
-                    include = False
-                if "region" in filters and project["region"] not in filters["region"]:
-                    include = False
-                if "date_range" in filters:
-                    start_date = filters["date_range"].get("start")
-                    end_date = filters["date_range"].get("end")
-                    if start_date and project["start_date"] < start_date:
-                        include = False
-                    if end_date and project["start_date"] > end_date:
-                        include = False
-                
-                if include:
-                    filtered_projects.append(project)
-            
-            return filtered_projects
-        
-        return projects
+        return ColumnarTable({
+            "id": Categorical(np.arange(size, dtype=np.int32), [f"proj_{i:03d}" for i in range(size)]),
+            "name": Categorical(np.arange(size, dtype=np.int32), [f"Project {i+1}" for i in range(size)]),
+            "status": self._random_categorical(["Active", "Completed", "On Hold", "Cancelled"], size,
+                                               p=[0.4, 0.3, 0.2, 0.1]),
+            "budget": np.random.uniform(50000, 500000, size),
+            "actual_cost": np.random.uniform(40000, 450000, size),
+            "start_date": self._days_ago(1, 365, size),
+            "completion_percentage": np.random.uniform(0, 100, size),
+            "team_size": np.random.randint(3, 15, size),
+            "client_satisfaction": np.random.uniform(3.0, 5.0, size),
+            "energy_savings": np.random.uniform(10, 40, size),  # percentage
+            "hvac_type": self._random_categorical(["Commercial", "Residential", "Industrial", "Healthcare"], size),
+            "region": self._random_categorical(["North America", "Europe", "Asia", "Other"], size)
+        }, time_column=self.TIME_COLUMNS["projects"])
     
-    async def _get_calculation_data(self, filters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+    async def _get_calculation_data(self, size: int = 200) -> ColumnarTable:
         """Get calculation data"""
-        calculations = []
-        for i in range(200):
-            calc = {
-                "id": f"calc_{i:03d}",
-                "type": np.random.choice(["Load Calculation", "Duct Sizing", "Equipment Selection", "Energy Analysis"]),
-                "project_id": f"proj_{np.random.randint(0, 50):03d}",
-                "created_at": datetime.utcnow() - timedelta(days=np.random.randint(1, 365)),
-                "execution_time": np.random.uniform(0.5, 30.0),  # seconds
-                "accuracy": np.random.uniform(95, 99.9),  # percentage
-                "complexity": np.random.choice(["Simple", "Medium", "Complex"]),
-                "user_id": f"user_{np.random.randint(1, 20):03d}",
-                "iterations": np.random.randint(1, 10),
-                "energy_impact": np.random.uniform(-20, 30)  # percentage change
-            }
-            calculations.append(calc)
-        
-        return calculations
+        return ColumnarTable({
+            "id": Categorical(np.arange(size, dtype=np.int32), [f"calc_{i:03d}" for i in range(size)]),
+            "type": self._random_categorical(["Load Calculation", "Duct Sizing", "Equipment Selection",
+                                              "Energy Analysis"], size),
+            "project_id": self._random_categorical([f"proj_{i:03d}" for i in range(50)], size),
+            "created_at": self._days_ago(1, 365, size),
+            "execution_time": np.random.uniform(0.5, 30.0, size),  # seconds
+            "accuracy": np.random.uniform(95, 99.9, size),  # percentage
+            "complexity": self._random_categorical(["Simple", "Medium", "Complex"], size),
+            "user_id": self._random_categorical([f"user_{i:03d}" for i in range(1, 20)], size),
+            "region": self._random_categorical(["North America", "Europe", "Asia", "Other"], size),
+            "iterations": np.random.randint(1, 10, size),
+            "energy_impact": np.random.uniform(-20, 30, size)  # percentage change
+        }, time_column=self.TIME_COLUMNS["calculations"])
     
-    async def _get_user_data(self, filters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+    async def _get_user_data(self, size: int = 20) -> ColumnarTable:
         """Get user activity data"""
-        users = []
-        for i in range(20):
-            user = {
-                "id": f"user_{i+1:03d}",
-                "name": f"User {i+1}",
-                "role": np.random.choice(["Engineer", "Manager", "Analyst", "Admin"]),
-                "login_count": np.random.randint(50, 300),
-                "last_login": datetime.utcnow() - timedelta(days=np.random.randint(0, 30)),
-                "projects_count": np.random.randint(5, 25),
-                "calculations_count": np.random.randint(20, 150),
-                "avg_session_duration": np.random.uniform(30, 180),  # minutes
-                "efficiency_score": np.random.uniform(70, 95),
-                "department": np.random.choice(["HVAC Design", "Energy Analysis", "Project Management", "Quality Assurance"])
-            }
-            users.append(user)
-        
-        return users
+        return ColumnarTable({
+            "id": Categorical(np.arange(size, dtype=np.int32), [f"user_{i+1:03d}" for i in range(size)]),
+            "name": Categorical(np.arange(size, dtype=np.int32), [f"User {i+1}" for i in range(size)]),
+            "role": self._random_categorical(["Engineer", "Manager", "Analyst", "Admin"], size),
+            "login_count": np.random.randint(50, 300, size),
+            "last_login": self._days_ago(0, 30, size),
+            "projects_count": np.random.randint(5, 25, size),
+            "calculations_count": np.random.randint(20, 150, size),
+            "avg_session_duration": np.random.uniform(30, 180, size),  # minutes
+            "efficiency_score": np.random.uniform(70, 95, size),
+            "department": self._random_categorical(["HVAC Design", "Energy Analysis", "Project Management",
+                                                    "Quality Assurance"], size)
+        }, time_column=self.TIME_COLUMNS["users"])
     
-    async def _get_system_data(self, filters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+    async def _get_system_data(self) -> ColumnarTable:
         """Get system performance data"""
         # Generate hourly data for the last 30 days
-        system_data = []
-        base_time = datetime.utcnow() - timedelta(days=30)
-        
-        for hour in range(30 * 24):
-            timestamp = base_time + timedelta(hours=hour)
-            data_point = {
-                "timestamp": timestamp,
-                "cpu_usage": np.random.uniform(20, 80),
-                "memory_usage": np.random.uniform(40, 90),
-                "disk_usage": np.random.uniform(30, 70),
-                "network_io": np.random.uniform(100, 1000),  # MB/s
-                "active_users": np.random.randint(5, 50),
-                "response_time": np.random.uniform(100, 2000),  # ms
-                "error_rate": np.random.uniform(0, 5),  # percentage
-                "throughput": np.random.uniform(100, 1000)  # requests/minute
-            }
-            system_data.append(data_point)
-        
-        return system_data
+        size = 30 * 24
+        base_time = np.datetime64(datetime.utcnow() - timedelta(days=30), 'ms')
+        return ColumnarTable({
+            "timestamp": base_time + np.arange(size).astype('timedelta64[h]'),
+            "cpu_usage": np.random.uniform(20, 80, size),
+            "memory_usage": np.random.uniform(40, 90, size),
+            "disk_usage": np.random.uniform(30, 70, size),
+            "network_io": np.random.uniform(100, 1000, size),  # MB/s
+            "active_users": np.random.randint(5, 50, size),
+            "response_time": np.random.uniform(100, 2000, size),  # ms
+            "error_rate": np.random.uniform(0, 5, size),  # percentage
+            "throughput": np.random.uniform(100, 1000, size)  # requests/minute
+        }, time_column=self.TIME_COLUMNS["system"])
     
-    async def _get_sample_data(self, data_source: DataSource, filters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+    async def _get_sample_data(self, data_source: DataSource, size: int = 100) -> ColumnarTable:
         """Get sample data for custom sources"""
         # Generate sample data based on data source configuration
-        sample_data = []
-        for i in range(100):
-            data_point = {
-                "id": i,
-                "value": np.random.uniform(0, 100),
-                "category": np.random.choice(["A", "B", "C", "D"]),
-                "timestamp": datetime.utcnow() - timedelta(days=np.random.randint(0, 365)),
-                "metric": np.random.uniform(10, 1000)
-            }
-            sample_data.append(data_point)
-        
-        return sample_data
+        return ColumnarTable({
+            "id": np.arange(size),
+            "value": np.random.uniform(0, 100, size),
+            "category": self._random_categorical(["A", "B", "C", "D"], size),
+            "timestamp": self._days_ago(0, 365, size),
+            "metric": np.random.uniform(10, 1000, size)
+        }, time_column="timestamp")
     
     def aggregate_data(self, data: List[Dict[str, Any]], field: str, aggregation: AggregationType) -> float:
         """Aggregate data field"""
-        if not data:
-            return 0.0
-        
-        values = [item.get(field, 0) for item in data if field in item]
-        if not values:
+        values = np.fromiter((item[field] for item in data if field in item), dtype=np.float64)
+        if not len(values):
             return 0.0
-        
-        if aggregation == AggregationType.SUM:
-            return sum(values)
-        elif aggregation == AggregationType.AVERAGE:
-            return statistics.mean(values)
-        elif aggregation == AggregationType.COUNT:
-            return len(values)
-        elif aggregation == AggregationType.MIN:
-            return min(values)
-        elif aggregation == AggregationType.MAX:
-            return max(values)
-        elif aggregation == AggregationType.MEDIAN:
-            return statistics.median(values)
-        else:
-            return statistics.mean(values)
+        return aggregate_values(values, aggregation.value)
 
 class ReportGenerator:
     """Report generation engine"""
     
     def __init__(self, data_processor: DataProcessor):
         self.data_processor = data_processor
+        self.engine = ColumnarReportEngine()
     
     async def generate_report(self, template: ReportTemplate, parameters: Dict[str, Any] = None) -> ReportInstance:
         """Generate report from template"""
         logger.info(f"Generating report: {template.name}")
         
         report_id = f"report_{uuid.uuid4().hex[:8]}"
-        report_data = {}
         
         try:
-            # Process each chart in the template
-            for chart in template.charts:
-                chart_data = await self._generate_chart_data(chart, parameters)
-                report_data[chart.id] = chart_data
+            # Compute all charts in the template together
+            report_data = await self._generate_charts_data(template.charts, parameters)
             
             # Create report instance
             report = ReportInstance(
@@ -385,196 +352,34 @@ class ReportGenerator:
                 status="FAILED"
             )
     
+    async def _generate_charts_data(self, charts: List[ChartConfig],
+                                    parameters: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Generate data for several charts, loading and filtering each data source once"""
+        charts_by_source = defaultdict(list)
+        for chart in charts:
+            charts_by_source[chart.data_source].append(chart)
+        
+        chart_data = {}
+        for source_id, source_charts in charts_by_source.items():
+            table = await self.data_processor.process_table(self._data_source(source_id))
+            chart_data.update(self.engine.compute_charts(table, source_charts, parameters))
+        
+        return {chart.id: chart_data[chart.id] for chart in charts}
+    
     async def _generate_chart_data(self, chart: ChartConfig, parameters: Dict[str, Any] = None) -> Dict[str, Any]:
         """Generate data for a specific chart"""
-        # Get data source
-        data_source = DataSource(
-            id=chart.data_source,
-            name=chart.data_source,
-            type=chart.data_source,
+        return (await self._generate_charts_data([chart], parameters))[chart.id]
+    
+    @staticmethod
+    def _data_source(source_id: str) -> DataSource:
+        return DataSource(
+            id=source_id,
+            name=source_id,
+            type=source_id,
             connection_string="",
             query="",
             refresh_interval=15
         )
-        
-        # Apply filters from chart config and parameters
-        filters = chart.filters.copy()
-        if parameters:
-            filters.update(parameters)
-        
-        # Get raw data
-        raw_data = await self.data_processor.process_data(data_source, filters)
-        
-        # Process data based on chart type
-        if chart.type == ChartType.LINE or chart.type == ChartType.AREA:
-            return self._process_time_series_data(raw_data, chart)
-        elif chart.type == ChartType.BAR:
-            return self._process_categorical_data(raw_data, chart)
-        elif chart.type == ChartType.PIE:
-            return self._process_pie_data(raw_data, chart)
-        elif chart.type == ChartType.SCATTER:
-            return self._process_scatter_data(raw_data, chart)
-        elif chart.type == ChartType.TABLE:
-            return self._process_table_data(raw_data, chart)
-        elif chart.type == ChartType.GAUGE:
-            return self._process_gauge_data(raw_data, chart)
-        else:
-            return {"data": raw_data, "chart_type": chart.type.value}
-    
-    def _process_time_series_data(self, data: List[Dict[str, Any]], chart: ChartConfig) -> Dict[str, Any]:
-        """Process data for time series charts"""
-        # Group data by time periods
-        time_groups = defaultdict(list)
-        
-        for item in data:
-            if chart.x_axis in item:
-                time_key = item[chart.x_axis]
-                if isinstance(time_key, datetime):
-                    time_key = time_key.strftime('%Y-%m-%d')
-                time_groups[time_key].append(item)
-        
-        # Aggregate values for each time period
-        chart_data = []
-        for time_key, group_data in sorted(time_groups.items()):
-            aggregated_value = self.data_processor.aggregate_data(group_data, chart.y_axis, chart.aggregation)
-            chart_data.append({
-                "x": time_key,
-                "y": aggregated_value
-            })
-        
-        return {
-            "data": chart_data,
-            "chart_type": chart.type.value,
-            "title": chart.title,
-            "x_label": chart.x_axis,
-            "y_label": chart.y_axis
-        }
-    
-    def _process_categorical_data(self, data: List[Dict[str, Any]], chart: ChartConfig) -> Dict[str, Any]:
-        """Process data for bar charts"""
-        # Group data by categories
-        category_groups = defaultdict(list)
-        
-        for item in data:
-            if chart.x_axis in item:
-                category = item[chart.x_axis]
-                category_groups[category].append(item)
-        
-        # Aggregate values for each category
-        chart_data = []
-        for category, group_data in category_groups.items():
-            aggregated_value = self.data_processor.aggregate_data(group_data, chart.y_axis, chart.aggregation)
-            chart_data.append({
-                "category": category,
-                "value": aggregated_value
-            })
-        
-        # Sort by value descending
-        chart_data.sort(key=lambda x: x["value"], reverse=True)
-        
-        return {
-            "data": chart_data,
-            "chart_type": chart.type.value,
-            "title": chart.title,
-            "x_label": chart.x_axis,
-            "y_label": chart.y_axis
-        }
-    
-    def _process_pie_data(self, data: List[Dict[str, Any]], chart: ChartConfig) -> Dict[str, Any]:
-        """Process data for pie charts"""
-        # Count occurrences of each category
-        category_counts = defaultdict(int)
-        
-        for item in data:
-            if chart.x_axis in item:
-                category = item[chart.x_axis]
-                category_counts[category] += 1
-        
-        # Convert to chart data
-        chart_data = []
-        total = sum(category_counts.values())
-        
-        for category, count in category_counts.items():
-            percentage = (count / total * 100) if total > 0 else 0
-            chart_data.append({
-                "label": category,
-                "value": count,
-                "percentage": round(percentage, 1)
-            })
-        
-        # Sort by value descending
-        chart_data.sort(key=lambda x: x["value"], reverse=True)
-        
-        return {
-            "data": chart_data,
-            "chart_type": chart.type.value,
-            "title": chart.title,
-            "total": total
-        }
-    
-    def _process_scatter_data(self, data: List[Dict[str, Any]], chart: ChartConfig) -> Dict[str, Any]:
-        """Process data for scatter plots"""
-        chart_data = []
-        
-        for item in data:
-            if chart.x_axis in item and chart.y_axis in item:
-                chart_data.append({
-                    "x": item[chart.x_axis],
-                    "y": item[chart.y_axis],
-                    "label": item.get("name", item.get("id", ""))
-                })
-        
-        return {
-            "data": chart_data,
-            "chart_type": chart.type.value,
-            "title": chart.title,
-            "x_label": chart.x_axis,
-            "y_label": chart.y_axis
-        }
-    
-    def _process_table_data(self, data: List[Dict[str, Any]], chart: ChartConfig) -> Dict[str, Any]:
-        """Process data for tables"""
-        # Limit to first 100 rows for performance
-        table_data = data[:100]
-        
-        # Get column headers
-        columns = set()
-        for item in table_data:
-            columns.update(item.keys())
-        
-        return {
-            "data": table_data,
-            "chart_type": chart.type.value,
-            "title": chart.title,
-            "columns": sorted(list(columns)),
-            "row_count": len(table_data),
-            "total_rows": len(data)
-        }
-    
-    def _process_gauge_data(self, data: List[Dict[str, Any]], chart: ChartConfig) -> Dict[str, Any]:
-        """Process data for gauge charts"""
-        if not data:
-            return {
-                "data": {"value": 0, "max": 100},
-                "chart_type": chart.type.value,
-                "title": chart.title
-            }
-        
-        # Calculate aggregated value
-        value = self.data_processor.aggregate_data(data, chart.y_axis, chart.aggregation)
-        
-        # Determine max value (could be from chart config or calculated)
-        max_value = chart.styling.get("max_value", 100)
-        
-        return {
-            "data": {
-                "value": round(value, 2),
-                "max": max_value,
-                "percentage": round((value / max_value * 100), 1) if max_value > 0 else 0
-            },
-            "chart_type": chart.type.value,
-            "title": chart.title
-        }
 
 class AdvancedReportingAnalyticsSystem:
     """Main advanced reporting and analytics system"""
@@ -583,6 +388,11 @@ class AdvancedReportingAnalyticsSystem:
         self.db = db_service
         self.data_processor = DataProcessor()
         self.report_generator = ReportGenerator(self.data_processor)
+        self.rollup_planner = RollupPlanner({"calculations": calculation_rollups}, self.report_generator.engine)
+        # Finished reports and job state are shared through Redis so any worker can serve them
+        self.report_store = shared_report_store()
+        self.report_jobs = ReportJobQueue(self.generate_report, store=self.report_store,
+                                          enabled=REPORT_JOBS_ENABLED and self.report_store is not None)
         
         # In-memory storage for demo
         self.data_sources: Dict[str, DataSource] = {}
@@ -728,6 +538,28 @@ class AdvancedReportingAnalyticsSystem:
                     filters={},
                     styling={}
                 ),
+                ChartConfig(
+                    id="calculations_by_type",
+                    title="Calculation Time by Type (7 days)",
+                    type=ChartType.BAR,
+                    data_source="calculations",
+                    x_axis="type",
+                    y_axis="execution_time",
+                    aggregation=AggregationType.AVERAGE,
+                    filters={"time_range": TimeRange.LAST_7_DAYS.value},
+                    styling={}
+                ),
+                ChartConfig(
+                    id="daily_calculations",
+                    title="Calculations per Day (30 days)",
+                    type=ChartType.LINE,
+                    data_source="calculations",
+                    x_axis="created_at",
+                    y_axis="count",
+                    aggregation=AggregationType.COUNT,
+                    filters={"time_range": TimeRange.LAST_30_DAYS.value},
+                    styling={}
+                ),
                 ChartConfig(
                     id="user_activity",
                     title="User Activity",
@@ -809,9 +641,29 @@ class AdvancedReportingAnalyticsSystem:
         
         report = await self.report_generator.generate_report(template, parameters)
         self.report_instances[report.id] = report
+        if self.report_store is not None:
+            # Written before the job is marked finished, so a finished job's report is always readable
+            payload = asdict(report)
+            payload["generated_at"] = report.generated_at.isoformat()
+            self.report_store.save_report(report.id, payload)
         
         return report
     
+    def get_report_instance(self, report_id: str) -> Optional[ReportInstance]:
+        """Report generated by this process, or by another worker if it is in the shared store"""
+        report = self.report_instances.get(report_id)
+        if report is not None or self.report_store is None:
+            return report
+        try:
+            payload = self.report_store.load_report(report_id)
+        except Exception as e:
+            logger.warning(f"Could not read shared report {report_id}: {e}")
+            return None
+        if payload is None:
+            return None
+        payload["generated_at"] = datetime.fromisoformat(payload["generated_at"])
+        return ReportInstance(**payload)
+    
     async def get_dashboard_data(self, dashboard_id: str) -> Dict[str, Any]:
         """Get dashboard data"""
         dashboard = self.dashboards.get(dashboard_id)
@@ -826,9 +678,22 @@ class AdvancedReportingAnalyticsSystem:
             "widgets": []
         }
         
-        # Generate data for each widget
+        # Serve widgets from rollups where possible; compute the rest together from rows
+        now = datetime.utcnow()
+        stores = await self._load_rollups(dashboard.widgets, now)
+        widgets_data = {}
+        pending = []
         for widget in dashboard.widgets:
-            widget_data = await self.report_generator._generate_chart_data(widget)
+            widget_data = self.rollup_planner.serve(widget, now=now, stores=stores)
+            if widget_data is None:
+                pending.append(widget)
+            else:
+                widgets_data[widget.id] = widget_data
+        if pending:
+            widgets_data.update(await self.report_generator._generate_charts_data(pending))
+        
+        for widget in dashboard.widgets:
+            widget_data = widgets_data[widget.id]
             dashboard_data["widgets"].append({
                 "id": widget.id,
                 "title": widget.title,
@@ -838,6 +703,22 @@ class AdvancedReportingAnalyticsSystem:
         
         return dashboard_data
     
+    async def _load_rollups(self, charts: List[ChartConfig], now: datetime) -> Dict[str, RollupStore]:
+        """Read the shared buckets the charts need; sources without stored rollups are left out"""
+        stores = {}
+        for source_id, requests in self.rollup_planner.requests(charts, now=now).items():
+            store = self.rollup_planner.stores[source_id]
+            if store.loader is None:
+                continue
+            try:
+                loaded = await store.loader(store, requests)
+            except Exception as e:
+                logger.warning(f"Rollups for {source_id} unavailable: {e}")
+                continue
+            if loaded is not None:
+                stores[source_id] = loaded
+        return stores
+    
     def get_kpis(self) -> List[KPI]:
         """Get all KPIs"""
         return list(self.kpis.values())
@@ -859,6 +740,8 @@ class AdvancedReportingAnalyticsSystem:
             "kpis": len(self.kpis),
             "data_sources": len(self.data_sources),
             "cache_size": len(self.data_processor.data_cache),
+            "rollups": dict(self.rollup_planner.stats),
+            "report_jobs": dict(self.report_jobs.stats),
             "last_updated": datetime.utcnow().isoformat()
         }
 
@@ -0,0 +1,407 @@
+"""
+Columnar Analytics Engine for SizeWise Suite
+Report data sources held as NumPy column arrays, with vectorized filtering, group-by and aggregation.
+"""
+
+import json
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PERCENTILE = 95.0
+
+# Trailing windows for the ``time_range`` filter, keyed by TimeRange value
+TIME_RANGE_WINDOWS = {
+    "LAST_24_HOURS": timedelta(hours=24),
+    "LAST_7_DAYS": timedelta(days=7),
+    "LAST_30_DAYS": timedelta(days=30),
+    "LAST_90_DAYS": timedelta(days=90),
+    "LAST_YEAR": timedelta(days=365)
+}
+
+@dataclass
+class Categorical:
+    """Dictionary-encoded column: integer codes into a list of labels (-1 is missing)"""
+    codes: np.ndarray
+    categories: List[Any]
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def take(self, index: np.ndarray) -> 'Categorical':
+        return Categorical(self.codes[index], self.categories)
+
+    def labels(self) -> np.ndarray:
+        lookup = np.array(list(self.categories) + [None], dtype=object)
+        return lookup[self.codes]
+
+    @classmethod
+    def from_values(cls, values: Iterable[Any]) -> 'Categorical':
+        categories: List[Any] = []
+        index: Dict[Any, int] = {}
+        codes = []
+        for value in values:
+            if value is None:
+                codes.append(-1)
+                continue
+            code = index.get(value)
+            if code is None:
+                code = index[value] = len(categories)
+                categories.append(value)
+            codes.append(code)
+        return cls(np.asarray(codes, dtype=np.int32), categories)
+
+Column = Union[np.ndarray, Categorical]
+
+def _dense_unique(column: np.ndarray, max_span: int = 1 << 22) -> Tuple[np.ndarray, np.ndarray]:
+    """np.unique(return_inverse=True) in linear time for datetime buckets spanning a bounded range"""
+    if not len(column) or np.isnat(column).any():
+        return np.unique(column, return_inverse=True)
+    ticks = column.view(np.int64)
+    low, high = int(ticks.min()), int(ticks.max())
+    if high - low >= max_span:
+        return np.unique(column, return_inverse=True)
+    offsets = ticks - low
+    present = np.bincount(offsets, minlength=high - low + 1) > 0
+    remap = np.cumsum(present) - 1
+    return (np.flatnonzero(present) + low).astype(np.int64).view(column.dtype), remap[offsets]
+
+@dataclass
+class ColumnarTable:
+    """Named columns of equal length"""
+    columns: Dict[str, Column]
+    time_column: Optional[str] = None
+    _factorized: Dict[Tuple[str, Optional[str]], Tuple[np.ndarray, List[Any]]] = field(
+        default_factory=dict, repr=False
+    )
+
+    @property
+    def num_rows(self) -> int:
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.columns
+
+    @classmethod
+    def from_records(cls, records: List[Dict[str, Any]], time_column: Optional[str] = None) -> 'ColumnarTable':
+        """Convert row dicts once; strings become categoricals, datetimes datetime64[ms]"""
+        names: Dict[str, None] = {}
+        for record in records:
+            names.update(dict.fromkeys(record))
+
+        columns: Dict[str, Column] = {}
+        for name in names:
+            values = [record.get(name) for record in records]
+            sample = next((value for value in values if value is not None), None)
+            if isinstance(sample, datetime):
+                columns[name] = np.array([value if value is not None else 'NaT' for value in values],
+                                         dtype='datetime64[ms]')
+            elif isinstance(sample, (int, float, np.number)) and not isinstance(sample, bool):
+                columns[name] = np.array([value if value is not None else np.nan for value in values],
+                                         dtype=np.float64)
+            else:
+                columns[name] = Categorical.from_values(values)
+        return cls(columns, time_column)
+
+    def take(self, index: np.ndarray) -> 'ColumnarTable':
+        """Rows selected by a boolean mask or index array"""
+        return ColumnarTable({name: column.take(index) if isinstance(column, Categorical) else column[index]
+                              for name, column in self.columns.items()}, self.time_column)
+
+    def values(self, name: str) -> np.ndarray:
+        """Plain array for a column (labels for categoricals)"""
+        column = self.columns[name]
+        return column.labels() if isinstance(column, Categorical) else column
+
+    def factorize(self, name: str, time_bucket: Optional[str] = 'D') -> Tuple[np.ndarray, List[Any]]:
+        """Group codes and sorted group labels for a column; datetimes are bucketed by ``time_bucket``"""
+        key = (name, time_bucket)
+        if key not in self._factorized:
+            column = self.columns[name]
+            if isinstance(column, Categorical):
+                codes, labels = column.codes, list(column.categories)
+            elif np.issubdtype(column.dtype, np.datetime64):
+                if time_bucket:
+                    column = column.astype(f'datetime64[{time_bucket}]')
+                uniques, codes = _dense_unique(column)
+                labels = np.datetime_as_string(uniques).tolist()
+            else:
+                uniques, codes = np.unique(column, return_inverse=True)
+                labels = uniques.tolist()
+            self._factorized[key] = (codes.astype(np.int64, copy=False), labels)
+        return self._factorized[key]
+
+    def to_records(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Row dicts with plain Python values"""
+        stop = self.num_rows if limit is None else min(limit, self.num_rows)
+        converted = {}
+        for name, column in self.columns.items():
+            if isinstance(column, Categorical):
+                converted[name] = column.labels()[:stop].tolist()
+            elif np.issubdtype(column.dtype, np.datetime64):
+                converted[name] = column[:stop].astype('datetime64[ms]').astype(object).tolist()
+            else:
+                converted[name] = column[:stop].tolist()
+        return [{name: values[i] for name, values in converted.items()} for i in range(stop)]
+
+def filter_mask(table: ColumnarTable, filters: Optional[Dict[str, Any]],
+                now: Optional[datetime] = None) -> Optional[np.ndarray]:
+    """
+    Boolean row mask for report filters, or None when nothing is filtered.
+
+    List values keep rows whose column is one of the listed values.
+    ``date_range`` bounds the table's time column and ``time_range`` (a
+    TimeRange value such as "LAST_7_DAYS") keeps the trailing window before
+    ``now``. Scalar parameters (such as the requesting user_id) and unknown
+    columns do not filter.
+    """
+    mask = None
+    for name, value in (filters or {}).items():
+        condition = None
+        if name == 'date_range' and isinstance(value, dict) and table.time_column in table:
+            times = table.columns[table.time_column]
+            condition = np.ones(table.num_rows, dtype=bool)
+            if value.get('start'):
+                condition &= times >= np.datetime64(value['start'], 'ms')
+            if value.get('end'):
+                condition &= times <= np.datetime64(value['end'], 'ms')
+        elif name == 'time_range' and value in TIME_RANGE_WINDOWS and table.time_column in table:
+            start = (now or datetime.utcnow()) - TIME_RANGE_WINDOWS[value]
+            condition = table.columns[table.time_column] >= np.datetime64(start, 'ms')
+        elif isinstance(value, (list, tuple, set)) and name in table:
+            column = table.columns[name]
+            if isinstance(column, Categorical):
+                allowed = set(value)
+                condition = np.isin(column.codes, [code for code, label in enumerate(column.categories)
+                                                   if label in allowed])
+            else:
+                condition = np.isin(column, list(value))
+        if condition is not None:
+            mask = condition if mask is None else mask & condition
+    return mask
+
+def aggregate_groups(codes: np.ndarray, num_groups: int, values: Optional[np.ndarray], aggregation: str,
+                     percentile: float = DEFAULT_PERCENTILE) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Aggregate ``values`` per group code; returns (row counts, results).
+
+    ``values`` of None (the y-axis is not a column, e.g. "count") counts
+    rows. NaN values are ignored. Groups without values get NaN.
+    """
+    if values is None:
+        counts = np.bincount(codes, minlength=num_groups).astype(np.float64)
+        return counts, counts
+
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values)
+    if not valid.all():
+        codes, values = codes[valid], values[valid]
+    counts = np.bincount(codes, minlength=num_groups).astype(np.float64)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if aggregation == 'COUNT':
+            return counts, counts
+        if aggregation == 'SUM':
+            return counts, np.bincount(codes, weights=values, minlength=num_groups)
+        if aggregation == 'MIN':
+            result = np.full(num_groups, np.inf)
+            np.minimum.at(result, codes, values)
+        elif aggregation == 'MAX':
+            result = np.full(num_groups, -np.inf)
+            np.maximum.at(result, codes, values)
+        elif aggregation in ('MEDIAN', 'PERCENTILE'):
+            q = 50.0 if aggregation == 'MEDIAN' else percentile
+            return counts, _group_percentiles(codes, counts, values, q)
+        else:  # AVERAGE
+            return counts, np.bincount(codes, weights=values, minlength=num_groups) / counts
+    result[counts == 0] = np.nan
+    return counts, result
+
+def _group_percentiles(codes: np.ndarray, counts: np.ndarray, values: np.ndarray, q: float,
+                       max_partitioned_groups: int = 4096) -> np.ndarray:
+    """Linearly interpolated q-th percentile per group"""
+    num_groups = len(counts)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.int64)
+    position = (np.maximum(counts, 1) - 1) * (q / 100.0)
+    low = np.floor(position).astype(np.int64)
+    high = np.ceil(position).astype(np.int64)
+    result = np.full(num_groups, np.nan)
+
+    if num_groups <= max_partitioned_groups:
+        # Bucket rows by group (integer sort), then a linear-time selection per group
+        grouped = values[np.argsort(codes, kind='stable')] if num_groups > 1 else values.copy()
+        for group in np.flatnonzero(counts).tolist():
+            segment = grouped[starts[group]:starts[group] + int(counts[group])]
+            segment.partition([low[group], high[group]])
+            low_value, high_value = segment[low[group]], segment[high[group]]
+            result[group] = low_value + (high_value - low_value) * (position[group] - low[group])
+        return result
+
+    # Many small groups: one full sort beats a Python loop over groups
+    ordered = values[np.lexsort((values, codes))]
+    present = counts > 0
+    low_values = ordered[starts[present] + low[present]]
+    high_values = ordered[starts[present] + high[present]]
+    result[present] = low_values + (high_values - low_values) * (position[present] - low[present])
+    return result
+
+def aggregate_values(values: np.ndarray, aggregation: str, percentile: float = DEFAULT_PERCENTILE) -> float:
+    """Aggregate a whole column"""
+    values = np.asarray(values, dtype=np.float64)
+    _, result = aggregate_groups(np.zeros(len(values), dtype=np.int64), 1, values, aggregation, percentile)
+    return 0.0 if np.isnan(result[0]) else float(result[0])
+
+def _number(value: float) -> float:
+    return 0.0 if np.isnan(value) else float(value)
+
+class ColumnarReportEngine:
+    """
+    Computes report charts over a columnar table.
+
+    Charts of one template share the work: each distinct filter set is
+    applied to the table once, and each grouping column is factorized once
+    per filtered table.
+    """
+
+    TABLE_ROW_LIMIT = 100
+
+    def compute_charts(self, table: ColumnarTable, charts: List[Any], parameters: Optional[Dict[str, Any]] = None,
+                       now: Optional[datetime] = None) -> Dict[str, Dict[str, Any]]:
+        """Chart payloads by chart id for charts reading ``table``"""
+        filtered: Dict[str, ColumnarTable] = {}
+        results = {}
+        for chart in charts:
+            filters = dict(chart.filters)
+            filters.update(parameters or {})
+            key = json.dumps(filters, sort_keys=True, default=str)
+            if key not in filtered:
+                mask = filter_mask(table, filters, now)
+                filtered[key] = table if mask is None else table.take(mask)
+            results[chart.id] = self.compute_chart(filtered[key], chart)
+        return results
+
+    def compute_chart(self, table: ColumnarTable, chart: Any) -> Dict[str, Any]:
+        chart_type = chart.type.value
+        if chart_type in ('LINE', 'AREA'):
+            return self._time_series(table, chart)
+        if chart_type == 'BAR':
+            return self._categorical(table, chart)
+        if chart_type == 'PIE':
+            return self._pie(table, chart)
+        if chart_type == 'SCATTER':
+            return self._scatter(table, chart)
+        if chart_type == 'TABLE':
+            return self._table(table, chart)
+        if chart_type == 'GAUGE':
+            return self._gauge(table, chart)
+        return {"data": table.to_records(), "chart_type": chart_type}
+
+    def _grouped(self, table: ColumnarTable, chart: Any) -> Tuple[List[Any], np.ndarray, np.ndarray]:
+        codes, labels = table.factorize(chart.x_axis)
+        values = self._numeric(table, chart.y_axis)
+        if len(codes) and codes.min() < 0:
+            # Rows with no x value belong to no group
+            keep = codes >= 0
+            codes = codes[keep]
+            values = None if values is None else values[keep]
+        counts, results = aggregate_groups(codes, len(labels), values, chart.aggregation.value,
+                                           chart.styling.get('percentile', DEFAULT_PERCENTILE))
+        return labels, counts, results
+
+    @staticmethod
+    def _numeric(table: ColumnarTable, name: str) -> Optional[np.ndarray]:
+        if name not in table:
+            return None
+        column = table.columns[name]
+        if isinstance(column, Categorical) or not np.issubdtype(column.dtype, np.number):
+            return None
+        return column
+
+    def _axes(self, chart: Any) -> Dict[str, Any]:
+        return {"chart_type": chart.type.value, "title": chart.title, "x_label": chart.x_axis,
+                "y_label": chart.y_axis}
+
+    def _time_series(self, table: ColumnarTable, chart: Any) -> Dict[str, Any]:
+        if chart.x_axis not in table or not table.num_rows:
+            return {"data": [], **self._axes(chart)}
+        return self.format_groups(chart, *self._grouped(table, chart))
+
+    def _categorical(self, table: ColumnarTable, chart: Any) -> Dict[str, Any]:
+        if chart.x_axis not in table or not table.num_rows:
+            return {"data": [], **self._axes(chart)}
+        return self.format_groups(chart, *self._grouped(table, chart))
+
+    def _pie(self, table: ColumnarTable, chart: Any) -> Dict[str, Any]:
+        if chart.x_axis not in table or not table.num_rows:
+            return self.format_groups(chart, [], np.zeros(0), np.zeros(0))
+        codes, labels = table.factorize(chart.x_axis)
+        counts = np.bincount(codes[codes >= 0], minlength=len(labels))
+        return self.format_groups(chart, labels, counts, counts)
+
+    def format_groups(self, chart: Any, labels: List[Any], counts: np.ndarray,
+                      results: np.ndarray) -> Dict[str, Any]:
+        """Payload for a grouped chart from per-group row counts and aggregates; empty groups are left out"""
+        chart_type = chart.type.value
+        present = np.flatnonzero(counts)
+        if chart_type == 'PIE':
+            total = int(counts.sum())
+            data = [{"label": labels[i], "value": int(counts[i]), "percentage": round(counts[i] / total * 100, 1)}
+                    for i in present[np.argsort(-counts[present], kind='stable')].tolist()]
+            return {"data": data, "chart_type": chart_type, "title": chart.title, "total": total}
+        if chart_type == 'BAR':
+            order = present[np.argsort(-np.nan_to_num(results[present]), kind='stable')]
+            data = [{"category": labels[i], "value": _number(results[i])} for i in order.tolist()]
+        else:
+            data = [{"x": labels[i], "y": _number(results[i])} for i in present.tolist()]
+        return {"data": data, **self._axes(chart)}
+
+    def _scatter(self, table: ColumnarTable, chart: Any) -> Dict[str, Any]:
+        data = []
+        if chart.x_axis in table and chart.y_axis in table and table.num_rows:
+            label_column = 'name' if 'name' in table else 'id' if 'id' in table else None
+            labels = table.values(label_column).tolist() if label_column else [""] * table.num_rows
+            xs = table.values(chart.x_axis).tolist()
+            ys = table.values(chart.y_axis).tolist()
+            data = [{"x": x, "y": y, "label": label} for x, y, label in zip(xs, ys, labels)]
+        return {"data": data, **self._axes(chart)}
+
+    def _table(self, table: ColumnarTable, chart: Any) -> Dict[str, Any]:
+        rows = table.to_records(self.TABLE_ROW_LIMIT)
+        return {
+            "data": rows,
+            "chart_type": chart.type.value,
+            "title": chart.title,
+            "columns": sorted(table.columns),
+            "row_count": len(rows),
+            "total_rows": table.num_rows
+        }
+
+    def _gauge(self, table: ColumnarTable, chart: Any) -> Dict[str, Any]:
+        if not table.num_rows:
+            return self.format_gauge(chart, None)
+        values = self._numeric(table, chart.y_axis)
+        if values is None:
+            return self.format_gauge(chart, float(table.num_rows))
+        return self.format_gauge(chart, aggregate_values(values, chart.aggregation.value,
+                                                         chart.styling.get('percentile', DEFAULT_PERCENTILE)))
+
+    @staticmethod
+    def format_gauge(chart: Any, value: Optional[float]) -> Dict[str, Any]:
+        """Gauge payload; ``value`` of None means there were no rows"""
+        max_value = chart.styling.get("max_value", 100)
+        if value is None:
+            return {"data": {"value": 0, "max": max_value}, "chart_type": chart.type.value, "title": chart.title}
+        return {
+            "data": {
+                "value": round(value, 2),
+                "max": max_value,
+                "percentage": round((value / max_value * 100), 1) if max_value > 0 else 0
+            },
+            "chart_type": chart.type.value,
+            "title": chart.title
+        }
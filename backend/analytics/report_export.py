@@ -0,0 +1,101 @@
+"""
+Streaming Report Export for SizeWise Suite
+
+Exports are produced by generators that write JSON or CSV a row at a time
+and hand out chunks of about ``CHUNK_SIZE`` characters. An export therefore
+never holds another full copy of the report. Chunks can be gzip-compressed
+as they are produced.
+"""
+
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import Any, Iterable, Iterator
+
+import numpy as np
+
+CHUNK_SIZE = 64 * 1024
+
+# format -> (mimetype, file extension)
+EXPORT_FORMATS = {
+    "json": ("application/json", "json"),
+    "csv": ("text/csv", "csv")
+}
+
+def json_default(value: Any) -> Any:
+    """JSON encoding for the datetimes and NumPy scalars found in report data"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, default=json_default)
+
+def _json_pieces(report) -> Iterator[str]:
+    yield '{"report": {"id": %s, "name": %s, "generated_at": %s, "data": {' % (
+        _dumps(report.id), _dumps(report.name), _dumps(report.generated_at.isoformat()))
+    for index, (chart_id, chart_data) in enumerate(report.data.items()):
+        yield (', ' if index else '') + _dumps(chart_id) + ': '
+        if isinstance(chart_data, dict) and isinstance(chart_data.get('data'), list):
+            # Chart rows are written one by one; the rest of the chart is small
+            yield '{' + ''.join(f'{_dumps(key)}: {_dumps(value)}, ' for key, value in chart_data.items()
+                                if key != 'data') + '"data": ['
+            for row_index, item in enumerate(chart_data['data']):
+                yield (', ' if row_index else '') + _dumps(item)
+            yield ']}'
+        else:
+            yield _dumps(chart_data)
+    yield '}}}'
+
+def _csv_pieces(report) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def line(values) -> str:
+        writer.writerow(values)
+        text = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return text
+
+    yield line(['Chart', 'Data Type', 'Value'])
+    for chart_id, chart_data in report.data.items():
+        if isinstance(chart_data, dict) and isinstance(chart_data.get('data'), list):
+            for item in chart_data['data']:
+                if isinstance(item, dict):
+                    for key, value in item.items():
+                        yield line([chart_id, key, value])
+
+def _chunked(pieces: Iterable[str], chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    buffer, size = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield ''.join(buffer).encode()
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer).encode()
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Gzip a byte stream as it is read"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # 16+: gzip header and trailer
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+def export_chunks(report, export_format: str, compress: bool = False) -> Iterator[bytes]:
+    """Encoded export of a report instance, produced incrementally"""
+    if export_format == "json":
+        chunks = _chunked(_json_pieces(report))
+    elif export_format == "csv":
+        chunks = _chunked(_csv_pieces(report))
+    else:
+        raise ValueError(f"Unsupported export format: {export_format}")
+    return gzip_chunks(chunks) if compress else chunks
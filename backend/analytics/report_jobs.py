@@ -0,0 +1,274 @@
+"""
+Background Report Generation for SizeWise Suite
+
+Report requests are queued and generated by a small pool of worker threads
+instead of inside the HTTP request. Each worker keeps its own event loop for
+the report coroutines. Submitting returns a job id at once. Clients poll the
+job (optionally waiting for it to change) or subscribe to its updates. The
+pool size and the number of queued jobs are bounded, so a burst of large
+reports waits or is refused instead of tying up every web worker.
+
+A job runs in the worker process that accepted it, but its state and the
+finished report are also written to Redis (``ReportStore``). Under several
+gunicorn workers, a poll, event stream or download landing on another
+worker reads them from there. Without a reachable Redis, background jobs
+stay off and reports are generated inside the request. REPORT_JOBS_ENABLED
+can switch them off explicitly.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import redis
+
+from .report_export import json_default
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "QUEUED"
+RUNNING = "RUNNING"
+COMPLETED = "COMPLETED"
+FAILED = "FAILED"
+
+REPORT_JOBS_ENABLED = os.getenv('REPORT_JOBS_ENABLED', 'true').lower() == 'true'
+
+# How long job records and finished reports are kept in the shared store
+REPORT_STORE_TTL_SECONDS = 86400
+# How often a worker that does not run a job re-reads it while waiting
+REMOTE_POLL_SECONDS = 0.25
+
+class ReportQueueFull(Exception):
+    """Raised when too many reports are already waiting to be generated"""
+
+@dataclass
+class ReportJob:
+    """State of one queued report"""
+    id: str
+    template_id: str
+    parameters: Dict[str, Any]
+    status: str = QUEUED
+    submitted_at: datetime = field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    report_id: Optional[str] = None
+    error: Optional[str] = None
+    version: int = 0  # Bumped on every change so waiters can tell what they have seen
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (COMPLETED, FAILED)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "template_id": self.template_id,
+            "status": self.status,
+            "submitted_at": self.submitted_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "report_id": self.report_id,
+            "error": self.error,
+            "version": self.version
+        }
+
+def _is_finished(state: Dict[str, Any]) -> bool:
+    return state["status"] in (COMPLETED, FAILED)
+
+class ReportStore:
+    """Job records and finished reports in Redis, readable from every worker process"""
+
+    def __init__(self, client, ttl: int = REPORT_STORE_TTL_SECONDS, prefix: str = "sizewise:reports"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def save_job(self, state: Dict[str, Any]):
+        self.client.setex(f"{self.prefix}:job:{state['job_id']}", self.ttl, json.dumps(state))
+
+    def load_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        value = self.client.get(f"{self.prefix}:job:{job_id}")
+        return json.loads(value) if value else None
+
+    def save_report(self, report_id: str, report: Dict[str, Any]):
+        self.client.setex(f"{self.prefix}:report:{report_id}", self.ttl, json.dumps(report, default=json_default))
+
+    def load_report(self, report_id: str) -> Optional[Dict[str, Any]]:
+        value = self.client.get(f"{self.prefix}:report:{report_id}")
+        return json.loads(value) if value else None
+
+def shared_report_store() -> Optional[ReportStore]:
+    """Report store on the configured Redis, or None when Redis cannot be reached"""
+    client = redis.Redis(
+        host=os.getenv('REDIS_HOST', 'localhost'),
+        port=int(os.getenv('REDIS_PORT', 6379)),
+        password=os.getenv('REDIS_PASSWORD'),
+        socket_connect_timeout=2,
+        socket_timeout=2
+    )
+    try:
+        client.ping()
+    except redis.RedisError as e:
+        logger.warning(f"Report store unavailable, generating reports inline: {e}")
+        return None
+    return ReportStore(client)
+
+class ReportJobQueue:
+    """Bounded worker pool generating reports in the background"""
+
+    def __init__(self, generate: Callable[[str, Dict[str, Any]], Awaitable[Any]], max_workers: int = 2,
+                 max_pending: int = 50, max_jobs: int = 1000, enabled: bool = True,
+                 store: Optional[ReportStore] = None):
+        self.generate = generate  # Coroutine function (template_id, parameters) -> report
+        self.enabled = enabled  # When False, callers generate reports inline instead of submitting
+        self.store = store  # Shares job state with other processes; None keeps it local
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.max_jobs = max_jobs
+        self.jobs: "OrderedDict[str, ReportJob]" = OrderedDict()
+        self.stats = {'submitted': 0, 'completed': 0, 'failed': 0, 'rejected': 0}
+        self._pending = 0
+        self._changed = threading.Condition()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pid: Optional[int] = None
+        self._executor_lock = threading.Lock()
+        self._worker = threading.local()
+
+    def submit(self, template_id: str, parameters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Queue a report; returns the new job's state without waiting for it"""
+        with self._changed:
+            if self._pending >= self.max_pending:
+                self.stats['rejected'] += 1
+                raise ReportQueueFull(f"{self._pending} reports are already queued")
+            job = ReportJob(id=f"job_{uuid.uuid4().hex[:12]}", template_id=template_id,
+                            parameters=parameters or {})
+            self.jobs[job.id] = job
+            self._pending += 1
+            self.stats['submitted'] += 1
+            self._evict()
+            state = job.to_dict()
+            self._publish(state)
+
+        self._get_executor().submit(self._run, job)
+        return state
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Current state of a job, or None if it is unknown or has been evicted"""
+        with self._changed:
+            job = self.jobs.get(job_id)
+            if job is not None:
+                return job.to_dict()
+        return self._load(job_id)
+
+    def wait(self, job_id: str, after_version: Optional[int] = None,
+             timeout: float = 0.0) -> Optional[Dict[str, Any]]:
+        """
+        State of a job once it finishes, or once its version passes ``after_version`` if given.
+
+        Returns the current state when ``timeout`` seconds pass first. Jobs run
+        by another process are re-read from the store until then.
+        """
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            job = self.jobs.get(job_id)
+            while job is not None and not job.finished:
+                if after_version is not None and job.version > after_version:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._changed.wait(remaining)
+            if job is not None:
+                return job.to_dict()
+
+        state = self._load(job_id)
+        while state is not None and not _is_finished(state):
+            if after_version is not None and state["version"] > after_version:
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            time.sleep(min(REMOTE_POLL_SECONDS, remaining))
+            state = self._load(job_id) or state
+        return state
+
+    def shutdown(self, wait: bool = True):
+        with self._executor_lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=wait)
+            self._executor = None
+            self._pid = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Threads do not survive a fork; a child process starts its own pool
+        if self._executor is None or self._pid != os.getpid():
+            with self._executor_lock:
+                if self._executor is None or self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                        thread_name_prefix="report-worker")
+                    self._pid = os.getpid()
+        return self._executor
+
+    def _run(self, job: ReportJob):
+        self._update(job, status=RUNNING, started_at=datetime.utcnow())
+        loop = getattr(self._worker, 'loop', None)
+        if loop is None:
+            loop = self._worker.loop = asyncio.new_event_loop()
+
+        try:
+            report = loop.run_until_complete(self.generate(job.template_id, job.parameters))
+        except Exception as e:
+            logger.error(f"Report job {job.id} failed: {e}")
+            self._update(job, status=FAILED, error=str(e), finished_at=datetime.utcnow())
+            return
+
+        # Generators report their own failures on the instance rather than raising
+        failed = getattr(report, 'status', COMPLETED) == FAILED
+        self._update(job, status=FAILED if failed else COMPLETED, report_id=report.id,
+                     error="Report generation failed" if failed else None, finished_at=datetime.utcnow())
+
+    def _update(self, job: ReportJob, **changes):
+        with self._changed:
+            if changes.get('status') == RUNNING:
+                self._pending -= 1
+            elif changes.get('status') in (COMPLETED, FAILED):
+                self.stats['completed' if changes['status'] == COMPLETED else 'failed'] += 1
+            for name, value in changes.items():
+                setattr(job, name, value)
+            job.version += 1
+            self._publish(job.to_dict())
+            self._changed.notify_all()
+
+    def _publish(self, state: Dict[str, Any]):
+        if self.store is None:
+            return
+        try:
+            self.store.save_job(state)
+        except Exception as e:
+            logger.warning(f"Could not share report job {state['job_id']}: {e}")
+
+    def _load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        if self.store is None:
+            return None
+        try:
+            return self.store.load_job(job_id)
+        except Exception as e:
+            logger.warning(f"Could not read report job {job_id}: {e}")
+            return None
+
+    def _evict(self):
+        # Forget the oldest finished jobs; queued and running ones are always kept
+        excess = len(self.jobs) - self.max_jobs
+        if excess <= 0:
+            return
+        for job_id in [job_id for job_id, job in self.jobs.items() if job.finished][:excess]:
+            del self.jobs[job_id]
@@ -0,0 +1,420 @@
+"""
+Incremental Rollups for SizeWise Suite Analytics
+
+Saved calculations are pre-aggregated into minute, hour and day buckets as
+they arrive. A bucket holds totals for all rows and totals per value of
+each dimension (calculation type, region, user). Each total is a row count
+plus a count, sum, minimum and maximum per measure. Those merge exactly
+across buckets for SUM, AVERAGE, COUNT, MIN and MAX.
+
+A dashboard widget over a trailing window (``time_range`` filter) is
+answered from the coarsest buckets that cover it: minutes up to the first
+whole hour, hours up to the first whole day, then days. Work grows with
+the number of buckets, not rows. Minute and hour buckets are only kept for
+a while, so an older window starts at the finest granularity still kept
+(at most an hour early). Widgets the rollups cannot answer exactly fall
+back to the columnar engine: percentiles, medians, date ranges and filters
+on a second dimension.
+
+Buckets live in shared storage so every web worker sees every save. A
+store's ``loader`` (set by the services layer) reads just the buckets a
+dashboard needs into a fresh in-memory store, which the planner then
+serves from. ``calculation_rollups`` is the layout of the saved
+calculation rollups; its own buckets stay empty.
+"""
+
+import math
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .columnar_engine import TIME_RANGE_WINDOWS, ColumnarReportEngine
+
+EPOCH = datetime(1970, 1, 1)
+
+# Finest first; each width divides the next
+GRANULARITIES = (('minute', 60), ('hour', 3600), ('day', 86400))
+WIDTHS = dict(GRANULARITIES)
+
+# Seconds each granularity is kept for (None keeps it indefinitely)
+DEFAULT_RETENTION = {'minute': 2 * 86400, 'hour': 120 * 86400, 'day': None}
+
+MERGEABLE_AGGREGATIONS = ('SUM', 'AVERAGE', 'COUNT', 'MIN', 'MAX')
+
+Piece = Tuple[str, Optional[int], Optional[int]]  # granularity, first bucket, end (exclusive, None is open)
+BucketKey = Tuple[str, Optional[str], Any, int]  # granularity, dimension (None for all rows), value, bucket start
+
+def epoch_seconds(value: Any) -> Optional[float]:
+    """Seconds since the epoch for naive-UTC datetimes, datetime64 values and numbers"""
+    if isinstance(value, datetime):
+        return value.timestamp() if value.tzinfo is not None else (value - EPOCH).total_seconds()
+    if isinstance(value, np.datetime64):
+        return None if np.isnat(value) else value.astype('datetime64[ms]').astype(np.int64) / 1000.0
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return None
+
+def measure_value(value: Any) -> Optional[float]:
+    if isinstance(value, bool) or not isinstance(value, (int, float, np.number)):
+        return None
+    value = float(value)
+    return None if math.isnan(value) else value
+
+@dataclass
+class MeasureStats:
+    """Mergeable totals for one measure"""
+    count: int = 0
+    total: float = 0.0
+    minimum: float = math.inf
+    maximum: float = -math.inf
+
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        if value < self.minimum:
+            self.minimum = value
+        if value > self.maximum:
+            self.maximum = value
+
+    def merge(self, other: 'MeasureStats'):
+        self.count += other.count
+        self.total += other.total
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'count': self.count, 'total': self.total, 'min': self.minimum, 'max': self.maximum}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'MeasureStats':
+        return cls(data.get('count', 0), data.get('total', 0.0), data.get('min', math.inf), data.get('max', -math.inf))
+
+    def result(self, aggregation: str) -> float:
+        if aggregation == 'COUNT':
+            return float(self.count)
+        if not self.count:
+            return 0.0
+        if aggregation == 'SUM':
+            return self.total
+        if aggregation == 'MIN':
+            return self.minimum
+        if aggregation == 'MAX':
+            return self.maximum
+        return self.total / self.count
+
+@dataclass
+class BucketStats:
+    """Row count and measure totals for one bucket and dimension value"""
+    rows: int = 0
+    measures: Dict[str, MeasureStats] = field(default_factory=dict)
+
+    def merge(self, other: 'BucketStats', measure: Optional[str]):
+        """Add another bucket's row count and, if given, its totals for one measure"""
+        self.rows += other.rows
+        if measure is not None and measure in other.measures:
+            self.measures.setdefault(measure, MeasureStats()).merge(other.measures[measure])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'rows': self.rows, 'measures': {name: stats.to_dict() for name, stats in self.measures.items()}}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'BucketStats':
+        return cls(data.get('rows', 0), {name: MeasureStats.from_dict(stats)
+                                         for name, stats in data.get('measures', {}).items()})
+
+class RollupStore:
+    """Minute, hour and day pre-aggregates of one data source, overall and per dimension"""
+
+    def __init__(self, time_column: str, dimensions: Iterable[str], measures: Iterable[str],
+                 retention: Optional[Dict[str, Optional[int]]] = None, clock=time.time):
+        self.time_column = time_column
+        self.dimensions = tuple(dimensions)
+        self.measures = tuple(measures)
+        self.retention = {**DEFAULT_RETENTION, **(retention or {})}
+        self.clock = clock
+        self.loaded = False  # Set on stores holding the buckets of every saved row
+        # async (store, dimension -> pieces) -> loaded copy of the shared buckets, or None before backfill
+        self.loader: Optional[Callable[['RollupStore', Dict[Optional[str], List[Piece]]],
+                                       Awaitable[Optional['RollupStore']]]] = None
+        self._lock = threading.Lock()
+        self._next_eviction = 0.0
+        # (granularity, dimension or None for all rows) -> bucket start -> dimension value -> stats
+        self.buckets: Dict[Tuple[str, Optional[str]], Dict[int, Dict[Any, BucketStats]]] = {
+            (granularity, dimension): {}
+            for granularity, _ in GRANULARITIES for dimension in (None,) + self.dimensions
+        }
+        self.stats = {'rows': 0, 'skipped': 0}
+
+    def available_from(self, granularity: str, now: float) -> Optional[int]:
+        """Start of the oldest complete bucket kept for ``granularity``, or None if nothing expires"""
+        retention = self.retention[granularity]
+        if retention is None:
+            return None
+        width = WIDTHS[granularity]
+        return int(now - retention) // width * width
+
+    def empty(self) -> 'RollupStore':
+        """Store with the same layout and no buckets"""
+        return RollupStore(self.time_column, self.dimensions, self.measures, self.retention, self.clock)
+
+    def increments(self, row: Dict[str, Any]) -> Optional[Tuple[List[BucketKey], List[Tuple[str, float]]]]:
+        """Buckets a saved row counts towards and its measure values; None if it has no timestamp"""
+        at = epoch_seconds(row.get(self.time_column))
+        if at is None:
+            return None
+        values = [(name, measure_value(row.get(name))) for name in self.measures]
+        values = [(name, value) for name, value in values if value is not None]
+        labels = [(None, None)] + [(dimension, row.get(dimension)) for dimension in self.dimensions
+                                   if row.get(dimension) is not None]
+        now = self.clock()
+
+        keys = []
+        for granularity, width in GRANULARITIES:
+            start = int(at // width * width)
+            cutoff = self.available_from(granularity, now)
+            if cutoff is None or start >= cutoff:
+                keys.extend((granularity, dimension, label, start) for dimension, label in labels)
+        return keys, values
+
+    def record(self, row: Dict[str, Any]):
+        """Fold one saved row into every rollup"""
+        increments = self.increments(row)
+        if increments is None:
+            self.stats['skipped'] += 1
+            return
+        keys, values = increments
+        now = self.clock()
+
+        with self._lock:
+            for key in keys:
+                stats = self._bucket(key)
+                stats.rows += 1
+                for name, value in values:
+                    measure = stats.measures.get(name)
+                    if measure is None:
+                        measure = stats.measures[name] = MeasureStats()
+                    measure.add(value)
+            self.stats['rows'] += 1
+            if now >= self._next_eviction:
+                self._evict(now)
+
+    def merge_bucket(self, key: BucketKey, stats: BucketStats):
+        """Add stored totals for one bucket"""
+        with self._lock:
+            target = self._bucket(key)
+            target.rows += stats.rows
+            for name, measure in stats.measures.items():
+                target.measures.setdefault(name, MeasureStats()).merge(measure)
+
+    def items(self) -> Iterator[Tuple[BucketKey, BucketStats]]:
+        """Every bucket with its totals"""
+        with self._lock:
+            found = [((granularity, dimension, label, start), stats)
+                     for (granularity, dimension), buckets in self.buckets.items()
+                     for start, groups in buckets.items() for label, stats in groups.items()]
+        return iter(found)
+
+    def _bucket(self, key: BucketKey) -> BucketStats:
+        granularity, dimension, label, start = key
+        groups = self.buckets[(granularity, dimension)].setdefault(start, {})
+        stats = groups.get(label)
+        if stats is None:
+            stats = groups[label] = BucketStats()
+        return stats
+
+    def _evict(self, now: float):
+        for granularity, _ in GRANULARITIES:
+            cutoff = self.available_from(granularity, now)
+            if cutoff is None:
+                continue
+            for dimension in (None,) + self.dimensions:
+                buckets = self.buckets[(granularity, dimension)]
+                for start in [start for start in buckets if start < cutoff]:
+                    del buckets[start]
+        self._next_eviction = now + WIDTHS['minute']
+
+    def cover(self, start: Optional[float], now: float) -> List[Piece]:
+        """Pieces covering [start, now] with the coarsest buckets that fit"""
+        if start is None:
+            return [(GRANULARITIES[-1][0], None, None)]
+
+        # Begin at the finest granularity still kept for ``start``
+        for index, (granularity, width) in enumerate(GRANULARITIES):
+            cutoff = self.available_from(granularity, now)
+            if cutoff is None or start // width * width >= cutoff:
+                break
+        position = int(start // width * width)
+        if cutoff is not None:
+            position = max(position, cutoff)
+
+        pieces: List[Piece] = []
+        for (granularity, _), (_, coarser) in zip(GRANULARITIES[index:], GRANULARITIES[index + 1:]):
+            boundary = -(-position // coarser) * coarser
+            if boundary > position:
+                pieces.append((granularity, position, boundary))
+            position = boundary
+        pieces.append((GRANULARITIES[-1][0], position, None))
+        return pieces
+
+    def scan(self, pieces: List[Piece], dimension: Optional[str]) -> List[Tuple[int, Any, BucketStats]]:
+        """(bucket start, dimension value, stats) for every bucket in ``pieces``"""
+        found = []
+        with self._lock:
+            for granularity, first, end in pieces:
+                buckets = self.buckets[(granularity, dimension)]
+                if end is None:
+                    starts = [start for start in buckets if first is None or start >= first]
+                else:
+                    starts = range(first, end, WIDTHS[granularity])
+                for start in starts:
+                    for label, stats in buckets.get(start, {}).items():
+                        found.append((start, label, stats))
+        return found
+
+@dataclass
+class RollupQuery:
+    """How a chart is answered from a rollup store"""
+    store: RollupStore
+    group_by: Optional[str]  # 'time', 'dimension' or None for a single value
+    dimension: Optional[str]
+    labels: Optional[Set[Any]]  # Dimension values kept, or None for all
+    measure: Optional[str]  # None counts rows
+    window: Optional[timedelta]
+
+class RollupPlanner:
+    """Serves charts from rollups when they give the same answer as the raw rows"""
+
+    def __init__(self, stores: Dict[str, RollupStore], engine: Optional[ColumnarReportEngine] = None):
+        self.stores = stores
+        self.engine = engine or ColumnarReportEngine()
+        self.stats = {'served': 0, 'fallbacks': 0}
+
+    def plan(self, chart: Any, parameters: Optional[Dict[str, Any]] = None,
+             stores: Optional[Dict[str, RollupStore]] = None) -> Optional[RollupQuery]:
+        """Rollup query for a chart, or None if it needs the raw rows"""
+        store = (self.stores if stores is None else stores).get(chart.data_source)
+        if store is None or chart.aggregation.value not in MERGEABLE_AGGREGATIONS:
+            return None
+
+        if chart.y_axis in store.measures:
+            measure = chart.y_axis
+        elif chart.y_axis == 'count' or chart.y_axis in store.dimensions:
+            measure = None  # Not numeric: the engine counts rows
+        else:
+            return None
+
+        chart_type = chart.type.value
+        if chart_type in ('LINE', 'AREA') and chart.x_axis == store.time_column:
+            group_by, dimension = 'time', None
+        elif chart_type in ('BAR', 'PIE') and chart.x_axis in store.dimensions:
+            group_by, dimension = 'dimension', chart.x_axis
+        elif chart_type == 'GAUGE':
+            group_by, dimension = None, None
+        else:
+            return None
+
+        filters = dict(chart.filters)
+        filters.update(parameters or {})
+        labels = None
+        window = None
+        for name, value in filters.items():
+            if name == 'time_range':
+                window = TIME_RANGE_WINDOWS.get(value)
+            elif name == 'date_range':
+                return None  # Arbitrary bounds need row timestamps
+            elif isinstance(value, (list, tuple, set)):
+                # Buckets hold one dimension at a time
+                if name not in store.dimensions or dimension not in (None, name) or labels is not None:
+                    return None
+                dimension, labels = name, set(value)
+        return RollupQuery(store, group_by, dimension, labels, measure, window)
+
+    def requests(self, charts: Iterable[Any], parameters: Optional[Dict[str, Any]] = None,
+                 now: Optional[datetime] = None) -> Dict[str, Dict[Optional[str], List[Piece]]]:
+        """Buckets needed to serve ``charts``: data source -> dimension -> pieces"""
+        needed: Dict[str, Dict[Optional[str], List[Piece]]] = {}
+        for chart in charts:
+            query = self.plan(chart, parameters)
+            if query is None:
+                continue
+            pieces = needed.setdefault(chart.data_source, {}).setdefault(query.dimension, [])
+            for piece in query.store.cover(self._window_start(query, now), self._now(query.store, now)):
+                if piece not in pieces:
+                    pieces.append(piece)
+        return needed
+
+    @staticmethod
+    def _now(store: RollupStore, now: Optional[datetime]) -> float:
+        return store.clock() if now is None else epoch_seconds(now)
+
+    def _window_start(self, query: RollupQuery, now: Optional[datetime]) -> Optional[float]:
+        if query.window is None:
+            return None
+        return self._now(query.store, now) - query.window.total_seconds()
+
+    def serve(self, chart: Any, parameters: Optional[Dict[str, Any]] = None, now: Optional[datetime] = None,
+              stores: Optional[Dict[str, RollupStore]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Chart payload from rollups, or None if the chart must be computed from rows.
+
+        ``stores`` holds loaded copies of the shared buckets; a source without one falls back.
+        """
+        query = self.plan(chart, parameters, stores)
+        if query is None or not query.store.loaded:
+            self.stats['fallbacks'] += 1
+            return None
+
+        store = query.store
+        now_seconds = self._now(store, now)
+        start = self._window_start(query, now)
+
+        groups: Dict[Any, BucketStats] = {}
+        day_labels: Dict[int, str] = {}
+        for bucket, label, stats in store.scan(store.cover(start, now_seconds), query.dimension):
+            if query.labels is not None and label not in query.labels:
+                continue
+            if query.group_by == 'time':
+                day = bucket // WIDTHS['day']
+                key = day_labels.get(day)
+                if key is None:
+                    key = day_labels[day] = (EPOCH + timedelta(days=day)).strftime('%Y-%m-%d')
+            else:
+                key = label if query.group_by == 'dimension' else None
+            merged = groups.get(key)
+            if merged is None:
+                merged = groups[key] = BucketStats()
+            merged.merge(stats, query.measure)
+        self.stats['served'] += 1
+
+        aggregation = chart.aggregation.value
+        if query.group_by is None:
+            merged = groups.get(None)
+            if merged is None or not merged.rows:
+                return self.engine.format_gauge(chart, None)
+            if query.measure is None:
+                return self.engine.format_gauge(chart, float(merged.rows))
+            return self.engine.format_gauge(chart, merged.measures.get(query.measure, MeasureStats())
+                                            .result(aggregation))
+
+        labels = sorted(groups, key=str)
+        counts = np.zeros(len(labels))
+        results = np.zeros(len(labels))
+        for i, label in enumerate(labels):
+            merged = groups[label]
+            if query.measure is None or chart.type.value == 'PIE':
+                counts[i] = results[i] = merged.rows
+            else:
+                stats = merged.measures.get(query.measure, MeasureStats())
+                counts[i], results[i] = stats.count, stats.result(aggregation)
+        return self.engine.format_groups(chart, labels, counts, results)
+
+# Layout of the saved calculation rollups; the services layer stores the buckets and sets the loader
+calculation_rollups = RollupStore(
+    "created_at",
+    dimensions=("type", "region", "user_id"),
+    measures=("execution_time", "accuracy", "iterations", "energy_impact")
+)
@@ -3,12 +3,10 @@ Analytics API Routes for SizeWise Suite
 Advanced reporting and analytics endpoints.
 """
 
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from datetime import datetime, timedelta
 import asyncio
 import json
-import io
-import csv
 from typing import Dict, Any, List
 
 from ..analytics.advanced_reporting_analytics import (
@@ -18,6 +16,13 @@ from ..analytics.advanced_reporting_analytics import (
     AggregationType,
     TimeRange
 )
+from ..analytics.report_export import EXPORT_FORMATS, export_chunks
+from ..analytics.report_jobs import ReportQueueFull
+
+# Longest a request may block waiting on a report job
+MAX_JOB_WAIT_SECONDS = 30.0
+# Keep-alive interval for job event streams
+JOB_EVENT_HEARTBEAT_SECONDS = 15.0
 
 analytics_bp = Blueprint('analytics', __name__)
 
@@ -208,11 +213,18 @@ def get_report_templates():
             "message": str(e)
         }), 500
 
+def _job_wait_seconds(value) -> float:
+    """Requested wait, clamped to what a request may block for"""
+    try:
+        return min(max(float(value or 0), 0.0), MAX_JOB_WAIT_SECONDS)
+    except (TypeError, ValueError):
+        return 0.0
+
 @analytics_bp.route('/api/analytics/reports/generate', methods=['POST'])
 def generate_report():
-    """Generate report from template"""
+    """Generate a report from a template, or queue it when background jobs are enabled"""
     try:
-        data = request.get_json()
+        data = request.get_json(silent=True) or {}
         template_id = data.get('template_id')
         parameters = data.get('parameters', {})
         
@@ -222,40 +234,130 @@ def generate_report():
                 "message": "Template ID is required"
             }), 400
         
-        # Run async function in sync context
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
+        if template_id not in analytics_system.report_templates:
+            return jsonify({
+                "status": "error",
+                "message": f"Report template not found: {template_id}"
+            }), 404
+        
+        if not analytics_system.report_jobs.enabled:
+            # Without a shared store another worker could not report on the job, so generate inline
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            
+            try:
+                report = loop.run_until_complete(
+                    analytics_system.generate_report(template_id, parameters)
+                )
+            finally:
+                loop.close()
+            
+            return jsonify({
+                "status": "success",
+                "data": {
+                    "report_id": report.id,
+                    "name": report.name,
+                    "template_id": report.template_id,
+                    "generated_at": report.generated_at.isoformat(),
+                    "status": report.status,
+                    "data": report.data
+                }
+            })
         
         try:
-            report = loop.run_until_complete(
-                analytics_system.generate_report(template_id, parameters)
-            )
-        finally:
-            loop.close()
+            job = analytics_system.report_jobs.submit(template_id, parameters)
+        except ReportQueueFull as e:
+            return jsonify({
+                "status": "error",
+                "message": str(e)
+            }), 503
+        
+        # Small reports can be waited for; everything else is polled
+        wait = _job_wait_seconds(data.get('wait'))
+        if wait:
+            job = analytics_system.report_jobs.wait(job["job_id"], timeout=wait)
+        
+        report = analytics_system.get_report_instance(job["report_id"]) if job["report_id"] else None
+        if report is not None and job["status"] == "COMPLETED":
+            return jsonify({
+                "status": "success",
+                "data": {
+                    "report_id": report.id,
+                    "name": report.name,
+                    "template_id": report.template_id,
+                    "generated_at": report.generated_at.isoformat(),
+                    "status": report.status,
+                    "data": report.data,
+                    "job": job
+                }
+            })
         
         return jsonify({
-            "status": "success",
+            "status": "accepted",
             "data": {
-                "report_id": report.id,
-                "name": report.name,
-                "template_id": report.template_id,
-                "generated_at": report.generated_at.isoformat(),
-                "status": report.status,
-                "data": report.data
+                "job": job,
+                "status_url": f"/api/analytics/reports/jobs/{job['job_id']}",
+                "events_url": f"/api/analytics/reports/jobs/{job['job_id']}/events"
             }
-        })
+        }), 202
         
-    except ValueError as e:
+    except Exception as e:
         return jsonify({
             "status": "error",
             "message": str(e)
-        }), 404
+        }), 500
+
+@analytics_bp.route('/api/analytics/reports/jobs/<job_id>', methods=['GET'])
+def get_report_job(job_id):
+    """Get report job state; ``wait`` long-polls up to that many seconds for it to finish or change"""
+    try:
+        job = analytics_system.report_jobs.wait(
+            job_id, after_version=request.args.get('after_version', type=int),
+            timeout=_job_wait_seconds(request.args.get('wait'))
+        )
+        if job is None:
+            return jsonify({
+                "status": "error",
+                "message": "Report job not found"
+            }), 404
+        
+        return jsonify({
+            "status": "success",
+            "data": job
+        })
+        
     except Exception as e:
         return jsonify({
             "status": "error",
             "message": str(e)
         }), 500
 
+@analytics_bp.route('/api/analytics/reports/jobs/<job_id>/events', methods=['GET'])
+def stream_report_job(job_id):
+    """Push report job state changes as server-sent events until the job finishes"""
+    jobs = analytics_system.report_jobs
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({
+            "status": "error",
+            "message": "Report job not found"
+        }), 404
+    
+    def generate(job):
+        yield f"event: job\ndata: {json.dumps(job)}\n\n"
+        while job["status"] not in ("COMPLETED", "FAILED"):
+            update = jobs.wait(job_id, after_version=job["version"], timeout=JOB_EVENT_HEARTBEAT_SECONDS)
+            if update is None:
+                return
+            if update["version"] == job["version"]:
+                yield ": keep-alive\n\n"
+                continue
+            job = update
+            yield f"event: job\ndata: {json.dumps(job)}\n\n"
+    
+    return Response(stream_with_context(generate(job)), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache'})
+
 @analytics_bp.route('/api/analytics/reports', methods=['GET'])
 def get_reports():
     """Get all generated reports"""
@@ -309,7 +411,7 @@ def get_reports():
 def get_report(report_id):
     """Get specific report"""
     try:
-        report = analytics_system.report_instances.get(report_id)
+        report = analytics_system.get_report_instance(report_id)
         if not report:
             return jsonify({
                 "status": "error",
@@ -340,7 +442,7 @@ def get_report(report_id):
 def export_report(report_id):
     """Export report data"""
     try:
-        report = analytics_system.report_instances.get(report_id)
+        report = analytics_system.get_report_instance(report_id)
         if not report:
             return jsonify({
                 "status": "error",
@@ -348,59 +450,25 @@ def export_report(report_id):
             }), 404
         
         export_format = request.args.get('format', 'json').lower()
-        
-        if export_format == 'json':
-            # Export as JSON
-            output = io.StringIO()
-            json.dump({
-                "report": {
-                    "id": report.id,
-                    "name": report.name,
-                    "generated_at": report.generated_at.isoformat(),
-                    "data": report.data
-                }
-            }, output, indent=2)
-            
-            output.seek(0)
-            return send_file(
-                io.BytesIO(output.getvalue().encode()),
-                mimetype='application/json',
-                as_attachment=True,
-                download_name=f"report_{report_id}.json"
-            )
-            
-        elif export_format == 'csv':
-            # Export as CSV (flatten data)
-            output = io.StringIO()
-            writer = csv.writer(output)
-            
-            # Write header
-            writer.writerow(['Chart', 'Data Type', 'Value'])
-            
-            # Write data
-            for chart_id, chart_data in report.data.items():
-                if isinstance(chart_data, dict) and 'data' in chart_data:
-                    data = chart_data['data']
-                    if isinstance(data, list):
-                        for item in data:
-                            if isinstance(item, dict):
-                                for key, value in item.items():
-                                    writer.writerow([chart_id, key, value])
-            
-            output.seek(0)
-            return send_file(
-                io.BytesIO(output.getvalue().encode()),
-                mimetype='text/csv',
-                as_attachment=True,
-                download_name=f"report_{report_id}.csv"
-            )
-        
-        else:
+        if export_format not in EXPORT_FORMATS:
             return jsonify({
                 "status": "error",
                 "message": "Unsupported export format. Use 'json' or 'csv'"
             }), 400
         
+        # Rows are written as they are sent, optionally gzipped on the fly
+        compress = request.args.get('compression', '').lower() == 'gzip'
+        mimetype, extension = EXPORT_FORMATS[export_format]
+        filename = f"report_{report_id}.{extension}"
+        if compress:
+            mimetype, filename = 'application/gzip', f"{filename}.gz"
+        
+        return Response(
+            stream_with_context(export_chunks(report, export_format, compress)),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
+        )
+        
     except Exception as e:
         return jsonify({
             "status": "error",
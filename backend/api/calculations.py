@@ -51,6 +51,17 @@ except ImportError:
             return f
         return decorator
 
+# Import request phase profiling
+try:
+    from backend.monitoring.request_profiler import profile_phase
+except ImportError:
+    # Fallback when profiling is not available
+    from contextlib import contextmanager
+
+    @contextmanager
+    def profile_phase(name):
+        yield
+
 logger = structlog.get_logger()
 
 calculations_bp = Blueprint('calculations', __name__)
@@ -84,7 +95,8 @@ def calculate_air_duct():
         calculator = AirDuctCalculator()
 
         # Perform calculation
-        calc_result = calculator.calculate(data)
+        with profile_phase('calculator'):
+            calc_result = calculator.calculate(data)
 
         # Format response to match expected API format
         result = {
@@ -99,7 +111,8 @@ def calculate_air_duct():
 
         if result['success']:
             logger.info("Air duct calculation completed", input_data=data)
-            return jsonify(result)
+            with profile_phase('serialization'):
+                return jsonify(result)
         else:
             logger.warning("Air duct calculation failed validation",
                          errors=result.get('errors', []),
@@ -318,7 +331,8 @@ def calculate_velocity_pressure():
         )
 
         # Calculate velocity pressure
-        result = VelocityPressureCalculator.calculate_velocity_pressure(input_params)
+        with profile_phase('calculator'):
+            result = VelocityPressureCalculator.calculate_velocity_pressure(input_params)
 
         # Format response
         response = {
@@ -358,7 +372,8 @@ def calculate_velocity_pressure():
 
         logger.info("Velocity pressure calculation completed",
                    velocity=data['velocity'], method=method.value)
-        return jsonify(response)
+        with profile_phase('serialization'):
+            return jsonify(response)
 
     except Exception as e:
         logger.error("Velocity pressure calculation failed", error=str(e))
@@ -505,7 +520,8 @@ def calculate_enhanced_friction():
         )
 
         # Calculate friction loss
-        result = EnhancedFrictionCalculator.calculate_friction_loss(input_params)
+        with profile_phase('calculator'):
+            result = EnhancedFrictionCalculator.calculate_friction_loss(input_params)
 
         # Format response
         response = {
@@ -536,7 +552,8 @@ def calculate_enhanced_friction():
 
         logger.info("Enhanced friction calculation completed",
                    velocity=data['velocity'], method=method.value, material=data['material'])
-        return jsonify(response)
+        with profile_phase('serialization'):
+            return jsonify(response)
 
     except Exception as e:
         logger.error("Enhanced friction calculation failed", error=str(e))
@@ -5,24 +5,79 @@ Provides REST API endpoints for MongoDB operations including spatial data,
 project management, and calculation results storage.
 """
 
-import asyncio
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from functools import partial
 from typing import Dict, Any
 import structlog
-from ..services.mongodb_service import mongodb_service
+from ..config.mongodb_config import mongodb_config, run_mongodb_coroutine
+from ..services.mongodb_service import DEFAULT_PAGE_SIZE, mongodb_service
+from ..services.spatial_index import valid_bounds
 
 logger = structlog.get_logger()
 
 mongodb_bp = Blueprint('mongodb', __name__)
 
 def run_async(coro):
-    """Helper function to run async functions in Flask routes."""
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
+    """Run a coroutine on the worker's shared MongoDB event loop."""
+    return run_mongodb_coroutine(coro)
+
+# Documents fetched per round trip while streaming a full listing
+STREAM_PAGE_SIZE = 200
+
+def list_response(key: str, fetch_page):
+    """Serve a paginated listing as one page or as a streamed JSON document.
+
+    With ``limit`` or ``cursor`` the response is a single page plus
+    ``next_cursor``. Otherwise a listing that fits in one page is returned
+    as a plain JSON response, and longer ones are streamed as a chunked
+    ``{key: [...], "success": true}`` body, so memory stays flat however
+    large the project is. If a later page fails the stream still ends as
+    valid JSON, with ``"success": false`` and an ``error``. ``fields``
+    selects a comma-separated projection.
+    """
+    fields = [field.strip() for field in request.args.get('fields', '').split(',') if field.strip()] or None
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor')
+
     try:
-        return loop.run_until_complete(coro)
-    finally:
-        loop.close()
+        if limit is not None or cursor:
+            page = run_async(fetch_page(limit=limit or DEFAULT_PAGE_SIZE, resume_token=cursor, fields=fields))
+            return jsonify({'success': True, key: page['items'], 'next_cursor': page['next_cursor']}), 200
+
+        # Fetch the first page up front so failures still get an error status
+        first_page = run_async(fetch_page(limit=STREAM_PAGE_SIZE, resume_token=None, fields=fields))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if not first_page['next_cursor']:
+        return jsonify({'success': True, key: first_page['items']}), 200
+
+    dumps = current_app.json.dumps
+
+    def generate(page):
+        # The success flag goes last: it is only known once every page has been read
+        yield '{%s: [' % dumps(key)
+        separator = ''
+        sent = 0
+        while True:
+            if page['items']:
+                yield separator + ','.join(dumps(item) for item in page['items'])
+                separator = ','
+                sent += len(page['items'])
+            if not page['next_cursor']:
+                break
+            try:
+                page = run_async(fetch_page(limit=STREAM_PAGE_SIZE, resume_token=page['next_cursor'],
+                                            fields=fields))
+            except Exception as e:
+                # Headers are already sent; close the document with an explicit failure instead
+                logger.error("Failed while streaming listing", listing=key, sent=sent, error=str(e))
+                yield '], "success": false, "error": %s}' % dumps(
+                    f"Listing failed after {sent} items; the results are incomplete")
+                return
+        yield '], "success": true}'
+
+    return Response(stream_with_context(generate(first_page)), mimetype='application/json')
 
 @mongodb_bp.route('/projects', methods=['POST'])
 def create_project():
@@ -130,15 +185,44 @@ def get_spatial_data(project_id: str):
     """Get spatial data for a project."""
     try:
         layer_type = request.args.get('layer_type')
-        spatial_data = run_async(mongodb_service.get_spatial_data(project_id, layer_type))
+        return list_response('spatial_data', partial(
+            mongodb_service.get_spatial_data_page, project_id, layer_type
+        ))
         
+    except Exception as e:
+        logger.error("Failed to get spatial data", project_id=project_id, error=str(e))
+        return jsonify({'error': 'Failed to get spatial data'}), 500
+
+@mongodb_bp.route('/projects/<project_id>/spatial-data/viewport', methods=['GET'])
+def get_spatial_data_in_viewport(project_id: str):
+    """Get one page of spatial data intersecting a viewport."""
+    try:
+        bounds = {key: float(request.args[key]) for key in ('min_x', 'min_y', 'max_x', 'max_y')}
+        limit = min(int(request.args.get('limit', 500)), 5000)
+    except (KeyError, ValueError):
+        return jsonify({'error': 'min_x, min_y, max_x and max_y are required numbers'}), 400
+    if not valid_bounds(bounds):
+        return jsonify({'error': 'Viewport bounds must be finite with min_x <= max_x and min_y <= max_y'}), 400
+
+    try:
+        page = run_async(mongodb_service.find_spatial_data_page(
+            project_id,
+            bounds,
+            layer_type=request.args.get('layer_type'),
+            limit=limit,
+            cursor=request.args.get('cursor')
+        ))
+
         return jsonify({
             'success': True,
-            'spatial_data': spatial_data
+            'spatial_data': page['spatial_data'],
+            'next_cursor': page['next_cursor']
         }), 200
-        
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        logger.error("Failed to get spatial data", project_id=project_id, error=str(e))
+        logger.error("Failed to get spatial data in viewport", project_id=project_id, error=str(e))
         return jsonify({'error': 'Failed to get spatial data'}), 500
 
 @mongodb_bp.route('/projects/<project_id>/hvac-systems', methods=['POST'])
@@ -166,12 +250,9 @@ def save_hvac_system(project_id: str):
 def get_hvac_systems(project_id: str):
     """Get HVAC systems for a project."""
     try:
-        systems = run_async(mongodb_service.get_hvac_systems(project_id))
-        
-        return jsonify({
-            'success': True,
-            'hvac_systems': systems
-        }), 200
+        return list_response('hvac_systems', partial(
+            mongodb_service.get_hvac_systems_page, project_id
+        ))
         
     except Exception as e:
         logger.error("Failed to get HVAC systems", project_id=project_id, error=str(e))
@@ -203,12 +284,9 @@ def get_calculation_results(project_id: str):
     """Get calculation results for a project."""
     try:
         calculation_type = request.args.get('calculation_type')
-        calculations = run_async(mongodb_service.get_calculation_results(project_id, calculation_type))
-        
-        return jsonify({
-            'success': True,
-            'calculations': calculations
-        }), 200
+        return list_response('calculations', partial(
+            mongodb_service.get_calculation_results_page, project_id, calculation_type
+        ))
         
     except Exception as e:
         logger.error("Failed to get calculation results", project_id=project_id, error=str(e))
@@ -256,11 +334,9 @@ def get_user_preferences(user_id: str):
 def mongodb_health():
     """MongoDB health check endpoint."""
     try:
-        # Test MongoDB connection
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        connected = loop.run_until_complete(mongodb_service.db.client.admin.command('ping'))
-        loop.close()
+        # The ping coroutine is created on the loop thread; Motor binds futures to the loop they start on
+        if not run_async(mongodb_config.test_connection()):
+            raise ConnectionError("MongoDB ping failed")
         
         return jsonify({
             'success': True,
@@ -9,16 +9,18 @@ from flask import Flask, jsonify, request
 from flask_cors import CORS
 import os
 import sys
+import time
 import asyncio
+import threading
 from dotenv import load_dotenv
 import structlog
 from sentry_config import init_sentry
-from config.mongodb_config import mongodb_config, init_mongodb_collections
 from middleware.rate_limiter import RateLimitMiddleware
 from middleware.input_validator import InputValidationMiddleware
 from middleware.security_headers import SecurityHeadersMiddleware
 from security.credential_manager import get_credential_manager
 from monitoring.flask_integration import init_monitoring
+from monitoring.request_profiler import initialize_request_profiler
 
 # Add parent directory to Python path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -60,6 +62,9 @@ def create_app(config_name='development'):
     cors_origins = os.getenv('CORS_ORIGINS', default_origins).split(',')
     CORS(app, origins=cors_origins)
 
+    # Initialize request profiler first so its timings cover the other middleware
+    initialize_request_profiler(app)
+
     # Initialize security middleware
     rate_limiter = RateLimitMiddleware(app)
     input_validator = InputValidationMiddleware(app)
@@ -101,6 +106,8 @@ def create_app(config_name='development'):
     from backend.api.validation import validation_bp
     from backend.api.exports import exports_bp
     from backend.api.mongodb_api import mongodb_bp
+    # Same module the MongoDB blueprint uses, so both share one loop and client
+    from backend.config.mongodb_config import mongodb_config, init_mongodb_collections, run_mongodb_coroutine
     from backend.api.cdn_management import cdn_bp
     from backend.api.asset_optimization import asset_optimization_bp
     from backend.api.migration import migration_bp
@@ -125,16 +132,19 @@ def create_app(config_name='development'):
     mongodb_enabled = os.getenv('MONGODB_ENABLED', 'false').lower() == 'true'
     if mongodb_enabled:
         try:
-            # Run async initialization with timeout
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-
-            # Use asyncio.wait_for with timeout to prevent hanging
-            loop.run_until_complete(
+            # Run on the shared MongoDB loop with a timeout to prevent hanging
+            run_mongodb_coroutine(
                 asyncio.wait_for(init_mongodb_collections(), timeout=2.0)
             )
-            loop.close()
             logger.info("MongoDB initialized successfully")
+            # Start the dashboard rollup backfill now rather than in the first dashboard request
+            from backend.services.mongodb_service import mongodb_service
+            try:
+                run_mongodb_coroutine(
+                    asyncio.wait_for(mongodb_service.ensure_calculation_rollups(), timeout=2.0)
+                )
+            except Exception as e:
+                logger.warning("Failed to start rollup backfill - dashboards start it on demand", error=str(e))
         except asyncio.TimeoutError:
             logger.warning("MongoDB initialization timed out - continuing without MongoDB")
         except Exception as e:
@@ -142,26 +152,32 @@ def create_app(config_name='development'):
     else:
         logger.info("MongoDB disabled - skipping initialization")
 
+    # Dependency status cached for health probes; one request refreshes it at a time
+    health_cache = {'mongodb_status': 'unknown', 'checked_at': 0.0}
+    health_cache_lock = threading.Lock()
+    health_cache_ttl = float(os.getenv('HEALTH_CACHE_TTL_SECONDS', '15'))
+
     # Health check endpoint
     @app.route('/api/health')
     def health_check():
         """Health check endpoint for monitoring."""
-        mongodb_status = "unknown"
-        try:
-            # Test MongoDB connection
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            mongodb_connected = loop.run_until_complete(mongodb_config.test_connection())
-            loop.close()
-            mongodb_status = "connected" if mongodb_connected else "disconnected"
-        except Exception:
-            mongodb_status = "error"
+        stale = time.monotonic() - health_cache['checked_at'] >= health_cache_ttl
+        if stale and health_cache_lock.acquire(blocking=False):
+            try:
+                # Test MongoDB connection
+                mongodb_connected = run_mongodb_coroutine(mongodb_config.test_connection())
+                health_cache['mongodb_status'] = "connected" if mongodb_connected else "disconnected"
+            except Exception:
+                health_cache['mongodb_status'] = "error"
+            finally:
+                health_cache['checked_at'] = time.monotonic()
+                health_cache_lock.release()
 
         return jsonify({
             'status': 'healthy',
             'service': 'SizeWise Suite Backend',
             'version': '0.1.0',
-            'mongodb_status': mongodb_status
+            'mongodb_status': health_cache['mongodb_status']
         })
     
     # API info endpoint with versioning information
@@ -17,6 +17,16 @@ from functools import wraps
 import structlog
 import os
 
+try:
+    from backend.monitoring.request_profiler import profile_phase
+except ImportError:
+    # Fallback when profiling is not available
+    from contextlib import contextmanager
+
+    @contextmanager
+    def profile_phase(name):
+        yield
+
 logger = structlog.get_logger()
 
 class RedisCache:
@@ -221,7 +231,8 @@ def cache_result(cache_type: str = 'default', ttl: int = None, key_prefix: str =
             cache_key = redis_cache._generate_key(prefix, *args, **kwargs)
             
             # Try to get from cache
-            cached_result = redis_cache.get(cache_key)
+            with profile_phase('cache_lookup'):
+                cached_result = redis_cache.get(cache_key)
             if cached_result is not None:
                 logger.debug("Cache hit", function=func.__name__, key=cache_key)
                 return cached_result
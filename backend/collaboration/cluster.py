@@ -0,0 +1,205 @@
+"""
+Collaboration Cluster Membership for SizeWise Suite
+
+Lets several collaboration server nodes share the load. Each document is
+owned by exactly one live node, chosen by consistent hashing over the
+nodes registered in Redis. Clients are sent to the owner, which keeps the
+single in-memory copy that transforms and merges operations. When a node
+joins or leaves, only about 1/N of the documents move, and the previous
+owner hands them off.
+
+Membership is a Redis sorted set of node heartbeats plus a hash of node
+addresses. A node that stops heartbeating drops out of the ring after
+``ttl`` seconds.
+
+Ring views can briefly disagree, so writes are also gated by a per-document
+lease. A node serves a document only while it holds ``doc:{id}:lease``.
+Each new holder gets a fencing token ``<node>:<epoch>`` stored in
+``doc:{id}:owner``, and persistence refuses writes carrying a stale token.
+A new owner therefore waits for the old owner's hand-off (or for its lease
+to expire), and a node that lost its lease cannot overwrite the new
+owner's revisions.
+"""
+
+import bisect
+import hashlib
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import structlog
+
+logger = structlog.get_logger()
+
+NODES_KEY = "collaboration:nodes"
+ADDRESSES_KEY = "collaboration:node_addresses"
+
+# Lua: take or renew a document lease; returns the fencing token, or nil while another node holds it
+ACQUIRE_LEASE_SCRIPT = """
+local holder = redis.call('GET', KEYS[1])
+if holder and holder ~= ARGV[1] then
+    return nil
+end
+local token = redis.call('GET', KEYS[2])
+if not token or string.sub(token, 1, #ARGV[1] + 1) ~= ARGV[1] .. ':' then
+    local epoch = token and tonumber(string.match(token, ':(%d+)$')) or 0
+    token = ARGV[1] .. ':' .. (epoch + 1)
+end
+redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+redis.call('SET', KEYS[2], token, 'EX', ARGV[3])
+return token
+"""
+
+# Lua: drop a lease only if this node still holds it
+RELEASE_LEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+def lease_key(document_id: str) -> str:
+    return f"doc:{document_id}:lease"
+
+def owner_key(document_id: str) -> str:
+    return f"doc:{document_id}:owner"
+
+class LeaseHeld(Exception):
+    """Raised when another node still holds a document's lease"""
+
+    def __init__(self, document_id: str):
+        super().__init__(f"Document {document_id} is still held by another node")
+        self.document_id = document_id
+
+def ring_hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'big')
+
+class HashRing:
+    """Consistent hash ring with virtual nodes to even out the share each node gets"""
+
+    def __init__(self, nodes: Iterable[str] = (), replicas: int = 100):
+        self.replicas = replicas
+        self._points: List[Tuple[int, str]] = []
+        self._nodes = set()
+        for node in nodes:
+            self.add(node)
+
+    @property
+    def nodes(self) -> List[str]:
+        return sorted(self._nodes)
+
+    def add(self, node: str):
+        if node in self._nodes:
+            return
+        self._nodes.add(node)
+        for replica in range(self.replicas):
+            bisect.insort(self._points, (ring_hash(f"{node}#{replica}"), node))
+
+    def remove(self, node: str):
+        if node not in self._nodes:
+            return
+        self._nodes.discard(node)
+        self._points = [point for point in self._points if point[1] != node]
+
+    def owner(self, key: str) -> Optional[str]:
+        """Node owning ``key``: the first virtual node clockwise from its hash"""
+        if not self._points:
+            return None
+        index = bisect.bisect(self._points, (ring_hash(key), ''))
+        return self._points[index % len(self._points)][1]
+
+class ClusterCoordinator:
+    """Registers this node in Redis and answers which node owns a document"""
+
+    def __init__(self, redis, node_id: str, address: str, ttl: float = 15.0,
+                 clock: Callable[[], float] = time.time, lease_margin: float = 1.0,
+                 token_ttl: int = 86400):
+        self.redis = redis
+        self.node_id = node_id
+        self.address = address
+        self.ttl = ttl  # Also the lease length
+        self.clock = clock
+        self.lease_margin = lease_margin  # Local clock drift allowed for when trusting a lease
+        self.token_ttl = token_ttl
+        self.ring = HashRing([node_id])
+        self.addresses: Dict[str, str] = {node_id: address}
+        self.leases: Dict[str, Tuple[str, float]] = {}  # document_id -> (fencing token, trusted until)
+
+    async def heartbeat(self):
+        """Register or refresh this node"""
+        await self.redis.hset(ADDRESSES_KEY, self.node_id, self.address)
+        await self.redis.zadd(NODES_KEY, {self.node_id: self.clock()})
+
+    async def leave(self):
+        """Remove this node so the others take over its documents"""
+        await self.redis.zrem(NODES_KEY, self.node_id)
+        await self.redis.hdel(ADDRESSES_KEY, self.node_id)
+        self.ring.remove(self.node_id)
+
+    async def refresh(self) -> bool:
+        """Rebuild the ring from live nodes; returns True if membership changed"""
+        cutoff = self.clock() - self.ttl
+        await self.redis.zremrangebyscore(NODES_KEY, '-inf', cutoff)  # Expire nodes that stopped heartbeating
+        live = set(await self.redis.zrangebyscore(NODES_KEY, cutoff, '+inf'))
+        if not live:
+            return False  # Not registered yet; keep serving everything locally
+
+        changed = live != set(self.ring.nodes)
+        if changed:
+            for node in set(self.ring.nodes) - live:
+                self.ring.remove(node)
+            for node in live:
+                self.ring.add(node)
+            addresses = await self.redis.hgetall(ADDRESSES_KEY)
+            self.addresses = {node: addresses.get(node) for node in live}
+            logger.info("Collaboration cluster membership changed", nodes=self.ring.nodes)
+        return changed
+
+    def owner(self, document_id: str) -> Optional[str]:
+        return self.ring.owner(document_id)
+
+    def is_owner(self, document_id: str) -> bool:
+        return self.owner(document_id) == self.node_id
+
+    def owner_address(self, document_id: str) -> Optional[str]:
+        return self.addresses.get(self.owner(document_id))
+
+    async def acquire(self, document_id: str) -> str:
+        """Take or renew the lease on a document; returns its fencing token or raises LeaseHeld"""
+        started = self.clock()
+        token = await self.redis.eval(ACQUIRE_LEASE_SCRIPT, 2, lease_key(document_id), owner_key(document_id),
+                                      self.node_id, int(self.ttl * 1000), self.token_ttl)
+        if not token:
+            self.leases.pop(document_id, None)
+            raise LeaseHeld(document_id)
+        self.leases[document_id] = (token, started + self.ttl - self.lease_margin)
+        return token
+
+    async def renew(self, document_id: str) -> bool:
+        """
+        Extend a held lease; False when it was lost. A lease that lapsed and
+        was taken by another node in between comes back with a new token,
+        which also counts as lost.
+        """
+        previous = self.leases.get(document_id)
+        try:
+            token = await self.acquire(document_id)
+        except LeaseHeld:
+            return False
+        if previous is None or token != previous[0]:
+            await self.release(document_id)
+            return False
+        return True
+
+    async def release(self, document_id: str):
+        """Give up a lease so the next owner can take the document at once"""
+        self.leases.pop(document_id, None)
+        await self.redis.eval(RELEASE_LEASE_SCRIPT, 1, lease_key(document_id), self.node_id)
+
+    def holds_lease(self, document_id: str) -> bool:
+        lease = self.leases.get(document_id)
+        return lease is not None and lease[1] > self.clock()
+
+    def moved_documents(self, document_ids: Iterable[str]) -> Dict[str, Optional[str]]:
+        """Local documents now owned elsewhere, with the new owner's address"""
+        return {document_id: self.owner_address(document_id)
+                for document_id in document_ids if not self.is_owner(document_id)}
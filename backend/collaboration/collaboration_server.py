@@ -7,10 +7,13 @@ conflict resolution, and multi-user HVAC design support.
 Features:
 - Real-time document synchronization
 - Operational transformation for conflict resolution
-- User presence and cursor tracking
+- User presence and cursor tracking, coalesced into binary frames per tick
 - Permission-based access control
 - Document locking and version control
-- Scalable room-based architecture
+- Revisioned operations with snapshot compaction
+- Optional CRDT engine with delta-state sync
+- Scalable room-based architecture: documents are spread over nodes by
+  consistent hashing, with broadcasts relayed through Redis
 """
 
 import asyncio
@@ -27,6 +30,12 @@ from aiohttp import web
 import aioredis
 import structlog
 
+from .cluster import ClusterCoordinator, LeaseHeld
+from .crdt_document import CRDTDocument, Delta, decode_version_vector, encode_version_vector
+from .document_history import DocumentHistory, Operation, OperationalTransformEngine, ResyncRequired
+from .op_journal import JournalBacklogFull, JournalTruncated, OperationJournal
+from .presence import PresenceHub
+
 # Configure structured logging
 logger = structlog.get_logger()
 
@@ -42,36 +51,61 @@ class CollaborationUser:
     is_online: bool = True
     permissions: str = "write"  # read, write, admin
 
-@dataclass
-class Operation:
-    id: str
-    type: str  # insert, delete, update, move, style
-    user_id: str
-    timestamp: datetime
-    element_id: str
-    path: List[str]
-    old_value: Optional[any] = None
-    new_value: Optional[any] = None
-    position: Optional[Dict] = None
-    metadata: Optional[Dict] = None
-
 @dataclass
 class CollaborationDocument:
     id: str
     project_id: str
     type: str  # hvac_design, calculation, report
-    version: int
-    operations: List[Operation]
+    history: DocumentHistory
     participants: List[CollaborationUser]
     permissions: Dict[str, str]
     last_modified: datetime
     is_locked: bool = False
     locked_by: Optional[str] = None
+    crdt: Optional[CRDTDocument] = None  # Set when the server runs the CRDT engine
+
+    @property
+    def version(self) -> int:
+        return self.history.revision
+
+    def to_dict(self) -> Dict:
+        """Join payload: the snapshot and the operations after it, not the full history"""
+        if self.crdt is not None:
+            return {
+                'id': self.id,
+                'project_id': self.project_id,
+                'type': self.type,
+                'engine': 'crdt',
+                'elements': self.crdt.elements(),
+                'version_vector': encode_version_vector(self.crdt.version_vector),
+                'participants': [asdict(participant) for participant in self.participants],
+                'permissions': self.permissions,
+                'last_modified': self.last_modified.isoformat(),
+                'is_locked': self.is_locked,
+                'locked_by': self.locked_by
+            }
+        return {
+            'id': self.id,
+            'project_id': self.project_id,
+            'type': self.type,
+            'version': self.version,
+            'engine': 'ot',
+            'snapshot': self.history.snapshot,
+            'snapshot_revision': self.history.snapshot_revision,
+            'operations': [operation.to_dict() for operation in self.history.operations],
+            'participants': [asdict(participant) for participant in self.participants],
+            'permissions': self.permissions,
+            'last_modified': self.last_modified.isoformat(),
+            'is_locked': self.is_locked,
+            'locked_by': self.locked_by
+        }
 
 class CollaborationServer:
-    def __init__(self, redis_url: str = "redis://localhost:6379"):
-        # Initialize Socket.IO server
+    def __init__(self, redis_url: str = "redis://localhost:6379", engine: str = "ot",
+                 node_id: Optional[str] = None, cluster: bool = False, node_address: Optional[str] = None):
+        # Initialize Socket.IO server; in a cluster, emits are relayed to every node through Redis
         self.sio = socketio.AsyncServer(
+            client_manager=socketio.AsyncRedisManager(redis_url) if cluster and redis_url else None,
             cors_allowed_origins="*",
             logger=True,
             engineio_logger=True
@@ -90,9 +124,28 @@ class CollaborationServer:
         # Redis for scaling (optional)
         self.redis_url = redis_url
         self.redis = None
-        
-        # Operation transformation engine
+        self.document_ttl = 86400  # 24 hours
+        self.journal: Optional[OperationJournal] = None  # Write-behind operation persistence
+        self.journal_task = None
+        
+        # Conflict resolution: "ot" (revisioned transforms) or "crdt" (mergeable on any node)
+        if engine not in ('ot', 'crdt'):
+            raise ValueError(f"Unknown collaboration engine: {engine}")
+        self.engine = engine
+        self.node_id = node_id or uuid4().hex[:8]
         self.ot_engine = OperationalTransformEngine()
+        self.crdt_compaction_threshold = 500  # Stored deltas merged into one on load
+        
+        # Multi-node: each document is served by the node that owns it on the hash ring
+        self.cluster_enabled = cluster and bool(redis_url)
+        self.node_address = node_address
+        self.cluster: Optional[ClusterCoordinator] = None
+        self.cluster_task = None
+        self.cluster_heartbeat_interval = 5
+        
+        # Cursor presence, sent to each room as one frame per tick
+        self.presence = PresenceHub()
+        self.presence_task = None
         
         # Setup event handlers
         self.setup_event_handlers()
@@ -105,11 +158,24 @@ class CollaborationServer:
         try:
             # Initialize Redis connection
             if self.redis_url:
-                self.redis = await aioredis.from_url(self.redis_url)
+                self.redis = await aioredis.from_url(self.redis_url, decode_responses=True)
+                # The journal stores binary batches, so it gets a connection that does not decode
+                self.journal = OperationJournal(await aioredis.from_url(self.redis_url), ttl=self.document_ttl)
+                self.journal_task = asyncio.create_task(self.journal.run())
                 logger.info("Connected to Redis for collaboration scaling")
             
+            # Join the cluster
+            if self.cluster_enabled and self.redis:
+                self.cluster = ClusterCoordinator(self.redis, self.node_id, self.node_address or self.node_id,
+                                                  ttl=self.cluster_heartbeat_interval * 3,
+                                                  token_ttl=self.document_ttl)
+                await self.cluster.heartbeat()
+                await self.cluster.refresh()
+                self.cluster_task = asyncio.create_task(self.maintain_cluster())
+            
             # Start cleanup task
             self.cleanup_task = asyncio.create_task(self.cleanup_inactive_sessions())
+            self.presence_task = asyncio.create_task(self.broadcast_presence())
             
             logger.info("Collaboration server initialized successfully")
             
@@ -183,17 +249,28 @@ class CollaborationServer:
                 if not document_id or not project_id:
                     return {'success': False, 'error': 'Missing document or project ID'}
                 
+                redirect = self.redirect_for(document_id)
+                if redirect:
+                    return redirect
+                
                 # Check permissions
                 if not await self.check_document_permissions(user.id, document_id, 'read'):
                     return {'success': False, 'error': 'Insufficient permissions'}
                 
                 # Get or create document
-                document = await self.get_or_create_document(document_id, project_id)
+                try:
+                    document = await self.get_or_create_document(document_id, project_id)
+                except LeaseHeld:
+                    # The previous owner has not handed the document off yet; the client retries
+                    return {'success': False, 'error': 'document_busy'}
+                except JournalTruncated as e:
+                    logger.error("Stored document history is incomplete", document_id=document_id, error=str(e))
+                    return {'success': False, 'error': 'document_unavailable'}
                 
                 # Join document room
                 await self.join_document_internal(sid, user, document)
                 
-                return {'success': True, 'document': asdict(document)}
+                return {'success': True, 'document': document.to_dict()}
                 
             except Exception as e:
                 logger.error("Join document error", error=str(e), sid=sid)
@@ -224,19 +301,77 @@ class CollaborationServer:
                 if not document_id or not operation_data:
                     return {'success': False, 'error': 'Missing data'}
                 
+                redirect = self.redirect_for(document_id)
+                if redirect:
+                    return redirect
+                
                 # Check write permissions
                 if not await self.check_document_permissions(user.id, document_id, 'write'):
                     return {'success': False, 'error': 'Insufficient permissions'}
                 
+                if self.lease_lapsed(document_id):
+                    return {'success': False, 'error': 'document_busy'}
+                
+                if self.journal:
+                    try:
+                        self.journal.check_capacity(document_id)
+                    except JournalBacklogFull:
+                        # Redis has been unreachable too long; accept nothing that could not be persisted
+                        return {'success': False, 'error': 'persistence_unavailable'}
+                
                 # Process operation
-                success = await self.process_operation(document_id, operation_data, user)
+                try:
+                    committed = await self.process_operation(document_id, operation_data, user)
+                except ResyncRequired as e:
+                    # The client's base is older than the snapshot; it must rejoin to reload
+                    return {'success': False, 'error': 'resync_required', 'snapshotRevision': e.snapshot_revision}
                 
-                return {'success': success}
+                if committed is None:
+                    return {'success': False}
+                if self.engine == 'crdt':
+                    return {'success': True}
+                return {'success': True, 'revision': committed.revision}
                 
             except Exception as e:
                 logger.error("Operation error", error=str(e), sid=sid)
                 return {'success': False, 'error': str(e)}
 
+        @self.sio.event
+        async def sync(sid, data):
+            """Handle CRDT delta-state sync: merge the client's changes and return the ones it is missing"""
+            try:
+                user = self.user_sessions.get(sid)
+                if not user:
+                    return {'success': False, 'error': 'User not authenticated'}
+                
+                document_id = data.get('documentId')
+                redirect = self.redirect_for(document_id)
+                if redirect:
+                    return redirect
+                
+                if not await self.check_document_permissions(user.id, document_id, 'read'):
+                    return {'success': False, 'error': 'Insufficient permissions'}
+                
+                document = self.documents.get(document_id)
+                if not document or document.crdt is None:
+                    return {'success': False, 'error': 'Document not found'}
+                
+                if data.get('delta'):
+                    if not await self.check_document_permissions(user.id, document_id, 'write'):
+                        return {'success': False, 'error': 'Insufficient permissions'}
+                    await self.apply_delta(document, Delta.from_dict(data['delta']), user, skip_sid=sid)
+                
+                missing = document.crdt.delta_since(decode_version_vector(data.get('versionVector')))
+                return {
+                    'success': True,
+                    'delta': missing.to_dict(),
+                    'versionVector': encode_version_vector(document.crdt.version_vector)
+                }
+                
+            except Exception as e:
+                logger.error("Sync error", error=str(e), sid=sid)
+                return {'success': False, 'error': str(e)}
+
         @self.sio.event
         async def cursor_update(sid, data):
             """Handle cursor position update"""
@@ -248,15 +383,11 @@ class CollaborationServer:
                 document_id = data.get('documentId')
                 cursor = data.get('cursor')
                 
-                if document_id and cursor:
-                    # Update user cursor
+                if document_id and cursor and self.user_documents.get(user.id) == document_id:
+                    # Update user cursor; broadcast_presence sends it with the room's next frame
                     user.cursor = cursor
-                    
-                    # Broadcast to other users in document
-                    await self.sio.emit('cursor_updated', {
-                        'userId': user.id,
-                        'cursor': cursor
-                    }, room=f"doc_{document_id}", skip_sid=sid)
+                    user.last_seen = datetime.utcnow()
+                    self.presence.update_cursor(document_id, user.id, cursor)
                     
             except Exception as e:
                 logger.error("Cursor update error", error=str(e), sid=sid)
@@ -324,6 +455,11 @@ class CollaborationServer:
         # Notify other users
         await self.sio.emit('user_joined', asdict(user), room=room_name, skip_sid=sid)
         
+        # Room frames only carry changes, so the new client starts from the full cursor state
+        keyframe = self.presence.keyframe(document_id)
+        if keyframe is not None:
+            await self.sio.emit('presence_frame', keyframe, room=sid)
+        
         logger.info("User joined document", user_id=user.id, document_id=document_id)
 
     async def leave_document_internal(self, sid: str, user: CollaborationUser):
@@ -346,6 +482,8 @@ class CollaborationServer:
         if user.id in self.user_documents:
             del self.user_documents[user.id]
         
+        self.presence.remove_user(document_id, user.id)
+        
         # Remove from document participants
         document = self.documents.get(document_id)
         if document:
@@ -356,12 +494,112 @@ class CollaborationServer:
         
         logger.info("User left document", user_id=user.id, document_id=document_id)
 
-    async def process_operation(self, document_id: str, operation_data: dict, user: CollaborationUser) -> bool:
-        """Process and broadcast an operation"""
+    @property
+    def uses_leases(self) -> bool:
+        # Revisioned documents need a single writer; CRDT deltas merge from any node
+        return self.cluster is not None and self.journal is not None and self.engine == 'ot'
+
+    def lease_lapsed(self, document_id: str) -> bool:
+        """True when a loaded document may no longer be written because this node's lease ran out"""
+        return self.uses_leases and document_id in self.documents and not self.cluster.holds_lease(document_id)
+
+    def redirect_for(self, document_id: str) -> Optional[Dict]:
+        """Error response pointing the client at the owning node, or None if this node owns the document"""
+        if self.cluster is None or self.cluster.is_owner(document_id):
+            return None
+        return {'success': False, 'error': 'wrong_node', 'owner': self.cluster.owner_address(document_id)}
+
+    async def maintain_cluster(self):
+        """Heartbeat, follow membership changes and hand off documents this node no longer owns"""
+        while True:
+            try:
+                await asyncio.sleep(self.cluster_heartbeat_interval)
+                await self.cluster.heartbeat()
+                await self.cluster.refresh()
+                # Every tick, not only on membership changes, so failed hand-offs are retried
+                await self.rebalance()
+                await self.renew_leases()
+                    
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Cluster maintenance error", error=str(e))
+
+    async def rebalance(self):
+        """Hand off every local document now owned by another node"""
+        for document_id, owner in self.cluster.moved_documents(list(self.documents)).items():
+            try:
+                await self.handoff_document(document_id, owner)
+            except Exception as e:
+                logger.warning("Document hand-off failed", document_id=document_id, error=str(e))
+
+    async def renew_leases(self):
+        """
+        Renew the lease on each local document this node owns; drop the ones
+        another node has taken over. Documents waiting to be handed off are
+        not renewed, so their lease lapses to the new owner even if the
+        hand-off keeps failing.
+        """
+        if not self.uses_leases:
+            return
+        for document_id in list(self.documents):
+            if not self.cluster.is_owner(document_id):
+                continue
+            if document_id in self.journal.fenced or not await self.cluster.renew(document_id):
+                logger.warning("Document lease lost", document_id=document_id)
+                await self.handoff_document(document_id, self.cluster.owner_address(document_id), flush=False)
+
+    async def handoff_document(self, document_id: str, owner: Optional[str], flush: bool = True):
+        """
+        Flush a document to Redis, send its clients to the new owner and drop
+        the local copy. ``flush=False`` drops it without writing, for documents
+        this node has already lost.
+        """
+        document = self.documents.get(document_id)
+        if document is None:
+            return
+        
+        # Write out the queued operations and a fresh snapshot before the new owner loads it
+        if flush and self.journal and document.crdt is None:
+            document.history.compact()
+            self.save_snapshot(document)
+            await self.journal.flush()
+            if document_id in self.journal.pending:
+                raise RuntimeError(f"Operations for {document_id} are not written yet; hand-off retried")
+        if self.uses_leases:
+            # The new owner can load the document as soon as the lease is gone
+            await self.cluster.release(document_id)
+        if self.journal:
+            self.journal.discard(document_id)
+        
+        room_name = f"doc_{document_id}"
+        await self.sio.emit('document_moved', {'documentId': document_id, 'owner': owner}, room=room_name)
+        await self.sio.close_room(room_name)
+        self.presence.remove_room(document_id)
+        
+        for user_id in self.document_rooms.pop(document_id, set()):
+            if self.user_documents.get(user_id) == document_id:
+                del self.user_documents[user_id]
+        del self.documents[document_id]
+        
+        logger.info("Document handed off", document_id=document_id, owner=owner)
+
+    async def leave_cluster(self):
+        """Deregister this node and hand its documents to their new owners"""
+        if self.cluster_task:
+            self.cluster_task.cancel()
+        await self.cluster.leave()
+        await self.cluster.refresh()
+        for document_id in list(self.documents):
+            await self.handoff_document(document_id, self.cluster.owner_address(document_id))
+
+    async def process_operation(self, document_id: str, operation_data: dict,
+                                user: CollaborationUser) -> Optional[Operation]:
+        """Process and broadcast an operation; returns it as committed, or None if it was not applied"""
         try:
             document = self.documents.get(document_id)
             if not document:
-                return False
+                return None
             
             # Create operation object
             operation = Operation(
@@ -374,60 +612,127 @@ class CollaborationServer:
                 old_value=operation_data.get('oldValue'),
                 new_value=operation_data.get('newValue'),
                 position=operation_data.get('position'),
-                metadata=operation_data.get('metadata')
+                metadata=operation_data.get('metadata'),
+                base_revision=operation_data.get('baseRevision')
             )
             
-            # Apply operational transformation
-            transformed_operation = self.ot_engine.transform_operation(operation, document.operations)
+            if document.crdt is not None:
+                await self.apply_delta(document, document.crdt.apply_operation(operation), user)
+                return operation
             
-            # Add to document
-            document.operations.append(transformed_operation)
-            document.version += 1
+            # Transform against the operations after the client's base revision and append
+            committed = document.history.commit(operation, self.ot_engine)
             document.last_modified = datetime.utcnow()
+            compacted = document.history.needs_compaction
+            if compacted:
+                document.history.compact()
             
             # Broadcast to other users
-            await self.sio.emit('operation_received', asdict(transformed_operation), 
+            await self.sio.emit('operation_received', committed.to_dict(),
                              room=f"doc_{document_id}", skip_sid=None)
             
-            # Persist to Redis if available
-            if self.redis:
-                await self.redis.lpush(f"ops:{document_id}", json.dumps(asdict(transformed_operation)))
-                await self.redis.expire(f"ops:{document_id}", 86400)  # 24 hours
+            # Queue for persistence; the journal writes to Redis in the background
+            if self.journal:
+                self.journal.append(document_id, committed)
+                if compacted:
+                    self.save_snapshot(document)
             
-            return True
+            return committed
             
+        except ResyncRequired:
+            raise
         except Exception as e:
             logger.error("Operation processing error", error=str(e))
-            return False
+            return None
+
+    async def apply_delta(self, document: CollaborationDocument, delta: Delta, user: CollaborationUser,
+                          skip_sid: Optional[str] = None):
+        """Merge a CRDT delta, then broadcast and persist the entries that changed the document"""
+        applied = document.crdt.merge(delta)
+        if not applied:
+            return
+        document.last_modified = datetime.utcnow()
+        
+        await self.sio.emit('delta_received', {'userId': user.id, 'delta': applied.to_dict()},
+                         room=f"doc_{document.id}", skip_sid=skip_sid)
+        
+        if self.redis:
+            # Deltas merge in any order, so nodes can append without coordinating
+            deltas_key = f"crdt:{document.id}:deltas"
+            await self.redis.rpush(deltas_key, json.dumps(applied.to_dict()))
+            await self.redis.expire(deltas_key, self.document_ttl)
+
+    async def load_crdt(self, document_id: str) -> CRDTDocument:
+        """Merge the stored deltas, folding them into one entry when there are many"""
+        crdt = CRDTDocument(self.node_id)
+        deltas_key = f"crdt:{document_id}:deltas"
+        deltas_data = await self.redis.lrange(deltas_key, 0, -1)
+        for delta_data in deltas_data:
+            crdt.merge(Delta.from_dict(json.loads(delta_data)))
+        
+        if len(deltas_data) > self.crdt_compaction_threshold:
+            # Deltas other nodes append meanwhile land after the ones read, so trimming by count is safe
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.rpush(deltas_key, json.dumps(crdt.delta_since().to_dict()))
+                pipe.ltrim(deltas_key, len(deltas_data), -1)
+                await pipe.execute()
+        return crdt
+
+    def save_snapshot(self, document: CollaborationDocument):
+        """Queue the document snapshot; once written it replaces the journaled operations it covers"""
+        history = document.history
+        self.journal.save_snapshot(document.id, history.snapshot_revision, history.snapshot)
+
+    async def load_history(self, document_id: str) -> DocumentHistory:
+        """Load the stored snapshot and the operations journaled after it"""
+        snapshot, snapshot_revision, operations = await self.journal.load(document_id)
+        history = DocumentHistory(snapshot=snapshot, snapshot_revision=snapshot_revision, operations=operations)
+        if history.needs_compaction:
+            history.compact()
+            self.journal.save_snapshot(document_id, history.snapshot_revision, history.snapshot)
+        return history
 
     async def get_or_create_document(self, document_id: str, project_id: str) -> CollaborationDocument:
         """Get existing document or create new one"""
         if document_id in self.documents:
             return self.documents[document_id]
         
+        # Load snapshot and tail from Redis if available
+        history = DocumentHistory()
+        crdt = None
+        if self.engine == 'crdt':
+            crdt = await self.load_crdt(document_id) if self.redis else CRDTDocument(self.node_id)
+        elif self.journal:
+            if self.uses_leases:
+                # Load only once the previous owner has handed off; writes carry the new token
+                self.journal.fence(document_id, await self.cluster.acquire(document_id))
+            try:
+                history = await self.load_history(document_id)
+            except Exception:
+                if self.uses_leases and document_id not in self.documents:
+                    self.journal.discard(document_id)
+                    await self.cluster.release(document_id)
+                raise
+        if document_id in self.documents:
+            # Another join loaded it while we were waiting on Redis
+            return self.documents[document_id]
+        
         # Create new document
         document = CollaborationDocument(
             id=document_id,
             project_id=project_id,
             type='hvac_design',
-            version=0,
-            operations=[],
+            history=history,
             participants=[],
             permissions={},
-            last_modified=datetime.utcnow()
+            last_modified=datetime.utcnow(),
+            crdt=crdt
         )
         
         self.documents[document_id] = document
         
-        # Load from Redis if available
-        if self.redis:
-            operations_data = await self.redis.lrange(f"ops:{document_id}", 0, -1)
-            for op_data in operations_data:
-                op_dict = json.loads(op_data)
-                operation = Operation(**op_dict)
-                document.operations.append(operation)
-        
-        logger.info("Document created", document_id=document_id, project_id=project_id)
+        logger.info("Document created", document_id=document_id, project_id=project_id,
+                    revision=history.revision)
         return document
 
     async def authenticate_user(self, user_id: str, token: str) -> bool:
@@ -442,6 +747,19 @@ class CollaborationServer:
         # For now, allow all operations
         return True
 
+    async def broadcast_presence(self):
+        """Send each room with cursor changes one binary presence frame per tick"""
+        while True:
+            try:
+                await asyncio.sleep(self.presence.tick_interval)
+                for document_id, frame in self.presence.flush().items():
+                    await self.sio.emit('presence_frame', frame, room=f"doc_{document_id}")
+                    
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Presence broadcast error", error=str(e))
+
     async def cleanup_inactive_sessions(self):
         """Cleanup inactive user sessions"""
         while True:
@@ -465,14 +783,18 @@ class CollaborationServer:
 
     async def start_server(self, host: str = "localhost", port: int = 3001):
         """Start the collaboration server"""
+        self.node_address = self.node_address or f"http://{host}:{port}"
         await self.initialize()
         
         # Add health check endpoint
         async def health_check(request):
             return web.json_response({
                 'status': 'healthy',
+                'node_id': self.node_id,
+                'cluster_nodes': self.cluster.ring.nodes if self.cluster else [self.node_id],
                 'active_documents': len(self.documents),
                 'active_users': len(self.user_sessions),
+                'journal': self.journal.stats if self.journal else None,
                 'timestamp': datetime.utcnow().isoformat()
             })
         
@@ -494,47 +816,17 @@ class CollaborationServer:
         finally:
             if self.cleanup_task:
                 self.cleanup_task.cancel()
+            if self.presence_task:
+                self.presence_task.cancel()
+            if self.cluster:
+                await self.leave_cluster()
+            if self.journal:
+                self.journal_task.cancel()
+                await self.journal.flush()
+                await self.journal.redis.close()
             if self.redis:
                 await self.redis.close()
 
-class OperationalTransformEngine:
-    """Operational Transformation Engine for conflict resolution"""
-    
-    def transform_operation(self, operation: Operation, existing_operations: List[Operation]) -> Operation:
-        """Transform operation against existing operations"""
-        transformed_op = operation
-        
-        # Find concurrent operations (operations that happened after this one was created)
-        concurrent_ops = [op for op in existing_operations 
-                         if op.timestamp > operation.timestamp and op.user_id != operation.user_id]
-        
-        # Apply transformation rules
-        for concurrent_op in concurrent_ops:
-            transformed_op = self.transform_against(transformed_op, concurrent_op)
-        
-        return transformed_op
-    
-    def transform_against(self, op1: Operation, op2: Operation) -> Operation:
-        """Transform op1 against op2"""
-        if op1.element_id != op2.element_id:
-            # Different elements - no transformation needed
-            return op1
-        
-        # Same element - apply transformation rules
-        if op1.type == 'update' and op2.type == 'update':
-            # Last writer wins for updates
-            return op1 if op1.timestamp > op2.timestamp else op2
-        
-        if op1.type == 'move' and op2.type == 'move':
-            # Combine position changes
-            if op1.position and op2.position:
-                op1.position = {
-                    'x': op1.position.get('x', 0) + op2.position.get('x', 0),
-                    'y': op1.position.get('y', 0) + op2.position.get('y', 0)
-                }
-        
-        return op1
-
 # Main entry point
 if __name__ == "__main__":
     import sys
@@ -542,10 +834,12 @@ if __name__ == "__main__":
     # Configure logging
     logging.basicConfig(level=logging.INFO)
     
-    # Create and start server
-    server = CollaborationServer()
-    
     host = sys.argv[1] if len(sys.argv) > 1 else "localhost"
     port = int(sys.argv[2]) if len(sys.argv) > 2 else 3001
+    engine = sys.argv[3] if len(sys.argv) > 3 else "ot"
+    cluster = "--cluster" in sys.argv[4:]
+    
+    # Create and start server
+    server = CollaborationServer(engine=engine, cluster=cluster)
     
     asyncio.run(server.start_server(host, port))
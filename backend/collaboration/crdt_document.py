@@ -0,0 +1,240 @@
+"""
+CRDT Document Model for SizeWise Suite Collaboration
+
+State-based CRDT for HVAC design elements, an alternative to the
+revisioned OT engine in ``document_history``:
+
+- Element membership is an observed-remove set (OR-set). Every insert adds
+  a unique tag; a delete removes the tags it has seen, so an insert
+  concurrent with a delete survives.
+- Element fields are last-writer-wins registers stamped with hybrid
+  logical clocks (HLC). The stamps are totally ordered (wall time, counter,
+  node), so every replica picks the same winner.
+
+Merging is commutative, associative and idempotent. Any server node can
+apply changes in any order without coordination and end up with the same
+document. Reconnecting clients send their version vector, which holds the
+highest stamp they have seen from each node, and receive only the newer
+entries (delta-state sync).
+"""
+
+import copy
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from .document_history import Operation
+
+class HLC(NamedTuple):
+    """Hybrid logical clock stamp; tuple order is the merge order"""
+    wall: int  # Milliseconds since the epoch
+    counter: int
+    node: str
+
+    def encode(self) -> str:
+        return f"{self.wall}:{self.counter}:{self.node}"
+
+    @classmethod
+    def decode(cls, value: str) -> 'HLC':
+        wall, counter, node = value.split(':', 2)
+        return cls(int(wall), int(counter), node)
+
+class ClockDriftError(ValueError):
+    """Raised for a remote stamp too far ahead of local wall time"""
+
+class HybridLogicalClock:
+    """Issues stamps that stay close to wall time but never go backwards, even across nodes"""
+
+    def __init__(self, node_id: str, clock: Callable[[], float] = time.time, max_drift_ms: int = 60000):
+        self.node_id = node_id
+        self.clock = clock
+        self.max_drift_ms = max_drift_ms
+        self.wall = 0
+        self.counter = 0
+
+    def now(self) -> HLC:
+        """Stamp for a local change"""
+        physical = int(self.clock() * 1000)
+        if physical > self.wall:
+            self.wall, self.counter = physical, 0
+        else:
+            self.counter += 1
+        return HLC(self.wall, self.counter, self.node_id)
+
+    def check(self, remote: HLC):
+        """Refuse a stamp that would drag this clock more than ``max_drift_ms`` into the future"""
+        if remote.wall > int(self.clock() * 1000) + self.max_drift_ms:
+            raise ClockDriftError(f"Stamp {remote.encode()} is too far ahead of local time")
+
+    def observe(self, remote: HLC):
+        """Advance past a stamp received from another node"""
+        self.check(remote)
+        if (remote.wall, remote.counter) > (self.wall, self.counter):
+            self.wall, self.counter = remote.wall, remote.counter
+
+@dataclass
+class Delta:
+    """A set of CRDT entries; a whole document is just a delta with everything in it"""
+    adds: List[Tuple[str, HLC]] = field(default_factory=list)  # (element_id, tag)
+    removes: List[Tuple[str, HLC, HLC]] = field(default_factory=list)  # (element_id, tag, stamp)
+    fields: List[Tuple[str, str, HLC, Any]] = field(default_factory=list)  # (element_id, field, stamp, value)
+
+    def __bool__(self) -> bool:
+        return bool(self.adds or self.removes or self.fields)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'adds': [[element_id, tag.encode()] for element_id, tag in self.adds],
+            'removes': [[element_id, tag.encode(), stamp.encode()] for element_id, tag, stamp in self.removes],
+            'fields': [[element_id, name, stamp.encode(), value] for element_id, name, stamp, value in self.fields]
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Delta':
+        return cls(
+            adds=[(element_id, HLC.decode(tag)) for element_id, tag in data.get('adds', [])],
+            removes=[(element_id, HLC.decode(tag), HLC.decode(stamp))
+                     for element_id, tag, stamp in data.get('removes', [])],
+            fields=[(element_id, name, HLC.decode(stamp), value)
+                    for element_id, name, stamp, value in data.get('fields', [])]
+        )
+
+def field_name(path: List[str]) -> str:
+    return '.'.join(path)
+
+def encode_version_vector(version_vector: Dict[str, HLC]) -> Dict[str, str]:
+    return {node: stamp.encode() for node, stamp in version_vector.items()}
+
+def decode_version_vector(data: Optional[Dict[str, str]]) -> Dict[str, HLC]:
+    return {node: HLC.decode(stamp) for node, stamp in (data or {}).items()}
+
+class CRDTDocument:
+    """OR-set of elements with LWW-register fields, mergeable in any order"""
+
+    def __init__(self, node_id: str, clock: Optional[HybridLogicalClock] = None):
+        self.node_id = node_id
+        self.clock = clock or HybridLogicalClock(node_id)
+        self.adds: Dict[str, set] = {}  # element_id -> add tags
+        self.removes: Dict[str, Dict[HLC, HLC]] = {}  # element_id -> removed tag -> removal stamp
+        self.fields: Dict[str, Dict[str, Tuple[HLC, Any]]] = {}  # element_id -> field -> (stamp, value)
+        self.version_vector: Dict[str, HLC] = {}  # node -> highest stamp merged from it
+
+    # Merging
+
+    def merge(self, delta: Delta) -> Delta:
+        """
+        Merge entries from any replica; returns the entries that changed this document.
+
+        Raises ClockDriftError, leaving the document untouched, when any stamp
+        is too far in the future.
+        """
+        for stamp in [tag for _, tag in delta.adds] + [stamp for _, _, stamp in delta.removes] + \
+                [stamp for _, _, stamp, _ in delta.fields]:
+            self.clock.check(stamp)
+
+        applied = Delta()
+        for element_id, tag in delta.adds:
+            tags = self.adds.setdefault(element_id, set())
+            if tag not in tags:
+                tags.add(tag)
+                applied.adds.append((element_id, tag))
+                self._seen(tag)
+        for element_id, tag, stamp in delta.removes:
+            removed = self.removes.setdefault(element_id, {})
+            if tag not in removed or stamp > removed[tag]:
+                removed[tag] = stamp
+                applied.removes.append((element_id, tag, stamp))
+                self._seen(stamp)
+        for element_id, name, stamp, value in delta.fields:
+            registers = self.fields.setdefault(element_id, {})
+            current = registers.get(name)
+            if current is None or stamp > current[0]:
+                registers[name] = (stamp, value)
+                applied.fields.append((element_id, name, stamp, value))
+                self._seen(stamp)
+        return applied
+
+    def _seen(self, stamp: HLC):
+        self.clock.observe(stamp)
+        if stamp > self.version_vector.get(stamp.node, HLC(0, 0, stamp.node)):
+            self.version_vector[stamp.node] = stamp
+
+    def delta_since(self, version_vector: Optional[Dict[str, HLC]] = None) -> Delta:
+        """Entries newer than what a replica with ``version_vector`` has seen"""
+        seen = version_vector or {}
+
+        def is_new(stamp: HLC) -> bool:
+            return stamp.node not in seen or stamp > seen[stamp.node]
+
+        delta = Delta()
+        for element_id, tags in self.adds.items():
+            delta.adds.extend((element_id, tag) for tag in tags if is_new(tag))
+        for element_id, removed in self.removes.items():
+            delta.removes.extend((element_id, tag, stamp) for tag, stamp in removed.items() if is_new(stamp))
+        for element_id, registers in self.fields.items():
+            delta.fields.extend((element_id, name, stamp, value)
+                                for name, (stamp, value) in registers.items() if is_new(stamp))
+        return delta
+
+    # Local changes
+
+    def insert(self, element_id: str, value: Optional[Dict[str, Any]] = None) -> Delta:
+        delta = Delta(adds=[(element_id, self.clock.now())])
+        for key, field_value in (value or {}).items():
+            delta.fields.append((element_id, key, self.clock.now(), field_value))
+        return self.merge(delta)
+
+    def delete(self, element_id: str) -> Delta:
+        stamp = self.clock.now()
+        removed = self.removes.get(element_id, {})
+        return self.merge(Delta(removes=[(element_id, tag, stamp) for tag in self.adds.get(element_id, ())
+                                         if tag not in removed]))
+
+    def set(self, element_id: str, path: List[str], value: Any) -> Delta:
+        return self.merge(Delta(fields=[(element_id, field_name(path), self.clock.now(), value)]))
+
+    def apply_operation(self, operation: Operation) -> Delta:
+        """Translate a collaboration operation into local CRDT changes"""
+        if operation.type == 'insert':
+            value = dict(operation.new_value or {})
+            if operation.position is not None:
+                value['position'] = operation.position
+            return self.insert(operation.element_id, value)
+        if operation.type == 'delete':
+            return self.delete(operation.element_id)
+        if operation.type == 'move':
+            return self.set(operation.element_id, ['position'], operation.position)
+        if operation.path:
+            return self.set(operation.element_id, operation.path, operation.new_value)
+        if isinstance(operation.new_value, dict):
+            # Whole-element updates become per-field writes so edits to other fields survive
+            stamp = self.clock.now()
+            return self.merge(Delta(fields=[(operation.element_id, key, stamp, value)
+                                            for key, value in operation.new_value.items()]))
+        return Delta()
+
+    # Reading
+
+    def contains(self, element_id: str) -> bool:
+        removed = self.removes.get(element_id, {})
+        return any(tag not in removed for tag in self.adds.get(element_id, ()))
+
+    def elements(self) -> Dict[str, Dict[str, Any]]:
+        """Materialized element state (element_id -> nested fields) of the elements present"""
+        elements = {}
+        for element_id in self.adds:
+            if not self.contains(element_id):
+                continue
+            element: Dict[str, Any] = {}
+            # Apply in stamp order so a write to "size" and a later one to "size.width" compose
+            for name, (stamp, value) in sorted(self.fields.get(element_id, {}).items(), key=lambda item: item[1][0]):
+                *parents, leaf = name.split('.')
+                target = element
+                for key in parents:
+                    child = target.get(key)
+                    if not isinstance(child, dict):
+                        child = target[key] = {}
+                    target = child
+                target[leaf] = copy.deepcopy(value)
+            elements[element_id] = element
+        return elements
@@ -0,0 +1,187 @@
+"""
+Revisioned Document History for SizeWise Suite Collaboration
+
+Every accepted operation gets the next revision number. Clients send the
+revision their change was based on (the last revision they had applied),
+so an incoming operation is transformed only against the operations
+committed after that base, not against the whole history.
+
+Older operations are folded into a snapshot of element state. The history
+keeps a bounded tail of recent operations, used for transforms and to
+catch up joining clients. Processing an operation and joining a document
+therefore cost the same after hours of editing as after minutes.
+"""
+
+import copy
+from dataclasses import dataclass, fields
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+@dataclass
+class Operation:
+    id: str
+    type: str  # insert, delete, update, move, style
+    user_id: str
+    timestamp: datetime
+    element_id: str
+    path: List[str]
+    old_value: Optional[Any] = None
+    new_value: Optional[Any] = None
+    position: Optional[Dict] = None
+    metadata: Optional[Dict] = None
+    revision: int = 0  # Assigned when committed
+    base_revision: Optional[int] = None  # Revision the client had applied when it made the change
+
+    def to_dict(self) -> Dict[str, Any]:
+        # Shallow on purpose: asdict() would deep-copy every value on each broadcast
+        data = {f.name: getattr(self, f.name) for f in fields(self)}
+        data['timestamp'] = self.timestamp.isoformat()
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Operation':
+        data = dict(data)
+        if isinstance(data.get('timestamp'), str):
+            data['timestamp'] = datetime.fromisoformat(data['timestamp'])
+        return cls(**data)
+
+class ResyncRequired(Exception):
+    """The client's base revision has been compacted into the snapshot; it must reload the document."""
+
+    def __init__(self, base_revision: int, snapshot_revision: int):
+        super().__init__(f"Base revision {base_revision} is older than snapshot revision {snapshot_revision}")
+        self.base_revision = base_revision
+        self.snapshot_revision = snapshot_revision
+
+def apply_operation(state: Dict[str, Any], operation: Operation):
+    """
+    Apply an operation to element state (element_id -> element).
+
+    Inserts add an element, deletes remove it, moves set its position, and
+    updates/styles set the value at ``path`` inside the element (or merge
+    into it when ``path`` is empty). Changes to elements that no longer
+    exist are ignored; a concurrent delete wins.
+    """
+    if operation.type == 'insert':
+        element = copy.deepcopy(operation.new_value) if operation.new_value is not None else {}
+        if operation.position is not None and isinstance(element, dict):
+            element['position'] = copy.deepcopy(operation.position)
+        state[operation.element_id] = element
+        return
+    if operation.type == 'delete':
+        state.pop(operation.element_id, None)
+        return
+
+    element = state.get(operation.element_id)
+    if element is None:
+        return
+    if operation.type == 'move':
+        if isinstance(element, dict):
+            element['position'] = copy.deepcopy(operation.position)
+        return
+
+    value = copy.deepcopy(operation.new_value)
+    if operation.path and isinstance(element, dict):
+        target = element
+        for key in operation.path[:-1]:
+            child = target.get(key)
+            if not isinstance(child, dict):
+                child = target[key] = {}
+            target = child
+        target[operation.path[-1]] = value
+    elif not operation.path:
+        if isinstance(element, dict) and isinstance(value, dict):
+            element.update(value)
+        else:
+            state[operation.element_id] = value
+
+class OperationalTransformEngine:
+    """Operational Transformation Engine for conflict resolution"""
+
+    def transform_operation(self, operation: Operation, concurrent_operations: Iterable[Operation]) -> Operation:
+        """Transform operation against the operations committed after its base revision"""
+        transformed_op = operation
+        for concurrent_op in concurrent_operations:
+            transformed_op = self.transform_against(transformed_op, concurrent_op)
+        return transformed_op
+
+    def transform_against(self, op1: Operation, op2: Operation) -> Operation:
+        """Transform op1 against op2, which was committed first"""
+        if op1.element_id != op2.element_id:
+            # Different elements - no transformation needed
+            return op1
+
+        # Same element: op1 applies after op2, so it wins (last writer in revision
+        # order) and records what it actually overwrites
+        if op1.type in ('update', 'style') and op2.type in ('update', 'style') and op1.path == op2.path:
+            op1.old_value = copy.deepcopy(op2.new_value)
+        elif op1.type == 'move' and op2.type == 'move':
+            op1.old_value = copy.deepcopy(op2.position)
+
+        return op1
+
+class DocumentHistory:
+    """
+    Snapshot plus bounded operation tail for one document.
+
+    The tail holds revisions ``snapshot_revision + 1`` to ``revision``. When
+    it grows past ``max_tail`` the oldest operations are folded into the
+    snapshot, leaving ``retained_tail``; clients based further back than the
+    snapshot must resync.
+    """
+
+    def __init__(self, snapshot: Optional[Dict[str, Any]] = None, snapshot_revision: int = 0,
+                 operations: Iterable[Operation] = (), max_tail: int = 1000, retained_tail: int = 200):
+        self.snapshot: Dict[str, Any] = snapshot or {}
+        self.snapshot_revision = snapshot_revision
+        self.operations: List[Operation] = []
+        self.max_tail = max_tail
+        self.retained_tail = min(retained_tail, max_tail)
+        for operation in operations:
+            # A stored tail may have a gap if a write was lost; keep the contiguous prefix
+            if operation.revision != self.revision + 1:
+                break
+            self.operations.append(operation)
+
+    @property
+    def revision(self) -> int:
+        return self.snapshot_revision + len(self.operations)
+
+    def operations_since(self, revision: int) -> List[Operation]:
+        """Operations committed after ``revision``."""
+        if revision < self.snapshot_revision:
+            raise ResyncRequired(revision, self.snapshot_revision)
+        return self.operations[revision - self.snapshot_revision:]
+
+    def commit(self, operation: Operation, engine: OperationalTransformEngine) -> Operation:
+        """Transform an operation against everything after its base and append it at the next revision."""
+        base_revision = self.revision if operation.base_revision is None else min(operation.base_revision,
+                                                                                    self.revision)
+        # The user's own later operations were made with this change already applied
+        concurrent = [op for op in self.operations_since(base_revision) if op.user_id != operation.user_id]
+        committed = engine.transform_operation(operation, concurrent)
+        committed.revision = self.revision + 1
+        self.operations.append(committed)
+        return committed
+
+    @property
+    def needs_compaction(self) -> bool:
+        return len(self.operations) > self.max_tail
+
+    def compact(self) -> int:
+        """Fold all but the retained tail into the snapshot; returns the new snapshot revision."""
+        folded = len(self.operations) - self.retained_tail
+        if folded <= 0:
+            return self.snapshot_revision
+        for operation in self.operations[:folded]:
+            apply_operation(self.snapshot, operation)
+        del self.operations[:folded]
+        self.snapshot_revision += folded
+        return self.snapshot_revision
+
+    def state(self) -> Dict[str, Any]:
+        """Current element state: the snapshot with the tail applied."""
+        state = copy.deepcopy(self.snapshot)
+        for operation in self.operations:
+            apply_operation(state, operation)
+        return state
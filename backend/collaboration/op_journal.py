@@ -0,0 +1,311 @@
+"""
+Write-Behind Operation Journal for SizeWise Suite Collaboration
+
+Committed operations are queued in memory and written to a Redis Stream
+per document (``doc:{id}:journal``) by a background task every few
+milliseconds. All documents with pending operations go out in one
+pipelined round trip, one ``XADD`` per document. Acknowledging an
+operation never waits on Redis.
+
+Each stream entry is one batch. Its ID is ``<last revision>-0``, so
+entries are ordered by revision and a snapshot can drop the batches it
+covers with ``XTRIM MINID``. Appends refresh the expiry of the snapshot
+along with the journal's, since the journal is useless without it. In a cluster, writes for a document carry
+the node's fencing token and are refused once another node has taken the
+document over (see ``cluster``). Batches are encoded compactly:
+
+- Operations are positional arrays with trailing empty fields dropped.
+  Operation types are small integer codes.
+- User ids, element ids and path segments are interned into a string
+  table per batch.
+- Timestamps are epoch milliseconds.
+- The batch is packed with msgpack when it is installed, and compact JSON
+  otherwise.
+"""
+
+import asyncio
+import json
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Set, Tuple
+
+import structlog
+
+from .document_history import Operation
+
+try:
+    import msgpack
+except ImportError:
+    # JSON fallback keeps the journal working where msgpack is not installed
+    msgpack = None
+
+logger = structlog.get_logger()
+
+EPOCH = datetime(1970, 1, 1)
+OPERATION_TYPES = ('insert', 'delete', 'update', 'move', 'style')
+TYPE_CODES = {name: code for code, name in enumerate(OPERATION_TYPES)}
+
+FENCED = "FENCED"
+
+# Lua: append a batch unless the fencing token (ARGV[1], empty outside a cluster) is stale,
+# keeping the snapshot (KEYS[3]) alive as long as the journal
+APPEND_BATCH_SCRIPT = """
+if ARGV[1] ~= '' and redis.call('GET', KEYS[2]) ~= ARGV[1] then
+    return redis.error_reply('FENCED')
+end
+redis.call('XADD', KEYS[1], ARGV[2], 'f', ARGV[3], 'b', ARGV[4])
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+redis.call('EXPIRE', KEYS[3], ARGV[5])
+return 1
+"""
+
+# Lua: store a snapshot only if it is newer than the stored one, then drop the batches it covers
+SAVE_SNAPSHOT_SCRIPT = """
+if ARGV[4] ~= '' and redis.call('GET', KEYS[3]) ~= ARGV[4] then
+    return redis.error_reply('FENCED')
+end
+local current = redis.call('HGET', KEYS[1], 'revision')
+if current and tonumber(current) >= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'revision', ARGV[1], 'state', ARGV[2])
+redis.call('XTRIM', KEYS[2], 'MINID', tonumber(ARGV[1]) + 1)
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+return 1
+"""
+
+class JournalBacklogFull(Exception):
+    """Raised when a document has too many operations waiting to be written"""
+
+    def __init__(self, document_id: str, pending: int):
+        super().__init__(f"{pending} operations for {document_id} are waiting to be written")
+        self.document_id = document_id
+
+class JournalTruncated(Exception):
+    """Raised when the stored journal does not continue from the stored snapshot"""
+
+    def __init__(self, document_id: str, snapshot_revision: int, first_revision: int):
+        super().__init__(f"Journal for {document_id} resumes at revision {first_revision} "
+                         f"but its snapshot is at revision {snapshot_revision}")
+        self.document_id = document_id
+
+def journal_key(document_id: str) -> str:
+    return f"doc:{document_id}:journal"
+
+def snapshot_key(document_id: str) -> str:
+    return f"doc:{document_id}:snapshot"
+
+def owner_key(document_id: str) -> str:
+    return f"doc:{document_id}:owner"
+
+def encode_batch(operations: List[Operation]) -> Tuple[bytes, bytes]:
+    """Encode operations as (format, payload)"""
+    strings: List[str] = []
+    refs: Dict[str, int] = {}
+
+    def intern(value: str) -> int:
+        ref = refs.get(value)
+        if ref is None:
+            ref = refs[value] = len(strings)
+            strings.append(value)
+        return ref
+
+    rows = []
+    for operation in operations:
+        row = [
+            operation.revision,
+            TYPE_CODES.get(operation.type, operation.type),
+            intern(operation.user_id),
+            intern(operation.element_id),
+            [intern(segment) for segment in operation.path],
+            (operation.timestamp - EPOCH) // timedelta(milliseconds=1),
+            operation.id,
+            operation.new_value,
+            operation.old_value,
+            operation.position,
+            operation.metadata,
+            operation.base_revision
+        ]
+        while row[-1] is None:
+            row.pop()
+        rows.append(row)
+
+    batch = [strings, rows]
+    if msgpack is not None:
+        return b'msgpack', msgpack.packb(batch, use_bin_type=True)
+    return b'json', json.dumps(batch, separators=(',', ':')).encode()
+
+def decode_batch(format: bytes, payload: bytes) -> List[Operation]:
+    if format == b'msgpack':
+        if msgpack is None:
+            raise RuntimeError("msgpack is required to read this journal")
+        strings, rows = msgpack.unpackb(payload, raw=False)
+    else:
+        strings, rows = json.loads(payload)
+
+    operations = []
+    for row in rows:
+        row = row + [None] * (12 - len(row))
+        revision, type_code, user_ref, element_ref, path_refs, timestamp_ms, operation_id, \
+            new_value, old_value, position, metadata, base_revision = row
+        operations.append(Operation(
+            id=operation_id,
+            type=OPERATION_TYPES[type_code] if isinstance(type_code, int) else type_code,
+            user_id=strings[user_ref],
+            timestamp=EPOCH + timedelta(milliseconds=timestamp_ms),
+            element_id=strings[element_ref],
+            path=[strings[ref] for ref in path_refs],
+            old_value=old_value,
+            new_value=new_value,
+            position=position,
+            metadata=metadata,
+            revision=revision,
+            base_revision=base_revision
+        ))
+    return operations
+
+class OperationJournal:
+    """Queues committed operations and snapshots, and writes them to Redis in pipelined batches"""
+
+    def __init__(self, redis, flush_interval: float = 0.005, max_pending: int = 10000, ttl: int = 86400,
+                 max_retry_interval: float = 5.0):
+        self.redis = redis  # Must not decode responses; batches are binary
+        self.flush_interval = flush_interval
+        self.max_retry_interval = max_retry_interval  # Longest pause between flushes while Redis fails
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self.pending: Dict[str, List[Operation]] = {}
+        self.snapshots: Dict[str, Tuple[int, str]] = {}
+        self.fences: Dict[str, str] = {}  # document_id -> fencing token its writes carry
+        self.fenced: Set[str] = set()  # Documents whose writes were refused; another node owns them now
+        self._flush_lock = asyncio.Lock()
+        self.stats = {'batches': 0, 'operations': 0, 'bytes': 0, 'failures': 0, 'rejected': 0, 'fenced': 0}
+
+    def check_capacity(self, document_id: str):
+        """
+        Raise JournalBacklogFull when ``max_pending`` operations for the document
+        are still unwritten. Called before committing, so new operations are
+        refused while Redis is unreachable instead of leaving gaps in the journal.
+        """
+        pending = len(self.pending.get(document_id, ()))
+        if pending >= self.max_pending:
+            self.stats['rejected'] += 1
+            raise JournalBacklogFull(document_id, pending)
+
+    def append(self, document_id: str, operation: Operation):
+        """Queue a committed operation; returns immediately"""
+        self.pending.setdefault(document_id, []).append(operation)
+
+    def fence(self, document_id: str, token: str):
+        """Tag a document's writes with this node's fencing token"""
+        self.fences[document_id] = token
+        self.fenced.discard(document_id)
+
+    def discard(self, document_id: str):
+        """Forget a document this node no longer serves, including anything not yet written"""
+        self.pending.pop(document_id, None)
+        self.snapshots.pop(document_id, None)
+        self.fences.pop(document_id, None)
+        self.fenced.discard(document_id)
+
+    def save_snapshot(self, document_id: str, revision: int, state: Dict[str, Any]):
+        """Queue a snapshot; it is written after the batches queued before it"""
+        self.snapshots[document_id] = (revision, json.dumps(state))
+
+    async def run(self):
+        """Flush pending batches every ``flush_interval`` seconds, backing off exponentially on failures"""
+        interval = self.flush_interval
+        while True:
+            try:
+                await asyncio.sleep(interval)
+                if self.pending or self.snapshots:
+                    await self.flush()
+                interval = self.flush_interval
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                interval = min(interval * 2, self.max_retry_interval)
+                logger.error("Operation journal flush error", error=str(e), retry_in=interval)
+
+    async def flush(self):
+        """Write everything queued so far in one pipelined round trip"""
+        async with self._flush_lock:
+            pending, self.pending = self.pending, {}
+            snapshots, self.snapshots = self.snapshots, {}
+            if not pending and not snapshots:
+                return
+
+            pipe = self.redis.pipeline(transaction=False)
+            commands = []  # (result index, document_id, operations) for each append
+            for document_id, operations in pending.items():
+                format, payload = encode_batch(operations)
+                commands.append((len(pipe), document_id, operations))
+                pipe.eval(APPEND_BATCH_SCRIPT, 3, journal_key(document_id), owner_key(document_id),
+                          snapshot_key(document_id), self.fences.get(document_id, ''), f"{operations[-1].revision}-0", format, payload,
+                          self.ttl)
+                self.stats['bytes'] += len(payload)
+            snapshot_commands = []  # (result index, document_id) for each snapshot
+            for document_id, (revision, state) in snapshots.items():
+                snapshot_commands.append((len(pipe), document_id))
+                pipe.eval(SAVE_SNAPSHOT_SCRIPT, 3, snapshot_key(document_id), journal_key(document_id),
+                          owner_key(document_id), revision, state, self.ttl, self.fences.get(document_id, ''))
+
+            try:
+                results = await pipe.execute(raise_on_error=False)
+            except Exception:
+                # Nothing was confirmed; put everything back in front of what arrived meanwhile.
+                # Batches that did reach Redis are written again and skipped on load.
+                for document_id, operations in pending.items():
+                    self.pending[document_id] = operations + self.pending.get(document_id, [])
+                for document_id, snapshot in snapshots.items():
+                    self.snapshots.setdefault(document_id, snapshot)
+                self.stats['failures'] += 1
+                raise
+
+            for index, document_id, operations in commands:
+                result = results[index]
+                if isinstance(result, Exception) and FENCED in str(result):
+                    self._fenced(document_id, len(operations))
+                elif isinstance(result, Exception) and 'equal or smaller' not in str(result):
+                    self.pending[document_id] = operations + self.pending.get(document_id, [])
+                    self.stats['failures'] += 1
+                    logger.error("Operation journal write failed", document_id=document_id, error=str(result))
+                else:
+                    self.stats['batches'] += 1
+                    self.stats['operations'] += len(operations)
+            for index, document_id in snapshot_commands:
+                if isinstance(results[index], Exception) and FENCED in str(results[index]):
+                    self._fenced(document_id, 0)
+
+    def _fenced(self, document_id: str, operations: int):
+        # Another node owns the document now; its copy is authoritative, so these writes are dropped
+        self.fenced.add(document_id)
+        self.stats['fenced'] += operations
+        logger.warning("Operation journal write refused, document owned by another node",
+                       document_id=document_id, operations=operations)
+
+    async def load(self, document_id: str) -> Tuple[Dict[str, Any], int, List[Operation]]:
+        """
+        Stored snapshot, its revision and the journaled operations after it.
+
+        Operations written twice (a batch retried after it had already
+        reached Redis) are returned once. Raises JournalTruncated when the
+        operations do not start right after the snapshot (e.g. the snapshot
+        expired or was lost while the trimmed journal survived), rather than
+        rebuilding a document missing its start.
+        """
+        snapshot = await self.redis.hgetall(snapshot_key(document_id))
+        snapshot_revision = int(snapshot.get(b'revision', 0))
+        state = json.loads(snapshot[b'state']) if snapshot else {}
+
+        operations = []
+        last_revision = snapshot_revision
+        for _, fields in await self.redis.xrange(journal_key(document_id), min=f"{snapshot_revision + 1}-0"):
+            for operation in decode_batch(fields[b'f'], fields[b'b']):
+                if operation.revision > last_revision:
+                    operations.append(operation)
+                    last_revision = operation.revision
+        if operations and operations[0].revision > snapshot_revision + 1:
+            raise JournalTruncated(document_id, snapshot_revision, operations[0].revision)
+        return state, snapshot_revision, operations
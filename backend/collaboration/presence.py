@@ -0,0 +1,234 @@
+"""
+Presence Broadcasting for SizeWise Suite Collaboration
+
+Cursor updates are not relayed one by one. The hub keeps the latest cursor
+per user and, on a fixed tick (20 Hz by default), sends each room a single
+binary frame holding only the cursors that changed since the previous
+frame. Each cursor event costs O(1) and each room costs one emit per tick,
+so traffic grows linearly with the number of users in a room instead of
+with its square.
+
+Frame layout (big-endian)::
+
+    header  B version, I sequence, H entry count
+    entry   H slot, B flags, then per flag in bit order:
+            NEW       B length + UTF-8 user id  (first frame for this slot)
+            ABSOLUTE  i x, i y                  (quantized position)
+            DELTA     h dx, h dy                (change since the last frame)
+            EXTRA     H length + JSON           (non-coordinate cursor fields)
+            GONE      -                         (idle or left; hide the cursor)
+
+Positions are quantized to ``1 / QUANTUM`` units. Users get a small slot
+number per room, so their ids are only sent once per client: a client
+joining a room first gets a keyframe describing every visible cursor with
+NEW and ABSOLUTE, numbered with the room's current sequence. It ignores
+frames numbered at or below the keyframe and applies later ones on top.
+"""
+
+import json
+import struct
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+FRAME_VERSION = 1
+QUANTUM = 10
+
+NEW = 0x01
+ABSOLUTE = 0x02
+DELTA = 0x04
+EXTRA = 0x08
+GONE = 0x10
+
+HEADER = struct.Struct('!BIH')
+ENTRY = struct.Struct('!HB')
+POINT = struct.Struct('!ii')
+STEP = struct.Struct('!hh')
+LENGTH8 = struct.Struct('!B')
+LENGTH16 = struct.Struct('!H')
+
+def quantize(cursor: Dict[str, Any]) -> Optional[Tuple[int, int]]:
+    try:
+        return round(float(cursor['x']) * QUANTUM), round(float(cursor['y']) * QUANTUM)
+    except (KeyError, TypeError, ValueError):
+        return None
+
+@dataclass
+class CursorState:
+    slot: int
+    pending: Optional[Dict[str, Any]] = None  # Latest update not yet framed
+    sent_position: Optional[Tuple[int, int]] = None  # What clients have now
+    sent_extra: Optional[str] = None
+    announced: bool = False
+    last_active: float = 0.0
+
+@dataclass
+class RoomPresence:
+    cursors: Dict[str, CursorState] = field(default_factory=dict)
+    next_slot: int = 0
+    sequence: int = 0
+    gone: List[int] = field(default_factory=list)  # Slots to report as gone in the next frame
+    dirty: bool = False
+
+class PresenceHub:
+    """Coalesces cursor updates per user and packs each room's changes into one frame per tick"""
+
+    def __init__(self, tick_rate: float = 20.0, idle_after: float = 10.0):
+        self.tick_interval = 1.0 / tick_rate
+        self.idle_after = idle_after
+        self.rooms: Dict[str, RoomPresence] = {}
+
+    def update_cursor(self, room_id: str, user_id: str, cursor: Dict[str, Any], now: Optional[float] = None):
+        """Record a cursor; only the latest one before the next tick is sent"""
+        room = self.rooms.setdefault(room_id, RoomPresence())
+        state = room.cursors.get(user_id)
+        if state is None:
+            state = room.cursors[user_id] = CursorState(slot=room.next_slot)
+            room.next_slot = (room.next_slot + 1) % 0x10000
+        state.pending = cursor
+        state.last_active = time.monotonic() if now is None else now
+        room.dirty = True
+
+    def remove_user(self, room_id: str, user_id: str):
+        """Drop a user who left; the next frame tells clients to hide their cursor"""
+        room = self.rooms.get(room_id)
+        if room and user_id in room.cursors:
+            self._forget(room, user_id)
+
+    def keyframe(self, room_id: str) -> Optional[bytes]:
+        """Full state of the cursors clients already know about, for a client joining the room"""
+        room = self.rooms.get(room_id)
+        if room is None:
+            return None
+        body = []
+        count = 0
+        for user_id, state in room.cursors.items():
+            if not state.announced:
+                continue  # Still waiting for its first frame, which announces it to everyone
+            flags = NEW
+            encoded_id = user_id.encode()[:255]
+            payload = [LENGTH8.pack(len(encoded_id)) + encoded_id]
+            if state.sent_position is not None:
+                flags |= ABSOLUTE
+                payload.append(POINT.pack(*state.sent_position))
+            if state.sent_extra is not None:
+                flags |= EXTRA
+                data = state.sent_extra.encode()
+                payload.append(LENGTH16.pack(len(data)) + data)
+            body.append(ENTRY.pack(state.slot, flags))
+            body.extend(payload)
+            count += 1
+
+        if not count:
+            return None
+        return HEADER.pack(FRAME_VERSION, room.sequence, count) + b''.join(body)
+
+    def remove_room(self, room_id: str):
+        self.rooms.pop(room_id, None)
+
+    def flush(self, now: Optional[float] = None) -> Dict[str, bytes]:
+        """Build the frame for every room with changes since the last tick"""
+        now = time.monotonic() if now is None else now
+        frames = {}
+        for room_id, room in list(self.rooms.items()):
+            self._drop_idle(room, now)
+            if room.dirty:
+                frame = self._build_frame(room)
+                if frame is not None:
+                    frames[room_id] = frame
+            if not room.cursors and not room.gone:
+                del self.rooms[room_id]
+        return frames
+
+    def _drop_idle(self, room: RoomPresence, now: float):
+        for user_id, state in list(room.cursors.items()):
+            if state.pending is None and now - state.last_active > self.idle_after:
+                self._forget(room, user_id)
+
+    @staticmethod
+    def _forget(room: RoomPresence, user_id: str):
+        state = room.cursors.pop(user_id)
+        if state.announced:
+            room.gone.append(state.slot)
+            room.dirty = True
+
+    def _build_frame(self, room: RoomPresence) -> Optional[bytes]:
+        room.dirty = False
+        body = []
+        count = 0
+        for user_id, state in room.cursors.items():
+            if state.pending is None:
+                continue
+            cursor, state.pending = state.pending, None
+            flags, payload = 0, []
+
+            if not state.announced:
+                flags |= NEW
+                encoded_id = user_id.encode()[:255]
+                payload.append(LENGTH8.pack(len(encoded_id)) + encoded_id)
+
+            position = quantize(cursor)
+            if position is not None and position != state.sent_position:
+                if state.sent_position is not None:
+                    dx, dy = position[0] - state.sent_position[0], position[1] - state.sent_position[1]
+                    if -0x8000 <= dx < 0x8000 and -0x8000 <= dy < 0x8000:
+                        flags |= DELTA
+                        payload.append(STEP.pack(dx, dy))
+                if not flags & DELTA:
+                    flags |= ABSOLUTE
+                    payload.append(POINT.pack(*position))
+                state.sent_position = position
+
+            extra = {key: value for key, value in cursor.items() if key not in ('x', 'y')}
+            encoded_extra = json.dumps(extra, sort_keys=True, separators=(',', ':')) if extra else None
+            if encoded_extra != state.sent_extra:
+                flags |= EXTRA
+                data = (encoded_extra or '{}').encode()
+                payload.append(LENGTH16.pack(len(data)) + data)
+                state.sent_extra = encoded_extra
+
+            if flags:
+                state.announced = True
+                body.append(ENTRY.pack(state.slot, flags))
+                body.extend(payload)
+                count += 1
+
+        for slot in room.gone:
+            body.append(ENTRY.pack(slot, GONE))
+            count += 1
+        room.gone.clear()
+
+        if not count:
+            return None
+        room.sequence = (room.sequence + 1) % 0x100000000
+        return HEADER.pack(FRAME_VERSION, room.sequence, count) + b''.join(body)
+
+def decode_frame(frame: bytes) -> Tuple[int, List[Dict[str, Any]]]:
+    """Decode a presence frame into (sequence, entries); reference for client implementations"""
+    version, sequence, count = HEADER.unpack_from(frame, 0)
+    if version != FRAME_VERSION:
+        raise ValueError(f"Unsupported presence frame version: {version}")
+    offset = HEADER.size
+    entries = []
+    for _ in range(count):
+        slot, flags = ENTRY.unpack_from(frame, offset)
+        offset += ENTRY.size
+        entry: Dict[str, Any] = {'slot': slot}
+        if flags & NEW:
+            (length,) = LENGTH8.unpack_from(frame, offset)
+            entry['user_id'] = frame[offset + 1:offset + 1 + length].decode()
+            offset += 1 + length
+        if flags & ABSOLUTE:
+            entry['position'] = POINT.unpack_from(frame, offset)
+            offset += POINT.size
+        if flags & DELTA:
+            entry['delta'] = STEP.unpack_from(frame, offset)
+            offset += STEP.size
+        if flags & EXTRA:
+            (length,) = LENGTH16.unpack_from(frame, offset)
+            entry['extra'] = json.loads(frame[offset + 2:offset + 2 + length])
+            offset += 2 + length
+        if flags & GONE:
+            entry['gone'] = True
+        entries.append(entry)
+    return sequence, entries
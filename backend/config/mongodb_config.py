@@ -3,11 +3,17 @@ MongoDB Configuration for SizeWise Suite Backend
 
 Provides MongoDB connection management alongside existing PostgreSQL setup.
 Supports connection pooling, error handling, and environment-based configuration.
+
+Synchronous Flask handlers reach the async (Motor) client through a single
+long-lived event loop thread per worker process, so the loop and the
+client's connection pool are reused across requests.
 """
 
 import os
 import asyncio
-from typing import Optional, Dict, Any
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Optional, Dict, Any, Awaitable
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 from pymongo import MongoClient
 from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
@@ -33,6 +39,14 @@ class MongoDBConfig:
         self.async_client: Optional[AsyncIOMotorClient] = None
         self.database: Optional[AsyncIOMotorDatabase] = None
         
+        # Pool tuning; idle connections are kept long enough to be reused
+        # between bursts instead of being closed and reopened
+        self.max_pool_size = int(os.getenv('MONGODB_MAX_POOL_SIZE', '50'))
+        self.min_pool_size = int(os.getenv('MONGODB_MIN_POOL_SIZE', '5'))
+        self.max_idle_time_ms = int(os.getenv('MONGODB_MAX_IDLE_TIME_MS', '300000'))
+        self.wait_queue_timeout_ms = int(os.getenv('MONGODB_WAIT_QUEUE_TIMEOUT_MS', '5000'))
+        self._owner_pid = os.getpid()
+        
     def _get_connection_string(self) -> str:
         """Get MongoDB connection string from secure credential manager."""
         # Try to get credential manager
@@ -72,22 +86,34 @@ class MongoDBConfig:
 
         return connection_string
     
+    def _pool_options(self) -> Dict[str, Any]:
+        """Connection pool and timeout options shared by both clients."""
+        return {
+            'maxPoolSize': self.max_pool_size,
+            'minPoolSize': self.min_pool_size,
+            'maxIdleTimeMS': self.max_idle_time_ms,
+            'waitQueueTimeoutMS': self.wait_queue_timeout_ms,
+            'serverSelectionTimeoutMS': 5000,
+            'connectTimeoutMS': 10000,
+            'socketTimeoutMS': 20000,
+            'retryWrites': True,
+            'retryReads': True
+        }
+    
+    def _reset_after_fork(self):
+        """Drop clients inherited from a parent process; pools are not fork-safe."""
+        if self._owner_pid != os.getpid():
+            self.client = None
+            self.async_client = None
+            self.database = None
+            self._owner_pid = os.getpid()
+    
     def get_sync_client(self) -> MongoClient:
         """Get synchronous MongoDB client with connection pooling."""
+        self._reset_after_fork()
         if not self.client:
             try:
-                self.client = MongoClient(
-                    self.connection_string,
-                    maxPoolSize=50,
-                    minPoolSize=5,
-                    maxIdleTimeMS=30000,
-                    waitQueueTimeoutMS=5000,
-                    serverSelectionTimeoutMS=5000,
-                    connectTimeoutMS=10000,
-                    socketTimeoutMS=20000,
-                    retryWrites=True,
-                    retryReads=True
-                )
+                self.client = MongoClient(self.connection_string, **self._pool_options())
                 
                 # Test connection
                 self.client.admin.command('ping')
@@ -101,19 +127,12 @@ class MongoDBConfig:
     
     def get_async_client(self) -> AsyncIOMotorClient:
         """Get asynchronous MongoDB client with connection pooling."""
+        self._reset_after_fork()
         if not self.async_client:
             try:
                 self.async_client = AsyncIOMotorClient(
                     self.connection_string,
-                    maxPoolSize=50,
-                    minPoolSize=5,
-                    maxIdleTimeMS=30000,
-                    waitQueueTimeoutMS=5000,
-                    serverSelectionTimeoutMS=5000,
-                    connectTimeoutMS=10000,
-                    socketTimeoutMS=20000,
-                    retryWrites=True,
-                    retryReads=True
+                    **self._pool_options()
                 )
                 
                 logger.info("MongoDB async client initialized")
@@ -128,7 +147,9 @@ class MongoDBConfig:
         """Get MongoDB database instance."""
         if async_client:
             client = self.get_async_client()
-            return client[self.database_name]
+            if self.database is None or self.database.client is not client:
+                self.database = client[self.database_name]
+            return self.database
         else:
             client = self.get_sync_client()
             return client[self.database_name]
@@ -152,11 +173,76 @@ class MongoDBConfig:
             
         if self.async_client:
             self.async_client.close()
+            self.async_client = None
+            self.database = None
             logger.info("MongoDB async client closed")
 
-# Global MongoDB configuration instance
+class MongoDBEventLoop:
+    """
+    Background event loop thread that runs all MongoDB coroutines of this
+    worker process.
+    
+    The thread is started lazily and restarted after a fork, since threads
+    do not survive into child processes.
+    """
+    
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+    
+    def get_loop(self) -> asyncio.AbstractEventLoop:
+        """Get the running background loop, starting it if needed."""
+        if self._loop is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return self._loop
+        
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid() or not self._thread.is_alive():
+                loop = asyncio.new_event_loop()
+                started = threading.Event()
+                
+                def run():
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(started.set)
+                    loop.run_forever()
+                
+                self._thread = threading.Thread(target=run, name="mongodb-event-loop", daemon=True)
+                self._thread.start()
+                started.wait()
+                self._loop = loop
+                self._pid = os.getpid()
+                logger.info("MongoDB event loop thread started", pid=self._pid)
+        return self._loop
+    
+    def run(self, coro: Awaitable, timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the background loop and wait for its result."""
+        loop = self.get_loop()
+        future = asyncio.run_coroutine_threadsafe(coro, loop)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise asyncio.TimeoutError(f"MongoDB operation timed out after {timeout}s")
+    
+    def stop(self):
+        """Stop the background loop thread."""
+        with self._lock:
+            if self._loop is not None and self._pid == os.getpid():
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join(timeout=5)
+            self._loop = None
+            self._thread = None
+            self._pid = None
+
+# Global MongoDB event loop and configuration instances
+mongodb_loop = MongoDBEventLoop()
 mongodb_config = MongoDBConfig()
 
+def run_mongodb_coroutine(coro: Awaitable, timeout: Optional[float] = None) -> Any:
+    """Run a MongoDB coroutine from synchronous code on the shared loop."""
+    return mongodb_loop.run(coro, timeout)
+
 def get_mongodb_database(async_client: bool = True) -> AsyncIOMotorDatabase:
     """Get MongoDB database instance."""
     return mongodb_config.get_database(async_client=async_client)
@@ -180,7 +266,8 @@ async def init_mongodb_collections():
             'user_data',
             'spatial_data',
             'hvac_systems',
-            'duct_layouts'
+            'duct_layouts',
+            'project_analytics'
         ]
         
         existing_collections = await db.list_collection_names()
@@ -210,15 +297,33 @@ async def create_indexes(db: AsyncIOMotorDatabase):
         # Calculations collection indexes
         await db.calculations.create_index("project_id")
         await db.calculations.create_index("calculation_type")
-        await db.calculations.create_index([("project_id", 1), ("created_at", -1)])
+        await db.calculations.create_index([("project_id", 1), ("created_at", -1), ("_id", -1)])
+        await db.calculations.create_index(
+            [("project_id", 1), ("calculation_type", 1), ("created_at", -1), ("_id", -1)]
+        )
         
         # Spatial data collection indexes
         await db.spatial_data.create_index("project_id")
         await db.spatial_data.create_index([("project_id", 1), ("layer_type", 1)])
+        await db.spatial_data.create_index([("project_id", 1), ("created_at", -1), ("_id", -1)])
+        await db.spatial_data.create_index(
+            [("project_id", 1), ("layer_type", 1), ("created_at", -1), ("_id", -1)]
+        )
+        # Viewport queries: quadtree key ranges, paginated by _id
+        await db.spatial_data.create_index([("project_id", 1), ("spatial_key", 1), ("_id", 1)])
+        await db.spatial_data.create_index(
+            [("project_id", 1), ("layer_type", 1), ("spatial_key", 1), ("_id", 1)]
+        )
         
         # HVAC systems collection indexes
         await db.hvac_systems.create_index("project_id")
         await db.hvac_systems.create_index([("project_id", 1), ("system_type", 1)])
+        await db.hvac_systems.create_index([("project_id", 1), ("created_at", -1), ("_id", -1)])
+        
+        # Materialized analytics: one document per project and calculation type
+        await db.project_analytics.create_index(
+            [("project_id", 1), ("calculation_type", 1)], unique=True
+        )
         
         logger.info("MongoDB indexes created successfully")
         
@@ -4,24 +4,32 @@ Database Performance Optimizer for SizeWise Suite
 Provides comprehensive database performance optimization including:
 - Advanced connection pooling for PostgreSQL and MongoDB
 - Intelligent indexing strategies for HVAC data
-- Query optimization and caching
+- Query optimization and caching (in-process L1 in front of async Redis)
 - Performance monitoring and metrics
+- Connection pool telemetry and adaptive pool sizing
 - Automatic tuning recommendations
 """
 
 import asyncio
+import bisect
+import json
+import threading
 import time
-from typing import Dict, List, Optional, Any, Tuple
+import weakref
+from collections import OrderedDict, deque
+from enum import Enum
+from typing import Dict, List, Optional, Any, Tuple, Iterable
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 import psutil
 import structlog
-from sqlalchemy import create_engine, text, event
+from sqlalchemy import create_engine, text, event, exc as sa_exc
 from sqlalchemy.pool import QueuePool, StaticPool
 from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo import MongoClient, IndexModel, ASCENDING, DESCENDING, TEXT, GEO2D
-import redis
+from pymongo import MongoClient, IndexModel, ASCENDING, DESCENDING, TEXT, GEO2D, monitoring
+import redis.asyncio as aioredis
 from contextlib import asynccontextmanager
+from .index_advisor import IndexAdvisor, IndexCandidate, MongoQueryCapture, QueryWorkload, write_migration
 
 logger = structlog.get_logger()
 
@@ -50,6 +58,9 @@ class PostgreSQLConfig:
     enable_partitioning: bool = True
     enable_parallel_queries: bool = True
     max_parallel_workers: int = 4
+    
+    # Adaptive sizing moves pool_size + max_overflow between pool_size and this bound
+    adaptive_max_connections: int = 80
 
 @dataclass
 class MongoDBConfig:
@@ -70,6 +81,9 @@ class MongoDBConfig:
     enable_sharding: bool = False
     enable_compression: bool = True
     compression_algorithm: str = "zstd"
+    
+    # Upper bound for pool size recommendations (the driver cannot resize a live pool)
+    adaptive_max_pool_size: int = 100
 
 @dataclass
 class CacheConfig:
@@ -81,10 +95,402 @@ class CacheConfig:
     socket_timeout: int = 30
     socket_connect_timeout: int = 30
     
+    # Adaptive sizing may raise the limit up to this bound, never below max_connections
+    adaptive_max_connections: int = 100
+    
     # Cache strategies
     default_ttl: int = 3600  # 1 hour
     calculation_ttl: int = 7200  # 2 hours
     spatial_data_ttl: int = 1800  # 30 minutes
+    project_ttl: int = 1800  # 30 minutes
+    analytics_ttl: int = 900  # 15 minutes
+    
+    # In-process L1 tier; entries expire early so workers do not drift far apart
+    l1_max_entries: int = 1024
+    l1_max_ttl: int = 30
+
+class QueryType(Enum):
+    """Cached query types, each routed to its own TTL."""
+    DEFAULT = "default"
+    PROJECT = "project"
+    PROJECT_LIST = "project_list"
+    ANALYTICS = "analytics"
+    CALCULATION = "calculation"
+    SPATIAL = "spatial"
+
+class LocalQueryCache:
+    """
+    Bounded in-process LRU with per-entry expiry.
+    
+    Values are stored serialized so callers never share mutable results.
+    """
+    
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+    
+    def set(self, key: str, payload: str, ttl: float):
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def delete(self, keys: Iterable[str] = (), prefixes: Iterable[str] = ()):
+        prefixes = tuple(prefixes)
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+            if prefixes:
+                for key in [k for k in self._entries if k.startswith(prefixes)]:
+                    del self._entries[key]
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+# =============================================================================
+# Connection Pool Telemetry
+# =============================================================================
+
+# Matches the latency buckets of sizewise_database_query_duration_seconds
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+# Checkout waits are mostly sub-millisecond until a pool starves
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+@dataclass
+class LatencyHistogram:
+    """Fixed-bucket latency histogram with bounded memory."""
+    buckets: Tuple[float, ...] = LATENCY_BUCKETS
+    counts: List[int] = field(default_factory=list)
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    def __post_init__(self):
+        # One extra bucket for observations above the largest bound
+        self.counts = [0] * (len(self.buckets) + 1)
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket containing the q-th percentile."""
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for bound, bucket_count in zip(self.buckets, self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return bound
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "avg_time": self.total / self.count if self.count else 0,
+            "max_time": self.max,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "buckets": {
+                **{str(bound): n for bound, n in zip(self.buckets, self.counts)},
+                "+Inf": self.counts[-1]
+            }
+        }
+
+def _metrics_collector():
+    """Process-wide MetricsCollector; None when loaded outside the backend package."""
+    try:
+        from ..monitoring import MetricsCollector as metrics_module
+    except ImportError:
+        return None
+    return metrics_module.metrics_collector
+
+@dataclass
+class PoolWindow:
+    """Pool activity since the previous sizing decision."""
+    checkouts: int = 0
+    timeouts: int = 0
+    wait_p95: float = 0.0
+    peak_in_use: int = 0
+
+class PoolTelemetry:
+    """
+    Checkout waits, timeouts and peak usage for one kind of connection pool.
+    
+    Cumulative totals feed reports and Prometheus; the window is drained by
+    the pool sizing controller on each tick. Safe to share between threads
+    and between pools of the same database.
+    """
+    
+    def __init__(self, database_type: str):
+        self.database_type = database_type
+        self.waits = LatencyHistogram(POOL_WAIT_BUCKETS)
+        self.timeouts = 0
+        self._window = LatencyHistogram(POOL_WAIT_BUCKETS)
+        self._window_timeouts = 0
+        self._peak_in_use = 0
+        self._lock = threading.Lock()
+    
+    def record_checkout(self, seconds: float, in_use: int):
+        with self._lock:
+            self.waits.observe(seconds)
+            self._window.observe(seconds)
+            self._peak_in_use = max(self._peak_in_use, in_use)
+        
+        collector = _metrics_collector()
+        if collector is not None:
+            collector.metrics['database_pool_wait_seconds'].labels(
+                database_type=self.database_type
+            ).observe(seconds)
+    
+    def record_timeout(self, seconds: float):
+        with self._lock:
+            self.waits.observe(seconds)
+            self._window.observe(seconds)
+            self.timeouts += 1
+            self._window_timeouts += 1
+        
+        collector = _metrics_collector()
+        if collector is not None:
+            collector.metrics['database_pool_timeouts_total'].labels(
+                database_type=self.database_type
+            ).inc()
+    
+    def take_window(self, in_use: int = 0) -> PoolWindow:
+        """Drain the current window; ``in_use`` covers connections held across it."""
+        with self._lock:
+            window = PoolWindow(
+                checkouts=self._window.count - self._window_timeouts,
+                timeouts=self._window_timeouts,
+                wait_p95=self._window.percentile(95),
+                peak_in_use=max(self._peak_in_use, in_use)
+            )
+            self._window = LatencyHistogram(POOL_WAIT_BUCKETS)
+            self._window_timeouts = 0
+            self._peak_in_use = in_use
+        return window
+    
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "checkouts": self.waits.count - self.timeouts,
+                "timeouts": self.timeouts,
+                "wait": self.waits.to_dict()
+            }
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that times checkouts and can be resized while in use."""
+    
+    def __init__(self, creator, *args, **kwargs):
+        super().__init__(creator, *args, **kwargs)
+        self.telemetry = PoolTelemetry('postgresql')
+    
+    def _do_get(self):
+        start_time = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except sa_exc.TimeoutError:
+            self.telemetry.record_timeout(time.perf_counter() - start_time)
+            raise
+        self.telemetry.record_checkout(time.perf_counter() - start_time, self.checkedout())
+        return record
+    
+    def recreate(self) -> "InstrumentedQueuePool":
+        # engine.dispose() swaps in a new pool; keep its size and history
+        pool = super().recreate()
+        pool.telemetry = self.telemetry
+        return pool
+    
+    def usage(self) -> Tuple[int, int]:
+        """(in use, idle) connection counts."""
+        return self.checkedout(), self.checkedin()
+    
+    @property
+    def max_size(self) -> int:
+        return self.size() + max(self._max_overflow, 0)
+    
+    def resize(self, max_size: int) -> int:
+        """
+        Change the connection limit by adjusting overflow; the persistent
+        pool_size is the floor. Surplus overflow connections are closed as
+        they are returned.
+        """
+        if self._max_overflow == -1:
+            return self.max_size  # Unbounded pool
+        with self._overflow_lock:
+            self._max_overflow = max(0, max_size - self.size())
+        return self.max_size
+
+class InstrumentedRedisPool(aioredis.ConnectionPool):
+    """
+    asyncio Redis pool that times checkouts.
+    
+    The pool raises "Too many connections" instead of waiting when
+    exhausted; those failures are counted as timeouts. Because callers fail
+    rather than queue, resizing never drops below the configured limit.
+    """
+    
+    def __init__(self, *args, telemetry: Optional[PoolTelemetry] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.telemetry = telemetry or PoolTelemetry('redis')
+        self.min_connections = self.max_connections
+    
+    async def get_connection(self, command_name, *keys, **options):
+        start_time = time.perf_counter()
+        try:
+            connection = await super().get_connection(command_name, *keys, **options)
+        except aioredis.ConnectionError as e:
+            if str(e) == "Too many connections":
+                self.telemetry.record_timeout(time.perf_counter() - start_time)
+            raise
+        self.telemetry.record_checkout(time.perf_counter() - start_time, len(self._in_use_connections))
+        return connection
+    
+    def usage(self) -> Tuple[int, int]:
+        return len(self._in_use_connections), len(self._available_connections)
+    
+    def resize(self, max_size: int) -> int:
+        # Connections already open above the new limit stay pooled; no new ones are made
+        self.max_connections = max(max_size, self.min_connections)
+        return self.max_connections
+
+class MongoPoolListener(monitoring.ConnectionPoolListener):
+    """PyMongo pool listener recording checkout waits and open/in-use counts."""
+    
+    def __init__(self, telemetry: Optional[PoolTelemetry] = None):
+        self.telemetry = telemetry or PoolTelemetry('mongodb')
+        self.open = 0
+        self.in_use = 0
+        self._lock = threading.Lock()
+    
+    def usage(self) -> Tuple[int, int]:
+        with self._lock:
+            return self.in_use, max(self.open - self.in_use, 0)
+    
+    def connection_created(self, event):
+        with self._lock:
+            self.open += 1
+    
+    def connection_closed(self, event):
+        with self._lock:
+            self.open -= 1
+    
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.in_use += 1
+            in_use = self.in_use
+        self.telemetry.record_checkout(event.duration or 0.0, in_use)
+    
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.in_use -= 1
+    
+    def connection_check_out_failed(self, event):
+        if event.reason == monitoring.ConnectionCheckOutFailedReason.TIMEOUT:
+            self.telemetry.record_timeout(event.duration or 0.0)
+    
+    def connection_check_out_started(self, event):
+        pass
+    
+    def connection_ready(self, event):
+        pass
+    
+    def pool_created(self, event):
+        pass
+    
+    def pool_ready(self, event):
+        pass
+    
+    def pool_cleared(self, event):
+        pass
+    
+    def pool_closed(self, event):
+        pass
+
+@dataclass
+class PoolSizingPolicy:
+    """Bounds and thresholds for adaptive pool sizing."""
+    min_size: int
+    max_size: int
+    step: int = 5
+    grow_wait_p95: float = 0.05  # seconds
+    shrink_utilization: float = 0.3
+    saturation_limit: float = 0.85  # share of the database's connection limit in use
+
+@dataclass
+class PoolSizingDecision:
+    """Outcome of one controller tick for one pool."""
+    database_type: str
+    current_size: int
+    target_size: int
+    reason: str
+    timestamp: datetime = field(default_factory=datetime.utcnow)
+    applied: bool = False
+
+class AdaptivePoolController:
+    """
+    Picks a pool size from checkout pressure and database-side saturation.
+    
+    Grows by ``step`` while checkouts time out or wait too long, unless the
+    database itself is near its connection limit, in which case it backs off
+    instead: more connections would only queue inside the database. Shrinks
+    by ``step`` when the window's peak usage leaves most of the pool idle.
+    """
+    
+    def __init__(self, database_type: str, policy: PoolSizingPolicy):
+        self.database_type = database_type
+        self.policy = policy
+    
+    def decide(self, current_size: int, window: PoolWindow,
+               saturation: Optional[float] = None) -> PoolSizingDecision:
+        policy = self.policy
+        starved = window.timeouts > 0 or window.wait_p95 >= policy.grow_wait_p95
+        target, reason = current_size, ""
+        
+        if saturation is not None and saturation >= policy.saturation_limit:
+            if current_size > policy.min_size:
+                target = max(policy.min_size, current_size - policy.step)
+                reason = f"database at {saturation:.0%} of its connection limit"
+        elif starved:
+            target = min(policy.max_size, current_size + policy.step)
+            reason = (f"{window.timeouts} checkout timeouts" if window.timeouts
+                      else f"checkout wait p95 {window.wait_p95 * 1000:.1f}ms")
+        elif window.peak_in_use < current_size * policy.shrink_utilization:
+            target = max(policy.min_size, current_size - policy.step, window.peak_in_use)
+            reason = f"peak usage {window.peak_in_use}/{current_size}"
+        
+        target = min(max(target, policy.min_size), policy.max_size)
+        return PoolSizingDecision(self.database_type, current_size, target,
+                                  reason if target != current_size else "")
 
 @dataclass
 class PerformanceMetrics:
@@ -134,13 +540,55 @@ class DatabasePerformanceOptimizer:
         self.query_times: Dict[str, List[float]] = {}
         self.slow_queries: List[Dict[str, Any]] = []
         
+        # Statements by fingerprint, for the index advisor
+        self.query_workload = QueryWorkload()
+        
         # Connection pools
         self.pg_engine = None
         self.mongo_client = None
         self.redis_client = None
         
+        # Async Redis pools are bound to the loop that created them, so
+        # coroutines on any other loop get a pooled client of their own
+        self._redis_clients = weakref.WeakKeyDictionary()
+        self.redis_enabled = False
+        
+        # Query result cache tiers
+        self.query_cache_prefix = "query_cache:"
+        self.local_cache = LocalQueryCache(self.cache_config.l1_max_entries)
+        self.query_type_ttls: Dict[QueryType, int] = {
+            QueryType.DEFAULT: self.cache_config.default_ttl,
+            QueryType.PROJECT: self.cache_config.project_ttl,
+            QueryType.PROJECT_LIST: self.cache_config.project_ttl,
+            QueryType.ANALYTICS: self.cache_config.analytics_ttl,
+            QueryType.CALCULATION: self.cache_config.calculation_ttl,
+            QueryType.SPATIAL: self.cache_config.spatial_data_ttl,
+        }
+        
+        # Connection pool telemetry and adaptive sizing
+        self.mongo_pool_listener = MongoPoolListener()
+        self.redis_pool_telemetry = PoolTelemetry('redis')
+        self.redis_max_connections = self.cache_config.max_connections
+        self.pool_controllers: Dict[str, AdaptivePoolController] = {
+            'postgresql': AdaptivePoolController('postgresql', PoolSizingPolicy(
+                min_size=self.pg_config.pool_size, max_size=self.pg_config.adaptive_max_connections
+            )),
+            'mongodb': AdaptivePoolController('mongodb', PoolSizingPolicy(
+                min_size=self.mongo_config.min_pool_size, max_size=self.mongo_config.adaptive_max_pool_size
+            )),
+            'redis': AdaptivePoolController('redis', PoolSizingPolicy(
+                min_size=self.cache_config.max_connections,
+                max_size=self.cache_config.adaptive_max_connections
+            ))
+        }
+        # Other services' instrumented SQLAlchemy engines sized by the same controller tick
+        self.registered_engines: Dict[str, Any] = {}
+        self.pool_decisions: "deque[PoolSizingDecision]" = deque(maxlen=100)
+        self.pool_control_interval = 15  # seconds
+        
         # Optimization flags
         self.auto_optimization_enabled = True
+        self.adaptive_pool_sizing_enabled = True
         self.monitoring_enabled = True
         
     async def initialize(self, database_url: str, mongo_url: str):
@@ -161,6 +609,7 @@ class DatabasePerformanceOptimizer:
             # Start performance monitoring
             if self.monitoring_enabled:
                 asyncio.create_task(self._performance_monitor())
+                asyncio.create_task(self._pool_controller())
             
             logger.info("Database performance optimizer initialized successfully")
             
@@ -174,7 +623,7 @@ class DatabasePerformanceOptimizer:
             # Create engine with optimized pool settings
             self.pg_engine = create_engine(
                 database_url,
-                poolclass=QueuePool,
+                poolclass=InstrumentedQueuePool,
                 pool_size=self.pg_config.pool_size,
                 max_overflow=self.pg_config.max_overflow,
                 pool_timeout=self.pg_config.pool_timeout,
@@ -212,7 +661,8 @@ class DatabasePerformanceOptimizer:
                 readPreference=self.mongo_config.read_preference,
                 writeConcern=self.mongo_config.write_concern,
                 readConcern=self.mongo_config.read_concern,
-                compressors=["zstd", "zlib"] if self.mongo_config.enable_compression else None
+                compressors=["zstd", "zlib"] if self.mongo_config.enable_compression else None,
+                event_listeners=[self.mongo_pool_listener, MongoQueryCapture(self.query_workload)]
             )
             
             # Test connection
@@ -226,28 +676,47 @@ class DatabasePerformanceOptimizer:
             logger.error("Failed to initialize MongoDB optimization", error=str(e))
             raise
     
+    def _create_redis_client(self) -> aioredis.Redis:
+        """Create an asyncio Redis client with its own connection pool."""
+        pool = InstrumentedRedisPool(
+            telemetry=self.redis_pool_telemetry,
+            host=self.cache_config.host,
+            port=self.cache_config.port,
+            db=self.cache_config.db,
+            max_connections=self.redis_max_connections,
+            socket_timeout=self.cache_config.socket_timeout,
+            socket_connect_timeout=self.cache_config.socket_connect_timeout,
+            decode_responses=True
+        )
+        return aioredis.Redis(connection_pool=pool)
+    
+    def _get_redis_client(self) -> Optional[aioredis.Redis]:
+        """Pooled async Redis client for the running event loop."""
+        if not self.redis_enabled:
+            return None
+        loop = asyncio.get_running_loop()
+        client = self._redis_clients.get(loop)
+        if client is None:
+            client = self._redis_clients[loop] = self._create_redis_client()
+        return client
+    
     async def _initialize_redis(self):
         """Initialize Redis cache with optimized settings."""
         try:
-            self.redis_client = redis.Redis(
-                host=self.cache_config.host,
-                port=self.cache_config.port,
-                db=self.cache_config.db,
-                max_connections=self.cache_config.max_connections,
-                socket_timeout=self.cache_config.socket_timeout,
-                socket_connect_timeout=self.cache_config.socket_connect_timeout,
-                decode_responses=True
-            )
+            self.redis_client = self._create_redis_client()
             
             # Test connection
-            self.redis_client.ping()
+            await self.redis_client.ping()
             
+            self._redis_clients[asyncio.get_running_loop()] = self.redis_client
+            self.redis_enabled = True
             logger.info("Redis cache optimization initialized",
                        max_connections=self.cache_config.max_connections)
             
         except Exception as e:
             logger.warning("Redis cache not available, continuing without cache", error=str(e))
             self.redis_client = None
+            self.redis_enabled = False
     
     async def _configure_postgresql_performance(self):
         """Configure PostgreSQL performance settings."""
@@ -293,6 +762,7 @@ class DatabasePerformanceOptimizer:
                 self.query_times[query_type] = []
             
             self.query_times[query_type].append(total_time)
+            self.query_workload.record_sql(statement, total_time)
             
             # Log slow queries (>1 second)
             if total_time > 1.0:
@@ -487,8 +957,9 @@ class DatabasePerformanceOptimizer:
                 metrics.mongo_memory_usage = server_status.get('mem', {}).get('resident', 0) * 1024 * 1024  # MB to bytes
             
             # Redis metrics
-            if self.redis_client:
-                info = self.redis_client.info()
+            redis_client = self._get_redis_client()
+            if redis_client:
+                info = await redis_client.info()
                 metrics.cache_hit_ratio = float(info.get('keyspace_hits', 0)) / max(1, float(info.get('keyspace_hits', 0)) + float(info.get('keyspace_misses', 0))) * 100
                 metrics.cache_memory_usage = info.get('used_memory', 0)
                 metrics.cache_evictions = info.get('evicted_keys', 0)
@@ -521,8 +992,8 @@ class DatabasePerformanceOptimizer:
             if metrics.pg_query_avg_time > 0.5:
                 recommendations.append("Optimize slow PostgreSQL queries")
             
-            if metrics.pg_active_connections > self.pg_config.pool_size * 0.8:
-                recommendations.append("Consider increasing PostgreSQL pool size")
+            # Pool sizes are adjusted by the pool controller; only pools it cannot help are reported
+            recommendations.extend(self._pool_recommendations())
             
             # Check MongoDB performance
             if metrics.mongo_memory_usage > 1024 * 1024 * 1024:  # 1GB
@@ -546,6 +1017,172 @@ class DatabasePerformanceOptimizer:
         except Exception as e:
             logger.error("Auto-optimization error", error=str(e))
     
+    # -------------------------------------------------------------------------
+    # Connection pool sizing
+    # -------------------------------------------------------------------------
+    
+    def register_pool(self, name: str, engine, policy: PoolSizingPolicy):
+        """Size another service's engine (with an InstrumentedQueuePool) on each controller tick."""
+        self.registered_engines[name] = engine
+        self.pool_controllers[name] = AdaptivePoolController(name, policy)
+    
+    def unregister_pool(self, name: str):
+        if self.registered_engines.pop(name, None) is not None:
+            self.pool_controllers.pop(name, None)
+    
+    def _pool_state(self, database_type: str) -> Optional[Tuple[PoolTelemetry, int, int, int]]:
+        """(telemetry, in use, idle, max size) for an initialized pool."""
+        engine = self.registered_engines.get(database_type)
+        if engine is not None:
+            if not isinstance(engine.pool, InstrumentedQueuePool):
+                return None
+            return (engine.pool.telemetry, *engine.pool.usage(), engine.pool.max_size)
+        if database_type == 'postgresql' and isinstance(getattr(self.pg_engine, 'pool', None),
+                                                        InstrumentedQueuePool):
+            pool = self.pg_engine.pool
+            return (pool.telemetry, *pool.usage(), pool.max_size)
+        if database_type == 'mongodb' and self.mongo_client is not None:
+            return (self.mongo_pool_listener.telemetry, *self.mongo_pool_listener.usage(),
+                    self.mongo_config.max_pool_size)
+        if database_type == 'redis' and self.redis_enabled:
+            in_use = idle = 0
+            for redis_client in list(self._redis_clients.values()):
+                pool_in_use, pool_idle = redis_client.connection_pool.usage()
+                in_use += pool_in_use
+                idle += pool_idle
+            return self.redis_pool_telemetry, in_use, idle, self.redis_max_connections
+        return None
+    
+    def get_pool_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Live checkout telemetry and occupancy for each initialized pool."""
+        stats = {}
+        for database_type in self.pool_controllers:
+            state = self._pool_state(database_type)
+            if state is None:
+                continue
+            telemetry, in_use, idle, max_size = state
+            stats[database_type] = {
+                "in_use": in_use,
+                "idle": idle,
+                "max_size": max_size,
+                "resizable": database_type != 'mongodb',
+                **telemetry.to_dict()
+            }
+        return stats
+    
+    def _postgresql_saturation(self, engine=None) -> Optional[float]:
+        engine = engine or self.pg_engine
+        if engine.dialect.name != 'postgresql':
+            return None
+        with engine.connect() as conn:
+            return conn.execute(text(
+                "SELECT count(*)::float / current_setting('max_connections')::int FROM pg_stat_activity"
+            )).scalar()
+    
+    async def _database_saturation(self, database_type: str) -> Optional[float]:
+        """Share of the database server's connection limit in use, if it can be read."""
+        try:
+            if database_type == 'postgresql' or database_type in self.registered_engines:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(None, self._postgresql_saturation,
+                                                  self.registered_engines.get(database_type))
+            if database_type == 'mongodb':
+                server_status = await self.mongo_client.admin.command('serverStatus')
+                connections = server_status.get('connections', {})
+                current = connections.get('current', 0)
+                total = current + connections.get('available', 0)
+                return current / total if total else None
+            if database_type == 'redis':
+                redis_client = self._get_redis_client()
+                clients = await redis_client.info('clients')
+                maxclients = int((await redis_client.config_get('maxclients')).get('maxclients', 0))
+                return clients.get('connected_clients', 0) / maxclients if maxclients else None
+        except Exception as e:
+            logger.debug("Database connection saturation unavailable",
+                        database_type=database_type, error=str(e))
+        return None
+    
+    def _resize_pool(self, database_type: str, size: int) -> bool:
+        if database_type in self.registered_engines:
+            self.registered_engines[database_type].pool.resize(size)
+            return True
+        if database_type == 'postgresql':
+            self.pg_engine.pool.resize(size)
+            return True
+        if database_type == 'redis':
+            self.redis_max_connections = size
+            for redis_client in list(self._redis_clients.values()):
+                redis_client.connection_pool.resize(size)
+            return True
+        return False  # PyMongo fixes maxPoolSize when the client is created
+    
+    def _publish_pool_gauges(self, database_type: str, in_use: int, idle: int, max_size: int):
+        collector = _metrics_collector()
+        if collector is None:
+            return
+        connections = collector.metrics['database_pool_connections']
+        connections.labels(database_type=database_type, state='in_use').set(in_use)
+        connections.labels(database_type=database_type, state='idle').set(idle)
+        collector.metrics['database_pool_max_size'].labels(database_type=database_type).set(max_size)
+    
+    async def adjust_pools(self, resize: bool = True) -> List[PoolSizingDecision]:
+        """
+        One pool controller tick: publish occupancy, drain each pool's
+        telemetry window and resize pools within their bounds. With
+        ``resize=False`` (or for MongoDB) changes are only recommended.
+        """
+        decisions = []
+        for database_type, controller in self.pool_controllers.items():
+            state = self._pool_state(database_type)
+            if state is None:
+                continue
+            telemetry, in_use, idle, max_size = state
+            self._publish_pool_gauges(database_type, in_use, idle, max_size)
+            
+            window = telemetry.take_window(in_use)
+            saturation = await self._database_saturation(database_type)
+            decision = controller.decide(max_size, window, saturation)
+            decisions.append(decision)
+            if decision.target_size == decision.current_size:
+                continue
+            
+            decision.applied = resize and self._resize_pool(database_type, decision.target_size)
+            self.pool_decisions.append(decision)
+            logger.info("Connection pool resized" if decision.applied else "Connection pool resize recommended",
+                       database_type=database_type, from_size=decision.current_size,
+                       to_size=decision.target_size, reason=decision.reason)
+        return decisions
+    
+    def _pool_recommendations(self) -> List[str]:
+        """Pool problems the controller cannot fix on its own."""
+        recommendations = []
+        for database_type, stats in self.get_pool_stats().items():
+            limit = self.pool_controllers[database_type].policy.max_size
+            if stats["timeouts"] and stats["max_size"] >= limit:
+                recommendations.append(
+                    f"{database_type} pool is at its adaptive limit ({limit}) with "
+                    f"{stats['timeouts']} checkout timeouts; raise the limit or shorten connection hold times"
+                )
+        
+        hour_ago = datetime.utcnow() - timedelta(hours=1)
+        latest = {decision.database_type: decision for decision in self.pool_decisions
+                  if decision.timestamp > hour_ago}
+        for decision in latest.values():
+            if not decision.applied:
+                recommendations.append(
+                    f"Set {decision.database_type} pool size to {decision.target_size} ({decision.reason})"
+                )
+        return recommendations
+    
+    async def _pool_controller(self):
+        """Adaptive pool sizing, on a shorter interval than the metrics snapshot."""
+        while self.monitoring_enabled:
+            try:
+                await self.adjust_pools(resize=self.adaptive_pool_sizing_enabled)
+            except Exception as e:
+                logger.error("Pool controller error", error=str(e))
+            await asyncio.sleep(self.pool_control_interval)
+    
     async def get_performance_report(self) -> Dict[str, Any]:
         """Generate comprehensive performance report."""
         try:
@@ -607,6 +1244,29 @@ class DatabasePerformanceOptimizer:
                     for query_type, times in self.query_times.items()
                 },
                 "slow_queries": self.slow_queries[-10:],  # Last 10 slow queries
+                "top_queries": [
+                    {
+                        "fingerprint": query.fingerprint,
+                        "statement": query.statement[:200],
+                        "source": query.source,
+                        "calls": query.calls,
+                        "total_time": query.total_time,
+                        "mean_time": query.mean_time
+                    }
+                    for query in self.query_workload.top(10)
+                ],
+                "connection_pools": self.get_pool_stats(),
+                "pool_sizing": [
+                    {
+                        "database_type": decision.database_type,
+                        "from_size": decision.current_size,
+                        "to_size": decision.target_size,
+                        "reason": decision.reason,
+                        "applied": decision.applied,
+                        "timestamp": decision.timestamp.isoformat()
+                    }
+                    for decision in list(self.pool_decisions)[-10:]
+                ],
                 "recommendations": await self._generate_recommendations(latest_metrics)
             }
             
@@ -625,8 +1285,7 @@ class DatabasePerformanceOptimizer:
         if metrics.pg_query_avg_time > 0.5:
             recommendations.append("Analyze and optimize slow queries using EXPLAIN ANALYZE")
         
-        if metrics.pg_active_connections > self.pg_config.pool_size * 0.8:
-            recommendations.append("Consider increasing connection pool size")
+        recommendations.extend(self._pool_recommendations())
         
         # MongoDB recommendations
         if metrics.mongo_memory_usage > 1024 * 1024 * 1024:  # 1GB
@@ -648,46 +1307,136 @@ class DatabasePerformanceOptimizer:
         
         return recommendations
     
-    async def optimize_query_cache(self, query_key: str, result: Any, ttl: int = None):
+    async def advise_indexes(self, write_migrations: bool = False, min_calls: int = 5) -> Dict[str, List[IndexCandidate]]:
+        """
+        Index candidates for the captured workload. PostgreSQL candidates are
+        validated with hypothetical indexes and MongoDB candidates on a scratch
+        collection; only validated candidates are written as migrations, the
+        rest are reported.
+        """
+        advisor = IndexAdvisor(self.query_workload, min_calls=min_calls)
+        advice: Dict[str, List[IndexCandidate]] = {}
+        
+        if self.pg_engine:
+            loop = asyncio.get_running_loop()
+            advice['postgresql'] = await loop.run_in_executor(
+                None, lambda: advisor.validate_sql(self.pg_engine, advisor.propose_sql(self.pg_engine))
+            )
+        if self.mongo_client:
+            database = self.mongo_client.sizewise_spatial
+            advice['mongodb'] = await advisor.validate_mongodb(database, await advisor.propose_mongodb(database))
+        
+        if write_migrations:
+            write_migration(advice.get('postgresql', []), 'sql')
+            write_migration(advice.get('mongodb', []), 'mongodb')
+        
+        for source, candidates in advice.items():
+            logger.info("Index advice", database_type=source,
+                       candidates=[(c.ddl(), c.validated, round(c.total_time, 3)) for c in candidates])
+        return advice
+    
+    def _resolve_ttl(self, query_type: Optional[QueryType], ttl: Optional[int]) -> int:
+        """Explicit TTL wins; otherwise the query type decides."""
+        if ttl is not None:
+            return ttl
+        return self.query_type_ttls.get(query_type or QueryType.DEFAULT, self.cache_config.default_ttl)
+    
+    def _cache_key(self, query_key: str) -> str:
+        return f"{self.query_cache_prefix}{query_key}"
+    
+    async def optimize_query_cache(self, query_key: str, result: Any, ttl: int = None,
+                                   query_type: Optional[QueryType] = None):
         """Cache query results for performance optimization."""
-        if not self.redis_client:
+        await self.cache_query_results({query_key: result}, ttl=ttl, query_type=query_type)
+    
+    async def cache_query_results(self, results: Dict[str, Any], ttl: int = None,
+                                  query_type: Optional[QueryType] = None):
+        """Cache several query results in L1 and one pipelined Redis round trip."""
+        if not results:
+            return
+        
+        cache_ttl = self._resolve_ttl(query_type, ttl)
+        payloads = {}
+        for query_key, result in results.items():
+            try:
+                payloads[query_key] = json.dumps(result, default=str)
+            except (TypeError, ValueError) as e:
+                logger.warning("Failed to serialize query result", query_key=query_key, error=str(e))
+        
+        l1_ttl = min(cache_ttl, self.cache_config.l1_max_ttl)
+        for query_key, payload in payloads.items():
+            self.local_cache.set(query_key, payload, l1_ttl)
+        
+        redis_client = self._get_redis_client()
+        if not redis_client or not payloads:
             return
         
         try:
-            cache_ttl = ttl or self.cache_config.default_ttl
-            
-            # Determine TTL based on query type
-            if "calculation" in query_key.lower():
-                cache_ttl = self.cache_config.calculation_ttl
-            elif "spatial" in query_key.lower():
-                cache_ttl = self.cache_config.spatial_data_ttl
-            
-            # Cache the result
-            import json
-            self.redis_client.setex(
-                f"query_cache:{query_key}",
-                cache_ttl,
-                json.dumps(result, default=str)
-            )
+            async with redis_client.pipeline(transaction=False) as pipe:
+                for query_key, payload in payloads.items():
+                    pipe.setex(self._cache_key(query_key), cache_ttl, payload)
+                await pipe.execute()
             
         except Exception as e:
-            logger.warning("Failed to cache query result", query_key=query_key, error=str(e))
+            logger.warning("Failed to cache query results", keys=list(payloads), error=str(e))
     
     async def get_cached_query(self, query_key: str) -> Optional[Any]:
         """Retrieve cached query result."""
-        if not self.redis_client:
-            return None
+        return (await self.get_cached_queries([query_key])).get(query_key)
+    
+    async def get_cached_queries(self, query_keys: List[str]) -> Dict[str, Any]:
+        """Retrieve several cached results: L1 first, then one Redis MGET for the rest."""
+        found: Dict[str, Any] = {}
+        missing = []
+        for query_key in query_keys:
+            payload = self.local_cache.get(query_key)
+            if payload is None:
+                missing.append(query_key)
+            else:
+                found[query_key] = json.loads(payload)
+        
+        redis_client = self._get_redis_client()
+        if not missing or not redis_client:
+            return found
         
         try:
-            import json
-            cached_result = self.redis_client.get(f"query_cache:{query_key}")
-            if cached_result:
-                return json.loads(cached_result)
+            payloads = await redis_client.mget([self._cache_key(key) for key in missing])
+            for query_key, payload in zip(missing, payloads):
+                if payload is None:
+                    continue
+                found[query_key] = json.loads(payload)
+                # Short L1 lifetime; Redis stays the source of truth across workers
+                self.local_cache.set(query_key, payload, self.cache_config.l1_max_ttl)
             
         except Exception as e:
-            logger.warning("Failed to retrieve cached query", query_key=query_key, error=str(e))
+            logger.warning("Failed to retrieve cached queries", keys=missing, error=str(e))
         
-        return None
+        return found
+    
+    async def invalidate_cached_queries(self, query_keys: Iterable[str] = (),
+                                        prefixes: Iterable[str] = ()):
+        """Drop cached results by exact key or key prefix from both tiers."""
+        query_keys = list(query_keys)
+        prefixes = list(prefixes)
+        self.local_cache.delete(query_keys, prefixes)
+        
+        redis_client = self._get_redis_client()
+        if not redis_client:
+            return
+        
+        try:
+            redis_keys = [self._cache_key(key) for key in query_keys]
+            for prefix in prefixes:
+                async for key in redis_client.scan_iter(match=f"{self._cache_key(prefix)}*", count=500):
+                    redis_keys.append(key)
+            if redis_keys:
+                async with redis_client.pipeline(transaction=False) as pipe:
+                    for start in range(0, len(redis_keys), 500):
+                        pipe.unlink(*redis_keys[start:start + 500])
+                    await pipe.execute()
+            
+        except Exception as e:
+            logger.warning("Failed to invalidate cached queries", error=str(e))
     
     async def cleanup(self):
         """Cleanup database connections and resources."""
@@ -700,8 +1449,13 @@ class DatabasePerformanceOptimizer:
             if self.mongo_client:
                 self.mongo_client.close()
             
-            if self.redis_client:
-                self.redis_client.close()
+            for redis_client in list(self._redis_clients.values()):
+                await redis_client.close()
+                await redis_client.connection_pool.disconnect()
+            self._redis_clients.clear()
+            self.redis_client = None
+            self.redis_enabled = False
+            self.local_cache.clear()
             
             logger.info("Database performance optimizer cleanup completed")
             
@@ -724,17 +1478,10 @@ async def get_performance_report() -> Dict[str, Any]:
     return await db_performance_optimizer.get_performance_report()
 
 @asynccontextmanager
-async def optimized_query_cache(query_key: str, ttl: int = None):
-    """Context manager for automatic query caching."""
-    # Check cache first
-    cached_result = await db_performance_optimizer.get_cached_query(query_key)
-    if cached_result is not None:
-        yield cached_result
-        return
-    
-    # Execute query and cache result
-    result = yield None
-    if result is not None:
-        await db_performance_optimizer.optimize_query_cache(query_key, result, ttl)
-    
-    yield result
+async def optimized_query_cache(query_key: str):
+    """
+    Context manager yielding the cached result for ``query_key`` or None.
+
+    Lookups only; store results with ``optimize_query_cache``, which takes the TTL.
+    """
+    yield await db_performance_optimizer.get_cached_query(query_key)
@@ -0,0 +1,313 @@
+"""
+Bulk Loader for SizeWise Suite
+
+Loads large batches of rows (CAD imports push tens of thousands of
+segments per project) without per-row round trips:
+
+- PostgreSQL: rows stream through COPY FROM STDIN into a temporary staging
+  table, then one set-based INSERT ... ON CONFLICT merges each chunk into
+  the target table. The whole load commits as one transaction.
+- SQLite (offline database): one executemany upsert inside a single
+  transaction, with PRAGMAs tuned for bulk writes.
+
+IDs are assigned client-side when rows do not carry one, so they are
+returned in input order without relying on RETURNING order. A failed load
+leaves no rows behind, so it can simply be rerun, and callers only ever
+see loads that completed.
+The merge never moves a row to another project: IDs that already belong to
+a different owner are left untouched and reported as conflicts.
+"""
+
+import itertools
+import json
+import time
+import uuid
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import structlog
+
+logger = structlog.get_logger()
+
+@dataclass(frozen=True)
+class BulkTableSpec:
+    """Columns a bulk load writes for one table."""
+    table: str
+    columns: Tuple[str, ...]
+    json_columns: Tuple[str, ...] = ()
+    defaults: Dict[str, Any] = field(default_factory=dict)
+    key: str = 'id'
+    # Columns left untouched when an existing row is updated by the merge
+    immutable_columns: Tuple[str, ...] = ('id', 'project_id', 'user_id', 'created_at')
+    # Existing rows are only updated when this column matches the incoming row
+    owner_column: Optional[str] = 'project_id'
+
+    def restricted_to(self, available_columns: Iterable[str]) -> 'BulkTableSpec':
+        """Drop columns the live table does not have (schemas differ per database)."""
+        available = set(available_columns)
+        return replace(self, columns=tuple(c for c in self.columns if c in available))
+
+    @property
+    def update_columns(self) -> Tuple[str, ...]:
+        return tuple(c for c in self.columns if c not in self.immutable_columns)
+
+    @property
+    def guarded_owner(self) -> Optional[str]:
+        return self.owner_column if self.owner_column in self.columns else None
+
+SEGMENTS_TABLE = BulkTableSpec(
+    table='project_segments',
+    columns=('id', 'project_id', 'user_id', 'name', 'segment_type', 'calculation_data',
+             'geometry_data', 'validation_results', 'created_at', 'updated_at'),
+    json_columns=('calculation_data', 'geometry_data', 'validation_results')
+)
+
+CALCULATIONS_TABLE = BulkTableSpec(
+    table='calculations',
+    columns=('id', 'project_id', 'user_id', 'calculation_type', 'inputs', 'results',
+             'metadata', 'created_at', 'is_valid'),
+    json_columns=('inputs', 'results', 'metadata'),
+    defaults={'is_valid': True}
+)
+
+# Applied for the duration of a load and restored afterwards (connections are pooled)
+SQLITE_BULK_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'temp_store': 'MEMORY',
+    'cache_size': '-65536',  # 64 MB page cache
+}
+
+DEFAULT_CHUNK_SIZE = 10000
+
+@dataclass
+class BulkLoadResult:
+    """Outcome of a bulk load."""
+    ids: List[str]
+    rows: int
+    chunks: int
+    seconds: float = 0.0
+    # IDs that did not exist before the load
+    inserted_ids: List[str] = field(default_factory=list)
+    # IDs owned by another project; those rows were left unchanged
+    conflicts: List[str] = field(default_factory=list)
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+def prepare_rows(spec: BulkTableSpec, rows: Iterable[Dict[str, Any]],
+                 overrides: Optional[Dict[str, Any]] = None) -> Tuple[List[str], List[tuple]]:
+    """Convert row dicts into value tuples in column order.
+
+    Missing IDs are generated, JSON columns are serialized, datetimes are
+    rendered as ISO 8601 and ``overrides`` (e.g. project_id and timestamps)
+    are applied to every row. Input dicts are not modified.
+    """
+    overrides = overrides or {}
+    encode_json = json.JSONEncoder().encode
+    json_flags = [column in spec.json_columns for column in spec.columns]
+    ids = []
+    values = []
+    for row in rows:
+        merged = {**spec.defaults, **row, **overrides}
+        row_id = merged.get(spec.key) or str(uuid.uuid4())
+        merged[spec.key] = row_id
+        ids.append(str(row_id))
+
+        record = []
+        for column, is_json in zip(spec.columns, json_flags):
+            value = merged.get(column)
+            if value is None or isinstance(value, str):
+                pass
+            elif is_json:
+                value = encode_json(value)
+            elif isinstance(value, datetime):
+                value = value.isoformat()
+            record.append(value)
+        values.append(tuple(record))
+    return ids, values
+
+def _last_per_key(spec: BulkTableSpec, values: List[tuple]) -> List[tuple]:
+    """Keep one row per key (the last one), since a merge cannot touch a row twice."""
+    key_index = spec.columns.index(spec.key)
+    unique = {row[key_index]: row for row in values}
+    return values if len(unique) == len(values) else list(unique.values())
+
+def _chunks(values: Sequence[tuple], chunk_size: int) -> Iterator[Sequence[tuple]]:
+    for start in range(0, len(values), chunk_size):
+        yield values[start:start + chunk_size]
+
+def _csv_field(value: Any) -> str:
+    if value is None:
+        return '\\N'
+    # Quoted fields never match the NULL marker, so empty strings stay empty strings
+    return '"' + str(value).replace('"', '""') + '"'
+
+class CSVRowStream:
+    """File-like object that renders rows as CSV lazily for COPY FROM STDIN."""
+
+    def __init__(self, rows: Iterable[tuple]):
+        self._rows = iter(rows)
+        self._buffer = ''
+
+    def read(self, size: int = -1) -> str:
+        while size < 0 or len(self._buffer) < size:
+            lines = [
+                ','.join(_csv_field(value) for value in row) + '\n'
+                for row in itertools.islice(self._rows, 1000)
+            ]
+            if not lines:
+                break
+            self._buffer += ''.join(lines)
+
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+def _conflict_clause(spec: BulkTableSpec, excluded: str) -> str:
+    if not spec.update_columns:
+        return "DO NOTHING"
+    assignments = ', '.join(f"{column} = {excluded}.{column}" for column in spec.update_columns)
+    owner = spec.guarded_owner
+    guard = f" WHERE {spec.table}.{owner} = {excluded}.{owner}" if owner else ""
+    return f"DO UPDATE SET {assignments}{guard}"
+
+def load_postgresql(connection, spec: BulkTableSpec, rows: Iterable[Dict[str, Any]],
+                    overrides: Optional[Dict[str, Any]] = None,
+                    chunk_size: int = DEFAULT_CHUNK_SIZE) -> BulkLoadResult:
+    """COPY rows into a staging table and merge them chunk by chunk, in one transaction.
+
+    ``connection`` is a psycopg2 DBAPI connection.
+    """
+    start_time = time.perf_counter()
+    ids, values = prepare_rows(spec, rows, overrides)
+    values = _last_per_key(spec, values)
+    key_index = spec.columns.index(spec.key)
+    staging = f"{spec.table}_staging"
+    columns = ', '.join(spec.columns)
+    conflict = _conflict_clause(spec, 'EXCLUDED')
+
+    chunks = 0
+    inserted_ids, conflicts = [], []
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute(
+                f"CREATE TEMP TABLE {staging} (LIKE {spec.table} INCLUDING DEFAULTS) ON COMMIT DROP"
+            )
+            for chunk in _chunks(values, chunk_size):
+                if chunks:
+                    cursor.execute(f"TRUNCATE {staging}")
+                cursor.copy_expert(
+                    f"COPY {staging} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+                    CSVRowStream(chunk)
+                )
+                # xmax is 0 only for freshly inserted row versions; rows skipped by the owner guard are not returned
+                cursor.execute(
+                    f"INSERT INTO {spec.table} ({columns}) SELECT {columns} FROM {staging} "
+                    f"ON CONFLICT ({spec.key}) {conflict} RETURNING {spec.key}, (xmax = 0)"
+                )
+                written = {str(row_id): inserted for row_id, inserted in cursor.fetchall()}
+                chunks += 1
+                for row in chunk:
+                    row_id = str(row[key_index])
+                    if row_id not in written:
+                        conflicts.append(row_id)
+                    elif written[row_id]:
+                        inserted_ids.append(row_id)
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            logger.error("Bulk COPY load failed and was rolled back", table=spec.table,
+                         merged_chunks=chunks, rows=len(values))
+            raise
+
+    if conflicts:
+        logger.warning("Bulk load skipped rows owned by another project", table=spec.table,
+                       conflicts=len(conflicts))
+    return BulkLoadResult(ids=ids, rows=len(values), chunks=chunks,
+                          seconds=time.perf_counter() - start_time,
+                          inserted_ids=inserted_ids, conflicts=conflicts)
+
+def _sqlite_existing_owners(connection, spec: BulkTableSpec, keys: List[Any]) -> Dict[str, Any]:
+    """Owner of every key that already exists (the key itself when there is no owner column)."""
+    owner = spec.guarded_owner or spec.key
+    existing = {}
+    for start in range(0, len(keys), 500):  # Stay below SQLite's bound parameter limit
+        batch = keys[start:start + 500]
+        placeholders = ', '.join('?' for _ in batch)
+        existing.update(
+            (str(row_id), row_owner) for row_id, row_owner in connection.execute(
+                f"SELECT {spec.key}, {owner} FROM {spec.table} WHERE {spec.key} IN ({placeholders})", batch
+            )
+        )
+    return existing
+
+def load_sqlite(connection, spec: BulkTableSpec, rows: Iterable[Dict[str, Any]],
+                overrides: Optional[Dict[str, Any]] = None) -> BulkLoadResult:
+    """Upsert rows with executemany in a single transaction.
+
+    ``connection`` is a sqlite3 connection.
+    """
+    start_time = time.perf_counter()
+    ids, values = prepare_rows(spec, rows, overrides)
+    values = _last_per_key(spec, values)
+    key_index = spec.columns.index(spec.key)
+    owner_index = spec.columns.index(spec.guarded_owner) if spec.guarded_owner else key_index
+    columns = ', '.join(spec.columns)
+    placeholders = ', '.join('?' for _ in spec.columns)
+    conflict = _conflict_clause(spec, 'excluded')
+
+    previous_pragmas = {name: connection.execute(f"PRAGMA {name}").fetchone()[0]
+                        for name in SQLITE_BULK_PRAGMAS}
+    for name, value in SQLITE_BULK_PRAGMAS.items():
+        connection.execute(f"PRAGMA {name}={value}")
+
+    try:
+        # Take the write lock first so the existing-row check and the merge see the same rows
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            existing = _sqlite_existing_owners(connection, spec, [row[key_index] for row in values])
+            connection.executemany(
+                f"INSERT INTO {spec.table} ({columns}) VALUES ({placeholders}) "
+                f"ON CONFLICT ({spec.key}) {conflict}",
+                values
+            )
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+    finally:
+        for name, value in previous_pragmas.items():
+            connection.execute(f"PRAGMA {name}={value}")
+
+    inserted_ids, conflicts = [], []
+    for row in values:
+        row_id = str(row[key_index])
+        if row_id not in existing:
+            inserted_ids.append(row_id)
+        elif existing[row_id] != row[owner_index]:
+            conflicts.append(row_id)
+    if conflicts:
+        logger.warning("Bulk load skipped rows owned by another project", table=spec.table,
+                       conflicts=len(conflicts))
+    return BulkLoadResult(ids=ids, rows=len(values), chunks=1,
+                          seconds=time.perf_counter() - start_time,
+                          inserted_ids=inserted_ids, conflicts=conflicts)
+
+def bulk_load(engine, spec: BulkTableSpec, rows: Iterable[Dict[str, Any]],
+              overrides: Optional[Dict[str, Any]] = None,
+              chunk_size: int = DEFAULT_CHUNK_SIZE) -> BulkLoadResult:
+    """Bulk load through a SQLAlchemy engine using the fastest path for its dialect."""
+    raw_connection = engine.raw_connection()
+    try:
+        driver_connection = raw_connection.driver_connection
+        if engine.dialect.name == 'postgresql':
+            return load_postgresql(driver_connection, spec, rows, overrides, chunk_size)
+        if engine.dialect.name == 'sqlite':
+            return load_sqlite(driver_connection, spec, rows, overrides)
+        raise ValueError(f"Bulk loading is not supported for {engine.dialect.name}")
+    finally:
+        raw_connection.close()
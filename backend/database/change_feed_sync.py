@@ -0,0 +1,337 @@
+"""
+Change Feed Sync for SizeWise Suite Offline Clients
+
+Replays an offline client's ``change_log`` (database/schema.sql) onto the
+server database in ordered batches:
+
+1. Pending rows are read in id order above the client's high-water mark,
+   the last change id the server applied for that client.
+2. Changes to the same entity within a batch are coalesced into one
+   (an INSERT followed by UPDATEs becomes one INSERT, an INSERT followed
+   by a DELETE disappears, and so on). A change is only folded back into
+   the entity's earlier position when that cannot break a foreign key:
+   an UPDATE that references an entity inserted in between, or an
+   INSERT/DELETE with other changes in between, starts a new entry.
+3. The coalesced changes and the new high-water mark are written in a
+   single server transaction, so a batch is applied fully or not at all.
+4. The batch is acknowledged locally with one
+   ``UPDATE change_log ... WHERE id IN (...)``.
+
+If the acknowledgement is lost after the server commit, the next sync sees
+the rows below the high-water mark and acknowledges them without applying
+them twice.
+"""
+
+import json
+import sqlite3
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import structlog
+from sqlalchemy import JSON, MetaData, delete, text, update
+from sqlalchemy.engine import Engine
+
+logger = structlog.get_logger()
+
+# change_log.entity_type -> server table
+ENTITY_TABLES = {
+    'user': 'users',
+    'organization': 'organizations',
+    'project': 'projects',
+    'segment': 'project_segments',
+    'feature_flag': 'feature_flags'
+}
+
+SYNC_CLIENTS_DDL = """
+    CREATE TABLE IF NOT EXISTS sync_clients (
+        client_id TEXT PRIMARY KEY,
+        high_water_mark BIGINT NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP
+    )
+"""
+
+@dataclass
+class ChangeRecord:
+    """One row of a client's change_log."""
+    id: int
+    user_id: str
+    entity_type: str
+    entity_id: str
+    operation: str
+    changes: Dict[str, Any]
+    size_bytes: int = 0
+
+@dataclass
+class CoalescedChange:
+    """Net effect of a batch's changes to one entity; ``operation`` is None when they cancel out."""
+    entity_type: str
+    entity_id: str
+    operation: Optional[str]
+    changes: Dict[str, Any]
+    change_ids: List[int] = field(default_factory=list)
+
+@dataclass
+class SyncResult:
+    """Outcome of one sync run."""
+    client_id: str
+    batches: int = 0
+    changes_read: int = 0
+    changes_applied: int = 0
+    high_water_mark: int = 0
+    data_size_bytes: int = 0
+    duration_ms: float = 0.0
+    success: bool = True
+    error_message: Optional[str] = None
+
+def _merge(first: Tuple[Optional[str], Dict[str, Any]],
+           second: Tuple[str, Dict[str, Any]]) -> Tuple[Optional[str], Dict[str, Any]]:
+    """Net operation of applying ``second`` after ``first`` to the same entity."""
+    operation, changes = first
+    next_operation, next_changes = second
+
+    if next_operation == 'INSERT':
+        # A (re)insert replaces whatever came before
+        return 'INSERT', dict(next_changes)
+    if next_operation == 'DELETE':
+        # Created and deleted within the batch: the server never needs to see it
+        return (None, {}) if operation == 'INSERT' else ('DELETE', {})
+    # UPDATE
+    if operation in ('INSERT', 'UPDATE'):
+        return operation, {**changes, **next_changes}
+    return operation, changes  # Updates after a delete have nothing to update
+
+def _can_fold(record: ChangeRecord, last_position: int, position: int,
+              inserted_at: Dict[str, int]) -> bool:
+    """Whether ``record`` may be applied at its entity's earlier position ``last_position``."""
+    if last_position == position - 1:
+        return True  # Nothing happened in between
+    if record.operation != 'UPDATE':
+        # Moving an insert or delete earlier could overtake a change that depends on it
+        return False
+    # An update must not overtake the insert of an entity it now references
+    return not any(isinstance(value, str) and inserted_at.get(value, -1) > last_position
+                   for value in record.changes.values())
+
+def coalesce_changes(records: Iterable[ChangeRecord]) -> List[CoalescedChange]:
+    """Fold each entity's changes into its earliest position that keeps references valid."""
+    coalesced: List[CoalescedChange] = []
+    open_changes: Dict[Tuple[str, str], Tuple[CoalescedChange, int]] = {}
+    inserted_at: Dict[str, int] = {}
+    for position, record in enumerate(records):
+        key = (record.entity_type, record.entity_id)
+        current, last_position = open_changes.get(key, (None, -1))
+        if current is None or not _can_fold(record, last_position, position, inserted_at):
+            current = CoalescedChange(record.entity_type, record.entity_id, record.operation,
+                                      dict(record.changes), [record.id])
+            coalesced.append(current)
+        else:
+            current.operation, current.changes = _merge((current.operation, current.changes),
+                                                        (record.operation, record.changes))
+            current.change_ids.append(record.id)
+        open_changes[key] = (current, position)
+        if record.operation == 'INSERT':
+            inserted_at[record.entity_id] = position
+    return coalesced
+
+class ChangeLogReader:
+    """Reads and acknowledges pending rows in a client's local change_log."""
+
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+
+    def read_batch(self, after_id: int, limit: int) -> List[ChangeRecord]:
+        """Pending changes above ``after_id`` in id order (a rowid range scan)."""
+        rows = self.connection.execute(
+            "SELECT id, user_id, entity_type, entity_id, operation, changes FROM change_log "
+            "WHERE id > ? AND sync_status = 'pending' ORDER BY id LIMIT ?",
+            (after_id, limit)
+        ).fetchall()
+        return [
+            ChangeRecord(row[0], row[1], row[2], row[3], row[4],
+                         json.loads(row[5]) if row[5] else {}, len(row[5] or ''))
+            for row in rows
+        ]
+
+    def acknowledge(self, change_ids: List[int]):
+        """Mark a batch synced with a single UPDATE."""
+        if not change_ids:
+            return
+        placeholders = ", ".join("?" * len(change_ids))
+        self.connection.execute(
+            f"UPDATE change_log SET sync_status = 'synced', synced_at = CURRENT_TIMESTAMP, "
+            f"sync_error = NULL WHERE id IN ({placeholders})",
+            change_ids
+        )
+        self.connection.commit()
+
+    def acknowledge_through(self, high_water_mark: int) -> int:
+        """Acknowledge changes the server already applied but the client never marked."""
+        cursor = self.connection.execute(
+            "UPDATE change_log SET sync_status = 'synced', synced_at = CURRENT_TIMESTAMP "
+            "WHERE id <= ? AND sync_status = 'pending'",
+            (high_water_mark,)
+        )
+        self.connection.commit()
+        return cursor.rowcount
+
+    def mark_failed(self, change_ids: List[int], error: str):
+        """Record a failed attempt; the rows stay pending and are retried next sync."""
+        if not change_ids:
+            return
+        placeholders = ", ".join("?" * len(change_ids))
+        self.connection.execute(
+            f"UPDATE change_log SET sync_attempts = sync_attempts + 1, sync_error = ? "
+            f"WHERE id IN ({placeholders})",
+            [error[:500], *change_ids]
+        )
+        self.connection.commit()
+
+class ChangeApplier:
+    """Applies coalesced batches to the server database, one transaction per batch."""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.metadata = MetaData()
+        with self.engine.begin() as connection:
+            connection.execute(text(SYNC_CLIENTS_DDL))
+        self.metadata.reflect(bind=self.engine, only=lambda name, _: name in ENTITY_TABLES.values())
+
+    def get_high_water_mark(self, client_id: str) -> int:
+        with self.engine.connect() as connection:
+            value = connection.execute(
+                text("SELECT high_water_mark FROM sync_clients WHERE client_id = :client_id"),
+                {"client_id": client_id}
+            ).scalar()
+        return value or 0
+
+    def _insert(self, table):
+        if self.engine.dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        return insert(table)
+
+    def _values(self, table, changes: Dict[str, Any]) -> Dict[str, Any]:
+        """Keep known columns; serialize nested values for non-JSON columns."""
+        values = {}
+        for name, value in changes.items():
+            column = table.columns.get(name)
+            if column is None or name == 'id':
+                continue
+            if isinstance(value, (dict, list)) and not isinstance(column.type, JSON):
+                value = json.dumps(value)
+            values[name] = value
+        return values
+
+    def _apply_change(self, connection, change: CoalescedChange) -> bool:
+        table = self.metadata.tables.get(ENTITY_TABLES.get(change.entity_type, ''))
+        if table is None:
+            raise ValueError(f"Unknown entity type: {change.entity_type}")
+
+        values = self._values(table, change.changes)
+        if change.operation == 'DELETE':
+            connection.execute(delete(table).where(table.c.id == change.entity_id))
+        elif change.operation == 'INSERT':
+            statement = self._insert(table).values(id=change.entity_id, **values)
+            connection.execute(statement.on_conflict_do_update(index_elements=['id'], set_=values)
+                               if values else statement.on_conflict_do_nothing(index_elements=['id']))
+        elif change.operation == 'UPDATE' and values:
+            connection.execute(update(table).where(table.c.id == change.entity_id).values(**values))
+        else:
+            return False
+        return True
+
+    def _locked_high_water_mark(self, connection, client_id: str) -> Optional[int]:
+        lock = " FOR UPDATE" if self.engine.dialect.name == 'postgresql' else ""
+        return connection.execute(
+            text(f"SELECT high_water_mark FROM sync_clients WHERE client_id = :client_id{lock}"),
+            {"client_id": client_id}
+        ).scalar()
+
+    def apply_batch(self, client_id: str, changes: List[CoalescedChange], high_water_mark: int) -> int:
+        """Apply a batch and advance the client's high-water mark atomically."""
+        applied = 0
+        with self.engine.begin() as connection:
+            current = self._locked_high_water_mark(connection, client_id)
+            if current is not None and current >= high_water_mark:
+                return 0  # Already applied; the client's acknowledgement was lost
+
+            for change in changes:
+                if change.operation is not None and self._apply_change(connection, change):
+                    applied += 1
+
+            params = {"client_id": client_id, "mark": high_water_mark}
+            if current is None:
+                connection.execute(text(
+                    "INSERT INTO sync_clients (client_id, high_water_mark, updated_at) "
+                    "VALUES (:client_id, :mark, CURRENT_TIMESTAMP)"
+                ), params)
+            else:
+                connection.execute(text(
+                    "UPDATE sync_clients SET high_water_mark = :mark, updated_at = CURRENT_TIMESTAMP "
+                    "WHERE client_id = :client_id"
+                ), params)
+        return applied
+
+class ChangeFeedSync:
+    """Drives batched sync of one client's change_log to the server."""
+
+    def __init__(self, reader: ChangeLogReader, applier: ChangeApplier, client_id: str,
+                 batch_size: int = 500, metrics_collector=None):
+        self.reader = reader
+        self.applier = applier
+        self.client_id = client_id
+        self.batch_size = batch_size
+        self.metrics_collector = metrics_collector
+
+    def sync(self, max_batches: Optional[int] = None) -> SyncResult:
+        """Sync pending changes until none are left (or ``max_batches`` is reached)."""
+        start_time = time.perf_counter()
+        result = SyncResult(client_id=self.client_id)
+        sync_id = f"{self.client_id}:{uuid.uuid4()}"
+        if self.metrics_collector is not None:
+            self.metrics_collector.start_sync_tracking(sync_id, 'upload')
+
+        high_water_mark = self.applier.get_high_water_mark(self.client_id)
+        self.reader.acknowledge_through(high_water_mark)
+        batch: List[ChangeRecord] = []
+
+        try:
+            while max_batches is None or result.batches < max_batches:
+                batch = []  # A failed read must not mark the previous, acknowledged batch
+                batch = self.reader.read_batch(high_water_mark, self.batch_size)
+                if not batch:
+                    break
+
+                change_ids = [record.id for record in batch]
+                result.changes_applied += self.applier.apply_batch(
+                    self.client_id, coalesce_changes(batch), change_ids[-1]
+                )
+                self.reader.acknowledge(change_ids)
+
+                high_water_mark = change_ids[-1]
+                result.batches += 1
+                result.changes_read += len(batch)
+                result.data_size_bytes += sum(record.size_bytes for record in batch)
+
+        except Exception as e:
+            result.success = False
+            result.error_message = str(e)
+            self.reader.mark_failed([record.id for record in batch], str(e))
+            logger.error("Change feed sync failed", client_id=self.client_id,
+                        high_water_mark=high_water_mark, error=str(e))
+
+        result.high_water_mark = high_water_mark
+        result.duration_ms = (time.perf_counter() - start_time) * 1000
+        if self.metrics_collector is not None:
+            self.metrics_collector.complete_sync_tracking(
+                sync_id, result.changes_read, result.data_size_bytes, result.success,
+                error_message=result.error_message
+            )
+
+        logger.info("Change feed sync finished", client_id=self.client_id, batches=result.batches,
+                   changes_read=result.changes_read, changes_applied=result.changes_applied,
+                   duration_ms=round(result.duration_ms, 1))
+        return result
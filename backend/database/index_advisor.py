@@ -0,0 +1,890 @@
+#!/usr/bin/env python3
+"""
+Index Advisor for SizeWise Suite
+
+Proposes indexes from the queries the application actually runs:
+
+1. Captured statements are normalized (literals and bind parameters become
+   ``?``, IN lists collapse) and fingerprinted, and calls and latency are
+   aggregated per fingerprint. MongoDB commands are reduced to the same
+   shape: collection, equality fields, range fields and sort keys.
+2. Each fingerprint's predicates and sort keys are parsed into a query
+   shape, and a candidate index is built per shape in equality, sort,
+   range order. Candidates already served by an existing index are dropped,
+   and a candidate that is a prefix of another on the same table is merged
+   into it.
+3. Candidates are ranked by the total time of the queries they serve
+   (calls x mean latency) and validated: on SQLite by planning the queries
+   on a scratch copy of the database with and without the index, on
+   PostgreSQL with hypothetical indexes (hypopg), and on MongoDB by
+   explaining the query shapes against a scratch collection seeded with a
+   sample of the real one, so nothing is built on the live database.
+4. Validated candidates are written as migrations in ``migrations/``: a
+   ``.sql`` file for the relational schema and a Python module in the style
+   of ``001_mongodb_performance_indexes.py`` for MongoDB.
+
+Flat statements are supported; subqueries, OR-ed predicates and predicates
+on expressions are skipped rather than guessed at.
+"""
+
+import argparse
+import functools
+import hashlib
+import json
+import re
+import sqlite3
+import tempfile
+import threading
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import structlog
+from pymongo import monitoring
+from sqlalchemy import create_engine, inspect, text
+
+from .performance_analyzer import parse_query_plan
+
+logger = structlog.get_logger()
+
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+
+# Statements an index can help; inserts only ever pay for indexes
+INDEXABLE_STATEMENTS = ("select", "update", "delete")
+
+_COMMENT = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_PARAM = re.compile(r"%\(\w+\)s|%s|(?<![:\w]):(?!:)\w+|\$\d+")
+_NUMBER = re.compile(r"(?<![\w.])\d+(?:\.\d+)?(?:e[+-]?\d+)?\b", re.I)
+_IN_LIST = re.compile(r"\bin\s*\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_VALUES_ROWS = re.compile(r"(\(\s*\?(?:\s*,\s*\?)*\s*\))(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))+")
+_WHITESPACE = re.compile(r"\s+")
+
+_TABLE_REFERENCE = re.compile(
+    r"\b(?:from|join|update)\s+\"?(\w+)\"?(?:\s+(?:as\s+)?"
+    r"(?!(?:where|join|on|inner|left|right|full|cross|natural|outer|group|order|limit|set|using)\b)(\w+))?"
+)
+_WHERE_CLAUSE = re.compile(r"\bwhere\b(.*?)(?=\bgroup\s+by\b|\border\s+by\b|\blimit\b|\bhaving\b|\breturning\b|$)")
+_ON_CLAUSE = re.compile(r"\bon\b(.*?)(?=\b(?:inner|left|right|full|cross)?\s*join\b|\bwhere\b|\bgroup\s+by\b|\border\s+by\b|\blimit\b|$)")
+_ORDER_CLAUSE = re.compile(r"\border\s+by\b(.*?)(?=\blimit\b|\boffset\b|$)")
+_COLUMN = r"(?:\"?(\w+)\"?\.)?\"?(\w+)\"?"
+_EQUALITY = re.compile(rf"^{_COLUMN}\s*(?:=|==|\bis\b)\s*(?:\?|null)$|^\?\s*=\s*{_COLUMN}$")
+_IN_TERM = re.compile(rf"^{_COLUMN}\s+in\s*\(\?\)$")
+_RANGE = re.compile(rf"^{_COLUMN}\s*(?:<|<=|>|>=)\s*\?$|^\?\s*(?:<|<=|>|>=)\s*{_COLUMN}$|^{_COLUMN}\s+between\s+\?\s+and\s+\?$")
+_JOIN_EQUALITY = re.compile(rf"^{_COLUMN}\s*=\s*{_COLUMN}$")
+_SORT_KEY = re.compile(rf"^{_COLUMN}(?:\s+(asc|desc))?(?:\s+nulls\s+(?:first|last))?$")
+
+# =============================================================================
+# Fingerprinting and workload aggregation
+# =============================================================================
+
+@functools.lru_cache(maxsize=4096)
+def normalize_statement(statement: str) -> str:
+    """Statement text with comments, literals, parameters and list lengths removed."""
+    normalized = _COMMENT.sub(" ", statement)
+    normalized = _STRING.sub("?", normalized)
+    normalized = _WHITESPACE.sub(" ", normalized).strip().lower()
+    normalized = _PARAM.sub("?", normalized)
+    normalized = _NUMBER.sub("?", normalized)
+    normalized = _IN_LIST.sub("in (?)", normalized)
+    normalized = _VALUES_ROWS.sub(r"\1", normalized)
+    return normalized.rstrip("; ")
+
+def fingerprint(normalized: str) -> str:
+    return hashlib.sha1(normalized.encode()).hexdigest()[:16]
+
+@dataclass
+class QueryShape:
+    """Columns a query filters and sorts on, for one table or collection."""
+    table: str
+    equality: List[str] = field(default_factory=list)
+    ranges: List[str] = field(default_factory=list)
+    order_by: List[Tuple[str, bool]] = field(default_factory=list)  # (column, descending)
+
+    def add(self, kind: str, column: str):
+        columns = self.equality if kind == 'eq' else self.ranges
+        if column not in columns:
+            columns.append(column)
+
+@dataclass
+class QueryStats:
+    """Calls and latency for one query fingerprint."""
+    fingerprint: str
+    statement: str
+    source: str = 'sql'  # 'sql' or 'mongodb'
+    calls: int = 0
+    total_time: float = 0.0
+    max_time: float = 0.0
+    shape: Optional[QueryShape] = None  # MongoDB shapes are known when captured
+
+    @property
+    def mean_time(self) -> float:
+        return self.total_time / self.calls if self.calls else 0.0
+
+class QueryWorkload:
+    """
+    Bounded, thread-safe aggregate of captured queries by fingerprint.
+
+    When full, a new fingerprint replaces the one with the least total time.
+    """
+
+    def __init__(self, max_fingerprints: int = 2000):
+        self.max_fingerprints = max_fingerprints
+        self.queries: Dict[str, QueryStats] = {}
+        self._lock = threading.Lock()
+
+    def _record(self, key: str, statement: str, seconds: float, source: str,
+                shape: Optional[QueryShape] = None):
+        with self._lock:
+            stats = self.queries.get(key)
+            if stats is None:
+                if len(self.queries) >= self.max_fingerprints:
+                    coldest = min(self.queries.values(), key=lambda s: s.total_time)
+                    if coldest.total_time > seconds:
+                        return
+                    del self.queries[coldest.fingerprint]
+                stats = self.queries[key] = QueryStats(key, statement, source, shape=shape)
+            stats.calls += 1
+            stats.total_time += seconds
+            stats.max_time = max(stats.max_time, seconds)
+
+    def record_sql(self, statement: str, seconds: float):
+        normalized = normalize_statement(statement)
+        if normalized.startswith(INDEXABLE_STATEMENTS):
+            self._record(fingerprint(normalized), normalized, seconds, 'sql')
+
+    def record_mongodb(self, shape: QueryShape, operation: str, seconds: float):
+        statement = mongodb_statement(shape, operation)
+        self._record(fingerprint(statement), statement, seconds, 'mongodb', shape)
+
+    def top(self, limit: Optional[int] = None, source: Optional[str] = None) -> List[QueryStats]:
+        """Fingerprints by total time (calls x mean latency), most expensive first."""
+        with self._lock:
+            queries = [q for q in self.queries.values() if source is None or q.source == source]
+        queries.sort(key=lambda q: q.total_time, reverse=True)
+        return queries[:limit] if limit else queries
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"queries": [asdict(q) for q in self.top()]}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'QueryWorkload':
+        workload = cls()
+        for query in data.get("queries", []):
+            shape = query.pop("shape", None)
+            if shape:
+                shape["order_by"] = [tuple(key) for key in shape.get("order_by", [])]
+                query["shape"] = QueryShape(**shape)
+            stats = QueryStats(**query)
+            workload.queries[stats.fingerprint] = stats
+        return workload
+
+    def save(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> 'QueryWorkload':
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+# =============================================================================
+# SQL shape parsing
+# =============================================================================
+
+def _split_top_level(clause: str, separator: str) -> List[str]:
+    """Split on a keyword or comma outside parentheses."""
+    parts, depth, start = [], 0, 0
+    pattern = re.compile(rf"\(|\)|\b{separator}\b" if separator.isalpha() else rf"\(|\)|{separator}")
+    for match in pattern.finditer(clause):
+        token = match.group()
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth -= 1
+        elif depth == 0:
+            parts.append(clause[start:match.start()])
+            start = match.end()
+    parts.append(clause[start:])
+    return [part.strip() for part in parts if part.strip()]
+
+def _predicate_terms(clause: str) -> List[str]:
+    terms = _split_top_level(clause, "and")
+    # Re-join "x between ? and ?" split at its AND
+    merged: List[str] = []
+    for term in terms:
+        if merged and merged[-1].endswith("between ?"):
+            merged[-1] = f"{merged[-1]} and {term}"
+        else:
+            merged.append(term)
+    return merged
+
+def _strip_parentheses(term: str) -> str:
+    while term.startswith("(") and term.endswith(")") and "(" not in term[1:-1]:
+        term = term[1:-1].strip()
+    return term
+
+def parse_query_shapes(normalized: str,
+                       columns_by_table: Optional[Dict[str, Set[str]]] = None) -> List[QueryShape]:
+    """
+    Equality, range and sort columns per table of a normalized statement.
+
+    ``columns_by_table`` resolves unqualified columns in joins; without it
+    they are only attributed when the statement reads one table.
+    """
+    if not normalized.startswith(INDEXABLE_STATEMENTS) or normalized.count("select") > 1:
+        return []
+
+    aliases: Dict[str, str] = {}
+    for table, alias in _TABLE_REFERENCE.findall(normalized):
+        aliases[table] = table
+        if alias:
+            aliases[alias] = table
+    tables = list(dict.fromkeys(aliases.values()))
+    if not tables:
+        return []
+    shapes = {table: QueryShape(table) for table in tables}
+
+    def resolve(qualifier: str, column: str) -> Optional[str]:
+        if qualifier:
+            return aliases.get(qualifier)
+        if len(tables) == 1:
+            return tables[0]
+        owners = [t for t in tables if column in (columns_by_table or {}).get(t, ())]
+        return owners[0] if len(owners) == 1 else None
+
+    join_keys: Dict[str, List[str]] = {table: [] for table in tables}
+
+    def attribute(kind: str, groups: Tuple[str, ...]):
+        # Patterns with alternatives leave the unused pair empty
+        for qualifier, column in zip(groups[::2], groups[1::2]):
+            if column:
+                table = resolve(qualifier, column)
+                if table and kind == 'join':
+                    if column not in join_keys[table]:
+                        join_keys[table].append(column)
+                elif table:
+                    shapes[table].add(kind, column)
+                return
+
+    clauses = _ON_CLAUSE.findall(normalized)
+    where = _WHERE_CLAUSE.search(normalized)
+    if where and not _split_top_level(where.group(1), "or")[1:]:
+        clauses.append(where.group(1))
+
+    for clause in clauses:
+        for term in _predicate_terms(clause):
+            term = _strip_parentheses(term)
+            if " or " in term:
+                continue
+            match = _EQUALITY.match(term) or _IN_TERM.match(term)
+            if match:
+                attribute('eq', match.groups())
+                continue
+            match = _RANGE.match(term)
+            if match:
+                attribute('range', match.groups())
+                continue
+            match = _JOIN_EQUALITY.match(term)
+            if match:
+                attribute('join', match.groups()[:2])
+                attribute('join', match.groups()[2:])
+
+    order = _ORDER_CLAUSE.search(normalized)
+    if order:
+        sort_keys: List[Tuple[str, str, bool]] = []
+        for key in _split_top_level(order.group(1), ","):
+            match = _SORT_KEY.match(key)
+            table = match and resolve(match.group(1), match.group(2))
+            if not table:
+                sort_keys = []
+                break  # An expression or unknown column: no index can supply the order
+            sort_keys.append((table, match.group(2), match.group(3) == "desc"))
+        if sort_keys and len({table for table, _, _ in sort_keys}) == 1:
+            shapes[sort_keys[0][0]].order_by = [(column, desc) for _, column, desc in sort_keys]
+
+    result = [shape for shape in shapes.values() if shape.equality or shape.ranges or shape.order_by]
+    # Whichever side is probed in the join is looked up by its key plus its own filters
+    for table, columns in join_keys.items():
+        for column in columns:
+            equality = [column] + [c for c in shapes[table].equality if c != column]
+            result.append(QueryShape(table, equality=equality))
+    return result
+
+# =============================================================================
+# MongoDB capture
+# =============================================================================
+
+_RANGE_OPERATORS = {"$gt", "$gte", "$lt", "$lte"}
+_EQUALITY_OPERATORS = {"$eq", "$in"}
+
+def _filter_shape(shape: QueryShape, query: Dict[str, Any]):
+    for key, value in query.items():
+        if key == "$and" and isinstance(value, list):
+            for clause in value:
+                if isinstance(clause, dict):
+                    _filter_shape(shape, clause)
+        elif key.startswith("$"):
+            continue  # $or, $expr, $text: not served by one compound index
+        elif not isinstance(value, dict) or not any(op.startswith("$") for op in value):
+            shape.add('eq', key)
+        elif set(value) & _EQUALITY_OPERATORS and set(value) <= _EQUALITY_OPERATORS | _RANGE_OPERATORS:
+            shape.add('eq', key)
+        elif set(value) <= _RANGE_OPERATORS:
+            shape.add('range', key)
+
+def mongodb_query_shape(command_name: str, command: Dict[str, Any]) -> Optional[QueryShape]:
+    """Query shape of a find/aggregate/count/distinct/update/delete/findAndModify command."""
+    query, sort = None, None
+    if command_name == "find":
+        query, sort = command.get("filter", {}), command.get("sort")
+    elif command_name in ("count", "distinct"):
+        query = command.get("query", {})
+    elif command_name == "findAndModify":
+        query, sort = command.get("query", {}), command.get("sort")
+    elif command_name in ("update", "delete"):
+        statements = command.get("updates" if command_name == "update" else "deletes") or [{}]
+        query = statements[0].get("q", {})
+    elif command_name == "aggregate":
+        pipeline = command.get("pipeline") or [{}]
+        query = pipeline[0].get("$match")
+        if query is None:
+            return None
+        if len(pipeline) > 1 and "$sort" in pipeline[1]:
+            sort = pipeline[1]["$sort"]
+    else:
+        return None
+
+    collection = command.get(command_name)
+    if not isinstance(collection, str):
+        return None
+    shape = QueryShape(collection)
+    _filter_shape(shape, query or {})
+    if isinstance(sort, dict):
+        shape.order_by = [(key, direction == -1) for key, direction in sort.items()
+                          if direction in (1, -1)]
+    return shape if shape.equality or shape.ranges or shape.order_by else None
+
+def mongodb_statement(shape: QueryShape, operation: str) -> str:
+    """Canonical text of a MongoDB query shape; field order in the filter does not matter."""
+    query = {**{key: "?" for key in sorted(shape.equality)},
+             **{key: {"$range": "?"} for key in sorted(shape.ranges)}}
+    statement = f"{shape.table}.{operation}({json.dumps(query)})"
+    if shape.order_by:
+        statement += f".sort({json.dumps({key: -1 if desc else 1 for key, desc in shape.order_by})})"
+    return statement
+
+class MongoQueryCapture(monitoring.CommandListener):
+    """PyMongo command listener feeding query shapes and durations into a workload."""
+
+    def __init__(self, workload: QueryWorkload, max_pending: int = 10000):
+        self.workload = workload
+        self.max_pending = max_pending
+        self._pending: Dict[Tuple[Any, int], Tuple[QueryShape, str]] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        shape = mongodb_query_shape(event.command_name, event.command)
+        if shape is None:
+            return
+        with self._lock:
+            if len(self._pending) < self.max_pending:
+                self._pending[(event.connection_id, event.request_id)] = (shape, event.command_name)
+
+    def succeeded(self, event):
+        with self._lock:
+            pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending is not None:
+            shape, operation = pending
+            self.workload.record_mongodb(shape, operation, event.duration_micros / 1e6)
+
+    def failed(self, event):
+        with self._lock:
+            self._pending.pop((event.connection_id, event.request_id), None)
+
+# =============================================================================
+# Candidates
+# =============================================================================
+
+@dataclass
+class IndexCandidate:
+    """A proposed index and the captured queries it serves."""
+    table: str
+    columns: List[Tuple[str, bool]]  # (column, descending)
+    equality_count: int = 0
+    queries: List[QueryStats] = field(default_factory=list)
+    validated: Optional[bool] = None  # None until validated
+    evidence: List[str] = field(default_factory=list)
+
+    @property
+    def column_names(self) -> List[str]:
+        return [column for column, _ in self.columns]
+
+    @property
+    def name(self) -> str:
+        return f"idx_{self.table}_{'_'.join(self.column_names)}"[:63]
+
+    def ddl(self, if_not_exists: bool = True) -> str:
+        columns = ", ".join(f"{column} DESC" if desc else column for column, desc in self.columns)
+        guard = "IF NOT EXISTS " if if_not_exists else ""
+        return f"CREATE INDEX {guard}{self.name} ON {self.table}({columns})"
+
+    @property
+    def statements(self) -> List[str]:
+        return [stats.statement for stats in self.queries]
+
+    @property
+    def calls(self) -> int:
+        return sum(stats.calls for stats in self.queries)
+
+    @property
+    def total_time(self) -> float:
+        return sum(stats.total_time for stats in self.queries)
+
+    def serve(self, queries: Iterable[QueryStats]):
+        for stats in queries:
+            if all(stats.fingerprint != served.fingerprint for served in self.queries):
+                self.queries.append(stats)
+
+def candidate_for_shape(shape: QueryShape, max_columns: int = 4) -> Optional[IndexCandidate]:
+    """Equality columns, then sort keys, then the first range column."""
+    columns = [(column, False) for column in shape.equality]
+    for column, desc in shape.order_by:
+        if column not in shape.equality:
+            columns.append((column, desc))
+    for column in shape.ranges:
+        if column not in shape.equality:
+            if not any(column == c for c, _ in columns):
+                columns.append((column, False))
+            break  # Columns after a range cannot narrow the scan
+    if not columns:
+        return None
+    return IndexCandidate(shape.table, columns[:max_columns], equality_count=len(shape.equality))
+
+def is_covered(candidate: IndexCandidate, existing: List[str]) -> bool:
+    """Whether an existing index (column list) already serves the candidate."""
+    names = candidate.column_names
+    if len(existing) < len(names):
+        return False
+    leading = min(candidate.equality_count, len(names))
+    # Equality columns may appear in any order
+    return set(existing[:leading]) == set(names[:leading]) and existing[leading:len(names)] == names[leading:]
+
+def merge_candidates(candidates: Iterable[IndexCandidate]) -> List[IndexCandidate]:
+    """Fold identical candidates and candidates that prefix a longer one on the same table."""
+    by_key: Dict[Tuple[str, Tuple[Tuple[str, bool], ...]], IndexCandidate] = {}
+    for candidate in candidates:
+        key = (candidate.table, tuple(candidate.columns))
+        if key in by_key:
+            by_key[key].serve(candidate.queries)
+        else:
+            by_key[key] = candidate
+
+    remaining = sorted(by_key.values(), key=lambda c: len(c.columns), reverse=True)
+    result: List[IndexCandidate] = []
+    for candidate in remaining:
+        wider = next((c for c in result if c.table == candidate.table
+                      and is_covered(candidate, c.column_names)), None)
+        if wider is None:
+            result.append(candidate)
+        else:
+            wider.serve(candidate.queries)
+    return sorted(result, key=lambda c: c.total_time, reverse=True)
+
+def propose_indexes(queries: Iterable[QueryStats], existing: Dict[str, List[List[str]]],
+                    columns_by_table: Optional[Dict[str, Set[str]]] = None,
+                    min_calls: int = 1) -> List[IndexCandidate]:
+    """Candidates for captured queries, minus those existing indexes already serve, ranked by total time."""
+    candidates = []
+    for stats in queries:
+        if stats.calls < min_calls:
+            continue
+        shapes = [stats.shape] if stats.shape else parse_query_shapes(stats.statement, columns_by_table)
+        for shape in shapes:
+            if columns_by_table is not None and shape.table not in columns_by_table:
+                continue  # Not a table of this database (or a CTE)
+            candidate = candidate_for_shape(shape)
+            if candidate is None or any(is_covered(candidate, index) for index in existing.get(shape.table, [])):
+                continue
+            candidate.serve([stats])
+            candidates.append(candidate)
+    return merge_candidates(candidates)
+
+# =============================================================================
+# Validation
+# =============================================================================
+
+def _sqlite_plan(connection: sqlite3.Connection, statement: str) -> List[str]:
+    rows = connection.execute(f"EXPLAIN QUERY PLAN {statement}", [None] * statement.count("?")).fetchall()
+    return [row[3] for row in rows]
+
+def validate_sqlite(database_path: str, candidates: List[IndexCandidate]) -> List[IndexCandidate]:
+    """
+    Plan each candidate's queries on a scratch copy of the database with and
+    without the index; a candidate is validated when the planner uses it.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        scratch_path = str(Path(directory) / "scratch.db")
+        source = sqlite3.connect(database_path)
+        scratch = sqlite3.connect(scratch_path)
+        try:
+            source.backup(scratch)
+        finally:
+            source.close()
+
+        try:
+            for candidate in candidates:
+                try:
+                    before = [_sqlite_plan(scratch, s) for s in candidate.statements]
+                    scratch.execute(candidate.ddl())
+                    after = [_sqlite_plan(scratch, s) for s in candidate.statements]
+                    scratch.execute(f"DROP INDEX {candidate.name}")
+                except sqlite3.Error as e:
+                    candidate.validated = False
+                    candidate.evidence = [f"planning failed: {e}"]
+                    continue
+
+                candidate.evidence = []
+                for plan_before, plan_after in zip(before, after):
+                    if candidate.name in parse_query_plan(plan_after)[0]:
+                        candidate.evidence.append(f"{'; '.join(plan_before)} -> {'; '.join(plan_after)}")
+                candidate.validated = bool(candidate.evidence)
+        finally:
+            scratch.close()
+    return candidates
+
+GENERIC_PLAN_VERSION = 160000  # EXPLAIN (GENERIC_PLAN) arrived in PostgreSQL 16
+
+def _postgresql_cost(connection, statement: str, explain_generic: bool = True) -> float:
+    parameters = statement.count("?")
+    count = iter(range(1, parameters + 1))
+    numbered = re.sub(r"\?", lambda _: f"${next(count)}", statement)
+    if explain_generic:
+        plan = connection.exec_driver_sql(f"EXPLAIN (GENERIC_PLAN, FORMAT JSON) {numbered}").scalar()
+    else:
+        # Older servers: prepare the statement and explain its forced generic
+        # plan, so the placeholder arguments are never looked at
+        connection.exec_driver_sql("SET LOCAL plan_cache_mode = force_generic_plan")
+        connection.exec_driver_sql(f"PREPARE index_advisor_cost AS {numbered}")
+        arguments = f"({', '.join(['NULL'] * parameters)})" if parameters else ""
+        try:
+            with connection.begin_nested():
+                plan = connection.exec_driver_sql(
+                    f"EXPLAIN (FORMAT JSON) EXECUTE index_advisor_cost{arguments}"
+                ).scalar()
+        finally:
+            # Prepared statements outlive transactions; drop it even when planning failed
+            connection.exec_driver_sql("DEALLOCATE index_advisor_cost")
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return float(plan[0]["Plan"]["Total Cost"])
+
+def validate_postgresql(engine, candidates: List[IndexCandidate],
+                        min_improvement: float = 0.1) -> List[IndexCandidate]:
+    """
+    Cost each candidate's queries with and without a hypothetical index
+    (hypopg, generic plans); validated when a query gets ``min_improvement``
+    cheaper. Candidates stay unvalidated when hypopg is not installed.
+    """
+    with engine.connect() as connection:
+        if not connection.exec_driver_sql("SELECT 1 FROM pg_extension WHERE extname = 'hypopg'").scalar():
+            logger.warning("hypopg is not installed; index candidates left unvalidated")
+            return candidates
+        explain_generic = int(connection.exec_driver_sql("SHOW server_version_num").scalar()) >= GENERIC_PLAN_VERSION
+
+        for candidate in candidates:
+            try:
+                connection.exec_driver_sql("SELECT hypopg_reset()")
+                before = [_postgresql_cost(connection, s, explain_generic) for s in candidate.statements]
+                connection.execute(text("SELECT indexrelid FROM hypopg_create_index(:ddl)"),
+                                   {"ddl": candidate.ddl(if_not_exists=False)})
+                after = [_postgresql_cost(connection, s, explain_generic) for s in candidate.statements]
+            except Exception as e:
+                connection.rollback()
+                candidate.validated = False
+                candidate.evidence = [f"planning failed: {e}"]
+                continue
+
+            candidate.evidence = [
+                f"cost {cost_before:.1f} -> {cost_after:.1f}"
+                for cost_before, cost_after in zip(before, after)
+                if cost_after <= cost_before * (1 - min_improvement)
+            ]
+            candidate.validated = bool(candidate.evidence)
+
+        connection.exec_driver_sql("SELECT hypopg_reset()")
+        connection.rollback()
+    return candidates
+
+def _mongodb_plan(plan: Any) -> Tuple[List[str], List[str]]:
+    """Stages and index names anywhere in an explain() plan tree."""
+    stages: List[str] = []
+    indexes: List[str] = []
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            stages.append(plan['stage'])
+            if plan['stage'] == 'IXSCAN' and 'indexName' in plan:
+                indexes.append(plan['indexName'])
+        children = plan.values()
+    elif isinstance(plan, list):
+        children = plan
+    else:
+        return stages, indexes
+    for child in children:
+        child_stages, child_indexes = _mongodb_plan(child)
+        stages += child_stages
+        indexes += child_indexes
+    return stages, indexes
+
+def _mongodb_sample_query(shape: QueryShape, document: Dict[str, Any]) -> Dict[str, Any]:
+    """A concrete filter for ``shape`` using values from a sampled document."""
+    query = {column: document.get(column) for column in shape.equality}
+    for column in shape.ranges:
+        if column not in query:
+            query[column] = {'$gte': document.get(column)}
+    return query
+
+async def validate_mongodb(database, candidates: List[IndexCandidate],
+                           sample_size: int = 1000) -> List[IndexCandidate]:
+    """
+    Explain each candidate's query shapes on a scratch collection seeded with
+    ``$sample`` documents from the real one, with the index built there; a
+    candidate is validated when the winning plan scans it.
+    """
+    by_collection: Dict[str, List[IndexCandidate]] = {}
+    for candidate in candidates:
+        by_collection.setdefault(candidate.table, []).append(candidate)
+
+    for collection, collection_candidates in by_collection.items():
+        scratch = database[f"index_advisor_scratch_{collection}"]
+        try:
+            await scratch.drop()
+            sample = await database[collection].aggregate([{'$sample': {'size': sample_size}}]).to_list(length=None)
+            if sample:
+                await scratch.insert_many(sample)
+
+            for candidate in collection_candidates:
+                keys = [(column, -1 if desc else 1) for column, desc in candidate.columns]
+                candidate.evidence = []
+                try:
+                    await scratch.create_index(keys, name=candidate.name)
+                    for stats in candidate.queries:
+                        shape = stats.shape
+                        if shape is None:
+                            continue
+                        fields = shape.equality + shape.ranges + [column for column, _ in shape.order_by]
+                        document = await scratch.find_one({column: {'$exists': True} for column in fields})
+                        if document is None:
+                            continue
+                        cursor = scratch.find(_mongodb_sample_query(shape, document))
+                        if shape.order_by:
+                            cursor = cursor.sort([(column, -1 if desc else 1) for column, desc in shape.order_by])
+                        explain = await cursor.explain()
+                        stages, indexes = _mongodb_plan(explain.get('queryPlanner', {}).get('winningPlan', {}))
+                        if candidate.name in indexes:
+                            candidate.evidence.append(f"{stats.statement} -> {' <- '.join(stages)}")
+                    await scratch.drop_index(candidate.name)
+                except Exception as e:
+                    candidate.validated = False
+                    candidate.evidence = [f"planning failed: {e}"]
+                    continue
+                candidate.validated = bool(candidate.evidence)
+        finally:
+            await scratch.drop()
+    return candidates
+
+# =============================================================================
+# Migration output
+# =============================================================================
+
+def next_migration_number(migrations_dir: Path = MIGRATIONS_DIR) -> int:
+    numbers = [int(match.group(1)) for path in Path(migrations_dir).iterdir()
+               if (match := re.match(r"(\d+)_", path.name))]
+    return max(numbers, default=0) + 1
+
+def _describe(candidate: IndexCandidate) -> str:
+    return f"{candidate.calls} calls, {candidate.total_time * 1000:.1f}ms total"
+
+def render_sql_migration(candidates: List[IndexCandidate], generated_at: Optional[datetime] = None) -> str:
+    generated_at = generated_at or datetime.utcnow()
+    lines = [
+        "-- Advised Index Migration",
+        "-- SizeWise Suite - Database Indexing Improvements",
+        "-- ",
+        "-- Generated by the index advisor from captured queries, ranked by",
+        "-- calls x latency. Each index was validated against the query plans",
+        "-- noted below before being proposed.",
+        f"-- Generated: {generated_at.isoformat()}",
+        "",
+        "-- =============================================================================",
+        "-- Advised Indexes",
+        "-- =============================================================================",
+    ]
+    for candidate in candidates:
+        lines.append("")
+        lines.append(f"-- Serves {len(candidate.queries)} captured queries ({_describe(candidate)})")
+        for statement in candidate.statements[:3]:
+            lines.append(f"-- Optimizes queries like: {statement}")
+        for evidence in candidate.evidence[:1]:
+            lines.append(f"-- Plan: {evidence}")
+        lines.append(f"{candidate.ddl()};")
+    lines.append("")
+    return "\n".join(lines)
+
+def render_mongodb_migration(candidates: List[IndexCandidate], generated_at: Optional[datetime] = None) -> str:
+    generated_at = generated_at or datetime.utcnow()
+    collections: Dict[str, List[IndexCandidate]] = {}
+    for candidate in candidates:
+        collections.setdefault(candidate.table, []).append(candidate)
+
+    index_lines = []
+    for collection, collection_candidates in collections.items():
+        index_lines.append(f"    {collection!r}: [")
+        for candidate in collection_candidates:
+            keys = ", ".join(f"({column!r}, {'DESCENDING' if desc else 'ASCENDING'})"
+                             for column, desc in candidate.columns)
+            index_lines.append(f"        # {candidate.statements[0]}: {_describe(candidate)}")
+            index_lines.append(f"        IndexModel([{keys}], name={candidate.name!r}),")
+        index_lines.append("    ],")
+
+    return f'''#!/usr/bin/env python3
+"""
+Advised MongoDB Index Migration
+SizeWise Suite - Database Indexing Improvements
+
+Generated by the index advisor from captured query shapes, ranked by
+calls x latency.
+Generated: {generated_at.isoformat()}
+"""
+
+import asyncio
+import logging
+
+from pymongo import IndexModel, ASCENDING, DESCENDING
+
+from backend.config.mongodb_config import get_mongodb_database
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+INDEXES = {{
+{chr(10).join(index_lines)}
+}}
+
+async def main():
+    """Create the advised indexes."""
+    db = get_mongodb_database()
+    total_indexes = 0
+    for collection_name, indexes in INDEXES.items():
+        result = await db[collection_name].create_indexes(indexes)
+        total_indexes += len(result)
+        logger.info(f"Created {{len(result)}} indexes for collection '{{collection_name}}': {{result}}")
+
+    print("✅ Advised MongoDB index migration completed successfully!")
+    print(f"📊 Total indexes created: {{total_indexes}}")
+    return 0
+
+if __name__ == "__main__":
+    exit_code = asyncio.run(main())
+    exit(exit_code)
+'''
+
+def write_migration(candidates: List[IndexCandidate], source: str = 'sql',
+                    migrations_dir: Path = MIGRATIONS_DIR,
+                    include_unvalidated: bool = False) -> Optional[Path]:
+    """Write validated candidates as the next numbered migration; None if there is nothing to write."""
+    selected = [c for c in candidates if c.validated or (include_unvalidated and c.validated is None)]
+    if not selected:
+        return None
+
+    migrations_dir = Path(migrations_dir)
+    number = next_migration_number(migrations_dir)
+    if source == 'mongodb':
+        path = migrations_dir / f"{number:03d}_mongodb_advised_indexes.py"
+        path.write_text(render_mongodb_migration(selected))
+    else:
+        path = migrations_dir / f"{number:03d}_advised_indexes.sql"
+        path.write_text(render_sql_migration(selected))
+    logger.info("Index migration written", path=str(path), indexes=[c.name for c in selected])
+    return path
+
+# =============================================================================
+# Advisor
+# =============================================================================
+
+class IndexAdvisor:
+    """Turns a captured workload into validated index migrations."""
+
+    def __init__(self, workload: QueryWorkload, min_calls: int = 5, limit: int = 20):
+        self.workload = workload
+        self.min_calls = min_calls
+        self.limit = limit
+
+    def propose_sql(self, engine) -> List[IndexCandidate]:
+        """Candidates for the relational schema behind ``engine``."""
+        inspector = inspect(engine)
+        columns_by_table: Dict[str, Set[str]] = {}
+        existing: Dict[str, List[List[str]]] = {}
+        for table in inspector.get_table_names():
+            columns_by_table[table] = {column["name"] for column in inspector.get_columns(table)}
+            indexes = [index["column_names"] for index in inspector.get_indexes(table)]
+            indexes += [constraint["column_names"] for constraint in inspector.get_unique_constraints(table)]
+            primary_key = inspector.get_pk_constraint(table).get("constrained_columns")
+            if primary_key:
+                indexes.append(primary_key)
+            existing[table] = [[c for c in index if c] for index in indexes]
+
+        candidates = propose_indexes(self.workload.top(source='sql'), existing, columns_by_table, self.min_calls)
+        return candidates[:self.limit]
+
+    def validate_sql(self, engine, candidates: List[IndexCandidate]) -> List[IndexCandidate]:
+        if engine.dialect.name == 'sqlite':
+            return validate_sqlite(engine.url.database, candidates)
+        if engine.dialect.name == 'postgresql':
+            return validate_postgresql(engine, candidates)
+        return candidates
+
+    async def propose_mongodb(self, database) -> List[IndexCandidate]:
+        """Candidates for captured MongoDB shapes, unvalidated until ``validate_mongodb``."""
+        queries = self.workload.top(source='mongodb')
+        existing: Dict[str, List[List[str]]] = {}
+        for collection in {q.shape.table for q in queries if q.shape}:
+            information = await database[collection].index_information()
+            existing[collection] = [[key for key, _ in index["key"]] for index in information.values()]
+        candidates = propose_indexes(queries, existing, min_calls=self.min_calls)
+        return candidates[:self.limit]
+
+    async def validate_mongodb(self, database, candidates: List[IndexCandidate]) -> List[IndexCandidate]:
+        return await validate_mongodb(database, candidates)
+
+def main():
+    """Propose, validate and write index migrations from a saved workload."""
+    parser = argparse.ArgumentParser(description="Propose indexes from a captured query workload")
+    parser.add_argument("workload", help="Workload JSON saved by QueryWorkload.save")
+    parser.add_argument("--database-url", default="sqlite:///backend/database/sizewise.db")
+    parser.add_argument("--min-calls", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--write", action="store_true", help="Write validated candidates as a migration")
+    parser.add_argument("--migrations-dir", default=str(MIGRATIONS_DIR))
+    args = parser.parse_args()
+
+    advisor = IndexAdvisor(QueryWorkload.load(args.workload), min_calls=args.min_calls, limit=args.limit)
+    engine = create_engine(args.database_url)
+    try:
+        candidates = advisor.validate_sql(engine, advisor.propose_sql(engine))
+    finally:
+        engine.dispose()
+
+    for i, candidate in enumerate(candidates, 1):
+        status = {True: "validated", False: "rejected", None: "unvalidated"}[candidate.validated]
+        print(f"{i}. {candidate.ddl()}  [{status}; {_describe(candidate)}]")
+
+    if args.write:
+        path = write_migration(candidates, migrations_dir=Path(args.migrations_dir))
+        print(f"Migration written to {path}" if path else "No validated indexes to write")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
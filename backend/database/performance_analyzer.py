@@ -6,15 +6,26 @@ Task: Database Indexing Improvements
 
 This module analyzes database performance before and after index creation
 to validate the 60% sync improvement and <100ms query response time targets.
+
+The benchmark suite builds a synthetic database at a configurable scale from
+schema.sql and the migrations, captures each test query's plan, times warm
+and cold repetitions, and diffs plans and latencies against a stored
+baseline so a missing or unused index fails the benchmark.
 """
 
+import argparse
 import asyncio
+import json
+import math
+import random
+import re
 import sqlite3
+import tempfile
 import time
 import statistics
-from datetime import datetime
-from typing import Dict, List, Any, Tuple
-from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional, Set, Tuple
+from dataclasses import asdict, dataclass, field
 from pathlib import Path
 
 import logging
@@ -23,6 +34,201 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+SCHEMA_FILE = Path(__file__).parent / "schema.sql"
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+
+# IDs referenced by the HVAC test queries; the synthetic dataset makes them its busiest user and project
+TEST_USER_ID = "test-user-123"
+TEST_PROJECT_ID = "test-project-456"
+
+# Queries that cannot be served by a B-tree index (leading-wildcard LIKE)
+ALLOWED_FULL_SCANS = {"project_name_search"}
+
+_PLAN_INDEX = re.compile(r"USING (?:COVERING )?INDEX (\w+)")
+
+@dataclass
+class SyntheticDataConfig:
+    """Size of the generated benchmark dataset."""
+    users: int = 50
+    projects_per_user: int = 20
+    segments_per_project: int = 50
+    change_log_rows: int = 20000
+    feature_flags_per_user: int = 5
+    seed: int = 42
+
+    @classmethod
+    def scaled(cls, scale: float) -> 'SyntheticDataConfig':
+        """Default dataset multiplied by ``scale`` (users and change log grow, per-user shape stays)."""
+        return cls(users=max(2, int(cls.users * scale)),
+                   change_log_rows=max(10, int(cls.change_log_rows * scale)))
+
+@dataclass
+class QueryBenchmarkResult:
+    """Plan and latency percentiles for one benchmark query."""
+    query_name: str
+    plan: List[str]
+    indexes_used: List[str]
+    full_scans: List[str]
+    temp_sorts: int
+    rows_returned: int
+    cold_ms: Dict[str, float]
+    warm_ms: Dict[str, float]
+    error: Optional[str] = None
+
+@dataclass
+class BenchmarkFinding:
+    """A plan or latency difference found by the benchmark."""
+    query_name: str
+    kind: str  # 'error' | 'full_scan' | 'index_lost' | 'plan_changed' | 'latency' | 'missing_query' | 'dataset_changed'
+    detail: str
+    failing: bool = True
+
+@dataclass
+class BenchmarkReport:
+    """Benchmark run with findings against the baseline."""
+    timestamp: datetime
+    database_path: str
+    dataset: Dict[str, int]
+    results: List[QueryBenchmarkResult]
+    findings: List[BenchmarkFinding] = field(default_factory=list)
+
+    @property
+    def passed(self) -> bool:
+        return not any(finding.failing for finding in self.findings)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "timestamp": self.timestamp.isoformat(),
+            "database_path": self.database_path,
+            "dataset": self.dataset,
+            "results": [asdict(result) for result in self.results],
+            "findings": [asdict(finding) for finding in self.findings]
+        }
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """Nearest-rank p50/p95/p99 and max of latency samples in milliseconds."""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def rank(q: float) -> float:
+        return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+    return {"p50": round(rank(0.50), 4), "p95": round(rank(0.95), 4),
+            "p99": round(rank(0.99), 4), "max": round(ordered[-1], 4)}
+
+def parse_query_plan(plan: List[str]) -> Tuple[List[str], List[str], int]:
+    """Indexes used, tables scanned without an index, and temp B-tree sorts in a plan."""
+    indexes = []
+    full_scans = []
+    temp_sorts = 0
+    for line in plan:
+        detail = line.strip()
+        indexes.extend(_PLAN_INDEX.findall(detail))
+        if detail.startswith("SCAN ") and "USING" not in detail:
+            full_scans.append(detail[len("SCAN "):].split()[0])
+        if detail.startswith("USE TEMP B-TREE"):
+            temp_sorts += 1
+    return sorted(set(indexes)), full_scans, temp_sorts
+
+def _scanned_tables(plan: List[str]) -> Set[str]:
+    """Tables a plan reads end to end, with or without an index."""
+    return {line.strip()[len("SCAN "):].split()[0] for line in plan if line.strip().startswith("SCAN ")}
+
+def build_benchmark_database(database_path: str, config: Optional[SyntheticDataConfig] = None,
+                             apply_migrations: bool = True) -> Dict[str, int]:
+    """Create a fresh database from schema.sql (and migrations) filled with synthetic data."""
+    config = config or SyntheticDataConfig()
+    path = Path(database_path)
+    if path.exists():
+        path.unlink()
+
+    connection = sqlite3.connect(database_path)
+    try:
+        connection.executescript(SCHEMA_FILE.read_text(encoding="utf-8"))
+        if apply_migrations:
+            for migration in sorted(MIGRATIONS_DIR.glob("*.sql")):
+                connection.executescript(migration.read_text(encoding="utf-8"))
+
+        counts = generate_synthetic_dataset(connection, config)
+        connection.execute("ANALYZE")
+        connection.commit()
+        return counts
+    finally:
+        connection.close()
+
+def generate_synthetic_dataset(connection: sqlite3.Connection,
+                               config: SyntheticDataConfig) -> Dict[str, int]:
+    """Insert reproducible users, projects, segments, feature flags and change log rows."""
+    rng = random.Random(config.seed)
+    start = datetime(2024, 1, 1)
+
+    def timestamp() -> str:
+        return (start + timedelta(seconds=rng.randrange(365 * 86400))).strftime("%Y-%m-%d %H:%M:%S")
+
+    user_ids = [TEST_USER_ID] + [f"user-{i:06d}" for i in range(1, config.users)]
+    connection.executemany(
+        "INSERT INTO users (id, email, name, tier) VALUES (?, ?, ?, ?)",
+        [(user_id, f"{user_id}@example.com", user_id, rng.choice(["free", "pro", "enterprise"]))
+         for user_id in user_ids]
+    )
+
+    projects = []
+    for user_id in user_ids:
+        for i in range(config.projects_per_user):
+            project_id = TEST_PROJECT_ID if not projects else f"project-{len(projects):07d}"
+            projects.append((
+                project_id, user_id, f"{rng.choice(['HVAC', 'Office', 'Clinic', 'Plant'])} {i}",
+                rng.choice(["office", "hospital", "school", "retail"]),
+                rng.choices(["active", "archived", "deleted"], weights=[8, 2, 1])[0], timestamp()
+            ))
+    connection.executemany(
+        "INSERT INTO projects (id, user_id, name, building_type, status, last_modified) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        projects
+    )
+
+    segments = []
+    for project_id, user_id, *_ in projects:
+        for i in range(config.segments_per_project):
+            created_at = timestamp()
+            segments.append((
+                f"{project_id}-s{i}", project_id, user_id, f"Segment {i}",
+                rng.choice(["duct", "fitting", "equipment", "terminal"]),
+                json.dumps({"cfm": round(rng.uniform(100, 5000), 1)}) if rng.random() < 0.7 else None,
+                created_at, created_at
+            ))
+    connection.executemany(
+        "INSERT INTO project_segments (id, project_id, user_id, name, segment_type, calculation_data, "
+        "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        segments
+    )
+
+    connection.executemany(
+        "INSERT INTO feature_flags (id, user_id, feature_name, enabled, tier_required) VALUES (?, ?, ?, ?, ?)",
+        [(f"{user_id}-f{i}", user_id, f"feature_{i}", rng.random() < 0.5,
+          rng.choice(["free", "pro", "enterprise"]))
+         for user_id in user_ids for i in range(config.feature_flags_per_user)]
+    )
+
+    change_log = []
+    for _ in range(config.change_log_rows):
+        project_id, user_id, *_ = rng.choice(projects)
+        change_log.append((
+            user_id, "project", project_id, rng.choice(["INSERT", "UPDATE", "DELETE"]), "{}", timestamp(),
+            rng.choices(["pending", "synced", "failed"], weights=[1, 8, 1])[0]
+        ))
+    connection.executemany(
+        "INSERT INTO change_log (user_id, entity_type, entity_id, operation, changes, timestamp, sync_status) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        change_log
+    )
+    connection.commit()
+
+    return {"users": len(user_ids), "projects": len(projects), "segments": len(segments),
+            "feature_flags": len(user_ids) * config.feature_flags_per_user,
+            "change_log": len(change_log)}
+
 @dataclass
 class QueryPerformanceResult:
     """Performance result for a single query."""
@@ -231,6 +437,194 @@ class DatabasePerformanceAnalyzer:
             recommendations=recommendations
         )
     
+    def capture_query_plan(self, query_sql: str) -> List[str]:
+        """EXPLAIN QUERY PLAN as indented detail lines, one per plan node."""
+        rows = self.connection.execute(f"EXPLAIN QUERY PLAN {query_sql}").fetchall()
+        depth = {0: -1}
+        plan = []
+        for node_id, parent_id, _, detail in rows:
+            depth[node_id] = depth.get(parent_id, -1) + 1
+            plan.append("  " * depth[node_id] + detail)
+        return plan
+    
+    def _time_query(self, query_sql: str, repetitions: int, cold: bool) -> Tuple[List[float], int]:
+        """Latencies in ms; cold runs use a fresh connection so SQLite's page cache starts empty."""
+        samples = []
+        rows_returned = 0
+        connection = None if cold else sqlite3.connect(self.database_path)
+        try:
+            if connection is not None:
+                connection.execute(query_sql).fetchall()  # Prime the page cache
+            for _ in range(repetitions):
+                run_connection = sqlite3.connect(self.database_path) if cold else connection
+                try:
+                    start_time = time.perf_counter()
+                    rows_returned = len(run_connection.execute(query_sql).fetchall())
+                    samples.append((time.perf_counter() - start_time) * 1000)
+                finally:
+                    if cold:
+                        run_connection.close()
+        finally:
+            if connection is not None:
+                connection.close()
+        return samples, rows_returned
+    
+    def benchmark_query(self, query_name: str, query_sql: str,
+                        warm_repetitions: int = 20, cold_repetitions: int = 5) -> QueryBenchmarkResult:
+        """Capture a query's plan and its warm and cold latency percentiles."""
+        try:
+            plan = self.capture_query_plan(query_sql)
+            indexes, full_scans, temp_sorts = parse_query_plan(plan)
+            cold_samples, _ = self._time_query(query_sql, cold_repetitions, cold=True)
+            warm_samples, rows_returned = self._time_query(query_sql, warm_repetitions, cold=False)
+            return QueryBenchmarkResult(
+                query_name=query_name,
+                plan=plan,
+                indexes_used=indexes,
+                full_scans=full_scans,
+                temp_sorts=temp_sorts,
+                rows_returned=rows_returned,
+                cold_ms=percentiles(cold_samples),
+                warm_ms=percentiles(warm_samples)
+            )
+        except Exception as e:
+            logger.error(f"Error benchmarking query '{query_name}': {e}")
+            return QueryBenchmarkResult(query_name, [], [], [], 0, 0, {}, {}, error=str(e))
+    
+    def run_benchmark(self, baseline: Optional[Dict[str, Any]] = None, dataset: Optional[Dict[str, int]] = None,
+                      warm_repetitions: int = 20, cold_repetitions: int = 5,
+                      latency_tolerance: float = 0.5, latency_floor_ms: float = 1.0) -> BenchmarkReport:
+        """Benchmark every HVAC test query and diff the results against ``baseline``."""
+        logger.info("Starting database benchmark...")
+        results = [
+            self.benchmark_query(name, sql, warm_repetitions, cold_repetitions)
+            for name, sql in self.get_hvac_test_queries().items()
+        ]
+        report = BenchmarkReport(
+            timestamp=datetime.utcnow(),
+            database_path=self.database_path,
+            dataset=dataset or {},
+            results=results
+        )
+        report.findings = self.compare_to_baseline(results, baseline, latency_tolerance, latency_floor_ms,
+                                                   dataset=report.dataset)
+        return report
+    
+    def compare_to_baseline(self, results: List[QueryBenchmarkResult], baseline: Optional[Dict[str, Any]],
+                            latency_tolerance: float = 0.5,
+                            latency_floor_ms: float = 1.0,
+                            dataset: Optional[Dict[str, int]] = None) -> List[BenchmarkFinding]:
+        """Findings for errors, unindexed scans and plan or latency regressions.
+        
+        Latency only fails when warm p95 grows by more than ``latency_tolerance``
+        (as a fraction) *and* by more than ``latency_floor_ms``, so sub-millisecond
+        noise does not fail the run. A lost index only fails when the query now
+        scans or sorts where the baseline did not; the planner may legitimately
+        pick another index. Plans and latencies depend on the data size, so
+        they are not compared when ``dataset`` differs from the baseline's.
+        """
+        findings = []
+        baseline_results = {
+            result["query_name"]: result for result in (baseline or {}).get("results", [])
+        }
+        baseline_dataset = (baseline or {}).get("dataset")
+        if baseline_results and dataset and baseline_dataset and baseline_dataset != dataset:
+            findings.append(BenchmarkFinding(
+                "*", "dataset_changed",
+                f"Baseline dataset {baseline_dataset} differs from {dataset}; plans and latency not compared",
+                failing=False
+            ))
+            baseline_results = {}
+        
+        for result in results:
+            if result.error:
+                findings.append(BenchmarkFinding(result.query_name, "error", result.error))
+                continue
+            if result.full_scans and result.query_name not in ALLOWED_FULL_SCANS:
+                findings.append(BenchmarkFinding(
+                    result.query_name, "full_scan",
+                    f"Full table scan of {', '.join(result.full_scans)}"
+                ))
+            
+            previous = baseline_results.get(result.query_name)
+            if previous is None:
+                continue
+            
+            lost = sorted(set(previous["indexes_used"]) - set(result.indexes_used))
+            # Walking a whole index is as much a scan as walking the table
+            degraded = [f"scans {table}" for table in sorted(_scanned_tables(result.plan) -
+                                                              _scanned_tables(previous["plan"]))]
+            if result.temp_sorts > parse_query_plan(previous["plan"])[2]:
+                degraded.append("sorts in a temp B-tree")
+            if lost and degraded:
+                findings.append(BenchmarkFinding(
+                    result.query_name, "index_lost", f"No longer uses {', '.join(lost)}; now {', '.join(degraded)}"
+                ))
+            if previous["plan"] != result.plan:
+                findings.append(BenchmarkFinding(
+                    result.query_name, "plan_changed",
+                    " / ".join(previous["plan"]) + " -> " + " / ".join(result.plan),
+                    failing=False
+                ))
+            
+            before = previous.get("warm_ms", {}).get("p95")
+            after = result.warm_ms.get("p95")
+            if before is not None and after is not None and \
+                    after > before * (1 + latency_tolerance) and after - before > latency_floor_ms:
+                findings.append(BenchmarkFinding(
+                    result.query_name, "latency", f"Warm p95 {before:.3f}ms -> {after:.3f}ms"
+                ))
+        
+        current = {result.query_name for result in results}
+        for name in sorted(set(baseline_results) - current):
+            findings.append(BenchmarkFinding(name, "missing_query", "Query is in the baseline but was not run",
+                                             failing=False))
+        return findings
+    
+    @staticmethod
+    def save_baseline(report: BenchmarkReport, baseline_path: str):
+        """Store a benchmark run as the baseline for later comparisons."""
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump(report.to_dict(), f, indent=2)
+    
+    @staticmethod
+    def load_baseline(baseline_path: str) -> Optional[Dict[str, Any]]:
+        """Load a stored baseline, or None if there is none yet."""
+        path = Path(baseline_path)
+        if not path.exists():
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    
+    def print_benchmark_report(self, report: BenchmarkReport):
+        """Print a formatted benchmark report."""
+        print("\n" + "="*80)
+        print("DATABASE BENCHMARK REPORT")
+        print("="*80)
+        print(f"Timestamp: {report.timestamp}")
+        print(f"Dataset: {report.dataset}")
+        
+        print("\nQUERY RESULTS (ms):")
+        print("-" * 80)
+        print(f"{'query':<30} {'warm p50':>9} {'warm p95':>9} {'cold p50':>9} {'cold p95':>9}  indexes")
+        for result in report.results:
+            if result.error:
+                print(f"{result.query_name:<30} ERROR: {result.error}")
+                continue
+            print(f"{result.query_name:<30} {result.warm_ms['p50']:>9.3f} {result.warm_ms['p95']:>9.3f} "
+                  f"{result.cold_ms['p50']:>9.3f} {result.cold_ms['p95']:>9.3f}  "
+                  f"{', '.join(result.indexes_used) or '-'}")
+        
+        print("\nFINDINGS:")
+        print("-" * 80)
+        for finding in report.findings:
+            status = "❌" if finding.failing else "ℹ️"
+            print(f"{status} {finding.query_name} [{finding.kind}]: {finding.detail}")
+        if not report.findings:
+            print("No findings.")
+        
+        print("\n" + "="*80)
+    
     def _generate_recommendations(self, results: List[QueryPerformanceResult]) -> List[str]:
         """Generate performance recommendations based on analysis results."""
         recommendations = []
@@ -290,8 +684,56 @@ class DatabasePerformanceAnalyzer:
         
         print("\n" + "="*80)
 
+def run_benchmark_suite(args) -> int:
+    """Build a synthetic database, benchmark it and diff against the stored baseline."""
+    config = SyntheticDataConfig.scaled(args.scale)
+    config.seed = args.seed
+    
+    with tempfile.TemporaryDirectory() as directory:
+        database_path = str(Path(directory) / "benchmark.db")
+        dataset = build_benchmark_database(database_path, config, apply_migrations=not args.no_migrations)
+        
+        analyzer = DatabasePerformanceAnalyzer(database_path)
+        analyzer.connect()
+        try:
+            baseline = None if args.update_baseline else analyzer.load_baseline(args.baseline)
+            report = analyzer.run_benchmark(
+                baseline=baseline,
+                dataset=dataset,
+                warm_repetitions=args.repetitions,
+                cold_repetitions=args.cold_repetitions,
+                latency_tolerance=args.latency_tolerance
+            )
+        finally:
+            analyzer.disconnect()
+    
+    analyzer.print_benchmark_report(report)
+    if args.update_baseline or (baseline is None and report.passed):
+        analyzer.save_baseline(report, args.baseline)
+        print(f"Baseline written to {args.baseline}")
+    
+    return 0 if report.passed else 1
+
 def main():
     """Main function to run performance analysis."""
+    parser = argparse.ArgumentParser(description="Analyze or benchmark SizeWise database queries")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="Run the synthetic benchmark suite instead of analyzing sizewise.db")
+    parser.add_argument("--scale", type=float, default=1.0, help="Synthetic dataset scale")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repetitions", type=int, default=20, help="Warm repetitions per query")
+    parser.add_argument("--cold-repetitions", type=int, default=5, help="Cold repetitions per query")
+    parser.add_argument("--latency-tolerance", type=float, default=0.5,
+                        help="Allowed fractional growth of warm p95 over the baseline")
+    parser.add_argument("--baseline", default=str(Path(__file__).parent / "benchmark_baseline.json"))
+    parser.add_argument("--update-baseline", action="store_true", help="Replace the stored baseline")
+    parser.add_argument("--no-migrations", action="store_true",
+                        help="Benchmark schema.sql without the index migrations")
+    args = parser.parse_args()
+    
+    if args.benchmark:
+        return run_benchmark_suite(args)
+    
     analyzer = DatabasePerformanceAnalyzer()
     
     try:
@@ -14,6 +14,16 @@ from pydantic import BaseModel, ValidationError, Field
 import bleach
 from jsonschema import validate, ValidationError as JSONSchemaValidationError
 
+try:
+    from backend.monitoring.request_profiler import profile_phase
+except ImportError:
+    # Fallback when profiling is not available
+    from contextlib import contextmanager
+
+    @contextmanager
+    def profile_phase(name):
+        yield
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
@@ -325,7 +335,8 @@ def validate_input(schema_name: str = None, required: bool = True):
             if data:
                 # Validate and sanitize input
                 validator = InputValidator()
-                result = validator.validate_and_sanitize(data, schema_name)
+                with profile_phase('validation'):
+                    result = validator.validate_and_sanitize(data, schema_name)
                 
                 if not result['valid']:
                     return jsonify({
@@ -381,7 +392,8 @@ class InputValidationMiddleware:
                 schema_name = self.get_schema_for_endpoint(request.endpoint)
                 
                 # Validate and sanitize
-                result = self.validator.validate_and_sanitize(data, schema_name)
+                with profile_phase('validation'):
+                    result = self.validator.validate_and_sanitize(data, schema_name)
                 
                 if not result['valid']:
                     return jsonify({
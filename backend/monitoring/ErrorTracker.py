@@ -8,14 +8,20 @@ Comprehensive error tracking and alerting system that provides:
 - Automated alerting and notifications
 - Error trend analysis and reporting
 - Integration with monitoring and logging systems
+- Bounded storage with per-group reservoir sampling and rate-limited handler dispatch
 
 Designed for production environments with high-volume error handling.
 """
 
 import asyncio
+import os
+import random
+import re
+import time
 import traceback
 import hashlib
 import json
+from collections import OrderedDict, deque
 from typing import Dict, List, Optional, Any, Callable
 from datetime import datetime, timedelta
 from dataclasses import dataclass, field
@@ -24,6 +30,23 @@ import structlog
 
 logger = structlog.get_logger()
 
+# Message fragments that vary between occurrences of the same error
+_MESSAGE_NORMALIZERS = [
+    (re.compile(r'[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}'), '<uuid>'),
+    (re.compile(r'\b0x[0-9a-fA-F]+\b'), '<hex>'),
+    (re.compile(r'\b(?=[0-9a-fA-F]*\d)[0-9a-fA-F]{12,}\b'), '<id>'),
+    (re.compile(r'\d+(?:\.\d+)?'), '<num>'),
+]
+
+# Frames used for fingerprinting, counted from the innermost
+FINGERPRINT_FRAMES = 3
+
+def normalize_error_message(message: str) -> str:
+    """Replace IDs and numbers so repeated errors share one fingerprint."""
+    for pattern, placeholder in _MESSAGE_NORMALIZERS:
+        message = pattern.sub(placeholder, message)
+    return message
+
 # =============================================================================
 # Error Types and Configuration
 # =============================================================================
@@ -77,6 +100,18 @@ class ErrorEvent:
     context: Optional[ErrorContext] = None
     resolved: bool = False
     resolution_notes: Optional[str] = None
+    frames: Optional[traceback.StackSummary] = field(default=None, repr=False)
+    
+    def get_stack_trace(self) -> Optional[str]:
+        """Format the stack trace on first use; source lines load only then."""
+        if self.stack_trace is None and self.frames is not None:
+            self.stack_trace = (
+                "Traceback (most recent call last):\n"
+                + "".join(self.frames.format())
+                + f"{self.exception_type}: {self.message}\n"
+            )
+            self.frames = None
+        return self.stack_trace
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert error event to dictionary."""
@@ -88,7 +123,7 @@ class ErrorEvent:
             'severity': self.severity.value,
             'category': self.category.value,
             'timestamp': self.timestamp.isoformat(),
-            'stack_trace': self.stack_trace,
+            'stack_trace': self.get_stack_trace(),
             'context': self.context.__dict__ if self.context else None,
             'resolved': self.resolved,
             'resolution_notes': self.resolution_notes
@@ -105,12 +140,32 @@ class ErrorGroup:
     severity: ErrorSeverity = ErrorSeverity.LOW
     category: ErrorCategory = ErrorCategory.APPLICATION
     resolved: bool = False
+    max_events: int = 100
+    latest_event: Optional[ErrorEvent] = None
+    
+    def reserve_slot(self, rng: random.Random) -> Optional[int]:
+        """
+        Reservoir-sample the next occurrence.
+        
+        Returns the index the event should occupy in ``events``, or None if
+        it should only be counted. Every occurrence has an equal chance of
+        being kept no matter how many the group has seen.
+        """
+        if len(self.events) < self.max_events:
+            return len(self.events)
+        slot = rng.randrange(self.count + 1)
+        return slot if slot < self.max_events else None
     
-    def add_event(self, event: ErrorEvent):
-        """Add an error event to this group."""
-        self.events.append(event)
+    def add_event(self, event: ErrorEvent, slot: Optional[int] = None):
+        """Add an error event to this group, keeping it only if given a slot."""
+        if slot is not None:
+            if slot < len(self.events):
+                self.events[slot] = event
+            else:
+                self.events.append(event)
         self.count += 1
         self.last_seen = event.timestamp
+        self.latest_event = event
         
         # Update severity to highest seen
         severity_order = [ErrorSeverity.INFO, ErrorSeverity.LOW, ErrorSeverity.MEDIUM, 
@@ -132,16 +187,36 @@ class ErrorTracker:
     """
     
     def __init__(self):
-        self.error_groups: Dict[str, ErrorGroup] = {}
-        self.error_events: List[ErrorEvent] = []
-        self.error_handlers: Dict[ErrorCategory, List[Callable]] = {}
-        self.alert_thresholds: Dict[str, Dict[str, Any]] = {}
-        
         # Configuration
         self.max_events_per_group = 100
         self.max_total_events = 10000
+        self.max_groups = 1000
         self.cleanup_interval_hours = 24
         self.alert_cooldown_minutes = 15
+        self.dispatch_rate_per_second = 10.0
+        self.dispatch_burst = 20
+        self.alert_rate_per_second = 1.0
+        self.alert_burst = 10
+        self.max_pending_dispatches = 1000
+        self.dispatch_interval_seconds = 0.5
+        
+        # Groups ordered least to most recently seen for LRU eviction
+        self.error_groups: Dict[str, ErrorGroup] = OrderedDict()
+        self.error_events: deque = deque(maxlen=self.max_total_events)
+        self.error_handlers: Dict[ErrorCategory, List[Callable]] = {}
+        self.alert_thresholds: Dict[str, Dict[str, Any]] = {}
+        self._rng = random.Random()
+        
+        # Handler and new-group alert dispatch, drained by a background task
+        self._dispatch_queue: deque = deque(maxlen=self.max_pending_dispatches)
+        # Handlers and new-group alerts have separate budgets so a storm of
+        # handler work for one group cannot starve the first alert for another
+        self._dispatch_tokens = float(self.dispatch_burst)
+        self._dispatch_refilled_at = time.monotonic()
+        self._alert_tokens = float(self.alert_burst)
+        self._alert_refilled_at = self._dispatch_refilled_at
+        self.dispatch_stats = {'queued': 0, 'dispatched': 0, 'rate_limited': 0}
+        self.evicted_groups = 0
         
         # Alert tracking
         self.last_alerts: Dict[str, datetime] = {}
@@ -152,6 +227,7 @@ class ErrorTracker:
         # Background tasks
         self.cleanup_task: Optional[asyncio.Task] = None
         self.alert_task: Optional[asyncio.Task] = None
+        self.dispatch_task: Optional[asyncio.Task] = None
     
     def _initialize_alert_thresholds(self):
         """Initialize default alert thresholds."""
@@ -179,6 +255,7 @@ class ErrorTracker:
             # Start background tasks
             self.cleanup_task = asyncio.create_task(self._cleanup_old_errors())
             self.alert_task = asyncio.create_task(self._monitor_error_patterns())
+            self.dispatch_task = asyncio.create_task(self._dispatch_loop())
             
             logger.info("Error tracker initialized successfully")
             
@@ -213,34 +290,45 @@ class ErrorTracker:
             if category is None:
                 category = self._detect_category(exception)
             
-            # Create error event
+            # Decide up front whether this occurrence is sampled into its group,
+            # so unsampled occurrences never pay for stack extraction
+            group = self.error_groups.get(fingerprint)
+            slot = group.reserve_slot(self._rng) if group is not None else 0
+            
+            message = str(exception)
             error_event = ErrorEvent(
                 error_id=self._generate_error_id(),
                 fingerprint=fingerprint,
-                message=str(exception),
+                message=message,
                 exception_type=type(exception).__name__,
                 severity=severity,
                 category=category,
                 timestamp=datetime.utcnow(),
-                stack_trace=traceback.format_exc(),
-                context=context
+                context=context,
+                frames=self._extract_frames(exception) if slot is not None else None
             )
             
             # Add to error group
-            self._add_to_group(error_event)
+            is_new_group = self._add_to_group(error_event, slot)
             
             # Store individual event
             self.error_events.append(error_event)
             
-            # Trigger error handlers
-            asyncio.create_task(self._trigger_error_handlers(error_event))
-            
-            logger.error("Error captured",
-                        error_id=error_event.error_id,
-                        fingerprint=fingerprint,
-                        severity=severity.value,
-                        category=category.value,
-                        message=str(exception))
+            # Queue error handlers for the background dispatcher
+            if self.error_handlers.get(category):
+                self._enqueue_dispatch('handlers', error_event)
+            
+            if is_new_group:
+                logger.error("Error captured",
+                            error_id=error_event.error_id,
+                            fingerprint=fingerprint,
+                            severity=severity.value,
+                            category=category.value,
+                            message=message)
+            else:
+                logger.debug("Repeated error captured",
+                            fingerprint=fingerprint,
+                            count=self.error_groups[fingerprint].count)
             
             return error_event.error_id
             
@@ -248,26 +336,39 @@ class ErrorTracker:
             logger.error("Failed to capture error", error=str(e))
             return ""
     
+    def _frame_keys(self, exception: Exception) -> List[str]:
+        """Innermost frames of the exception as ``file:function``."""
+        frames = deque(maxlen=FINGERPRINT_FRAMES)
+        for frame, _ in traceback.walk_tb(exception.__traceback__):
+            code = frame.f_code
+            frames.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        return list(frames)
+    
+    def _extract_frames(self, exception: Exception) -> Optional[traceback.StackSummary]:
+        """Capture frames without reading source; formatting happens on demand."""
+        if exception.__traceback__ is None:
+            return None
+        return traceback.StackSummary.extract(
+            traceback.walk_tb(exception.__traceback__), lookup_lines=False
+        )
+    
     def _generate_fingerprint(self, exception: Exception) -> str:
         """Generate a fingerprint for error grouping."""
         try:
-            # Create fingerprint based on exception type and message
-            fingerprint_data = f"{type(exception).__name__}:{str(exception)}"
-            
-            # Include relevant stack trace information
-            tb = traceback.extract_tb(exception.__traceback__)
-            if tb:
-                # Use the last few frames for fingerprinting
-                relevant_frames = tb[-3:]  # Last 3 frames
-                for frame in relevant_frames:
-                    fingerprint_data += f":{frame.filename}:{frame.lineno}"
+            # Type, normalized message and innermost frames; line numbers are
+            # left out so unrelated edits to a file do not split the group
+            fingerprint_data = ":".join([
+                type(exception).__name__,
+                normalize_error_message(str(exception)),
+                *self._frame_keys(exception)
+            ])
             
             # Generate hash
             return hashlib.md5(fingerprint_data.encode()).hexdigest()
             
         except Exception as e:
             logger.warning("Failed to generate error fingerprint", error=str(e))
-            return hashlib.md5(str(exception).encode()).hexdigest()
+            return hashlib.md5(type(exception).__name__.encode()).hexdigest()
     
     def _detect_severity(self, exception: Exception) -> ErrorSeverity:
         """Auto-detect error severity based on exception type."""
@@ -348,36 +449,100 @@ class ErrorTracker:
         import uuid
         return str(uuid.uuid4())
     
-    def _add_to_group(self, error_event: ErrorEvent):
-        """Add error event to appropriate group."""
+    def _add_to_group(self, error_event: ErrorEvent, slot: Optional[int]) -> bool:
+        """Add error event to appropriate group; returns True for a new group."""
         try:
             fingerprint = error_event.fingerprint
+            group = self.error_groups.get(fingerprint)
             
-            if fingerprint in self.error_groups:
-                # Add to existing group
-                self.error_groups[fingerprint].add_event(error_event)
-                
-                # Limit events per group
-                group = self.error_groups[fingerprint]
-                if len(group.events) > self.max_events_per_group:
-                    group.events = group.events[-self.max_events_per_group:]
-            else:
-                # Create new group
-                self.error_groups[fingerprint] = ErrorGroup(
-                    fingerprint=fingerprint,
-                    first_seen=error_event.timestamp,
-                    last_seen=error_event.timestamp,
-                    count=1,
-                    events=[error_event],
-                    severity=error_event.severity,
-                    category=error_event.category
-                )
-                
-                # Trigger new error group alert
-                asyncio.create_task(self._alert_new_error_group(self.error_groups[fingerprint]))
+            if group is not None:
+                # Add to existing group and mark it most recently seen
+                group.add_event(error_event, slot)
+                self.error_groups.move_to_end(fingerprint)
+                return False
+            
+            # Evict the least recently seen groups to stay bounded
+            while len(self.error_groups) >= self.max_groups:
+                self.error_groups.popitem(last=False)
+                self.evicted_groups += 1
+            
+            group = ErrorGroup(
+                fingerprint=fingerprint,
+                first_seen=error_event.timestamp,
+                last_seen=error_event.timestamp,
+                count=1,
+                events=[error_event],
+                severity=error_event.severity,
+                category=error_event.category,
+                max_events=self.max_events_per_group,
+                latest_event=error_event
+            )
+            self.error_groups[fingerprint] = group
+            
+            # Queue new error group alert
+            self._enqueue_dispatch('new_group', group)
+            return True
             
         except Exception as e:
             logger.error("Failed to add error to group", error=str(e))
+            return False
+    
+    def _take_dispatch_token(self, kind: str) -> bool:
+        """Spend one token from the budget for ``kind``; False once it is exhausted."""
+        now = time.monotonic()
+        if kind == 'new_group':
+            self._alert_tokens = min(
+                float(self.alert_burst),
+                self._alert_tokens + (now - self._alert_refilled_at) * self.alert_rate_per_second
+            )
+            self._alert_refilled_at = now
+            if self._alert_tokens < 1:
+                return False
+            self._alert_tokens -= 1
+            return True
+        
+        self._dispatch_tokens = min(
+            float(self.dispatch_burst),
+            self._dispatch_tokens + (now - self._dispatch_refilled_at) * self.dispatch_rate_per_second
+        )
+        self._dispatch_refilled_at = now
+        if self._dispatch_tokens < 1:
+            return False
+        self._dispatch_tokens -= 1
+        return True
+    
+    def _enqueue_dispatch(self, kind: str, payload: Any):
+        """Queue work for the dispatcher, dropping it once its rate limit is hit."""
+        if not self._take_dispatch_token(kind):
+            self.dispatch_stats['rate_limited'] += 1
+            return
+        self._dispatch_queue.append((kind, payload))
+        self.dispatch_stats['queued'] += 1
+    
+    async def drain_dispatch_queue(self) -> int:
+        """Run queued error handlers and alerts; returns the number processed."""
+        processed = 0
+        while self._dispatch_queue:
+            kind, payload = self._dispatch_queue.popleft()
+            if kind == 'handlers':
+                await self._trigger_error_handlers(payload)
+            elif kind == 'new_group':
+                await self._alert_new_error_group(payload)
+            processed += 1
+        self.dispatch_stats['dispatched'] += processed
+        return processed
+    
+    async def _dispatch_loop(self):
+        """Drain the dispatch queue on a fixed interval."""
+        while True:
+            try:
+                await self.drain_dispatch_queue()
+                await asyncio.sleep(self.dispatch_interval_seconds)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Error dispatching error handlers", error=str(e))
+                await asyncio.sleep(self.dispatch_interval_seconds)
     
     async def _trigger_error_handlers(self, error_event: ErrorEvent):
         """Trigger registered error handlers for the error category."""
@@ -417,10 +582,10 @@ class ErrorTracker:
                 cutoff_time = datetime.utcnow() - timedelta(hours=self.cleanup_interval_hours)
                 
                 # Clean up old events
-                self.error_events = [
-                    event for event in self.error_events
-                    if event.timestamp > cutoff_time
-                ]
+                self.error_events = deque(
+                    (event for event in self.error_events if event.timestamp > cutoff_time),
+                    maxlen=self.max_total_events
+                )
                 
                 # Clean up old groups
                 groups_to_remove = []
@@ -428,20 +593,15 @@ class ErrorTracker:
                     if group.last_seen < cutoff_time:
                         groups_to_remove.append(fingerprint)
                     else:
-                        # Clean up old events within the group
+                        # Clean up old sampled events within the group
                         group.events = [
                             event for event in group.events
                             if event.timestamp > cutoff_time
                         ]
-                        group.count = len(group.events)
                 
                 for fingerprint in groups_to_remove:
                     del self.error_groups[fingerprint]
                 
-                # Limit total events
-                if len(self.error_events) > self.max_total_events:
-                    self.error_events = self.error_events[-self.max_total_events:]
-                
                 logger.debug("Error cleanup completed",
                            total_events=len(self.error_events),
                            total_groups=len(self.error_groups),
@@ -534,7 +694,7 @@ class ErrorTracker:
                     if self._should_send_alert(alert_key):
                         await self._send_alert(
                             f"New {severity} error group detected",
-                            f"Error: {error_group.events[0].message}",
+                            f"Error: {error_group.latest_event.message}",
                             severity
                         )
                         self.last_alerts[alert_key] = datetime.utcnow()
@@ -615,7 +775,10 @@ class ErrorTracker:
                     'total_error_groups': len(self.error_groups),
                     'total_events': len(self.error_events),
                     'recent_events_1h': len(recent_errors),
-                    'active_alerts': len(self.last_alerts)
+                    'active_alerts': len(self.last_alerts),
+                    'evicted_groups': self.evicted_groups,
+                    'pending_dispatches': len(self._dispatch_queue),
+                    'rate_limited_dispatches': self.dispatch_stats['rate_limited']
                 },
                 'recent_errors': {
                     'by_category': category_counts,
@@ -629,7 +792,7 @@ class ErrorTracker:
                         'category': group.category.value,
                         'first_seen': group.first_seen.isoformat(),
                         'last_seen': group.last_seen.isoformat(),
-                        'latest_message': group.events[-1].message if group.events else ""
+                        'latest_message': group.latest_event.message if group.latest_event else ""
                     }
                     for group in top_groups
                 ]
@@ -638,6 +801,33 @@ class ErrorTracker:
         except Exception as e:
             logger.error("Failed to get error summary", error=str(e))
             return {'error': str(e)}
+    
+    async def get_error_groups(self, limit: int = 50, samples: int = 5) -> Dict[str, Any]:
+        """Get the most frequent error groups with a few sampled events each."""
+        try:
+            groups = sorted(self.error_groups.values(), key=lambda g: g.count, reverse=True)[:limit]
+            return {
+                'timestamp': datetime.utcnow().isoformat(),
+                'total_error_groups': len(self.error_groups),
+                'groups': [
+                    {
+                        'fingerprint': group.fingerprint,
+                        'count': group.count,
+                        'severity': group.severity.value,
+                        'category': group.category.value,
+                        'first_seen': group.first_seen.isoformat(),
+                        'last_seen': group.last_seen.isoformat(),
+                        'resolved': group.resolved,
+                        'sampled_events': len(group.events),
+                        'samples': [event.to_dict() for event in group.events[:samples]]
+                    }
+                    for group in groups
+                ]
+            }
+            
+        except Exception as e:
+            logger.error("Failed to get error groups", error=str(e))
+            return {'error': str(e)}
 
 # Global error tracker instance
 error_tracker = None
@@ -17,7 +17,10 @@ Designed for production environments with proactive health monitoring.
 import asyncio
 import aiohttp
 import psutil
-from typing import Dict, List, Optional, Any, Callable, Tuple
+import random
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Any, Callable, Tuple
 from datetime import datetime, timedelta
 from dataclasses import dataclass, field
 from enum import Enum
@@ -76,6 +79,7 @@ class HealthCheck:
     thresholds: Optional[HealthThreshold] = None
     dependencies: List[str] = field(default_factory=list)
     metadata: Dict[str, Any] = field(default_factory=dict)
+    freshness_seconds: Optional[int] = None  # Defaults to twice the interval
 
 class HealthMonitor:
     """
@@ -83,7 +87,9 @@ class HealthMonitor:
     
     Features:
     - Multi-level health monitoring (system, application, microservices)
-    - Automated health checks with configurable intervals
+    - Central scheduler starting each due check as its own task, with jitter
+    - Cached health snapshot with per-check freshness for health probes
+    - Bounded per-check history and state-change logging
     - Health trend analysis and alerting
     - Dependency health mapping
     - Recovery recommendations
@@ -92,19 +98,33 @@ class HealthMonitor:
     
     def __init__(self):
         self.health_checks: Dict[str, HealthCheck] = {}
-        self.health_results: Dict[str, List[HealthCheckResult]] = {}
+        self.health_results: Dict[str, Deque[HealthCheckResult]] = {}
+        self.latest_results: Dict[str, HealthCheckResult] = {}
         self.health_handlers: Dict[HealthStatus, List[Callable]] = {}
         
         # Configuration
         self.max_results_per_check = 1000
         self.result_retention_hours = 168  # 7 days
         self.alert_cooldown_minutes = 15
+        self.max_concurrent_checks = 8
+        self.interval_jitter = 0.1  # +/- 10% of each check interval
+        self.max_scheduler_sleep_seconds = 5.0
+        self.snapshot_ttl_seconds = 5.0
         
         # Alert tracking
         self.last_alerts: Dict[str, datetime] = {}
         
-        # Health check tasks
-        self.check_tasks: Dict[str, asyncio.Task] = {}
+        # Scheduler state (monotonic due times)
+        self.next_run: Dict[str, float] = {}
+        self.scheduler_task: Optional[asyncio.Task] = None
+        self._scheduler_wakeup: Optional[asyncio.Event] = None
+        self._running_checks: Dict[str, asyncio.Task] = {}
+        self._check_slots: Optional[Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = None
+        
+        # Cached health snapshot for probes
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._snapshot_built_at = 0.0
+        self._snapshot_dirty = True
         
         # Initialize default health checks
         self._initialize_default_health_checks()
@@ -223,18 +243,15 @@ class HealthMonitor:
     async def initialize(self):
         """Initialize the health monitor."""
         try:
-            # Start health check tasks
-            for check_name, health_check in self.health_checks.items():
-                if health_check.enabled:
-                    self.check_tasks[check_name] = asyncio.create_task(
-                        self._run_health_check_loop(health_check)
-                    )
+            # Start the central check scheduler
+            self._scheduler_wakeup = asyncio.Event()
+            self.scheduler_task = asyncio.create_task(self._run_scheduler())
             
             # Start cleanup task
             self.cleanup_task = asyncio.create_task(self._cleanup_old_results())
             
             logger.info("Health monitor initialized successfully",
-                       active_checks=len(self.check_tasks))
+                       active_checks=sum(1 for c in self.health_checks.values() if c.enabled))
             
         except Exception as e:
             logger.error("Failed to initialize health monitor", error=str(e))
@@ -244,7 +261,16 @@ class HealthMonitor:
         """Register a new health check."""
         try:
             self.health_checks[health_check.name] = health_check
-            self.health_results[health_check.name] = []
+            self.health_results[health_check.name] = deque(maxlen=self.max_results_per_check)
+            self.latest_results.pop(health_check.name, None)
+            
+            # Spread first runs so checks with equal intervals do not align
+            self.next_run[health_check.name] = time.monotonic() + random.uniform(
+                0, health_check.interval_seconds * self.interval_jitter
+            )
+            self._snapshot_dirty = True
+            if self._scheduler_wakeup:
+                self._scheduler_wakeup.set()
             
             logger.info("Health check registered",
                        check_name=health_check.name,
@@ -269,83 +295,202 @@ class HealthMonitor:
         except Exception as e:
             logger.error("Failed to register health handler", error=str(e))
     
-    async def _run_health_check_loop(self, health_check: HealthCheck):
-        """Run a health check in a loop."""
+    async def _run_scheduler(self):
+        """Start each due health check as its own task without waiting for it."""
         while True:
             try:
-                await asyncio.sleep(health_check.interval_seconds)
-                
-                # Check dependencies first
-                if not await self._check_dependencies(health_check):
-                    continue
+                self.start_due_checks()
                 
-                # Run the health check
-                start_time = datetime.utcnow()
+                # Sleep until the next check is due or a check is registered
+                now = time.monotonic()
+                due_times = [
+                    self.next_run[name] for name, check in self.health_checks.items()
+                    if check.enabled and name in self.next_run
+                ]
+                sleep_for = min(due_times) - now if due_times else self.max_scheduler_sleep_seconds
+                sleep_for = max(0.0, min(sleep_for, self.max_scheduler_sleep_seconds))
                 
+                self._scheduler_wakeup.clear()
                 try:
-                    # Run with timeout
-                    result = await asyncio.wait_for(
-                        health_check.check_function(),
-                        timeout=health_check.timeout_seconds
-                    )
-                    
-                    duration = (datetime.utcnow() - start_time).total_seconds() * 1000
-                    
-                    # Evaluate thresholds if configured
-                    if health_check.thresholds and result.value is not None:
-                        result.status = self._evaluate_threshold(
-                            result.value, health_check.thresholds
-                        )
-                    
-                    result.duration_ms = duration
-                    result.timestamp = datetime.utcnow()
-                    
+                    await asyncio.wait_for(self._scheduler_wakeup.wait(), timeout=sleep_for)
                 except asyncio.TimeoutError:
-                    result = HealthCheckResult(
-                        check_name=health_check.name,
-                        status=HealthStatus.CRITICAL,
-                        message=f"Health check timed out after {health_check.timeout_seconds}s"
-                    )
-                
-                # Store result
-                self._store_health_result(health_check.name, result)
-                
-                # Trigger handlers
-                await self._trigger_health_handlers(result)
-                
-                # Log result
-                logger.info("Health check completed",
-                           check_name=health_check.name,
-                           status=result.status.value,
-                           value=result.value,
-                           duration_ms=result.duration_ms)
+                    pass
                 
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                logger.error("Error in health check loop",
-                           check_name=health_check.name, error=str(e))
+                logger.error("Error in health check scheduler", error=str(e))
+                await asyncio.sleep(self.max_scheduler_sleep_seconds)
+    
+    def start_due_checks(self, now: Optional[float] = None) -> List[asyncio.Task]:
+        """
+        Start one task per enabled check that is due and not still running.
+        
+        Each check runs under its own timeout, so a slow check delays only the
+        checks that depend on it; dependents wait for their dependencies' tasks.
+        """
+        now = time.monotonic() if now is None else now
+        pending = {
+            name for name, check in self.health_checks.items()
+            if check.enabled and self.next_run.get(name, 0.0) <= now and name not in self._running_checks
+        }
+        for name in pending:
+            self.next_run[name] = now + self._jittered_interval(self.health_checks[name])
+        
+        tasks = []
+        while pending:
+            wave = [
+                name for name in pending
+                if not any(dep in pending for dep in self.health_checks[name].dependencies)
+            ]
+            if not wave:
+                # Dependency cycle: start the rest without waiting on each other
+                wave = list(pending)
+            pending.difference_update(wave)
+            # Dependents only wait on tasks from earlier waves or earlier ticks
+            tasks.extend(self._start_check(self.health_checks[name]) for name in wave)
+        return tasks
+    
+    def _start_check(self, health_check: HealthCheck) -> asyncio.Task:
+        dependencies = [self._running_checks[dep] for dep in health_check.dependencies
+                        if dep in self._running_checks]
+        task = asyncio.ensure_future(self._run_scheduled_check(health_check, dependencies))
+        self._running_checks[health_check.name] = task
+        
+        def forget(done: asyncio.Task):
+            if self._running_checks.get(health_check.name) is done:
+                del self._running_checks[health_check.name]
+        
+        task.add_done_callback(forget)
+        return task
+    
+    async def _run_scheduled_check(self, health_check: HealthCheck,
+                                   dependencies: List[asyncio.Task]) -> Optional[HealthCheckResult]:
+        if dependencies:
+            await asyncio.wait(dependencies)
+        if not await self._check_dependencies(health_check):
+            return None
+        async with self._check_semaphore():
+            return await self._execute_health_check(health_check)
+    
+    def _check_semaphore(self) -> asyncio.Semaphore:
+        """Semaphore bounding concurrent scheduled checks on the running loop."""
+        loop = asyncio.get_running_loop()
+        if self._check_slots is None or self._check_slots[0] is not loop:
+            self._check_slots = (loop, asyncio.Semaphore(self.max_concurrent_checks))
+        return self._check_slots[1]
+    
+    async def run_due_checks(self, now: Optional[float] = None) -> List[HealthCheckResult]:
+        """Start every due check and wait for them; the scheduler itself never waits."""
+        tasks = self.start_due_checks(now)
+        if not tasks:
+            return []
+        results = await asyncio.gather(*tasks)
+        return [r for r in results if r is not None]
+    
+    async def run_checks(self, check_names) -> List[HealthCheckResult]:
+        """Run the named checks in parallel waves ordered by dependencies."""
+        pending = set(check_names)
+        semaphore = asyncio.Semaphore(self.max_concurrent_checks)
+        results: List[HealthCheckResult] = []
+        
+        async def run_limited(health_check: HealthCheck):
+            async with semaphore:
+                return await self._execute_health_check(health_check)
+        
+        while pending:
+            wave = [
+                name for name in pending
+                if not any(dep in pending for dep in self.health_checks[name].dependencies)
+            ]
+            if not wave:
+                # Dependency cycle: run the rest together
+                wave = list(pending)
+            pending.difference_update(wave)
+            
+            runnable = [
+                self.health_checks[name] for name in wave
+                if await self._check_dependencies(self.health_checks[name])
+            ]
+            wave_results = await asyncio.gather(*(run_limited(c) for c in runnable))
+            results.extend(r for r in wave_results if r is not None)
+        
+        return results
+    
+    def _jittered_interval(self, health_check: HealthCheck) -> float:
+        """Check interval with random jitter to avoid synchronized bursts."""
+        jitter = health_check.interval_seconds * self.interval_jitter
+        return max(1.0, health_check.interval_seconds + random.uniform(-jitter, jitter))
+    
+    async def _execute_health_check(self, health_check: HealthCheck) -> Optional[HealthCheckResult]:
+        """Run a single health check, store its result and trigger handlers."""
+        try:
+            start_time = time.perf_counter()
+            
+            try:
+                # Run with timeout
+                result = await asyncio.wait_for(
+                    health_check.check_function(),
+                    timeout=health_check.timeout_seconds
+                )
                 
-                # Create error result
-                error_result = HealthCheckResult(
+                # Evaluate thresholds if configured
+                if health_check.thresholds and result.value is not None:
+                    result.status = self._evaluate_threshold(
+                        result.value, health_check.thresholds
+                    )
+                
+            except asyncio.TimeoutError:
+                result = HealthCheckResult(
                     check_name=health_check.name,
                     status=HealthStatus.CRITICAL,
-                    message=f"Health check failed: {str(e)}"
+                    message=f"Health check timed out after {health_check.timeout_seconds}s"
                 )
-                self._store_health_result(health_check.name, error_result)
+            
+            result.duration_ms = (time.perf_counter() - start_time) * 1000
+            result.timestamp = datetime.utcnow()
+            
+        except Exception as e:
+            logger.error("Error running health check",
+                       check_name=health_check.name, error=str(e))
+            
+            # Create error result
+            result = HealthCheckResult(
+                check_name=health_check.name,
+                status=HealthStatus.CRITICAL,
+                message=f"Health check failed: {str(e)}"
+            )
+        
+        previous = self.latest_results.get(health_check.name)
+        
+        # Store result
+        self._store_health_result(health_check.name, result)
+        
+        # Log state changes only
+        if previous is None or previous.status != result.status:
+            logger.info("Health check status changed",
+                       check_name=health_check.name,
+                       previous_status=previous.status.value if previous else None,
+                       status=result.status.value,
+                       value=result.value,
+                       duration_ms=result.duration_ms)
+        
+        # Trigger handlers
+        await self._trigger_health_handlers(result)
+        
+        return result
     
     async def _check_dependencies(self, health_check: HealthCheck) -> bool:
         """Check if health check dependencies are healthy."""
         try:
             for dependency_name in health_check.dependencies:
-                if dependency_name in self.health_results:
-                    results = self.health_results[dependency_name]
-                    if results:
-                        latest_result = results[-1]
-                        if latest_result.status in [HealthStatus.CRITICAL, HealthStatus.UNKNOWN]:
-                            logger.debug("Skipping health check due to unhealthy dependency",
-                                       check_name=health_check.name,
-                                       dependency=dependency_name,
-                                       dependency_status=latest_result.status.value)
-                            return False
+                latest_result = self.latest_results.get(dependency_name)
+                if latest_result and latest_result.status in [HealthStatus.CRITICAL, HealthStatus.UNKNOWN]:
+                    logger.debug("Skipping health check due to unhealthy dependency",
+                               check_name=health_check.name,
+                               dependency=dependency_name,
+                               dependency_status=latest_result.status.value)
+                    return False
             return True
             
         except Exception as e:
@@ -389,13 +534,12 @@ class HealthMonitor:
         """Store health check result."""
         try:
             if check_name not in self.health_results:
-                self.health_results[check_name] = []
+                self.health_results[check_name] = deque(maxlen=self.max_results_per_check)
             
+            # Ring buffer drops the oldest result once full
             self.health_results[check_name].append(result)
-            
-            # Limit results per check
-            if len(self.health_results[check_name]) > self.max_results_per_check:
-                self.health_results[check_name] = self.health_results[check_name][-self.max_results_per_check:]
+            self.latest_results[check_name] = result
+            self._snapshot_dirty = True
                 
         except Exception as e:
             logger.error("Failed to store health result", error=str(e))
@@ -466,11 +610,9 @@ class HealthMonitor:
                 
                 cutoff_time = datetime.utcnow() - timedelta(hours=self.result_retention_hours)
                 
-                for check_name in self.health_results:
-                    self.health_results[check_name] = [
-                        result for result in self.health_results[check_name]
-                        if result.timestamp > cutoff_time
-                    ]
+                for results in self.health_results.values():
+                    while results and results[0].timestamp <= cutoff_time:
+                        results.popleft()
                 
                 logger.debug("Health results cleanup completed")
                 
@@ -752,61 +894,83 @@ class HealthMonitor:
                 message=f"Load balancer health check failed: {str(e)}"
             )
     
+    def _is_fresh(self, check_name: str, result: HealthCheckResult, now: datetime) -> bool:
+        """Whether a result is recent enough to describe current health."""
+        health_check = self.health_checks.get(check_name)
+        if health_check is None:
+            return True
+        freshness = health_check.freshness_seconds or health_check.interval_seconds * 2
+        return (now - result.timestamp).total_seconds() <= freshness
+    
+    def _build_health_summary(self) -> Dict[str, Any]:
+        """Build the overall health summary from the latest stored results."""
+        now = datetime.utcnow()
+        health_summary = {
+            'timestamp': now.isoformat(),
+            'overall_status': HealthStatus.HEALTHY.value,
+            'checks': {},
+            'summary': {
+                'total_checks': len(self.health_checks),
+                'healthy': 0,
+                'warning': 0,
+                'critical': 0,
+                'unknown': 0,
+                'stale': 0
+            }
+        }
+        
+        status_order = [HealthStatus.HEALTHY, HealthStatus.WARNING,
+                      HealthStatus.CRITICAL, HealthStatus.UNKNOWN]
+        worst_status = HealthStatus.HEALTHY
+        
+        # Get latest result for each check
+        for check_name in self.health_checks:
+            latest_result = self.latest_results.get(check_name)
+            if latest_result:
+                fresh = self._is_fresh(check_name, latest_result, now)
+                
+                health_summary['checks'][check_name] = {
+                    'status': latest_result.status.value,
+                    'message': latest_result.message,
+                    'value': latest_result.value,
+                    'timestamp': latest_result.timestamp.isoformat(),
+                    'duration_ms': latest_result.duration_ms,
+                    'fresh': fresh
+                }
+                
+                # Stale results no longer describe current health
+                effective_status = latest_result.status if fresh else HealthStatus.UNKNOWN
+                if not fresh:
+                    health_summary['summary']['stale'] += 1
+                
+                # Update summary counts
+                health_summary['summary'][effective_status.value] += 1
+                
+                # Track worst status
+                if status_order.index(effective_status) > status_order.index(worst_status):
+                    worst_status = effective_status
+            else:
+                health_summary['checks'][check_name] = {
+                    'status': HealthStatus.UNKNOWN.value,
+                    'message': 'No results available',
+                    'value': None,
+                    'timestamp': None,
+                    'duration_ms': 0,
+                    'fresh': False
+                }
+                health_summary['summary']['unknown'] += 1
+                
+                if worst_status == HealthStatus.HEALTHY:
+                    worst_status = HealthStatus.UNKNOWN
+        
+        health_summary['overall_status'] = worst_status.value
+        
+        return health_summary
+    
     async def get_overall_health(self) -> Dict[str, Any]:
         """Get overall system health summary."""
         try:
-            health_summary = {
-                'timestamp': datetime.utcnow().isoformat(),
-                'overall_status': HealthStatus.HEALTHY.value,
-                'checks': {},
-                'summary': {
-                    'total_checks': len(self.health_checks),
-                    'healthy': 0,
-                    'warning': 0,
-                    'critical': 0,
-                    'unknown': 0
-                }
-            }
-            
-            worst_status = HealthStatus.HEALTHY
-            
-            # Get latest result for each check
-            for check_name, results in self.health_results.items():
-                if results:
-                    latest_result = results[-1]
-                    
-                    health_summary['checks'][check_name] = {
-                        'status': latest_result.status.value,
-                        'message': latest_result.message,
-                        'value': latest_result.value,
-                        'timestamp': latest_result.timestamp.isoformat(),
-                        'duration_ms': latest_result.duration_ms
-                    }
-                    
-                    # Update summary counts
-                    health_summary['summary'][latest_result.status.value] += 1
-                    
-                    # Track worst status
-                    status_order = [HealthStatus.HEALTHY, HealthStatus.WARNING, 
-                                  HealthStatus.CRITICAL, HealthStatus.UNKNOWN]
-                    if status_order.index(latest_result.status) > status_order.index(worst_status):
-                        worst_status = latest_result.status
-                else:
-                    health_summary['checks'][check_name] = {
-                        'status': HealthStatus.UNKNOWN.value,
-                        'message': 'No results available',
-                        'value': None,
-                        'timestamp': None,
-                        'duration_ms': 0
-                    }
-                    health_summary['summary']['unknown'] += 1
-                    
-                    if worst_status == HealthStatus.HEALTHY:
-                        worst_status = HealthStatus.UNKNOWN
-            
-            health_summary['overall_status'] = worst_status.value
-            
-            return health_summary
+            return self._build_health_summary()
             
         except Exception as e:
             logger.error("Failed to get overall health", error=str(e))
@@ -814,6 +978,29 @@ class HealthMonitor:
                 'error': str(e),
                 'overall_status': HealthStatus.UNKNOWN.value
             }
+    
+    def get_cached_snapshot(self) -> Dict[str, Any]:
+        """
+        Get the health summary for probes without running any checks.
+        
+        The snapshot is rebuilt at most once per ``snapshot_ttl_seconds``,
+        or sooner when a new result has been stored.
+        """
+        try:
+            now = time.monotonic()
+            if (self._snapshot is None or self._snapshot_dirty or
+                    now - self._snapshot_built_at >= self.snapshot_ttl_seconds):
+                self._snapshot = self._build_health_summary()
+                self._snapshot_built_at = now
+                self._snapshot_dirty = False
+            return self._snapshot
+            
+        except Exception as e:
+            logger.error("Failed to get health snapshot", error=str(e))
+            return {
+                'error': str(e),
+                'overall_status': HealthStatus.UNKNOWN.value
+            }
 
 # Global health monitor instance
 health_monitor = None
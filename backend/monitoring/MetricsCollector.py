@@ -9,9 +9,14 @@ Comprehensive metrics collection system that integrates with:
 - Infrastructure metrics (CPU, memory, disk, network)
 
 Provides Prometheus-compatible metrics export and real-time monitoring.
+When PROMETHEUS_MULTIPROC_DIR is set (e.g. under gunicorn with several
+workers), metric values live in mmap-backed files shared by all workers and
+the exposition endpoint aggregates them into fleet-wide numbers.
 """
 
 import asyncio
+import copy
+import threading
 import time
 import psutil
 import json
@@ -20,7 +25,7 @@ from datetime import datetime, timedelta
 from dataclasses import dataclass, field
 from enum import Enum
 import structlog
-from prometheus_client import Counter, Histogram, Gauge, Info, CollectorRegistry, generate_latest
+from prometheus_client import Counter, Histogram, Gauge, Info, CollectorRegistry, generate_latest, multiprocess
 
 # Import alerting dependencies
 import smtplib
@@ -30,6 +35,12 @@ from email.mime.multipart import MIMEMultipart
 import aiohttp
 import os
 
+try:
+    from .alert_rule_engine import AlertRuleEngine, AlertState, AlertTransition, evaluate_condition
+except ImportError:
+    # Fallback for standalone execution
+    from alert_rule_engine import AlertRuleEngine, AlertState, AlertTransition, evaluate_condition
+
 logger = structlog.get_logger()
 
 # =============================================================================
@@ -68,6 +79,10 @@ class AlertRule:
     severity: AlertSeverity
     duration_seconds: int = 300  # Alert after 5 minutes
     description: str = ""
+    aggregation: str = "last"  # last, avg, sum, count, rate, quantile
+    window_seconds: int = 60  # Aggregation window
+    quantile: float = 0.95  # Used when aggregation is "quantile"
+    labels: Dict[str, str] = field(default_factory=dict)  # Only samples carrying these labels
     
 @dataclass
 class MetricSample:
@@ -92,12 +107,28 @@ class MetricsCollector:
     
     def __init__(self):
         self.registry = CollectorRegistry()
+        
+        # Multiprocess exposition aggregates the files every worker writes
+        self.multiprocess_dir = os.getenv('PROMETHEUS_MULTIPROC_DIR') or None
+        self._multiprocess_registry: Optional[CollectorRegistry] = None
+        
+        # Exposition output is reused for one scrape interval
+        self.exposition_cache_seconds = float(os.getenv('METRICS_EXPOSITION_CACHE_SECONDS', '15'))
+        self._exposition_cache: Optional[tuple] = None  # (generated_at, payload)
+        self._exposition_lock = threading.Lock()
+        
         self.metrics: Dict[str, Any] = {}
         self.metric_definitions: Dict[str, MetricDefinition] = {}
         self.alert_rules: List[AlertRule] = []
         self.metric_history: List[MetricSample] = []
         self.active_alerts: Dict[str, Dict[str, Any]] = {}
         
+        # Event-driven alert evaluation
+        self.alert_engine = AlertRuleEngine()
+        self._synced_alert_rules: Optional[List[AlertRule]] = None  # Copy of the rules last synced
+        self.loop: Optional[asyncio.AbstractEventLoop] = None  # Loop the collector's tasks run on
+        self.alert_sweep_interval = 5  # seconds, only pending rules are visited
+        
         # Collection intervals
         self.system_metrics_interval = 30  # seconds
         self.microservices_metrics_interval = 15  # seconds
@@ -117,6 +148,7 @@ class MetricsCollector:
                 'sizewise_cpu_usage_percent',
                 'CPU usage percentage',
                 ['instance'],
+                multiprocess_mode='mostrecent',
                 registry=self.registry
             )
             
@@ -124,6 +156,7 @@ class MetricsCollector:
                 'sizewise_memory_usage_bytes',
                 'Memory usage in bytes',
                 ['instance', 'type'],
+                multiprocess_mode='mostrecent',
                 registry=self.registry
             )
             
@@ -131,6 +164,7 @@ class MetricsCollector:
                 'sizewise_disk_usage_bytes',
                 'Disk usage in bytes',
                 ['instance', 'device', 'type'],
+                multiprocess_mode='mostrecent',
                 registry=self.registry
             )
             
@@ -194,6 +228,7 @@ class MetricsCollector:
                 'sizewise_cache_hit_ratio',
                 'Cache hit ratio',
                 ['cache_tier'],
+                multiprocess_mode='mostrecent',
                 registry=self.registry
             )
             
@@ -201,6 +236,7 @@ class MetricsCollector:
                 'sizewise_cache_memory_usage_bytes',
                 'Cache memory usage in bytes',
                 ['cache_tier', 'node'],
+                multiprocess_mode='mostrecent',
                 registry=self.registry
             )
             
@@ -216,6 +252,7 @@ class MetricsCollector:
                 'sizewise_load_balancer_node_health',
                 'Load balancer node health status (1=healthy, 0=unhealthy)',
                 ['algorithm', 'node'],
+                multiprocess_mode='mostrecent',
                 registry=self.registry
             )
             
@@ -224,6 +261,7 @@ class MetricsCollector:
                 'sizewise_database_connections_active',
                 'Active database connections',
                 ['database_type', 'database_name'],
+                multiprocess_mode='livesum',
                 registry=self.registry
             )
             
@@ -235,6 +273,38 @@ class MetricsCollector:
                 registry=self.registry
             )
             
+            # Connection pool metrics
+            self.metrics['database_pool_wait_seconds'] = Histogram(
+                'sizewise_database_pool_wait_seconds',
+                'Time spent waiting to check a connection out of a pool',
+                ['database_type'],
+                buckets=[0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0],
+                registry=self.registry
+            )
+            
+            self.metrics['database_pool_timeouts_total'] = Counter(
+                'sizewise_database_pool_timeouts_total',
+                'Connection checkouts that timed out or found the pool exhausted',
+                ['database_type'],
+                registry=self.registry
+            )
+            
+            self.metrics['database_pool_connections'] = Gauge(
+                'sizewise_database_pool_connections',
+                'Pooled connections by state',
+                ['database_type', 'state'],
+                multiprocess_mode='livesum',
+                registry=self.registry
+            )
+            
+            self.metrics['database_pool_max_size'] = Gauge(
+                'sizewise_database_pool_max_size',
+                'Current connection limit of each pool',
+                ['database_type'],
+                multiprocess_mode='livesum',
+                registry=self.registry
+            )
+            
             logger.info("Core metrics initialized successfully")
             
         except Exception as e:
@@ -244,6 +314,8 @@ class MetricsCollector:
     async def initialize(self):
         """Initialize the metrics collector."""
         try:
+            self.loop = asyncio.get_running_loop()
+            
             # Initialize alert rules
             await self._initialize_alert_rules()
             
@@ -298,21 +370,26 @@ class MetricsCollector:
                 # Application alerts
                 AlertRule(
                     name="high_error_rate",
-                    metric_name="sizewise_http_error_rate",
+                    metric_name="sizewise_http_request_errors",
                     condition=">",
                     threshold=0.05,  # 5% error rate
                     severity=AlertSeverity.WARNING,
                     duration_seconds=180,
-                    description="HTTP error rate is above 5% for 3 minutes"
+                    description="HTTP error rate is above 5% for 3 minutes",
+                    aggregation="avg",  # Samples are 1 for errors, 0 otherwise
+                    window_seconds=180
                 ),
                 AlertRule(
                     name="slow_response_time",
-                    metric_name="sizewise_http_response_time_p95",
+                    metric_name="sizewise_http_request_duration_seconds",
                     condition=">",
                     threshold=2.0,  # 2 seconds
                     severity=AlertSeverity.WARNING,
                     duration_seconds=300,
-                    description="95th percentile response time is above 2 seconds"
+                    description="95th percentile response time is above 2 seconds",
+                    aggregation="quantile",
+                    window_seconds=300,
+                    quantile=0.95
                 ),
                 
                 # Cache alerts
@@ -329,12 +406,15 @@ class MetricsCollector:
                 # Service mesh alerts
                 AlertRule(
                     name="service_mesh_high_latency",
-                    metric_name="sizewise_service_mesh_latency_p95",
+                    metric_name="sizewise_service_mesh_request_duration_seconds",
                     condition=">",
                     threshold=0.1,  # 100ms
                     severity=AlertSeverity.WARNING,
                     duration_seconds=300,
-                    description="Service mesh 95th percentile latency is above 100ms"
+                    description="Service mesh 95th percentile latency is above 100ms",
+                    aggregation="quantile",
+                    window_seconds=300,
+                    quantile=0.95
                 ),
                 
                 # Load balancer alerts
@@ -349,6 +429,7 @@ class MetricsCollector:
                 )
             ]
             
+            self._sync_alert_rules()
             logger.info("Alert rules initialized", count=len(self.alert_rules))
             
         except Exception as e:
@@ -374,6 +455,10 @@ class MetricsCollector:
                     instance='sizewise-suite', type='available'
                 ).set(memory.available)
                 
+                # Feed alert rules watching system resources
+                await self.record_metric('sizewise_cpu_usage_percent', cpu_percent)
+                await self.record_metric('sizewise_memory_usage_percent', memory.percent)
+                
                 # Disk metrics
                 for partition in psutil.disk_partitions():
                     try:
@@ -446,6 +531,12 @@ class MetricsCollector:
                             status='error'
                         )._value._value = service_metrics.get('request_count', 0) * error_rate
 
+                        await self.record_metric(
+                            'sizewise_service_mesh_request_duration_seconds',
+                            service_metrics.get('avg_latency_ms', 0) / 1000,
+                            {'destination_service': service_id}
+                        )
+
                         # Store historical sample
                         self.metric_history.append(MetricSample(
                             name='service_mesh_metrics',
@@ -472,6 +563,7 @@ class MetricsCollector:
                 # Update cache hit ratio
                 hit_ratio = cache_stats.get('global_metrics', {}).get('hit_ratio', 0) / 100
                 self.metrics['cache_hit_ratio'].labels(cache_tier='distributed').set(hit_ratio)
+                await self.record_metric('sizewise_cache_hit_ratio', hit_ratio, {'cache_tier': 'distributed'})
 
                 # Update cache memory usage
                 memory_usage = cache_stats.get('global_metrics', {}).get('memory_usage_bytes', 0)
@@ -542,6 +634,9 @@ class MetricsCollector:
 
                         # Store historical sample
                         healthy_ratio = healthy_nodes / max(total_nodes, 1)
+                        await self.record_metric(
+                            'sizewise_load_balancer_healthy_nodes_ratio', healthy_ratio, {'algorithm': lb_name}
+                        )
                         self.metric_history.append(MetricSample(
                             name='load_balancer_metrics',
                             value=healthy_ratio,
@@ -609,101 +704,101 @@ class MetricsCollector:
         except Exception as e:
             logger.warning("Failed to collect HVAC metrics", error=str(e))
 
+    def submit(self, coroutine) -> bool:
+        """Run a coroutine on the collector's event loop from any thread; False if that loop is not running."""
+        loop = self.loop
+        if loop is None or loop.is_closed() or not loop.is_running():
+            coroutine.close()
+            return False
+        asyncio.run_coroutine_threadsafe(coroutine, loop)
+        return True
+
+    def _sync_alert_rules(self):
+        """Register added, removed or edited alert rules with the alert engine."""
+        if self.alert_rules != self._synced_alert_rules:
+            self.alert_engine.sync_rules(self.alert_rules)
+            self._synced_alert_rules = copy.deepcopy(self.alert_rules)
+
+    async def record_metric(self, metric_name: str, value: Union[int, float],
+                            labels: Optional[Dict[str, Any]] = None,
+                            timestamp: Optional[float] = None):
+        """Record a metric sample and evaluate the alert rules that watch it."""
+        try:
+            self._sync_alert_rules()
+            if not self.alert_engine.watches(metric_name):
+                return
+
+            transitions = self.alert_engine.observe(metric_name, value, timestamp, labels)
+            for transition in transitions:
+                await self._handle_alert_transition(transition)
+
+        except Exception as e:
+            logger.error("Failed to record metric", metric_name=metric_name, error=str(e))
+
+    async def record_http_request(self, method: str, endpoint: str, status_code: int,
+                                  duration_seconds: float):
+        """Record an HTTP request in Prometheus and the alert engine."""
+        try:
+            self._count_http_request(method, endpoint, status_code, duration_seconds)
+
+            labels = {'method': method, 'endpoint': endpoint, 'status_code': str(status_code)}
+            await self.record_metric('sizewise_http_request_duration_seconds', duration_seconds, labels)
+            await self.record_metric('sizewise_http_request_errors', 1 if status_code >= 500 else 0, labels)
+
+        except Exception as e:
+            logger.error("Failed to record HTTP request", endpoint=endpoint, error=str(e))
+
+    def _count_http_request(self, method: str, endpoint: str, status_code: int, duration_seconds: float):
+        self.metrics['http_requests_total'].labels(
+            method=method, endpoint=endpoint, status_code=str(status_code)
+        ).inc()
+        self.metrics['http_request_duration_seconds'].labels(
+            method=method, endpoint=endpoint
+        ).observe(duration_seconds)
+
+    async def _handle_alert_transition(self, transition: AlertTransition):
+        """Fire or resolve an alert for an engine state change."""
+        alert_rule = transition.rule
+        alert_key = f"{alert_rule.name}_{alert_rule.metric_name}"
+        current_time = datetime.utcnow()
+
+        if transition.state == AlertState.FIRING:
+            self.active_alerts[alert_key] = {
+                'rule': alert_rule,
+                'first_triggered': current_time - timedelta(seconds=transition.duration_seconds),
+                'last_triggered': current_time,
+                'current_value': transition.value,
+                'trigger_count': 1
+            }
+            await self._fire_alert(alert_rule, transition.value, transition.duration_seconds)
+        elif transition.previous_state == AlertState.FIRING:
+            self.active_alerts.pop(alert_key, None)
+            await self._resolve_alert(alert_rule, transition.value)
+
+    async def evaluate_alerts(self):
+        """Promote pending alerts whose duration elapsed without new samples."""
+        self._sync_alert_rules()
+        for transition in self.alert_engine.evaluate_pending():
+            await self._handle_alert_transition(transition)
+
     async def _evaluate_alerts(self):
-        """Evaluate alert rules and trigger alerts."""
+        """Sweep pending alerts; rule evaluation itself happens in record_metric."""
         while True:
             try:
-                await asyncio.sleep(60)  # Evaluate alerts every minute
-
-                current_time = datetime.utcnow()
-
-                for alert_rule in self.alert_rules:
-                    try:
-                        # Get current metric value
-                        metric_value = await self._get_current_metric_value(alert_rule.metric_name)
-
-                        if metric_value is not None:
-                            # Evaluate condition
-                            alert_triggered = self._evaluate_alert_condition(
-                                metric_value, alert_rule.condition, alert_rule.threshold
-                            )
-
-                            alert_key = f"{alert_rule.name}_{alert_rule.metric_name}"
-
-                            if alert_triggered:
-                                if alert_key not in self.active_alerts:
-                                    # New alert
-                                    self.active_alerts[alert_key] = {
-                                        'rule': alert_rule,
-                                        'first_triggered': current_time,
-                                        'last_triggered': current_time,
-                                        'current_value': metric_value,
-                                        'trigger_count': 1
-                                    }
-                                else:
-                                    # Update existing alert
-                                    alert_data = self.active_alerts[alert_key]
-                                    alert_data['last_triggered'] = current_time
-                                    alert_data['current_value'] = metric_value
-                                    alert_data['trigger_count'] += 1
-
-                                    # Check if alert should fire (duration exceeded)
-                                    duration = (current_time - alert_data['first_triggered']).total_seconds()
-                                    if duration >= alert_rule.duration_seconds:
-                                        await self._fire_alert(alert_rule, metric_value, duration)
-                            else:
-                                # Alert condition not met, remove if exists
-                                if alert_key in self.active_alerts:
-                                    await self._resolve_alert(alert_rule, metric_value)
-                                    del self.active_alerts[alert_key]
-
-                    except Exception as e:
-                        logger.error("Error evaluating alert rule",
-                                   rule_name=alert_rule.name, error=str(e))
+                await asyncio.sleep(self.alert_sweep_interval)
+                await self.evaluate_alerts()
 
             except Exception as e:
                 logger.error("Error in alert evaluation", error=str(e))
 
     async def _get_current_metric_value(self, metric_name: str) -> Optional[float]:
-        """Get current value for a metric."""
-        try:
-            # This is a simplified implementation
-            # In a real system, you'd query the actual metric values
-
-            if metric_name == "sizewise_cpu_usage_percent":
-                return psutil.cpu_percent()
-            elif metric_name == "sizewise_memory_usage_percent":
-                return psutil.virtual_memory().percent
-            elif metric_name in self.metrics:
-                # Try to get value from Prometheus metric
-                metric = self.metrics[metric_name]
-                if hasattr(metric, '_value'):
-                    return float(metric._value._value)
-
-            return None
-
-        except Exception as e:
-            logger.error("Failed to get metric value", metric_name=metric_name, error=str(e))
-            return None
+        """Get the most recent recorded value for a metric."""
+        return self.alert_engine.get_last_value(metric_name)
 
     def _evaluate_alert_condition(self, value: float, condition: str, threshold: float) -> bool:
         """Evaluate if alert condition is met."""
         try:
-            if condition == ">":
-                return value > threshold
-            elif condition == "<":
-                return value < threshold
-            elif condition == ">=":
-                return value >= threshold
-            elif condition == "<=":
-                return value <= threshold
-            elif condition == "==":
-                return abs(value - threshold) < 0.001  # Float comparison
-            elif condition == "!=":
-                return abs(value - threshold) >= 0.001
-            else:
-                logger.warning("Unknown alert condition", condition=condition)
-                return False
+            return evaluate_condition(value, condition, threshold)
 
         except Exception as e:
             logger.error("Error evaluating alert condition", error=str(e))
@@ -783,10 +878,32 @@ class MetricsCollector:
             except Exception as e:
                 logger.error("Error cleaning up metrics", error=str(e))
 
-    def get_prometheus_metrics(self) -> str:
+    def _exposition_registry(self) -> CollectorRegistry:
+        """Registry to expose: this process, or all workers in multiprocess mode."""
+        if not self.multiprocess_dir:
+            return self.registry
+        if self._multiprocess_registry is None:
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry, path=self.multiprocess_dir)
+            self._multiprocess_registry = registry
+        return self._multiprocess_registry
+    
+    def get_prometheus_metrics(self, use_cache: bool = True) -> str:
         """Get Prometheus-formatted metrics."""
         try:
-            return generate_latest(self.registry).decode('utf-8')
+            now = time.monotonic()
+            cached = self._exposition_cache
+            if use_cache and cached and now - cached[0] < self.exposition_cache_seconds:
+                return cached[1]
+            
+            # One scrape renders at a time; concurrent scrapes reuse its output
+            with self._exposition_lock:
+                cached = self._exposition_cache
+                if use_cache and cached and time.monotonic() - cached[0] < self.exposition_cache_seconds:
+                    return cached[1]
+                payload = generate_latest(self._exposition_registry()).decode('utf-8')
+                self._exposition_cache = (time.monotonic(), payload)
+                return payload
         except Exception as e:
             logger.error("Failed to generate Prometheus metrics", error=str(e))
             return ""
@@ -815,6 +932,7 @@ class MetricsCollector:
                 'alerts': {
                     'active_alerts': len(self.active_alerts),
                     'alert_rules': len(self.alert_rules),
+                    'engine': self.alert_engine.get_statistics(),
                     'recent_alerts': [
                         {
                             'name': alert_data['rule'].name,
@@ -856,3 +974,32 @@ def get_metrics_collector() -> MetricsCollector:
     if metrics_collector is None:
         raise RuntimeError("Metrics collector not initialized")
     return metrics_collector
+
+def init_request_metrics(app):
+    """
+    Record every Flask request's endpoint, status and duration with the metrics collector.
+
+    Samples are handed to the collector's event loop, where the alert engine
+    and any alert tasks it starts run. Without a running loop only the
+    Prometheus series are updated.
+    """
+    from flask import g, request
+
+    def start_timer():
+        g._metrics_started = time.perf_counter()
+
+    def record_request(response):
+        started = g.pop('_metrics_started', None)
+        if started is None or metrics_collector is None:
+            return response
+
+        # Route templates keep the endpoint label bounded; unmatched paths share one bucket
+        endpoint = request.url_rule.rule if request.url_rule else "<unmatched>"
+        sample = (request.method, endpoint, response.status_code, time.perf_counter() - started)
+        collector = metrics_collector
+        if not collector.submit(collector.record_http_request(*sample)):
+            collector._count_http_request(*sample)
+        return response
+
+    app.before_request(start_timer)
+    app.after_request(record_request)
@@ -0,0 +1,477 @@
+"""
+Event-Driven Alert Rule Engine for SizeWise Suite
+
+Evaluates alert rules incrementally as metric samples arrive instead of
+polling every rule on a fixed interval:
+- Rules indexed by metric name, so a sample only touches the rules that watch it
+- Windowed aggregates (last, avg, sum, count, rate, quantile) over N seconds
+- One aggregate computation per (aggregation, window) group, shared by all rules
+- Threshold-sorted rule groups so only rules whose outcome can change are visited
+- Optional label matchers, so a rule can watch one series of a labelled metric
+- Prometheus-style ``for:`` duration state machine (inactive -> pending -> firing)
+"""
+
+import bisect
+import copy
+import functools
+import math
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+import structlog
+
+logger = structlog.get_logger()
+
+# =============================================================================
+# Rule State and Aggregation Types
+# =============================================================================
+
+class AlertState(Enum):
+    """Lifecycle state of a single alert rule."""
+    INACTIVE = "inactive"
+    PENDING = "pending"
+    FIRING = "firing"
+
+class Aggregation(Enum):
+    """Windowed aggregations supported by the engine."""
+    LAST = "last"
+    AVG = "avg"
+    SUM = "sum"
+    COUNT = "count"
+    RATE = "rate"
+    QUANTILE = "quantile"
+
+# Conditions that can be answered with a bisect over sorted thresholds
+_ORDERED_CONDITIONS = (">", ">=", "<", "<=")
+
+@dataclass
+class RuleState:
+    """Mutable evaluation state kept for each registered rule."""
+    rule: Any  # AlertRule from MetricsCollector
+    state: AlertState = AlertState.INACTIVE
+    active_since: Optional[float] = None
+    fired_at: Optional[float] = None
+    last_value: Optional[float] = None
+
+@dataclass
+class AlertTransition:
+    """A state change produced by the engine for the caller to act on."""
+    rule: Any
+    previous_state: AlertState
+    state: AlertState
+    value: float
+    duration_seconds: float
+    timestamp: float
+
+# =============================================================================
+# Sliding Window Aggregates
+# =============================================================================
+
+class SlidingWindow:
+    """
+    Time-bounded window over one metric with constant-time updates.
+
+    Keeps running totals for avg/sum/count and a running counter increase
+    (reset-aware) for rate. A sorted copy of the values is only maintained
+    when a quantile rule is registered on the window.
+    """
+
+    def __init__(self, window_seconds: float, track_quantiles: bool = False,
+                 matchers: Tuple[Tuple[str, str], ...] = ()):
+        self.window_seconds = window_seconds
+        self.matchers = matchers  # (label, value) pairs a sample must carry
+        self.track_quantiles = track_quantiles
+        self.samples: Deque[Tuple[float, float, float]] = deque()  # (ts, value, increase)
+        self.total = 0.0
+        self.increase_total = 0.0
+        self.sorted_values: List[float] = []
+        self.last_value: Optional[float] = None
+
+    def matches(self, labels: Optional[Dict[str, Any]]) -> bool:
+        """Whether a sample with ``labels`` belongs to this window."""
+        if not self.matchers:
+            return True
+        labels = labels or {}
+        return all(str(labels.get(name)) == value for name, value in self.matchers)
+
+    def enable_quantiles(self):
+        """Start maintaining the sorted value list for quantile rules."""
+        if not self.track_quantiles:
+            self.track_quantiles = True
+            self.sorted_values = sorted(value for _, value, _ in self.samples)
+
+    def add(self, timestamp: float, value: float):
+        """Append a sample and evict everything that fell out of the window."""
+        if self.last_value is None:
+            increase = 0.0
+        elif value >= self.last_value:
+            increase = value - self.last_value
+        else:
+            increase = value  # Counter reset
+        self.last_value = value
+
+        self.samples.append((timestamp, value, increase))
+        self.total += value
+        self.increase_total += increase
+        if self.track_quantiles:
+            bisect.insort(self.sorted_values, value)
+
+        self.evict(timestamp)
+
+    def evict(self, now: float):
+        """Drop samples older than the window relative to ``now``."""
+        cutoff = now - self.window_seconds
+        samples = self.samples
+        while samples and samples[0][0] < cutoff:
+            _, value, increase = samples.popleft()
+            self.total -= value
+            self.increase_total -= increase
+            if self.track_quantiles:
+                index = bisect.bisect_left(self.sorted_values, value)
+                del self.sorted_values[index]
+
+    def aggregate(self, aggregation: Aggregation, quantile: float = 0.95) -> Optional[float]:
+        """Compute an aggregate over the current window contents."""
+        count = len(self.samples)
+        if count == 0:
+            return None
+
+        if aggregation == Aggregation.LAST:
+            return self.samples[-1][1]
+        if aggregation == Aggregation.AVG:
+            return self.total / count
+        if aggregation == Aggregation.SUM:
+            return self.total
+        if aggregation == Aggregation.COUNT:
+            return float(count)
+        if aggregation == Aggregation.RATE:
+            return self.increase_total / self.window_seconds if self.window_seconds > 0 else 0.0
+        if aggregation == Aggregation.QUANTILE:
+            values = self.sorted_values
+            if not values:
+                return None
+            rank = min(len(values) - 1, max(0, math.ceil(quantile * len(values)) - 1))
+            return values[rank]
+        return None
+
+# =============================================================================
+# Rule Groups
+# =============================================================================
+
+class _ConditionGroup:
+    """Rules sharing one aggregate and one comparison operator, sorted by threshold."""
+
+    def __init__(self, condition: str):
+        self.condition = condition
+        self.thresholds: List[float] = []
+        self.states: List[RuleState] = []
+
+    def add(self, rule_state: RuleState):
+        index = bisect.bisect_right(self.thresholds, rule_state.rule.threshold)
+        self.thresholds.insert(index, rule_state.rule.threshold)
+        self.states.insert(index, rule_state)
+
+    def remove(self, rule_state: RuleState) -> bool:
+        for index, candidate in enumerate(self.states):
+            if candidate is rule_state:
+                del self.thresholds[index]
+                del self.states[index]
+                return True
+        return False
+
+    def matching(self, value: float) -> Iterable[RuleState]:
+        """Yield rule states whose condition holds for ``value``."""
+        condition = self.condition
+        if condition == ">":
+            return self.states[:bisect.bisect_left(self.thresholds, value)]
+        if condition == ">=":
+            return self.states[:bisect.bisect_right(self.thresholds, value)]
+        if condition == "<":
+            return self.states[bisect.bisect_right(self.thresholds, value):]
+        if condition == "<=":
+            return self.states[bisect.bisect_left(self.thresholds, value):]
+        return [s for s in self.states if evaluate_condition(value, condition, s.rule.threshold)]
+
+class _AggregateGroup:
+    """All rules on one metric that share an aggregation, window and quantile."""
+
+    def __init__(self, window: SlidingWindow, aggregation: Aggregation, quantile: float):
+        self.window = window
+        self.aggregation = aggregation
+        self.quantile = quantile
+        self.conditions: Dict[str, _ConditionGroup] = {}
+        # Rules currently pending or firing; only these can need a reset
+        self.active: Dict[int, RuleState] = {}
+
+    @property
+    def rule_count(self) -> int:
+        return sum(len(group.states) for group in self.conditions.values())
+
+def evaluate_condition(value: float, condition: str, threshold: float) -> bool:
+    """Evaluate a threshold condition the same way MetricsCollector always has."""
+    if condition == ">":
+        return value > threshold
+    if condition == "<":
+        return value < threshold
+    if condition == ">=":
+        return value >= threshold
+    if condition == "<=":
+        return value <= threshold
+    if condition == "==":
+        return abs(value - threshold) < 0.001  # Float comparison
+    if condition == "!=":
+        return abs(value - threshold) >= 0.001
+    logger.warning("Unknown alert condition", condition=condition)
+    return False
+
+# =============================================================================
+# Alert Rule Engine
+# =============================================================================
+
+def _locked(method):
+    """Run an engine method under the engine lock."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+class AlertRuleEngine:
+    """
+    Incremental alert evaluator indexed by metric name.
+
+    ``observe`` is called for every incoming sample and returns the state
+    transitions it caused; ``evaluate_pending`` promotes pending rules whose
+    ``for:`` duration elapsed without a new sample arriving. All public
+    methods are serialized by a lock, so samples may arrive from any thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._rule_specs: Dict[str, Any] = {}  # Copy of each rule as registered, to spot in-place edits
+        self._windows: Dict[str, Dict[Tuple[float, tuple], SlidingWindow]] = {}
+        self._groups: Dict[str, Dict[Tuple[Aggregation, float, float, tuple], _AggregateGroup]] = {}
+        self._rule_states: Dict[str, RuleState] = {}
+        self._rule_groups: Dict[str, _AggregateGroup] = {}
+        self.samples_observed = 0
+
+    # -------------------------------------------------------------------------
+    # Rule registration
+    # -------------------------------------------------------------------------
+
+    @property
+    def rule_count(self) -> int:
+        return len(self._rule_states)
+
+    @_locked
+    def set_rules(self, rules: Iterable[Any]):
+        """Replace the registered rule set."""
+        self._windows.clear()
+        self._groups.clear()
+        self._rule_states.clear()
+        self._rule_groups.clear()
+        self._rule_specs.clear()
+        for rule in rules:
+            self.add_rule(rule)
+
+    @_locked
+    def add_rule(self, rule: Any):
+        """Register a rule, replacing any existing rule with the same name."""
+        if rule.name in self._rule_states:
+            self.remove_rule(rule.name)
+
+        aggregation = Aggregation(getattr(rule, 'aggregation', 'last'))
+        window_seconds = float(getattr(rule, 'window_seconds', 60))
+        quantile = float(getattr(rule, 'quantile', 0.95))
+        if aggregation != Aggregation.QUANTILE:
+            quantile = 0.0
+        matchers = tuple(sorted((name, str(value)) for name, value in (getattr(rule, 'labels', None) or {}).items()))
+
+        windows = self._windows.setdefault(rule.metric_name, {})
+        window = windows.get((window_seconds, matchers))
+        if window is None:
+            window = windows[(window_seconds, matchers)] = SlidingWindow(window_seconds, matchers=matchers)
+        if aggregation == Aggregation.QUANTILE:
+            window.enable_quantiles()
+
+        groups = self._groups.setdefault(rule.metric_name, {})
+        key = (aggregation, window_seconds, quantile, matchers)
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = _AggregateGroup(window, aggregation, quantile)
+
+        condition_group = group.conditions.get(rule.condition)
+        if condition_group is None:
+            condition_group = group.conditions[rule.condition] = _ConditionGroup(rule.condition)
+
+        rule_state = RuleState(rule=rule)
+        condition_group.add(rule_state)
+        self._rule_states[rule.name] = rule_state
+        self._rule_groups[rule.name] = group
+        self._rule_specs[rule.name] = copy.deepcopy(rule)
+
+    @_locked
+    def sync_rules(self, rules: Iterable[Any]):
+        """Reconcile with a rule list, keeping state for rules that did not change, even if edited in place."""
+        wanted = {rule.name: rule for rule in rules}
+        for name in list(self._rule_states):
+            if name not in wanted:
+                self.remove_rule(name)
+        for name, rule in wanted.items():
+            current = self._rule_states.get(name)
+            if current is None or current.rule is not rule or self._rule_specs[name] != rule:
+                self.add_rule(rule)
+
+    @_locked
+    def remove_rule(self, rule_name: str) -> bool:
+        """Unregister a rule by name."""
+        rule_state = self._rule_states.pop(rule_name, None)
+        if rule_state is None:
+            return False
+        spec = self._rule_specs.pop(rule_name)
+
+        # The rule may have been edited in place; it is filed under its registered condition and metric
+        group = self._rule_groups.pop(rule_name)
+        condition_group = group.conditions.get(spec.condition)
+        if condition_group:
+            condition_group.remove(rule_state)
+            if not condition_group.states:
+                del group.conditions[spec.condition]
+        group.active.pop(id(rule_state), None)
+
+        if group.rule_count == 0:
+            metric_name = spec.metric_name
+            groups = self._groups[metric_name]
+            for key, candidate in list(groups.items()):
+                if candidate is group:
+                    del groups[key]
+            still_used = {(g.window.window_seconds, g.window.matchers) for g in groups.values()}
+            windows = self._windows[metric_name]
+            for window_key in list(windows):
+                if window_key not in still_used:
+                    del windows[window_key]
+            if not groups:
+                del self._groups[metric_name]
+                del self._windows[metric_name]
+        return True
+
+    def get_rule_state(self, rule_name: str) -> Optional[RuleState]:
+        return self._rule_states.get(rule_name)
+
+    def watches(self, metric_name: str) -> bool:
+        return metric_name in self._groups
+
+    @_locked
+    def get_last_value(self, metric_name: str) -> Optional[float]:
+        """Return the most recent sample seen for a watched metric."""
+        for window in self._windows.get(metric_name, {}).values():
+            return window.last_value
+        return None
+
+    # -------------------------------------------------------------------------
+    # Evaluation
+    # -------------------------------------------------------------------------
+
+    @_locked
+    def observe(self, metric_name: str, value: float, timestamp: Optional[float] = None,
+                labels: Optional[Dict[str, Any]] = None) -> List[AlertTransition]:
+        """Feed one sample and evaluate only the rules watching its metric and labels."""
+        groups = self._groups.get(metric_name)
+        if not groups:
+            return []
+
+        now = time.time() if timestamp is None else timestamp
+        self.samples_observed += 1
+        for window in self._windows[metric_name].values():
+            if window.matches(labels):
+                window.add(now, float(value))
+
+        transitions: List[AlertTransition] = []
+        for group in groups.values():
+            if not group.window.matches(labels):
+                continue
+            aggregate = group.window.aggregate(group.aggregation, group.quantile)
+            if aggregate is None:
+                continue
+            self._evaluate_group(group, aggregate, now, transitions)
+        return transitions
+
+    def _evaluate_group(self, group: _AggregateGroup, value: float, now: float,
+                        transitions: List[AlertTransition]):
+        matched: Dict[int, RuleState] = {}
+        for condition_group in group.conditions.values():
+            for rule_state in condition_group.matching(value):
+                matched[id(rule_state)] = rule_state
+
+        # Rules that were active but no longer match go back to inactive
+        for key, rule_state in list(group.active.items()):
+            if key not in matched:
+                previous = rule_state.state
+                duration = now - (rule_state.active_since or now)
+                rule_state.state = AlertState.INACTIVE
+                rule_state.active_since = None
+                rule_state.fired_at = None
+                rule_state.last_value = value
+                del group.active[key]
+                if previous == AlertState.FIRING:
+                    transitions.append(AlertTransition(
+                        rule_state.rule, previous, AlertState.INACTIVE, value, duration, now
+                    ))
+
+        for key, rule_state in matched.items():
+            rule_state.last_value = value
+            if rule_state.state == AlertState.INACTIVE:
+                rule_state.state = AlertState.PENDING
+                rule_state.active_since = now
+                group.active[key] = rule_state
+            self._maybe_fire(rule_state, now, transitions)
+
+    def _maybe_fire(self, rule_state: RuleState, now: float,
+                    transitions: List[AlertTransition]):
+        if rule_state.state != AlertState.PENDING:
+            return
+        duration = now - rule_state.active_since
+        if duration >= rule_state.rule.duration_seconds:
+            rule_state.state = AlertState.FIRING
+            rule_state.fired_at = now
+            transitions.append(AlertTransition(
+                rule_state.rule, AlertState.PENDING, AlertState.FIRING,
+                rule_state.last_value, duration, now
+            ))
+
+    @_locked
+    def evaluate_pending(self, now: Optional[float] = None) -> List[AlertTransition]:
+        """Promote pending rules whose duration elapsed since the last sample."""
+        now = time.time() if now is None else now
+        transitions: List[AlertTransition] = []
+        for groups in self._groups.values():
+            for group in groups.values():
+                for rule_state in list(group.active.values()):
+                    self._maybe_fire(rule_state, now, transitions)
+        return transitions
+
+    @_locked
+    def get_active_states(self) -> List[RuleState]:
+        """Return every rule currently pending or firing."""
+        return [
+            rule_state
+            for groups in self._groups.values()
+            for group in groups.values()
+            for rule_state in group.active.values()
+        ]
+
+    @_locked
+    def get_statistics(self) -> Dict[str, Any]:
+        return {
+            'rules': self.rule_count,
+            'metrics_watched': len(self._groups),
+            'aggregate_groups': sum(len(groups) for groups in self._groups.values()),
+            'windows': sum(len(windows) for windows in self._windows.values()),
+            'samples_observed': self.samples_observed,
+            'pending': sum(1 for s in self._rule_states.values() if s.state == AlertState.PENDING),
+            'firing': sum(1 for s in self._rule_states.values() if s.state == AlertState.FIRING)
+        }
@@ -7,12 +7,13 @@ Integrates with existing monitoring infrastructure to provide real-time dashboar
 
 import asyncio
 import json
+import threading
 from datetime import datetime
 from flask import Blueprint, jsonify, request, Response
 from flask_cors import cross_origin
 import structlog
 
-from .MetricsCollector import get_metrics_collector, initialize_metrics_collector
+from .MetricsCollector import get_metrics_collector, initialize_metrics_collector, init_request_metrics
 from .PerformanceDashboard import get_performance_dashboard, initialize_performance_dashboard
 from .HealthMonitor import get_health_monitor, initialize_health_monitor
 from .ErrorTracker import get_error_tracker, initialize_error_tracker
@@ -25,6 +26,7 @@ from .sla_monitoring import get_sla_monitoring_manager, initialize_sla_monitorin
 from .sla_routes import sla_bp
 from .disaster_recovery import get_disaster_recovery_manager, initialize_disaster_recovery_manager
 from .disaster_recovery_routes import dr_bp
+from .request_profiler import get_request_profiler
 
 logger = structlog.get_logger()
 
@@ -110,17 +112,19 @@ def init_monitoring(app):
 
     # Initialize monitoring components immediately
     try:
-        # Run async initialization in sync context
+        # Components keep their background tasks on one loop that runs for the life of the process
         loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        loop.run_until_complete(initialize_monitoring_components())
-        loop.close()
+        threading.Thread(target=loop.run_forever, name="monitoring-loop", daemon=True).start()
+        asyncio.run_coroutine_threadsafe(initialize_monitoring_components(), loop).result()
 
         logger.info("Production monitoring initialized successfully")
 
     except Exception as e:
         logger.error("Failed to initialize monitoring", error=str(e))
 
+    # Feed request rates, latencies and errors to Prometheus and the alert rules
+    init_request_metrics(app)
+
     # Register monitoring blueprints
     app.register_blueprint(monitoring_bp)
     app.register_blueprint(incident_bp, url_prefix='/api/monitoring')
@@ -218,11 +222,8 @@ def health_check():
         if not _monitoring_initialized:
             return jsonify({'error': 'Monitoring not initialized'}), 503
         
-        # Run async function in sync context
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        health = loop.run_until_complete(_health_monitor.get_overall_health())
-        loop.close()
+        # Serve the cached snapshot; probes never trigger checks
+        health = _health_monitor.get_cached_snapshot()
         
         return jsonify(health)
         
@@ -292,6 +293,74 @@ def metrics_summary():
         return jsonify({'error': 'Failed to get metrics summary'}), 500
 
 
+# =============================================================================
+# Request Profiler Routes
+# =============================================================================
+
+@monitoring_bp.route('/profiler', methods=['GET'])
+@cross_origin()
+def profiler_summary():
+    """Get per-endpoint latency and phase timing from the request profiler."""
+    try:
+        profiler = get_request_profiler()
+        if profiler is None:
+            return jsonify({'error': 'Request profiler not initialized'}), 503
+
+        return jsonify(profiler.get_summary())
+
+    except Exception as e:
+        logger.error("Failed to get profiler summary", error=str(e))
+        return jsonify({'error': 'Failed to get profiler summary'}), 500
+
+
+@monitoring_bp.route('/profiler/collapsed', methods=['GET'])
+def profiler_collapsed_stacks():
+    """Export sampled stacks in collapsed-stack format for flamegraph.pl / speedscope."""
+    try:
+        profiler = get_request_profiler()
+        if profiler is None:
+            return Response('# Request profiler not initialized\n', mimetype='text/plain'), 503
+
+        return Response(profiler.get_collapsed_stacks(request.args.get('endpoint')), mimetype='text/plain')
+
+    except Exception as e:
+        logger.error("Failed to export collapsed stacks", error=str(e))
+        return Response('# Error exporting stacks\n', mimetype='text/plain'), 500
+
+
+@monitoring_bp.route('/profiler/flamegraph', methods=['GET'])
+@cross_origin()
+def profiler_flame_graph():
+    """Export sampled stacks as a flame-graph tree."""
+    try:
+        profiler = get_request_profiler()
+        if profiler is None:
+            return jsonify({'error': 'Request profiler not initialized'}), 503
+
+        return jsonify(profiler.get_flame_graph(request.args.get('endpoint')))
+
+    except Exception as e:
+        logger.error("Failed to export flame graph", error=str(e))
+        return jsonify({'error': 'Failed to export flame graph'}), 500
+
+
+@monitoring_bp.route('/profiler/reset', methods=['POST'])
+@cross_origin()
+def profiler_reset():
+    """Clear aggregated profiler data."""
+    try:
+        profiler = get_request_profiler()
+        if profiler is None:
+            return jsonify({'error': 'Request profiler not initialized'}), 503
+
+        profiler.reset()
+        return jsonify({'success': True, 'timestamp': datetime.utcnow().isoformat()})
+
+    except Exception as e:
+        logger.error("Failed to reset profiler", error=str(e))
+        return jsonify({'error': 'Failed to reset profiler'}), 500
+
+
 # =============================================================================
 # Error Tracking Routes
 # =============================================================================
@@ -451,7 +520,7 @@ def system_overview():
         asyncio.set_event_loop(loop)
         
         # Get key system metrics
-        health = loop.run_until_complete(_health_monitor.get_overall_health())
+        health = _health_monitor.get_cached_snapshot()
         metrics_summary = loop.run_until_complete(_metrics_collector.get_metrics_summary())
         error_summary = loop.run_until_complete(_error_tracker.get_error_summary())
         
@@ -497,7 +566,8 @@ def monitoring_status():
                 'error_tracker': _error_tracker is not None,
                 'alerting_manager': _alerting_manager is not None,
                 'centralized_logger': _centralized_logger is not None,
-                'hvac_metrics_collector': _hvac_metrics_collector is not None
+                'hvac_metrics_collector': _hvac_metrics_collector is not None,
+                'request_profiler': get_request_profiler() is not None
             },
             'timestamp': datetime.utcnow().isoformat()
         }
@@ -0,0 +1,32 @@
+"""
+Gunicorn server hooks for Prometheus multiprocess metrics
+
+Load with ``gunicorn --config python:backend.monitoring.gunicorn_hooks``
+and set PROMETHEUS_MULTIPROC_DIR so every worker writes its metric values
+to mmap-backed files that MetricsCollector aggregates on scrape.
+"""
+
+import glob
+import os
+
+from prometheus_client import multiprocess
+
+
+def _multiprocess_dir():
+    return os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+
+
+def on_starting(server):
+    """Start with an empty metrics directory so old worker files are not counted"""
+    path = _multiprocess_dir()
+    if not path:
+        return
+    os.makedirs(path, exist_ok=True)
+    for db_file in glob.glob(os.path.join(path, '*.db')):
+        os.remove(db_file)
+
+
+def child_exit(server, worker):
+    """Drop live gauges belonging to a worker that has exited"""
+    if _multiprocess_dir():
+        multiprocess.mark_process_dead(worker.pid)
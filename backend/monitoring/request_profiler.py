@@ -0,0 +1,353 @@
+"""
+In-Process Request Profiler for SizeWise Suite
+
+Profiles production requests from inside the Flask app instead of issuing
+synthetic HTTP requests from the outside:
+- Samples a configurable fraction of requests
+- Low-overhead stack sampler thread that only runs while sampled requests are in flight
+- Per-endpoint aggregation of collapsed stacks and request latency
+- Per-phase timing (middleware, validation, cache lookup, calculator, serialization, response)
+- Collapsed-stack (Brendan Gregg format) and flame-graph tree export
+"""
+
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from flask import Flask, g, has_request_context, request
+import structlog
+
+logger = structlog.get_logger()
+
+# Phases recorded by the profiler itself around Flask's dispatch
+MIDDLEWARE_PHASE = "middleware"
+VIEW_PHASE = "view"
+RESPONSE_PHASE = "response"
+
+@dataclass
+class PhaseStats:
+    """Aggregated timing for one phase of one endpoint."""
+    count: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+
+    def record(self, seconds: float):
+        self.count += 1
+        self.total_seconds += seconds
+        if seconds > self.max_seconds:
+            self.max_seconds = seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'avg_ms': round(self.total_seconds / self.count * 1000, 3) if self.count else 0.0,
+            'max_ms': round(self.max_seconds * 1000, 3),
+            'total_ms': round(self.total_seconds * 1000, 3)
+        }
+
+@dataclass
+class EndpointStats:
+    """Per-endpoint request, phase and stack sample aggregates."""
+    endpoint: str
+    requests: int = 0
+    sampled_requests: int = 0
+    latency: PhaseStats = field(default_factory=PhaseStats)
+    phases: Dict[str, PhaseStats] = field(default_factory=dict)
+    stacks: Counter = field(default_factory=Counter)
+    stack_samples: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'endpoint': self.endpoint,
+            'requests': self.requests,
+            'sampled_requests': self.sampled_requests,
+            'latency': self.latency.to_dict(),
+            'phases': {name: stats.to_dict() for name, stats in self.phases.items()},
+            'stack_samples': self.stack_samples,
+            'distinct_stacks': len(self.stacks)
+        }
+
+@contextmanager
+def profile_phase(name: str):
+    """
+    Time a named phase of the current request.
+
+    Safe to use anywhere: outside a request context it only yields.
+    """
+    if not has_request_context():
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases = g.setdefault('_profile_phases', {})
+        phases[name] = phases.get(name, 0.0) + (time.perf_counter() - started)
+
+class RequestProfiler:
+    """
+    Flask middleware that records phase timings for every request and
+    samples call stacks for a fraction of them.
+    """
+
+    def __init__(self, app: Optional[Flask] = None, sample_rate: Optional[float] = None,
+                 sampling_interval: Optional[float] = None, max_stack_depth: int = 64,
+                 max_stacks_per_endpoint: int = 5000):
+        self.sample_rate = sample_rate if sample_rate is not None else float(
+            os.getenv('PROFILER_SAMPLE_RATE', '0.01')
+        )
+        self.sampling_interval = sampling_interval if sampling_interval is not None else float(
+            os.getenv('PROFILER_SAMPLING_INTERVAL', '0.005')
+        )
+        self.max_stack_depth = max_stack_depth
+        self.max_stacks_per_endpoint = max_stacks_per_endpoint
+        self.enabled = os.getenv('PROFILER_ENABLED', 'true').lower() == 'true'
+
+        self.endpoints: Dict[str, EndpointStats] = {}
+        self._lock = threading.Lock()
+
+        # Thread id -> endpoint for sampled requests currently in flight
+        self._sampled_threads: Dict[int, str] = {}
+        self._sampler_wakeup = threading.Event()
+        self._sampler_thread: Optional[threading.Thread] = None
+        self._running = False
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        """Initialize profiler with Flask app"""
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        app.teardown_request(self.teardown_request)
+
+        # Split Flask's dispatch into middleware / view / response phases
+        original_dispatch = app.dispatch_request
+
+        def dispatch_request(*args, **kwargs):
+            if has_request_context() and '_profile_started' in g:
+                g._profile_view_started = time.perf_counter()
+                try:
+                    return original_dispatch(*args, **kwargs)
+                finally:
+                    g._profile_view_finished = time.perf_counter()
+            return original_dispatch(*args, **kwargs)
+
+        app.dispatch_request = dispatch_request
+        app.request_profiler = self
+
+        logger.info("Request profiler initialized",
+                   sample_rate=self.sample_rate,
+                   sampling_interval=self.sampling_interval)
+
+    # -------------------------------------------------------------------------
+    # Request hooks
+    # -------------------------------------------------------------------------
+
+    def before_request(self):
+        """Start timing and decide whether to sample this request"""
+        if not self.enabled:
+            return None
+
+        g._profile_started = time.perf_counter()
+        g._profile_phases = {}
+        g._profile_sampled = self.sample_rate > 0 and random.random() < self.sample_rate
+
+        if g._profile_sampled:
+            with self._lock:
+                self._sampled_threads[threading.get_ident()] = self._endpoint_key()
+            self._ensure_sampler()
+            self._sampler_wakeup.set()
+        return None
+
+    def after_request(self, response):
+        """Mark the end of response processing"""
+        if self.enabled and '_profile_started' in g:
+            g._profile_finished = time.perf_counter()
+        return response
+
+    def teardown_request(self, exc=None):
+        """Aggregate timings for the finished request"""
+        if not self.enabled or '_profile_started' not in g:
+            return
+
+        sampled = g.get('_profile_sampled', False)
+        if sampled:
+            with self._lock:
+                self._sampled_threads.pop(threading.get_ident(), None)
+
+        started = g._profile_started
+        finished = g.get('_profile_finished') or time.perf_counter()
+        view_started = g.get('_profile_view_started')
+        view_finished = g.get('_profile_view_finished')
+
+        phases = dict(g.get('_profile_phases', {}))
+        if view_started is not None:
+            phases[MIDDLEWARE_PHASE] = phases.get(MIDDLEWARE_PHASE, 0.0) + (view_started - started)
+            if view_finished is not None:
+                phases[VIEW_PHASE] = view_finished - view_started
+                phases[RESPONSE_PHASE] = max(0.0, finished - view_finished)
+
+        self._record_request(self._endpoint_key(), finished - started, phases, sampled)
+
+    def _endpoint_key(self) -> str:
+        # Raw paths of unmatched requests (scanners, typos) would grow the endpoint table without bound
+        return f"{request.method} {request.url_rule.rule if request.url_rule else '<unmatched>'}"
+
+    def _record_request(self, endpoint: str, duration: float, phases: Dict[str, float],
+                        sampled: bool):
+        with self._lock:
+            stats = self.endpoints.get(endpoint)
+            if stats is None:
+                stats = self.endpoints[endpoint] = EndpointStats(endpoint=endpoint)
+            stats.requests += 1
+            if sampled:
+                stats.sampled_requests += 1
+            stats.latency.record(duration)
+            for name, seconds in phases.items():
+                phase_stats = stats.phases.get(name)
+                if phase_stats is None:
+                    phase_stats = stats.phases[name] = PhaseStats()
+                phase_stats.record(seconds)
+
+    # -------------------------------------------------------------------------
+    # Stack sampler
+    # -------------------------------------------------------------------------
+
+    def _ensure_sampler(self):
+        if self._running:
+            return
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            self._sampler_thread = threading.Thread(
+                target=self._sampler_loop, name="request-profiler-sampler", daemon=True
+            )
+            self._sampler_thread.start()
+
+    def stop(self):
+        """Stop the sampler thread"""
+        self._running = False
+        self._sampler_wakeup.set()
+        if self._sampler_thread:
+            self._sampler_thread.join(timeout=1.0)
+            self._sampler_thread = None
+
+    def _sampler_loop(self):
+        while self._running:
+            if not self._sampled_threads:
+                # Idle until a sampled request starts
+                self._sampler_wakeup.wait()
+                self._sampler_wakeup.clear()
+                continue
+            self.sample_once()
+            time.sleep(self.sampling_interval)
+
+    def sample_once(self):
+        """Capture one stack sample for every sampled request in flight"""
+        with self._lock:
+            targets = list(self._sampled_threads.items())
+        if not targets:
+            return
+
+        frames = sys._current_frames()
+        collapsed = []
+        for thread_id, endpoint in targets:
+            frame = frames.get(thread_id)
+            if frame is not None:
+                collapsed.append((endpoint, self._collapse(frame)))
+
+        with self._lock:
+            for endpoint, stack in collapsed:
+                stats = self.endpoints.get(endpoint)
+                if stats is None:
+                    stats = self.endpoints[endpoint] = EndpointStats(endpoint=endpoint)
+                if stack not in stats.stacks and len(stats.stacks) >= self.max_stacks_per_endpoint:
+                    stack = "[truncated]"
+                stats.stacks[stack] += 1
+                stats.stack_samples += 1
+
+    def _collapse(self, frame) -> str:
+        """Render a frame chain root-first as ``file:function;file:function``"""
+        names: List[str] = []
+        while frame is not None and len(names) < self.max_stack_depth:
+            code = frame.f_code
+            names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        names.reverse()
+        return ";".join(names)
+
+    # -------------------------------------------------------------------------
+    # Export
+    # -------------------------------------------------------------------------
+
+    def get_summary(self) -> Dict[str, Any]:
+        """Per-endpoint latency and phase breakdown, slowest first"""
+        with self._lock:
+            endpoints = [stats.to_dict() for stats in self.endpoints.values()]
+        endpoints.sort(key=lambda e: e['latency']['total_ms'], reverse=True)
+        return {
+            'enabled': self.enabled,
+            'sample_rate': self.sample_rate,
+            'sampling_interval': self.sampling_interval,
+            'endpoints': endpoints
+        }
+
+    def get_collapsed_stacks(self, endpoint: Optional[str] = None) -> str:
+        """Export stacks as ``frame;frame;frame count`` lines, prefixed by endpoint"""
+        lines = []
+        with self._lock:
+            for key, stats in self.endpoints.items():
+                if endpoint and key != endpoint:
+                    continue
+                root = key.replace(' ', '_')
+                for stack, count in stats.stacks.items():
+                    lines.append(f"{root};{stack} {count}")
+        lines.sort()
+        return "\n".join(lines) + ("\n" if lines else "")
+
+    def get_flame_graph(self, endpoint: Optional[str] = None) -> Dict[str, Any]:
+        """Export stacks as a nested ``{name, value, children}`` tree"""
+        root = {'name': 'root', 'value': 0, 'children': []}
+        index: Dict[int, Dict[str, Dict[str, Any]]] = {}
+
+        for line in self.get_collapsed_stacks(endpoint).splitlines():
+            stack, _, count = line.rpartition(' ')
+            value = int(count)
+            node = root
+            node['value'] += value
+            for name in stack.split(';'):
+                children = index.setdefault(id(node), {})
+                child = children.get(name)
+                if child is None:
+                    child = children[name] = {'name': name, 'value': 0, 'children': []}
+                    node['children'].append(child)
+                child['value'] += value
+                node = child
+        return root
+
+    def reset(self):
+        """Clear all aggregated data"""
+        with self._lock:
+            self.endpoints.clear()
+
+# Global request profiler instance
+request_profiler = None
+
+def initialize_request_profiler(app: Optional[Flask] = None, **kwargs) -> RequestProfiler:
+    """Initialize the global request profiler."""
+    global request_profiler
+    request_profiler = RequestProfiler(app, **kwargs)
+    return request_profiler
+
+def get_request_profiler() -> Optional[RequestProfiler]:
+    """Get the global request profiler instance."""
+    return request_profiler
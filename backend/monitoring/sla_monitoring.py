@@ -12,21 +12,38 @@ Features:
 - API response time monitoring
 - Uptime monitoring and tracking
 - Custom SLA target configuration
+- Rolling 1m/5m/1h/30d windows with constant-time updates
+- Multi-window error-budget burn-rate alerting
 
 Designed to ensure production SLA compliance and provide actionable insights.
 """
 
 import asyncio
 import json
+import math
 import time
+from collections import deque
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Tuple
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
 from enum import Enum
 import structlog
 
 logger = structlog.get_logger()
 
+_EPOCH = datetime(1970, 1, 1)
+
+# Rolling windows kept per metric type: name -> (window seconds, bucket count)
+SLA_WINDOWS = {
+    "1m": (60, 60),
+    "5m": (300, 60),
+    "1h": (3600, 60),
+    "30d": (30 * 86400, 720),
+}
+
+# Severity order used when several burn-rate rules fire at once
+SEVERITY_RANK = {"MEDIUM": 1, "HIGH": 2, "CRITICAL": 3}
+
 class SLAMetricType(Enum):
     """Types of SLA metrics to track."""
     UPTIME = "uptime"
@@ -53,6 +70,7 @@ class SLATarget:
     unit: str                # Unit of measurement (%, ms, count, etc.)
     measurement_window: int   # Window in minutes for measurement
     description: str
+    error_budget: float = 0.01  # Fraction of measurements allowed to breach
 
 @dataclass
 class SLAMeasurement:
@@ -92,12 +110,187 @@ class SLAReport:
     recommendations: List[str]
     generated_at: datetime
 
+@dataclass
+class BurnRateRule:
+    """Multi-window burn-rate alert rule.
+
+    Fires only while both the long and the short window burn the error budget
+    at least ``burn_rate`` times faster than sustainable: the long window keeps
+    a single bad sample from alerting, the short window resets the alert
+    quickly once the problem stops. Burn rates over a handful of samples are
+    noise, so the long window must also hold ``min_events`` samples and both
+    windows at least ``min_bad_events`` bad ones.
+    """
+    long_window: str
+    short_window: str
+    burn_rate: float
+    severity: str
+    min_events: int = 20
+    min_bad_events: int = 3
+
+@dataclass
+class BurnRateEvaluation:
+    """Result of evaluating burn-rate rules for one metric type."""
+    metric_type: SLAMetricType
+    burn_rates: Dict[str, float]
+    rule: Optional[BurnRateRule] = None
+
+    @property
+    def firing(self) -> bool:
+        return self.rule is not None
+
+DEFAULT_BURN_RATE_RULES = [
+    BurnRateRule(long_window="1h", short_window="5m", burn_rate=14.4, severity="CRITICAL"),
+    BurnRateRule(long_window="1h", short_window="5m", burn_rate=6.0, severity="HIGH"),
+    BurnRateRule(long_window="30d", short_window="1h", burn_rate=1.0, severity="MEDIUM"),
+]
+
+class RollingWindow:
+    """
+    Sliding window over a fixed ring of time buckets.
+
+    Each bucket keeps a count, bad count and value sum, and running totals are
+    adjusted as buckets expire, so both updates and reads cost at most one pass
+    over the ring regardless of how many samples the window holds.
+    """
+
+    def __init__(self, window_seconds: float, bucket_count: int = 60):
+        self.window_seconds = window_seconds
+        self.bucket_count = bucket_count
+        self.bucket_seconds = window_seconds / bucket_count
+        self._counts = [0] * bucket_count
+        self._bad = [0] * bucket_count
+        self._good = [0] * bucket_count
+        self._sums = [0.0] * bucket_count
+        self._head: Optional[int] = None  # Absolute index of the newest bucket
+        self.count = 0
+        self.bad = 0
+        self.good = 0
+        self.total = 0.0
+
+    def _advance(self, bucket: int):
+        if self._head is None:
+            self._head = bucket
+            return
+        if bucket <= self._head:
+            return
+        for step in range(1, min(bucket - self._head, self.bucket_count) + 1):
+            slot = (self._head + step) % self.bucket_count
+            self.count -= self._counts[slot]
+            self.bad -= self._bad[slot]
+            self.good -= self._good[slot]
+            self.total -= self._sums[slot]
+            self._counts[slot] = 0
+            self._bad[slot] = 0
+            self._good[slot] = 0
+            self._sums[slot] = 0.0
+        self._head = bucket
+
+    def add(self, timestamp: float, value: float, bad: bool = False, good: bool = False) -> bool:
+        """Add a sample; returns False if it is older than the window"""
+        bucket = int(timestamp // self.bucket_seconds)
+        self._advance(bucket)
+        if bucket <= self._head - self.bucket_count:
+            return False
+        slot = bucket % self.bucket_count
+        self._counts[slot] += 1
+        self._sums[slot] += value
+        self.count += 1
+        self.total += value
+        if bad:
+            self._bad[slot] += 1
+            self.bad += 1
+        if good:
+            self._good[slot] += 1
+            self.good += 1
+        return True
+
+    def counts_between(self, start: float, end: float) -> Tuple[int, int, int]:
+        """(count, good, bad) over the buckets starting in ``[start, end)``"""
+        count = good = bad = 0
+        if self._head is None:
+            return count, good, bad
+        first = max(self._head - self.bucket_count + 1, math.ceil(start / self.bucket_seconds))
+        last = min(self._head, math.ceil(end / self.bucket_seconds) - 1)
+        for bucket in range(first, last + 1):
+            slot = bucket % self.bucket_count
+            count += self._counts[slot]
+            good += self._good[slot]
+            bad += self._bad[slot]
+        return count, good, bad
+
+    def expire(self, now: float):
+        """Drop buckets that have fallen out of the window at ``now``"""
+        self._advance(int(now // self.bucket_seconds))
+
+    def bad_fraction(self) -> float:
+        return self.bad / self.count if self.count else 0.0
+
+    def average(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+class SLAWindowSet:
+    """Rolling windows for one SLA metric type."""
+
+    def __init__(self, windows: Optional[Dict[str, Tuple[float, int]]] = None):
+        self.windows = {
+            name: RollingWindow(seconds, buckets)
+            for name, (seconds, buckets) in (windows or SLA_WINDOWS).items()
+        }
+
+    def observe(self, timestamp: float, value: float, bad: bool, good: bool = False):
+        for window in self.windows.values():
+            window.add(timestamp, value, bad, good)
+
+    def expire(self, now: float):
+        for window in self.windows.values():
+            window.expire(now)
+
+    def burn_rate(self, window: str, error_budget: float) -> float:
+        """How many times faster than sustainable the budget is being spent"""
+        if error_budget <= 0:
+            return float('inf') if self.windows[window].bad else 0.0
+        return self.windows[window].bad_fraction() / error_budget
+
+    def error_budget_remaining(self, window: str, error_budget: float) -> float:
+        """Fraction of the window's error budget still unspent"""
+        rolling = self.windows[window]
+        if not rolling.count:
+            return 1.0
+        allowed = error_budget * rolling.count
+        if allowed <= 0:
+            return 0.0 if rolling.bad else 1.0
+        return max(0.0, 1.0 - rolling.bad / allowed)
+
+    def summary(self, error_budget: float) -> Dict[str, Any]:
+        return {
+            name: {
+                "count": rolling.count,
+                "bad": rolling.bad,
+                "average": rolling.average(),
+                "burn_rate": round(self.burn_rate(name, error_budget), 3)
+            }
+            for name, rolling in self.windows.items()
+        }
+
+def _window_time(timestamp: datetime) -> float:
+    return (timestamp - _EPOCH).total_seconds()
+
+# Window whose buckets answer report and trend queries (hourly buckets over 30 days)
+REPORT_WINDOW = "30d"
+
 class SLAMonitoringManager:
     """Comprehensive SLA monitoring and reporting manager."""
     
-    def __init__(self):
+    def __init__(self, max_measurements: int = 10000):
         self.sla_targets = {}
-        self.measurements = []
+        self.measurements = deque(maxlen=max_measurements)
+        self.latest_measurements: Dict[SLAMetricType, SLAMeasurement] = {}
+        self.windows: Dict[SLAMetricType, SLAWindowSet] = {}
+        self.burn_rate_rules = sorted(
+            DEFAULT_BURN_RATE_RULES, key=lambda rule: SEVERITY_RANK[rule.severity], reverse=True
+        )
+        self.open_burn_alerts: Dict[SLAMetricType, str] = {}
         self.breaches = {}
         self.reports = {}
         self.monitoring_enabled = True
@@ -181,7 +374,8 @@ class SLAMonitoringManager:
         self,
         metric_type: SLAMetricType,
         value: float,
-        metadata: Optional[Dict[str, Any]] = None
+        metadata: Optional[Dict[str, Any]] = None,
+        timestamp: Optional[datetime] = None
     ) -> SLAMeasurement:
         """Record a new SLA measurement."""
         try:
@@ -209,7 +403,7 @@ class SLAMonitoringManager:
             
             measurement = SLAMeasurement(
                 metric_type=metric_type,
-                timestamp=datetime.utcnow(),
+                timestamp=timestamp or datetime.utcnow(),
                 value=value,
                 target_value=target.target_value,
                 status=status,
@@ -218,12 +412,21 @@ class SLAMonitoringManager:
             )
             
             self.measurements.append(measurement)
+            self.latest_measurements[metric_type] = measurement
+            
+            window_set = self.windows.get(metric_type)
+            if window_set is None:
+                window_set = self.windows[metric_type] = SLAWindowSet()
+            window_set.observe(
+                _window_time(measurement.timestamp), value,
+                bad=status == SLAStatus.BREACH, good=status == SLAStatus.COMPLIANT
+            )
             
-            # Trigger breach detection if needed
-            if status == SLAStatus.BREACH:
-                await self._handle_sla_breach(measurement)
+            # Alert on sustained error-budget burn rather than single samples
+            evaluation = self.evaluate_burn_rate(metric_type)
+            await self._update_burn_rate_alert(measurement, evaluation)
             
-            logger.info(
+            logger.debug(
                 "SLA measurement recorded",
                 metric_type=metric_type.value,
                 value=value,
@@ -236,23 +439,80 @@ class SLAMonitoringManager:
             logger.error("Failed to record SLA measurement", error=str(e))
             raise
     
-    async def _handle_sla_breach(self, measurement: SLAMeasurement):
+    def evaluate_burn_rate(
+        self,
+        metric_type: SLAMetricType,
+        now: Optional[datetime] = None
+    ) -> BurnRateEvaluation:
+        """Evaluate multi-window burn-rate rules for a metric type."""
+        target = self.sla_targets[metric_type]
+        window_set = self.windows.get(metric_type)
+        if window_set is None:
+            return BurnRateEvaluation(metric_type=metric_type, burn_rates={})
+        if now is not None:
+            window_set.expire(_window_time(now))
+        
+        burn_rates = {
+            name: window_set.burn_rate(name, target.error_budget)
+            for name in window_set.windows
+        }
+        for rule in self.burn_rate_rules:
+            long_window = window_set.windows[rule.long_window]
+            short_window = window_set.windows[rule.short_window]
+            if (long_window.count < rule.min_events or
+                    min(long_window.bad, short_window.bad) < rule.min_bad_events):
+                continue
+            if (burn_rates[rule.long_window] >= rule.burn_rate and
+                    burn_rates[rule.short_window] >= rule.burn_rate):
+                return BurnRateEvaluation(metric_type=metric_type, burn_rates=burn_rates, rule=rule)
+        return BurnRateEvaluation(metric_type=metric_type, burn_rates=burn_rates)
+    
+    async def _update_burn_rate_alert(
+        self,
+        measurement: SLAMeasurement,
+        evaluation: BurnRateEvaluation
+    ):
+        """Open, escalate or resolve the burn-rate breach for a metric type."""
+        breach_id = self.open_burn_alerts.get(measurement.metric_type)
+        breach = self.breaches.get(breach_id) if breach_id else None
+        
+        if evaluation.firing:
+            if breach is None:
+                await self._handle_sla_breach(measurement, evaluation)
+            elif SEVERITY_RANK[evaluation.rule.severity] > SEVERITY_RANK.get(breach.severity, 0):
+                breach.severity = evaluation.rule.severity
+                await self._send_breach_notification(breach, measurement)
+                if breach.severity == "CRITICAL":
+                    await self._create_sla_incident(breach, measurement)
+        elif breach is not None:
+            self._resolve_breach(breach, measurement.timestamp)
+    
+    def _resolve_breach(self, breach: SLABreach, resolved_at: datetime):
+        """Close a breach and stop tracking it as an open burn-rate alert."""
+        breach.breach_end = resolved_at
+        breach.duration_minutes = int(
+            (breach.breach_end - breach.breach_start).total_seconds() / 60
+        )
+        if self.open_burn_alerts.get(breach.metric_type) == breach.id:
+            del self.open_burn_alerts[breach.metric_type]
+        
+        logger.info(
+            "SLA breach resolved",
+            breach_id=breach.id,
+            duration_minutes=breach.duration_minutes
+        )
+    
+    async def _handle_sla_breach(
+        self,
+        measurement: SLAMeasurement,
+        evaluation: BurnRateEvaluation
+    ):
         """Handle SLA breach detection and notification."""
         try:
-            breach_id = f"SLA-{measurement.metric_type.value}-{int(time.time())}"
-            
-            # Determine severity based on how far below target
-            if measurement.metric_type in [SLAMetricType.UPTIME, SLAMetricType.AVAILABILITY]:
-                deviation = measurement.target_value - measurement.value
-            else:
-                deviation = measurement.value - measurement.target_value
-            
-            if deviation > 10:
-                severity = "CRITICAL"
-            elif deviation > 5:
-                severity = "HIGH"
-            else:
-                severity = "MEDIUM"
+            breach_id = f"SLA-{measurement.metric_type.value}-{int(time.time() * 1000)}"
+            rule = evaluation.rule
+            severity = rule.severity
+            unit = self.sla_targets[measurement.metric_type].unit
             
             breach = SLABreach(
                 id=breach_id,
@@ -261,13 +521,19 @@ class SLAMonitoringManager:
                 breach_end=None,
                 duration_minutes=None,
                 severity=severity,
-                impact_description=f"{measurement.metric_type.value} SLA breach: {measurement.value}{self.sla_targets[measurement.metric_type].unit} (target: {measurement.target_value}{self.sla_targets[measurement.metric_type].unit})",
+                impact_description=(
+                    f"{measurement.metric_type.value} error budget burning "
+                    f"{evaluation.burn_rates[rule.long_window]:.1f}x over {rule.long_window} and "
+                    f"{evaluation.burn_rates[rule.short_window]:.1f}x over {rule.short_window}: "
+                    f"{measurement.value}{unit} (target: {measurement.target_value}{unit})"
+                ),
                 root_cause=None,
                 resolution_notes=None,
                 created_incident_id=None
             )
             
             self.breaches[breach_id] = breach
+            self.open_burn_alerts[measurement.metric_type] = breach_id
             
             # Send breach notification
             await self._send_breach_notification(breach, measurement)
@@ -280,7 +546,8 @@ class SLAMonitoringManager:
                 "SLA breach detected",
                 breach_id=breach_id,
                 metric_type=measurement.metric_type.value,
-                severity=severity
+                severity=severity,
+                burn_rates=evaluation.burn_rates
             )
             
         except Exception as e:
@@ -341,42 +608,26 @@ class SLAMonitoringManager:
         try:
             report_id = f"SLA-REPORT-{int(time.time())}"
             
-            # Filter measurements for the period
-            period_measurements = [
-                m for m in self.measurements
-                if period_start <= m.timestamp <= period_end
-            ]
-            
-            # Calculate overall compliance
-            total_measurements = len(period_measurements)
-            compliant_measurements = len([
-                m for m in period_measurements
-                if m.status == SLAStatus.COMPLIANT
-            ])
+            # Count totals and compliant measurements per metric from the window buckets
+            totals = {metric_type: 0 for metric_type in SLAMetricType}
+            compliant = {metric_type: 0 for metric_type in SLAMetricType}
+            for metric_type in SLAMetricType:
+                totals[metric_type], compliant[metric_type] = self.compliance_counts(
+                    metric_type, period_start, period_end
+                )
             
+            total_measurements = sum(totals.values())
+            compliant_measurements = sum(compliant.values())
             overall_compliance = (
                 (compliant_measurements / total_measurements * 100)
                 if total_measurements > 0 else 0.0
             )
             
-            # Calculate per-metric compliance
-            metric_compliance = {}
-            for metric_type in SLAMetricType:
-                metric_measurements = [
-                    m for m in period_measurements
-                    if m.metric_type == metric_type
-                ]
-                
-                if metric_measurements:
-                    compliant_count = len([
-                        m for m in metric_measurements
-                        if m.status == SLAStatus.COMPLIANT
-                    ])
-                    metric_compliance[metric_type] = (
-                        compliant_count / len(metric_measurements) * 100
-                    )
-                else:
-                    metric_compliance[metric_type] = 0.0
+            metric_compliance = {
+                metric_type: (compliant[metric_type] / totals[metric_type] * 100)
+                if totals[metric_type] else 0.0
+                for metric_type in SLAMetricType
+            }
             
             # Get breaches for the period
             period_breaches = [
@@ -429,6 +680,26 @@ class SLAMonitoringManager:
             logger.error("Failed to generate SLA report", error=str(e))
             raise
     
+    def compliance_counts(
+        self,
+        metric_type: SLAMetricType,
+        period_start: datetime,
+        period_end: datetime
+    ) -> Tuple[int, int]:
+        """
+        Measurement and compliant-measurement counts for a period.
+        
+        Read from the hourly buckets of the 30-day window, so periods are
+        rounded to whole hours and nothing older than 30 days is counted.
+        """
+        window_set = self.windows.get(metric_type)
+        if window_set is None:
+            return 0, 0
+        count, good, _ = window_set.windows[REPORT_WINDOW].counts_between(
+            _window_time(period_start), _window_time(period_end)
+        )
+        return count, good
+    
     def _generate_sla_recommendations(
         self,
         overall_compliance: float,
@@ -506,23 +777,17 @@ class SLAMonitoringManager:
                 await asyncio.sleep(60)
     
     async def _check_breach_resolutions(self):
-        """Check if any ongoing breaches have been resolved."""
+        """Resolve burn-rate breaches whose windows have recovered."""
         try:
-            for breach in self.breaches.values():
-                if breach.breach_end is None:
-                    # Check if breach is resolved (would be actual implementation)
-                    # For now, simulate resolution after some time
-                    if (datetime.utcnow() - breach.breach_start).total_seconds() > 1800:  # 30 minutes
-                        breach.breach_end = datetime.utcnow()
-                        breach.duration_minutes = int(
-                            (breach.breach_end - breach.breach_start).total_seconds() / 60
-                        )
-                        
-                        logger.info(
-                            "SLA breach resolved",
-                            breach_id=breach.id,
-                            duration_minutes=breach.duration_minutes
-                        )
+            now = datetime.utcnow()
+            for metric_type, breach_id in list(self.open_burn_alerts.items()):
+                breach = self.breaches.get(breach_id)
+                if breach is None or breach.breach_end is not None:
+                    self.open_burn_alerts.pop(metric_type, None)
+                    continue
+                # Expire old buckets so a metric that stopped reporting can recover
+                if not self.evaluate_burn_rate(metric_type, now).firing:
+                    self._resolve_breach(breach, now)
                         
         except Exception as e:
             logger.error("Failed to check breach resolutions", error=str(e))
@@ -546,28 +811,26 @@ class SLAMonitoringManager:
     def get_current_sla_status(self) -> Dict[str, Any]:
         """Get current SLA status summary."""
         try:
-            # Get recent measurements (last hour)
+            # Only report measurements from the last hour
             recent_time = datetime.utcnow() - timedelta(hours=1)
-            recent_measurements = [
-                m for m in self.measurements
-                if m.timestamp >= recent_time
-            ]
             
             status_summary = {}
             for metric_type in SLAMetricType:
-                metric_measurements = [
-                    m for m in recent_measurements
-                    if m.metric_type == metric_type
-                ]
+                latest = self.latest_measurements.get(metric_type)
                 
-                if metric_measurements:
-                    latest = max(metric_measurements, key=lambda x: x.timestamp)
+                if latest is not None and latest.timestamp >= recent_time:
+                    target = self.sla_targets[metric_type]
+                    window_set = self.windows[metric_type]
                     status_summary[metric_type.value] = {
                         "current_value": latest.value,
                         "target_value": latest.target_value,
                         "status": latest.status.value,
-                        "unit": self.sla_targets[metric_type].unit,
-                        "last_updated": latest.timestamp.isoformat()
+                        "unit": target.unit,
+                        "last_updated": latest.timestamp.isoformat(),
+                        "windows": window_set.summary(target.error_budget),
+                        "error_budget_remaining": round(
+                            window_set.error_budget_remaining("30d", target.error_budget), 4
+                        )
                     }
                 else:
                     status_summary[metric_type.value] = {
@@ -26,8 +26,7 @@ import structlog
 
 from .sla_monitoring import (
     get_sla_monitoring_manager,
-    SLAMetricType,
-    SLAStatus
+    SLAMetricType
 )
 
 logger = structlog.get_logger()
@@ -373,47 +372,33 @@ def get_compliance_trend():
         metric_type = request.args.get('metric_type')
         
         end_time = datetime.utcnow()
-        start_time = end_time - timedelta(hours=hours)
-        
-        # Filter measurements
-        measurements = [
-            m for m in manager.measurements
-            if start_time <= m.timestamp <= end_time
-        ]
+        start_time = (end_time - timedelta(hours=hours)).replace(minute=0, second=0, microsecond=0)
         
+        metric_types = list(SLAMetricType)
         if metric_type:
             try:
-                metric_enum = SLAMetricType(metric_type)
-                measurements = [m for m in measurements if m.metric_type == metric_enum]
+                metric_types = [SLAMetricType(metric_type)]
             except ValueError:
                 return jsonify({
                     'success': False,
                     'error': f'Invalid metric type: {metric_type}'
                 }), 400
         
-        # Group by hour and calculate compliance
+        # Hourly compliance from the SLA window buckets
         trend_data = []
         current_time = start_time
         while current_time < end_time:
             hour_end = current_time + timedelta(hours=1)
-            hour_measurements = [
-                m for m in measurements
-                if current_time <= m.timestamp < hour_end
-            ]
-            
-            if hour_measurements:
-                compliant_count = len([
-                    m for m in hour_measurements
-                    if m.status == SLAStatus.COMPLIANT
-                ])
-                compliance_rate = (compliant_count / len(hour_measurements)) * 100
-            else:
-                compliance_rate = None
+            measurement_count = compliant_count = 0
+            for metric_enum in metric_types:
+                count, compliant = manager.compliance_counts(metric_enum, current_time, hour_end)
+                measurement_count += count
+                compliant_count += compliant
             
             trend_data.append({
                 'timestamp': current_time.isoformat(),
-                'compliance_rate': compliance_rate,
-                'measurement_count': len(hour_measurements)
+                'compliance_rate': (compliant_count / measurement_count) * 100 if measurement_count else None,
+                'measurement_count': measurement_count
             })
             
             current_time = hour_end
@@ -456,8 +441,8 @@ def sla_health_check():
         }
         
         # Get last measurement timestamp
-        if manager.measurements:
-            latest_measurement = max(manager.measurements, key=lambda x: x.timestamp)
+        if manager.latest_measurements:
+            latest_measurement = max(manager.latest_measurements.values(), key=lambda x: x.timestamp)
             health_status['last_measurement'] = latest_measurement.timestamp.isoformat()
         
         # Determine overall health
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Alert Rule Evaluation Benchmark for SizeWise Suite Backend
+
+Measures the cost of event-driven alert evaluation as the number of rules
+grows. Rules are spread across a configurable number of metrics with a mix
+of aggregations, windows, conditions and thresholds, then a stream of
+samples is fed through AlertRuleEngine.observe().
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from backend.monitoring.alert_rule_engine import AlertRuleEngine
+from backend.monitoring.MetricsCollector import AlertRule, AlertSeverity
+
+AGGREGATIONS = [
+    ("last", 60, 0.95),
+    ("avg", 60, 0.95),
+    ("avg", 300, 0.95),
+    ("rate", 60, 0.95),
+    ("quantile", 300, 0.95),
+    ("quantile", 300, 0.99),
+]
+CONDITIONS = [">", ">=", "<", "<="]
+
+
+def build_rules(rule_count: int, metric_count: int, seed: int):
+    """Generate a reproducible rule set spread over ``metric_count`` metrics."""
+    rng = random.Random(seed)
+    rules = []
+    for i in range(rule_count):
+        aggregation, window, quantile = rng.choice(AGGREGATIONS)
+        rules.append(AlertRule(
+            name=f"bench_rule_{i}",
+            metric_name=f"bench_metric_{i % metric_count}",
+            condition=rng.choice(CONDITIONS),
+            threshold=rng.uniform(0, 100),
+            severity=AlertSeverity.WARNING,
+            duration_seconds=rng.choice([0, 30, 60, 300]),
+            aggregation=aggregation,
+            window_seconds=window,
+            quantile=quantile
+        ))
+    return rules
+
+
+def run_benchmark(rule_count: int, metric_count: int, samples: int, seed: int = 42) -> dict:
+    """Feed ``samples`` samples through an engine loaded with ``rule_count`` rules."""
+    engine = AlertRuleEngine()
+    started = time.perf_counter()
+    engine.set_rules(build_rules(rule_count, metric_count, seed))
+    load_seconds = time.perf_counter() - started
+
+    rng = random.Random(seed + 1)
+    stream = [
+        (f"bench_metric_{rng.randrange(metric_count)}", rng.uniform(0, 100), i * 0.1)
+        for i in range(samples)
+    ]
+
+    transitions = 0
+    latencies = []
+    started = time.perf_counter()
+    for metric_name, value, timestamp in stream:
+        sample_started = time.perf_counter()
+        transitions += len(engine.observe(metric_name, value, timestamp))
+        latencies.append(time.perf_counter() - sample_started)
+    total_seconds = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "rules": rule_count,
+        "metrics": metric_count,
+        "samples": samples,
+        "rule_load_ms": round(load_seconds * 1000, 2),
+        "samples_per_second": round(samples / total_seconds, 1),
+        "p50_us": round(latencies[len(latencies) // 2] * 1e6, 1),
+        "p99_us": round(latencies[int(len(latencies) * 0.99) - 1] * 1e6, 1),
+        "transitions": transitions,
+        "engine": engine.get_statistics()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark alert rule evaluation")
+    parser.add_argument("--rules", type=int, nargs="+", default=[100, 1000, 5000, 10000],
+                        help="Rule counts to benchmark")
+    parser.add_argument("--metrics", type=int, default=50, help="Distinct metric names")
+    parser.add_argument("--samples", type=int, default=20000, help="Samples per run")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'rules':>8} {'samples/s':>12} {'p50 us':>10} {'p99 us':>10} {'transitions':>12}")
+    for rule_count in args.rules:
+        result = run_benchmark(rule_count, args.metrics, args.samples)
+        results.append(result)
+        print(f"{result['rules']:>8} {result['samples_per_second']:>12} "
+              f"{result['p50_us']:>10} {result['p99_us']:>10} {result['transitions']:>12}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Bulk Segment Ingestion Benchmark for SizeWise Suite Backend
+
+Measures rows/sec for loading project segments through the bulk loader at
+increasing batch sizes. The SQLite path (offline database) always runs
+against a fresh database built from database/schema.sql and is compared
+with the previous executemany INSERT ... RETURNING path. Pass
+--postgres-url to also benchmark the COPY path against an existing
+PostgreSQL database that has the project and user referenced by
+--project-id and --user-id.
+"""
+
+import argparse
+import json
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import MetaData, create_engine, insert
+from sqlalchemy.orm import Session
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from backend.database.bulk_loader import SEGMENTS_TABLE, load_postgresql, load_sqlite
+
+SCHEMA_FILE = Path(__file__).resolve().parents[1] / "database" / "schema.sql"
+SEGMENT_TYPES = ["duct", "fitting", "equipment", "terminal"]
+
+
+def build_segments(count: int, user_id: str, seed: int = 42):
+    """Generate a reproducible CAD-import-sized batch of segments."""
+    rng = random.Random(seed)
+    return [
+        {
+            "user_id": user_id,
+            "name": f"Segment {i}",
+            "segment_type": rng.choice(SEGMENT_TYPES),
+            "calculation_data": {"cfm": rng.uniform(100, 5000), "pressure_drop": rng.uniform(0.01, 0.5)},
+            "geometry_data": {"start": [rng.random(), rng.random(), 0], "length": rng.uniform(1, 20)},
+        }
+        for i in range(count)
+    ]
+
+
+def fresh_sqlite_database(directory: str, name: str, user_id: str, project_id: str):
+    connection = sqlite3.connect(Path(directory) / f"{name}.db")
+    connection.executescript(SCHEMA_FILE.read_text())
+    connection.execute("INSERT INTO users (id, email) VALUES (?, ?)", (user_id, "bench@example.com"))
+    connection.execute("INSERT INTO projects (id, user_id, name) VALUES (?, ?, ?)",
+                       (project_id, user_id, "Benchmark"))
+    connection.commit()
+    return connection
+
+
+def returning_insert_sqlite(database_path: Path, segments, project_id: str) -> float:
+    """Baseline: the previous executemany INSERT ... RETURNING through SQLAlchemy."""
+    engine = create_engine(f"sqlite:///{database_path}")
+    metadata = MetaData()
+    metadata.reflect(bind=engine, only=["project_segments"])
+    table = metadata.tables["project_segments"]
+    started = time.perf_counter()
+    current_time = datetime.utcnow()
+    insert_data = [
+        {
+            **segment,
+            "id": str(uuid.uuid4()),
+            "project_id": project_id,
+            "calculation_data": json.dumps(segment["calculation_data"]),
+            "geometry_data": json.dumps(segment["geometry_data"]),
+            "created_at": current_time,
+            "updated_at": current_time,
+        }
+        for segment in segments
+    ]
+    with Session(engine) as session:
+        session.execute(insert(table).returning(table.c.id), insert_data).all()
+        session.commit()
+    seconds = time.perf_counter() - started
+    engine.dispose()
+    return seconds
+
+
+def run_benchmark(size: int, args, directory: str) -> dict:
+    segments = build_segments(size, args.user_id)
+    overrides = {"project_id": args.project_id}
+
+    connection = fresh_sqlite_database(directory, f"bulk_{size}", args.user_id, args.project_id)
+    started = time.perf_counter()
+    load_sqlite(connection, SEGMENTS_TABLE, segments, overrides=overrides)
+    bulk_seconds = time.perf_counter() - started
+    connection.close()
+
+    result = {
+        "rows": size,
+        "sqlite_bulk_rows_per_second": round(size / bulk_seconds),
+    }
+
+    if size <= args.baseline_max_rows:
+        fresh_sqlite_database(directory, f"returning_{size}", args.user_id, args.project_id).close()
+        result["sqlite_returning_rows_per_second"] = round(size / returning_insert_sqlite(
+            Path(directory) / f"returning_{size}.db", segments, args.project_id
+        ))
+
+    if args.postgres_url:
+        import psycopg2
+
+        connection = psycopg2.connect(args.postgres_url)
+        try:
+            started = time.perf_counter()
+            load = load_postgresql(connection, SEGMENTS_TABLE, segments, overrides=overrides,
+                                   chunk_size=args.chunk_size)
+            copy_seconds = time.perf_counter() - started
+            with connection.cursor() as cursor:
+                cursor.execute("DELETE FROM project_segments WHERE id = ANY(%s)", (load.ids,))
+            connection.commit()
+        finally:
+            connection.close()
+        result["postgresql_copy_rows_per_second"] = round(size / copy_seconds)
+        result["postgresql_chunks"] = load.chunks
+
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark bulk segment ingestion")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="Batch sizes to benchmark")
+    parser.add_argument("--baseline-max-rows", type=int, default=100000,
+                        help="Skip the INSERT ... RETURNING baseline above this batch size")
+    parser.add_argument("--postgres-url", help="Also benchmark COPY against this database")
+    parser.add_argument("--project-id", default="00000000-0000-0000-0000-000000000001")
+    parser.add_argument("--user-id", default="00000000-0000-0000-0000-000000000002")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="Rows per COPY transaction")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'rows':>8} {'sqlite bulk/s':>14} {'returning/s':>12} {'pg copy/s':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.rows:
+            result = run_benchmark(size, args, directory)
+            results.append(result)
+            print(f"{result['rows']:>8} {result['sqlite_bulk_rows_per_second']:>14} "
+                  f"{result.get('sqlite_returning_rows_per_second', '-'):>12} "
+                  f"{result.get('postgresql_copy_rows_per_second', '-'):>12}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
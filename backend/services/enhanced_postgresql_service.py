@@ -7,22 +7,36 @@ Provides high-level PostgreSQL operations with performance optimizations includi
 - Bulk operations for better performance
 - Query plan analysis and optimization
 - Connection monitoring and health checks
+
+Queries run on a dedicated thread pool sized to the connection pool, so the
+async methods never block the event loop while a statement is in flight.
 """
 
 import asyncio
+import functools
+import os
+import re
+import threading
 import time
-from typing import Dict, List, Optional, Any, Tuple, Union
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Any, Tuple, Union
 from datetime import datetime, timedelta
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import structlog
 from sqlalchemy import create_engine, text, MetaData, Table, select, insert, update, delete
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import QueuePool
 from sqlalchemy.sql import func
 from contextlib import contextmanager, asynccontextmanager
 import psycopg2
 from psycopg2.extras import execute_batch, execute_values
-from ..database.PerformanceOptimizer import db_performance_optimizer, optimized_query_cache
+from ..database.PerformanceOptimizer import (
+    db_performance_optimizer, InstrumentedQueuePool, LatencyHistogram, PoolSizingPolicy, PostgreSQLConfig,
+    QueryType
+)
+from ..database.bulk_loader import BulkLoadResult, BulkTableSpec, CALCULATIONS_TABLE, SEGMENTS_TABLE, bulk_load
+from .project_analytics import BUILT_MARKER, GroupStats, accumulate, format_timestamp
 
 logger = structlog.get_logger()
 
@@ -40,44 +54,176 @@ class QueryPerformanceMetrics:
     bulk_operations: int = 0
     prepared_statements: int = 0
 
+# Frequently executed statements; prepared once per pooled connection on PostgreSQL
+COMMON_STATEMENTS = {
+    'get_user_projects': """
+        SELECT p.*, COUNT(ps.id) as segment_count 
+        FROM projects p 
+        LEFT JOIN project_segments ps ON p.id = ps.project_id 
+        WHERE p.user_id = :user_id 
+        GROUP BY p.id 
+        ORDER BY p.updated_at DESC 
+        LIMIT :limit
+    """,
+    'get_project_segments': """
+        SELECT * FROM project_segments 
+        WHERE project_id = :project_id 
+        ORDER BY created_at ASC
+    """,
+    'get_calculation_results': """
+        SELECT * FROM calculations 
+        WHERE project_id = :project_id AND calculation_type = :calculation_type 
+        ORDER BY created_at DESC 
+        LIMIT :limit
+    """,
+    'update_project_timestamp': """
+        UPDATE projects 
+        SET updated_at = CURRENT_TIMESTAMP 
+        WHERE id = :project_id
+    """
+}
+
+# Materialized per-project analytics, one row per segment or calculation type
+ANALYTICS_TABLE_DDL = """
+    CREATE TABLE IF NOT EXISTS project_analytics (
+        project_id TEXT NOT NULL,
+        data_type TEXT NOT NULL,
+        group_key TEXT NOT NULL,
+        item_count BIGINT NOT NULL DEFAULT 0,
+        cfm_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+        cfm_count BIGINT NOT NULL DEFAULT 0,
+        pressure_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+        pressure_count BIGINT NOT NULL DEFAULT 0,
+        last_at TIMESTAMP,
+        updated_at TIMESTAMP,
+        PRIMARY KEY (project_id, data_type, group_key)
+    )
+"""
+
+ANALYTICS_UPSERT = text("""
+    INSERT INTO project_analytics (project_id, data_type, group_key, item_count, cfm_sum, cfm_count,
+                                   pressure_sum, pressure_count, last_at, updated_at)
+    VALUES (:project_id, :data_type, :group_key, :item_count, :cfm_sum, :cfm_count,
+            :pressure_sum, :pressure_count, :last_at, CURRENT_TIMESTAMP)
+    ON CONFLICT (project_id, data_type, group_key) DO UPDATE SET
+        item_count = project_analytics.item_count + excluded.item_count,
+        cfm_sum = project_analytics.cfm_sum + excluded.cfm_sum,
+        cfm_count = project_analytics.cfm_count + excluded.cfm_count,
+        pressure_sum = project_analytics.pressure_sum + excluded.pressure_sum,
+        pressure_count = project_analytics.pressure_count + excluded.pressure_count,
+        last_at = CASE WHEN project_analytics.last_at IS NULL OR excluded.last_at > project_analytics.last_at
+                       THEN excluded.last_at ELSE project_analytics.last_at END,
+        updated_at = CURRENT_TIMESTAMP
+""")
+
+# Source tables and grouping column for each analytics data type
+ANALYTICS_SOURCES = {
+    'segments': ('project_segments', 'segment_type', 'calculation_data'),
+    'calculations': ('calculations', 'calculation_type', None)
+}
+
+_BIND_PARAM = re.compile(r'(?<!:):(\w+)')
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, default))
+
 class EnhancedPostgreSQLService:
     """Enhanced PostgreSQL service with performance optimizations."""
     
-    def __init__(self, database_url: str):
+    def __init__(self, database_url: str, config: Optional[PostgreSQLConfig] = None):
         self.database_url = database_url
+        self.config = config or PostgreSQLConfig(
+            pool_size=_env_int('POSTGRES_POOL_SIZE', PostgreSQLConfig.pool_size),
+            max_overflow=_env_int('POSTGRES_MAX_OVERFLOW', PostgreSQLConfig.max_overflow),
+            pool_timeout=_env_int('POSTGRES_POOL_TIMEOUT', PostgreSQLConfig.pool_timeout)
+        )
         self.engine = None
         self.SessionLocal = None
         self.metadata = MetaData()
+        self.executor = None
         
         # Performance tracking
         self.metrics = QueryPerformanceMetrics()
         self.query_cache_enabled = True
         self.prepared_statements = {}
+        self.server_side_prepare = False
+        self._server_statements = {}
         self.bulk_operation_threshold = 50
+        self.bulk_chunk_size = _env_int('POSTGRES_BULK_CHUNK_SIZE', 10000)
         
         # Query performance tracking
-        self.query_times = {}
-        self.slow_queries = []
+        self.query_times: Dict[str, LatencyHistogram] = {}
+        self.query_histograms: Dict[str, LatencyHistogram] = {}
+        self.slow_queries = deque(maxlen=100)
+        self._metrics_lock = threading.Lock()
+        self._analytics_rebuilds: Dict[str, asyncio.Task] = {}
+        
+    def _engine_options(self) -> Dict[str, Any]:
+        """Engine and pool options; the pool is sized to match the query thread pool."""
+        options = {
+            "poolclass": InstrumentedQueuePool,
+            "pool_size": self.config.pool_size,
+            "max_overflow": self.config.max_overflow,
+            "pool_timeout": self.config.pool_timeout,
+            "pool_recycle": self.config.pool_recycle,
+            "pool_pre_ping": self.config.pool_pre_ping,
+            "echo": False,  # Disable SQL logging for performance
+            "future": True,
+            # Keep compiled SQL for the service's statements across calls
+            "query_cache_size": 1200
+        }
+        if make_url(self.database_url).get_backend_name() == 'postgresql':
+            # PostgreSQL-specific optimizations
+            options["connect_args"] = {
+                "options": f"-c statement_timeout={self.config.statement_timeout} "
+                           f"-c work_mem={self.config.work_mem}"
+            }
+        return options
+    
+    async def _run_sync(self, fn, *args, **kwargs):
+        """Run blocking database work on the query thread pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+    
+    def _observe_query(self, name: str, seconds: float):
+        """Record latency for a named service query."""
+        with self._metrics_lock:
+            histogram = self.query_histograms.get(name)
+            if histogram is None:
+                histogram = self.query_histograms[name] = LatencyHistogram()
+            histogram.observe(seconds)
         
+        from ..monitoring import MetricsCollector as metrics_module
+        if metrics_module.metrics_collector is not None:
+            metrics_module.metrics_collector.metrics['database_query_duration_seconds'].labels(
+                database_type='postgresql', operation=name
+            ).observe(seconds)
+    
+    async def _timed(self, name: str, fn, *args):
+        """Run a blocking query off the event loop and record its latency."""
+        start_time = time.perf_counter()
+        try:
+            return await self._run_sync(fn, *args)
+        finally:
+            self._observe_query(name, time.perf_counter() - start_time)
+    
     async def initialize(self):
         """Initialize enhanced PostgreSQL connection with optimizations."""
         try:
             # Create optimized engine
-            self.engine = create_engine(
-                self.database_url,
-                poolclass=QueuePool,
-                pool_size=20,
-                max_overflow=30,
-                pool_timeout=30,
-                pool_recycle=3600,
-                pool_pre_ping=True,
-                echo=False,  # Disable SQL logging for performance
-                future=True,
-                # PostgreSQL-specific optimizations
-                connect_args={
-                    "options": "-c statement_timeout=30s -c work_mem=256MB"
-                }
+            self.engine = create_engine(self.database_url, **self._engine_options())
+            self.server_side_prepare = self.engine.dialect.name == 'postgresql'
+            
+            # One worker per connection the pool may grow to, so the pool (whose
+            # checkout waits drive the adaptive controller) is the limit, not the threads
+            self.executor = ThreadPoolExecutor(
+                max_workers=max(self.config.pool_size + self.config.max_overflow,
+                                self.config.adaptive_max_connections),
+                thread_name_prefix="postgresql-query"
             )
+            db_performance_optimizer.register_pool('postgresql_service', self.engine, PoolSizingPolicy(
+                min_size=self.config.pool_size, max_size=self.config.adaptive_max_connections
+            ))
             
             # Create session factory
             self.SessionLocal = sessionmaker(
@@ -86,8 +232,11 @@ class EnhancedPostgreSQLService:
                 bind=self.engine
             )
             
+            # Materialized analytics are maintained by this service
+            await self._run_sync(self._ensure_analytics_table)
+            
             # Reflect database metadata for dynamic queries
-            self.metadata.reflect(bind=self.engine)
+            await self._run_sync(self.metadata.reflect, bind=self.engine)
             
             # Set up query monitoring
             self._setup_query_monitoring()
@@ -107,27 +256,28 @@ class EnhancedPostgreSQLService:
         
         @event.listens_for(self.engine, "before_cursor_execute")
         def receive_before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
-            context._query_start_time = time.time()
+            context._query_start_time = time.perf_counter()
             context._query_statement = statement
         
         @event.listens_for(self.engine, "after_cursor_execute")
         def receive_after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
-            total_time = time.time() - context._query_start_time
-            
-            # Track query performance
-            self.metrics.query_count += 1
-            
-            # Update rolling average
-            current_avg = self.metrics.avg_query_time
-            count = self.metrics.query_count
-            self.metrics.avg_query_time = (current_avg * (count - 1) + total_time) / count
-            
-            # Track by query type
+            total_time = time.perf_counter() - context._query_start_time
             query_type = statement.split()[0].upper() if statement else "UNKNOWN"
-            if query_type not in self.query_times:
-                self.query_times[query_type] = []
             
-            self.query_times[query_type].append(total_time)
+            # Listeners fire on query threads, so updates are serialized
+            with self._metrics_lock:
+                self.metrics.query_count += 1
+                
+                # Update rolling average
+                current_avg = self.metrics.avg_query_time
+                count = self.metrics.query_count
+                self.metrics.avg_query_time = (current_avg * (count - 1) + total_time) / count
+                
+                # Track by query type
+                histogram = self.query_times.get(query_type)
+                if histogram is None:
+                    histogram = self.query_times[query_type] = LatencyHistogram()
+                histogram.observe(total_time)
             
             # Log slow queries (>1 second)
             if total_time > 1.0:
@@ -144,45 +294,49 @@ class EnhancedPostgreSQLService:
                              query_preview=statement[:100])
     
     async def _prepare_common_statements(self):
-        """Prepare commonly used SQL statements for better performance."""
+        """Prepare commonly used SQL statements for better performance.
+        
+        Each statement is compiled once; on PostgreSQL it is also PREPAREd
+        server-side the first time a pooled connection runs it, so repeat
+        executions skip parsing and planning.
+        """
         try:
-            common_statements = {
-                'get_user_projects': """
-                    SELECT p.*, COUNT(ps.id) as segment_count 
-                    FROM projects p 
-                    LEFT JOIN project_segments ps ON p.id = ps.project_id 
-                    WHERE p.user_id = %s 
-                    GROUP BY p.id 
-                    ORDER BY p.updated_at DESC 
-                    LIMIT %s
-                """,
-                'get_project_segments': """
-                    SELECT * FROM project_segments 
-                    WHERE project_id = %s 
-                    ORDER BY created_at ASC
-                """,
-                'get_calculation_results': """
-                    SELECT * FROM calculations 
-                    WHERE project_id = %s AND calculation_type = %s 
-                    ORDER BY created_at DESC 
-                    LIMIT %s
-                """,
-                'update_project_timestamp': """
-                    UPDATE projects 
-                    SET updated_at = CURRENT_TIMESTAMP 
-                    WHERE id = %s
-                """
-            }
+            for name, sql in COMMON_STATEMENTS.items():
+                param_names = list(dict.fromkeys(_BIND_PARAM.findall(sql)))
+                self.prepared_statements[name] = text(sql)
+                
+                positional_sql = _BIND_PARAM.sub(
+                    lambda match: f"${param_names.index(match.group(1)) + 1}", sql
+                )
+                execute_args = ", ".join(f":{param}" for param in param_names)
+                self._server_statements[name] = (
+                    f"PREPARE {name} AS {positional_sql}",
+                    text(f"EXECUTE {name}({execute_args})" if param_names else f"EXECUTE {name}")
+                )
             
-            self.prepared_statements = common_statements
-            self.metrics.prepared_statements = len(common_statements)
+            self.metrics.prepared_statements = len(self.prepared_statements)
             
             logger.info("Prepared common SQL statements", 
-                       count=len(common_statements))
+                       count=len(self.prepared_statements),
+                       server_side=self.server_side_prepare)
             
         except Exception as e:
             logger.error("Failed to prepare statements", error=str(e))
     
+    def _execute_statement(self, session: Session, name: str, params: Dict[str, Any]):
+        """Execute a common statement, preparing it on this connection if needed."""
+        if not self.server_side_prepare:
+            return session.execute(self.prepared_statements[name], params)
+        
+        connection = session.connection()
+        # Connection info lives as long as the DBAPI connection, like its prepared statements
+        prepared = connection.connection.info.setdefault('prepared_statements', set())
+        prepare_sql, execute_clause = self._server_statements[name]
+        if name not in prepared:
+            connection.exec_driver_sql(prepare_sql)
+            prepared.add(name)
+        return session.execute(execute_clause, params)
+    
     @contextmanager
     def get_db_session(self):
         """Get database session with automatic cleanup."""
@@ -211,21 +365,12 @@ class EnhancedPostgreSQLService:
                     return cached_result
             
             # Use prepared statement for better performance
-            with self.get_db_session() as session:
-                result = session.execute(
-                    text(self.prepared_statements['get_user_projects']),
-                    {"user_id": user_id, "limit": limit}
-                )
-                
-                projects = []
-                for row in result:
-                    project_dict = dict(row._mapping)
-                    projects.append(project_dict)
+            projects = await self._timed('get_user_projects', self._query_user_projects, user_id, limit)
             
             # Cache the result
             if self.query_cache_enabled:
                 await db_performance_optimizer.optimize_query_cache(
-                    cache_key, projects, ttl=1800  # 30 minutes
+                    cache_key, projects, query_type=QueryType.PROJECT_LIST
                 )
             
             query_time = time.time() - start_time
@@ -241,6 +386,13 @@ class EnhancedPostgreSQLService:
                         user_id=user_id, error=str(e))
             return []
     
+    def _query_user_projects(self, user_id: str, limit: int) -> List[Dict[str, Any]]:
+        with self.get_db_session() as session:
+            result = self._execute_statement(
+                session, 'get_user_projects', {"user_id": user_id, "limit": limit}
+            )
+            return [dict(row._mapping) for row in result]
+    
     async def bulk_insert_segments(self, project_id: str, segments_data: List[Dict[str, Any]]) -> List[str]:
         """Bulk insert project segments for better performance."""
         start_time = time.time()
@@ -248,40 +400,11 @@ class EnhancedPostgreSQLService:
         try:
             if len(segments_data) < self.bulk_operation_threshold:
                 # Use individual inserts for small batches
-                return await self._individual_insert_segments(project_id, segments_data)
+                return await self._timed('insert_segments', self._individual_insert_segments,
+                                         project_id, segments_data)
             
-            # Prepare data for bulk insert
-            current_time = datetime.utcnow()
-            insert_data = []
-            
-            for segment_data in segments_data:
-                segment_data.update({
-                    'project_id': project_id,
-                    'created_at': current_time,
-                    'updated_at': current_time
-                })
-                insert_data.append(segment_data)
-            
-            # Execute bulk insert using execute_values for better performance
-            with self.get_db_session() as session:
-                # Get the segments table
-                segments_table = self.metadata.tables.get('project_segments')
-                if not segments_table:
-                    raise ValueError("project_segments table not found")
-                
-                # Execute bulk insert
-                result = session.execute(
-                    insert(segments_table).returning(segments_table.c.id),
-                    insert_data
-                )
-                
-                inserted_ids = [str(row[0]) for row in result]
-                
-                # Update project timestamp
-                session.execute(
-                    text(self.prepared_statements['update_project_timestamp']),
-                    {"project_id": project_id}
-                )
+            inserted_ids = await self._timed('bulk_insert_segments', self._bulk_insert_segments,
+                                             project_id, segments_data)
             
             self.metrics.bulk_operations += 1
             
@@ -298,7 +421,63 @@ class EnhancedPostgreSQLService:
                         project_id=project_id, error=str(e))
             raise
     
-    async def _individual_insert_segments(self, project_id: str, segments_data: List[Dict[str, Any]]) -> List[str]:
+    def _bulk_insert_segments(self, project_id: str, segments_data: List[Dict[str, Any]]) -> List[str]:
+        """Load a large batch of segments via COPY (PostgreSQL) or executemany (SQLite)."""
+        current_time = datetime.utcnow()
+        result = bulk_load(
+            self.engine,
+            self._bulk_spec(SEGMENTS_TABLE),
+            segments_data,
+            overrides={'project_id': project_id, 'created_at': current_time, 'updated_at': current_time},
+            chunk_size=self.bulk_chunk_size
+        )
+        
+        self._fold_bulk_load(project_id, 'segments', segments_data, result,
+                             lambda rows: self._segment_analytics(rows, current_time), touch_project=True)
+        
+        logger.debug("Bulk loaded rows", table=SEGMENTS_TABLE.table,
+                    rows=result.rows, chunks=result.chunks,
+                    rows_per_second=round(result.rows_per_second))
+        return result.ids
+    
+    def _bulk_spec(self, spec: BulkTableSpec) -> BulkTableSpec:
+        """Limit a bulk table spec to the columns of the reflected table."""
+        table = self.metadata.tables.get(spec.table)
+        if table is None:
+            raise ValueError(f"{spec.table} table not found")
+        return spec.restricted_to(table.columns.keys())
+    
+    async def bulk_insert_calculations(self, project_id: str,
+                                       calculations_data: List[Dict[str, Any]]) -> List[str]:
+        """Bulk insert calculation results; IDs are returned in input order."""
+        try:
+            inserted_ids = await self._timed('bulk_insert_calculations', self._bulk_insert_calculations,
+                                             project_id, calculations_data)
+            self.metrics.bulk_operations += 1
+            return inserted_ids
+            
+        except Exception as e:
+            logger.error("Failed to bulk insert calculations", 
+                        project_id=project_id, error=str(e))
+            raise
+    
+    def _bulk_insert_calculations(self, project_id: str,
+                                  calculations_data: List[Dict[str, Any]]) -> List[str]:
+        current_time = datetime.utcnow()
+        result = bulk_load(
+            self.engine,
+            self._bulk_spec(CALCULATIONS_TABLE),
+            calculations_data,
+            overrides={'project_id': project_id, 'created_at': current_time},
+            chunk_size=self.bulk_chunk_size
+        )
+        
+        self._fold_bulk_load(project_id, 'calculations', calculations_data, result, lambda rows: accumulate(
+            rows, lambda calculation: calculation.get('calculation_type'), at=current_time
+        ))
+        return result.ids
+    
+    def _individual_insert_segments(self, project_id: str, segments_data: List[Dict[str, Any]]) -> List[str]:
         """Insert segments individually for small batches."""
         inserted_ids = []
         
@@ -319,68 +498,89 @@ class EnhancedPostgreSQLService:
                 )
                 
                 inserted_ids.append(str(result.scalar()))
+            
+            self._apply_analytics_delta(session, project_id, 'segments',
+                                        self._segment_analytics(segments_data, current_time))
         
         return inserted_ids
     
-    # Advanced Query Optimization
-    async def get_project_analytics_optimized(self, project_id: str) -> Dict[str, Any]:
-        """Get project analytics using optimized SQL queries."""
-        start_time = time.time()
-        cache_key = f"analytics:project:{project_id}"
-        
+    # Materialized Project Analytics
+    def _ensure_analytics_table(self):
+        with self.engine.begin() as connection:
+            connection.execute(text(ANALYTICS_TABLE_DDL))
+    
+    @staticmethod
+    def _segment_analytics(segments_data: List[Dict[str, Any]],
+                           created_at: datetime) -> Dict[Any, GroupStats]:
+        return accumulate(segments_data, lambda segment: segment.get('segment_type'),
+                          lambda segment: segment.get('calculation_data'), at=created_at)
+    
+    def _fold_bulk_load(self, project_id: str, data_type: str, rows: List[Dict[str, Any]],
+                        result: BulkLoadResult, analytics_of: Callable[[List[Dict[str, Any]]], Dict[Any, GroupStats]],
+                        touch_project: bool = False):
+        """
+        Update the analytics (and the project timestamp) after a committed bulk
+        load, counting only rows it actually inserted. Failures are logged, not
+        raised: the rows are stored, and a caller retrying the load would
+        duplicate them.
+        """
         try:
-            # Check cache first
-            if self.query_cache_enabled:
-                cached_result = await db_performance_optimizer.get_cached_query(cache_key)
-                if cached_result:
-                    self.metrics.cache_hits += 1
-                    return cached_result
+            if touch_project:
+                with self.get_db_session() as session:
+                    self._execute_statement(session, 'update_project_timestamp', {"project_id": project_id})
             
-            # Optimized analytics query using CTEs and window functions
-            analytics_query = text("""
-                WITH segment_stats AS (
-                    SELECT 
-                        segment_type,
-                        COUNT(*) as count,
-                        AVG(CAST(calculation_data->>'cfm' AS FLOAT)) as avg_cfm,
-                        SUM(CAST(calculation_data->>'cfm' AS FLOAT)) as total_cfm,
-                        AVG(CAST(calculation_data->>'pressure_drop' AS FLOAT)) as avg_pressure
-                    FROM project_segments 
-                    WHERE project_id = :project_id 
-                    GROUP BY segment_type
-                ),
-                calculation_stats AS (
-                    SELECT 
-                        calculation_type,
-                        COUNT(*) as calc_count,
-                        MAX(created_at) as last_calculation
-                    FROM calculations 
-                    WHERE project_id = :project_id 
-                    GROUP BY calculation_type
-                )
-                SELECT 
-                    'segments' as data_type,
-                    json_agg(segment_stats.*) as data
-                FROM segment_stats
-                UNION ALL
-                SELECT 
-                    'calculations' as data_type,
-                    json_agg(calculation_stats.*) as data
-                FROM calculation_stats
-            """)
+            # Rows merged into existing ones may have changed type or metrics, which a delta cannot express
+            if len(result.inserted_ids) + len(result.conflicts) < result.rows:
+                self._rebuild_project_analytics(project_id)
+                return
             
+            inserted = set(result.inserted_ids)
+            latest = {row_id: row for row, row_id in zip(rows, result.ids)}  # Repeated IDs store the last row
             with self.get_db_session() as session:
-                result = session.execute(analytics_query, {"project_id": project_id})
-                
-                analytics = {}
-                for row in result:
-                    analytics[row.data_type] = row.data
-            
-            # Cache the result
-            if self.query_cache_enabled:
-                await db_performance_optimizer.optimize_query_cache(
-                    cache_key, analytics, ttl=900  # 15 minutes
-                )
+                self._apply_analytics_delta(session, project_id, data_type, analytics_of(
+                    [row for row_id, row in latest.items() if row_id in inserted]
+                ))
+        except Exception as e:
+            logger.error("Failed to fold bulk load into project analytics",
+                        project_id=project_id, rows=result.rows, error=str(e))
+            self._invalidate_project_analytics(project_id)
+    
+    def _invalidate_project_analytics(self, project_id: str):
+        """Drop the built marker so the next read rebuilds the project's analytics."""
+        try:
+            with self.get_db_session() as session:
+                session.execute(text(
+                    "DELETE FROM project_analytics WHERE project_id = :project_id AND data_type = :data_type"
+                ), {"project_id": str(project_id), "data_type": BUILT_MARKER})
+        except Exception as e:
+            logger.error("Failed to invalidate project analytics", project_id=project_id, error=str(e))
+    
+    def _apply_analytics_delta(self, session: Session, project_id: str, data_type: str,
+                               groups: Dict[Any, GroupStats]):
+        """Add a batch's per-type totals to the materialized analytics in the caller's transaction."""
+        if not groups:
+            return
+        session.execute(ANALYTICS_UPSERT, [
+            {
+                "project_id": str(project_id),
+                "data_type": data_type,
+                "group_key": group if group is not None else '',
+                "item_count": stats.count,
+                "cfm_sum": stats.cfm_sum,
+                "cfm_count": stats.cfm_count,
+                "pressure_sum": stats.pressure_sum,
+                "pressure_count": stats.pressure_count,
+                "last_at": stats.last_at
+            }
+            for group, stats in groups.items()
+        ])
+    
+    async def get_project_analytics_optimized(self, project_id: str) -> Dict[str, Any]:
+        """Get project analytics from the materialized per-type totals."""
+        start_time = time.time()
+        
+        try:
+            analytics = await self._timed('project_analytics', self._query_project_analytics, project_id)
             
             query_time = time.time() - start_time
             logger.debug("Retrieved project analytics", 
@@ -394,42 +594,119 @@ class EnhancedPostgreSQLService:
                         project_id=project_id, error=str(e))
             return {}
     
+    def _query_project_analytics(self, project_id: str) -> Dict[str, Any]:
+        query = text("""
+            SELECT data_type, group_key, item_count, cfm_sum, cfm_count,
+                   pressure_sum, pressure_count, last_at
+            FROM project_analytics
+            WHERE project_id = :project_id
+            ORDER BY data_type, item_count DESC
+        """)
+        with self.get_db_session() as session:
+            rows = session.execute(query, {"project_id": str(project_id)}).all()
+        if not any(row.data_type == BUILT_MARKER for row in rows):
+            # Never rebuilt: totals only hold what was written since analytics were materialized
+            self._rebuild_project_analytics(project_id)
+            with self.get_db_session() as session:
+                rows = session.execute(query, {"project_id": str(project_id)}).all()
+        
+        analytics = {"segments": [], "calculations": []}
+        for row in rows:
+            group = row.group_key or None
+            if row.data_type == BUILT_MARKER:
+                continue
+            if row.data_type == 'segments':
+                analytics['segments'].append({
+                    "segment_type": group,
+                    "count": row.item_count,
+                    "avg_cfm": row.cfm_sum / row.cfm_count if row.cfm_count else None,
+                    "total_cfm": row.cfm_sum if row.cfm_count else None,
+                    "avg_pressure": row.pressure_sum / row.pressure_count if row.pressure_count else None
+                })
+            else:
+                analytics['calculations'].append({
+                    "calculation_type": group,
+                    "calc_count": row.item_count,
+                    "last_calculation": format_timestamp(row.last_at)
+                })
+        return analytics
+    
+    def _json_number(self, column: str, key: str) -> str:
+        if self.engine.dialect.name == 'postgresql':
+            return f"CAST({column}->>'{key}' AS FLOAT)"
+        return f"CAST(json_extract({column}, '$.{key}') AS REAL)"
+    
+    async def rebuild_project_analytics(self, project_id: str):
+        """Recompute a project's analytics totals from its segments and calculations."""
+        await self._timed('rebuild_project_analytics', self._rebuild_project_analytics, project_id)
+    
+    def _rebuild_project_analytics(self, project_id: str):
+        with self.get_db_session() as session:
+            session.execute(text("DELETE FROM project_analytics WHERE project_id = :project_id"),
+                            {"project_id": str(project_id)})
+            
+            for data_type, (table, group_column, metrics_column) in ANALYTICS_SOURCES.items():
+                if table not in self.metadata.tables:
+                    continue
+                if metrics_column:
+                    cfm = self._json_number(metrics_column, 'cfm')
+                    pressure = self._json_number(metrics_column, 'pressure_drop')
+                else:
+                    cfm = pressure = "NULL"
+                session.execute(text(f"""
+                    INSERT INTO project_analytics (project_id, data_type, group_key, item_count, cfm_sum,
+                                                   cfm_count, pressure_sum, pressure_count, last_at, updated_at)
+                    SELECT :project_id, :data_type, group_key, COUNT(*), COALESCE(SUM(cfm), 0), COUNT(cfm),
+                           COALESCE(SUM(pressure), 0), COUNT(pressure), MAX(created_at), CURRENT_TIMESTAMP
+                    FROM (
+                        SELECT COALESCE({group_column}, '') AS group_key, {cfm} AS cfm,
+                               {pressure} AS pressure, created_at
+                        FROM {table}
+                        WHERE project_id = :project_id
+                    ) source
+                    GROUP BY group_key
+                """), {"project_id": str(project_id), "data_type": data_type})
+            
+            # Zero row marking the project as built, even when it has no rows yet
+            session.execute(text("""
+                INSERT INTO project_analytics (project_id, data_type, group_key, updated_at)
+                VALUES (:project_id, :data_type, '', CURRENT_TIMESTAMP)
+            """), {"project_id": str(project_id), "data_type": BUILT_MARKER})
+        
+        logger.info("Rebuilt project analytics", project_id=project_id)
+    
+    def schedule_analytics_rebuild(self, project_id: str) -> asyncio.Task:
+        """Rebuild a project's analytics in the background; one rebuild per project at a time."""
+        task = self._analytics_rebuilds.get(project_id)
+        if task is None or task.done():
+            task = asyncio.ensure_future(self.rebuild_project_analytics(project_id))
+            self._analytics_rebuilds[project_id] = task
+            
+            def forget(done: asyncio.Task):
+                if self._analytics_rebuilds.get(project_id) is done:
+                    del self._analytics_rebuilds[project_id]
+                if not done.cancelled() and done.exception():
+                    logger.error("Failed to rebuild project analytics",
+                                project_id=project_id, error=str(done.exception()))
+            
+            task.add_done_callback(forget)
+        return task
+    
     # Performance Monitoring and Health Checks
     async def get_service_metrics(self) -> Dict[str, Any]:
         """Get PostgreSQL service performance metrics."""
         try:
-            with self.get_db_session() as session:
-                # Get connection stats
-                connection_stats = session.execute(text("""
-                    SELECT 
-                        state,
-                        COUNT(*) as count
-                    FROM pg_stat_activity 
-                    WHERE datname = current_database()
-                    GROUP BY state
-                """)).fetchall()
-                
-                # Get cache hit ratio
-                cache_stats = session.execute(text("""
-                    SELECT 
-                        sum(heap_blks_hit) / (sum(heap_blks_hit) + sum(heap_blks_read)) * 100 as cache_hit_ratio,
-                        sum(heap_blks_hit) as cache_hits,
-                        sum(heap_blks_read) as disk_reads
-                    FROM pg_statio_user_tables
-                """)).fetchone()
-                
-                # Get table sizes
-                table_sizes = session.execute(text("""
-                    SELECT 
-                        schemaname,
-                        tablename,
-                        pg_size_pretty(pg_total_relation_size(schemaname||'.'||tablename)) as size,
-                        pg_total_relation_size(schemaname||'.'||tablename) as size_bytes
-                    FROM pg_tables 
-                    WHERE schemaname = 'public'
-                    ORDER BY pg_total_relation_size(schemaname||'.'||tablename) DESC
-                    LIMIT 10
-                """)).fetchall()
+            connection_stats, cache_stats, table_sizes = await self._run_sync(self._query_database_stats)
+            
+            with self._metrics_lock:
+                query_performance = {
+                    query_type: histogram.to_dict()
+                    for query_type, histogram in self.query_times.items()
+                }
+                query_latency = {
+                    name: histogram.to_dict()
+                    for name, histogram in self.query_histograms.items()
+                }
             
             return {
                 "service_metrics": {
@@ -454,15 +731,10 @@ class EnhancedPostgreSQLService:
                     }
                     for row in table_sizes
                 ],
-                "query_performance": {
-                    query_type: {
-                        "count": len(times),
-                        "avg_time": sum(times) / len(times) if times else 0,
-                        "max_time": max(times) if times else 0
-                    }
-                    for query_type, times in self.query_times.items()
-                },
-                "recent_slow_queries": self.slow_queries[-5:],  # Last 5 slow queries
+                "connection_pool": self._pool_status(),
+                "query_performance": query_performance,
+                "query_latency": query_latency,
+                "recent_slow_queries": list(self.slow_queries)[-5:],  # Last 5 slow queries
                 "timestamp": datetime.utcnow().isoformat()
             }
             
@@ -470,31 +742,58 @@ class EnhancedPostgreSQLService:
             logger.error("Failed to get service metrics", error=str(e))
             return {"error": str(e)}
     
+    def _pool_status(self) -> Dict[str, Any]:
+        return {
+            "size": self.engine.pool.size(),
+            "checked_in": self.engine.pool.checkedin(),
+            "checked_out": self.engine.pool.checkedout(),
+            "overflow": self.engine.pool.overflow(),
+            "max_overflow": self.config.max_overflow,
+            "query_threads": self.executor._max_workers if self.executor else 0,
+            "checkout": self.engine.pool.telemetry.to_dict()
+        }
+    
+    def _query_database_stats(self):
+        with self.get_db_session() as session:
+            # Get connection stats
+            connection_stats = session.execute(text("""
+                SELECT 
+                    state,
+                    COUNT(*) as count
+                FROM pg_stat_activity 
+                WHERE datname = current_database()
+                GROUP BY state
+            """)).fetchall()
+            
+            # Get cache hit ratio
+            cache_stats = session.execute(text("""
+                SELECT 
+                    sum(heap_blks_hit) / (sum(heap_blks_hit) + sum(heap_blks_read)) * 100 as cache_hit_ratio,
+                    sum(heap_blks_hit) as cache_hits,
+                    sum(heap_blks_read) as disk_reads
+                FROM pg_statio_user_tables
+            """)).fetchone()
+            
+            # Get table sizes
+            table_sizes = session.execute(text("""
+                SELECT 
+                    schemaname,
+                    tablename,
+                    pg_size_pretty(pg_total_relation_size(schemaname||'.'||tablename)) as size,
+                    pg_total_relation_size(schemaname||'.'||tablename) as size_bytes
+                FROM pg_tables 
+                WHERE schemaname = 'public'
+                ORDER BY pg_total_relation_size(schemaname||'.'||tablename) DESC
+                LIMIT 10
+            """)).fetchall()
+        
+        return connection_stats, cache_stats, table_sizes
+    
     async def health_check(self) -> Dict[str, Any]:
         """Perform comprehensive health check."""
         try:
             start_time = time.time()
-            
-            with self.get_db_session() as session:
-                # Test basic connectivity
-                session.execute(text("SELECT 1"))
-                
-                # Check if critical tables exist
-                tables_check = session.execute(text("""
-                    SELECT table_name 
-                    FROM information_schema.tables 
-                    WHERE table_schema = 'public' 
-                    AND table_name IN ('users', 'projects', 'project_segments')
-                """)).fetchall()
-                
-                # Check for long-running queries
-                long_queries = session.execute(text("""
-                    SELECT COUNT(*) as count
-                    FROM pg_stat_activity 
-                    WHERE state = 'active' 
-                    AND query_start < NOW() - INTERVAL '5 minutes'
-                    AND datname = current_database()
-                """)).scalar()
+            tables_check, long_queries = await self._run_sync(self._query_health)
             
             response_time = time.time() - start_time
             
@@ -503,11 +802,7 @@ class EnhancedPostgreSQLService:
                 "response_time": response_time,
                 "tables_available": len(tables_check),
                 "long_running_queries": long_queries,
-                "connection_pool": {
-                    "size": self.engine.pool.size(),
-                    "checked_in": self.engine.pool.checkedin(),
-                    "checked_out": self.engine.pool.checkedout()
-                },
+                "connection_pool": self._pool_status(),
                 "timestamp": datetime.utcnow().isoformat()
             }
             
@@ -519,10 +814,39 @@ class EnhancedPostgreSQLService:
                 "timestamp": datetime.utcnow().isoformat()
             }
     
+    def _query_health(self):
+        with self.get_db_session() as session:
+            # Test basic connectivity
+            session.execute(text("SELECT 1"))
+            
+            # Check if critical tables exist
+            tables_check = session.execute(text("""
+                SELECT table_name 
+                FROM information_schema.tables 
+                WHERE table_schema = 'public' 
+                AND table_name IN ('users', 'projects', 'project_segments')
+            """)).fetchall()
+            
+            # Check for long-running queries
+            long_queries = session.execute(text("""
+                SELECT COUNT(*) as count
+                FROM pg_stat_activity 
+                WHERE state = 'active' 
+                AND query_start < NOW() - INTERVAL '5 minutes'
+                AND datname = current_database()
+            """)).scalar()
+        
+        return tables_check, long_queries
+    
     async def cleanup(self):
         """Cleanup database connections and resources."""
         try:
+            if self.executor:
+                self.executor.shutdown(wait=False)
+                self.executor = None
+            
             if self.engine:
+                db_performance_optimizer.unregister_pool('postgresql_service')
                 self.engine.dispose()
             
             logger.info("PostgreSQL service cleanup completed")
@@ -9,24 +9,86 @@ Provides high-level MongoDB operations with performance optimizations including:
 - Connection pooling and monitoring
 """
 
-from typing import Dict, List, Optional, Any, Union
+from typing import Dict, List, Optional, Any, Tuple, Union
 from datetime import datetime, timedelta
 from bson import ObjectId
-from pymongo import UpdateOne, InsertOne, DeleteOne
+from pymongo import UpdateOne, InsertOne, DeleteOne, ReturnDocument
 from pymongo.errors import BulkWriteError
 import structlog
 import asyncio
+import base64
+import json
 import time
 from ..config.mongodb_config import get_mongodb_database
-from ..database.PerformanceOptimizer import db_performance_optimizer, optimized_query_cache
+from ..database.PerformanceOptimizer import db_performance_optimizer, QueryType
+from ..analytics.rollups import GRANULARITIES, BucketKey, BucketStats, Piece, RollupStore, calculation_rollups
+from .project_analytics import BUILT_MARKER, GroupStats
+from .spatial_index import (
+    bounds_intersect_filter, calculate_bounds, flatten_coordinates, spatial_quadtree
+)
 
 logger = structlog.get_logger()
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Newest first; _id breaks ties between documents created in the same millisecond
+PAGE_SORT = [("created_at", -1), ("_id", -1)]
+
+# Running totals kept per project and calculation type in project_analytics
+ANALYTICS_TOTALS = ("count", "cfm_sum", "cfm_count", "pressure_sum", "pressure_count")
+
+# calculation_rollups document recording the backfill cutoff and progress
+ROLLUP_BACKFILL_ID = "__backfill__"
+ROLLUP_BACKFILL_TIMEOUT = timedelta(minutes=10)  # A claimed backfill not done by then is retried
+
+def _rollup_filter(key: BucketKey) -> Dict[str, Any]:
+    granularity, dimension, label, start = key
+    return {"granularity": granularity, "dimension": dimension, "label": label, "start": start}
+
+def _rollup_row(calculation: Dict[str, Any]) -> Dict[str, Any]:
+    """Saved calculation as a rollup row; calculations store their type as calculation_type."""
+    return dict(calculation, type=calculation.get('calculation_type', calculation.get('type')))
+
+def encode_resume_token(doc: Dict[str, Any]) -> str:
+    """Opaque token marking the (created_at, _id) position after ``doc``."""
+    created_at = doc.get("created_at")
+    payload = {"c": created_at.isoformat() if created_at else None, "i": str(doc["_id"])}
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_resume_token(token: str) -> Tuple[Optional[datetime], ObjectId]:
+    """Decode a resume token; raises ValueError when it is malformed."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        created_at = datetime.fromisoformat(payload["c"]) if payload["c"] else None
+        return created_at, ObjectId(payload["i"])
+    except Exception as e:
+        raise ValueError("Invalid resume token") from e
+
+def _after_position(created_at: Optional[datetime], last_id: ObjectId) -> Dict[str, Any]:
+    """Filter for documents sorting after (created_at, _id) in PAGE_SORT order."""
+    if created_at is None:
+        # Documents without created_at sort last
+        return {"created_at": None, "_id": {"$lt": last_id}}
+    return {"$or": [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "_id": {"$lt": last_id}},
+        {"created_at": None}
+    ]}
+
+def _projection(fields: Optional[List[str]]) -> Optional[Dict[str, int]]:
+    """Inclusion projection for caller-selected fields, keeping the sort keys."""
+    if not fields:
+        return None
+    projection = {field: 1 for field in fields if field and not field.startswith('$')}
+    projection["created_at"] = 1
+    return projection
+
 class EnhancedMongoDBService:
     """Enhanced service layer for MongoDB operations with performance optimizations."""
 
     def __init__(self):
-        self.db = get_mongodb_database()
         self.query_cache_enabled = True
         self.bulk_operation_threshold = 10  # Use bulk operations for 10+ items
         self.performance_metrics = {
@@ -35,6 +97,15 @@ class EnhancedMongoDBService:
             'bulk_operations': 0,
             'avg_query_time': 0.0
         }
+        self._analytics_rebuilds: Dict[str, asyncio.Task] = {}
+        self._rollup_cutoff: Optional[datetime] = None
+        self._rollups_evicted_at = 0.0
+        self._rollup_backfill: Optional[asyncio.Task] = None
+
+    @property
+    def db(self):
+        """Database handle from this worker's shared Motor client."""
+        return get_mongodb_database()
 
     async def _track_query_performance(self, operation_name: str, start_time: float):
         """Track query performance metrics."""
@@ -92,10 +163,10 @@ class EnhancedMongoDBService:
         try:
             # Check cache first
             if self.query_cache_enabled:
-                async with optimized_query_cache(cache_key, ttl=1800) as cached_result:
-                    if cached_result is not None:
-                        self.performance_metrics['cache_hits'] += 1
-                        return cached_result
+                cached_result = await db_performance_optimizer.get_cached_query(cache_key)
+                if cached_result is not None:
+                    self.performance_metrics['cache_hits'] += 1
+                    return cached_result
 
             # Query database
             project = await self.db.projects.find_one(
@@ -110,7 +181,7 @@ class EnhancedMongoDBService:
                 # Cache the result
                 if self.query_cache_enabled:
                     await db_performance_optimizer.optimize_query_cache(
-                        cache_key, project, ttl=1800
+                        cache_key, project, query_type=QueryType.PROJECT
                     )
 
             await self._track_query_performance('get_project', start_time)
@@ -164,17 +235,14 @@ class EnhancedMongoDBService:
     async def _invalidate_project_cache(self, user_id: str = None):
         """Invalidate project-related cache entries."""
         try:
-            if not self.query_cache_enabled or not db_performance_optimizer.redis_client:
+            if not self.query_cache_enabled:
                 return
 
             # Invalidate user's project list cache
             if user_id:
-                cache_keys = [
-                    f"projects:user:{user_id}",
-                    f"projects:user:{user_id}:*"
-                ]
-                for key in cache_keys:
-                    db_performance_optimizer.redis_client.delete(key)
+                await db_performance_optimizer.invalidate_cached_queries(
+                    [f"projects:user:{user_id}"], prefixes=[f"projects:user:{user_id}:"]
+                )
 
         except Exception as e:
             logger.warning("Failed to invalidate project cache", error=str(e))
@@ -188,13 +256,8 @@ class EnhancedMongoDBService:
             spatial_data['created_at'] = datetime.utcnow()
             spatial_data['updated_at'] = datetime.utcnow()
 
-            # Add spatial indexing hints for better query performance
-            if 'geometry' in spatial_data:
-                spatial_data['_spatial_indexed'] = True
-
-            # Add bounds for faster spatial queries
-            if 'coordinates' in spatial_data:
-                spatial_data['bounds'] = self._calculate_bounds(spatial_data['coordinates'])
+            # Add bounds and quadtree key for indexed viewport queries
+            self._index_spatial_fields(spatial_data)
 
             result = await self.db.spatial_data.insert_one(spatial_data)
             spatial_id = str(result.inserted_id)
@@ -236,11 +299,7 @@ class EnhancedMongoDBService:
                 spatial_data['project_id'] = project_id
                 spatial_data['created_at'] = current_time
                 spatial_data['updated_at'] = current_time
-                spatial_data['_spatial_indexed'] = True
-
-                # Add bounds for spatial queries
-                if 'coordinates' in spatial_data:
-                    spatial_data['bounds'] = self._calculate_bounds(spatial_data['coordinates'])
+                self._index_spatial_fields(spatial_data)
 
                 operations.append(InsertOne(spatial_data))
 
@@ -295,6 +354,37 @@ class EnhancedMongoDBService:
                         project_id=project_id, error=str(e))
             return []
     
+    async def _find_page(self, collection, query: Dict[str, Any], limit: int,
+                         resume_token: Optional[str], fields: Optional[List[str]]) -> Dict[str, Any]:
+        """Fetch one keyset page, newest first, plus the token for the next page."""
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        if resume_token:
+            query = {"$and": [query, _after_position(*decode_resume_token(resume_token))]}
+
+        # Fetch one extra document to learn whether another page exists
+        documents = await collection.find(query, _projection(fields)) \
+            .sort(PAGE_SORT).limit(limit + 1).to_list(length=limit + 1)
+        has_more = len(documents) > limit
+        documents = documents[:limit]
+        next_cursor = encode_resume_token(documents[-1]) if has_more else None
+
+        for doc in documents:
+            doc['_id'] = str(doc['_id'])
+        return {"items": documents, "next_cursor": next_cursor}
+
+    async def get_spatial_data_page(self, project_id: str, layer_type: Optional[str] = None,
+                                    limit: int = DEFAULT_PAGE_SIZE, resume_token: Optional[str] = None,
+                                    fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Get one page of a project's spatial data, newest first."""
+        start_time = time.time()
+        query = {"project_id": project_id}
+        if layer_type:
+            query["layer_type"] = layer_type
+
+        page = await self._find_page(self.db.spatial_data, query, limit, resume_token, fields)
+        await self._track_query_performance('get_spatial_data_page', start_time)
+        return page
+
     # HVAC System Management
     async def save_hvac_system(self, project_id: str, system_data: Dict[str, Any]) -> str:
         """Save HVAC system data."""
@@ -331,6 +421,16 @@ class EnhancedMongoDBService:
                         project_id=project_id, error=str(e))
             return []
     
+    async def get_hvac_systems_page(self, project_id: str, limit: int = DEFAULT_PAGE_SIZE,
+                                    resume_token: Optional[str] = None,
+                                    fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Get one page of a project's HVAC systems, newest first."""
+        start_time = time.time()
+        page = await self._find_page(self.db.hvac_systems, {"project_id": project_id},
+                                     limit, resume_token, fields)
+        await self._track_query_performance('get_hvac_systems_page', start_time)
+        return page
+
     # Calculation Results Storage
     async def save_calculation_result(self, project_id: str, calculation_data: Dict[str, Any]) -> str:
         """Save calculation results to MongoDB."""
@@ -339,6 +439,7 @@ class EnhancedMongoDBService:
             calculation_data['created_at'] = datetime.utcnow()
             
             result = await self.db.calculations.insert_one(calculation_data)
+            await self._record_calculation_analytics(project_id, calculation_data)
             logger.info("Calculation result saved to MongoDB", 
                        project_id=project_id, 
                        calculation_id=str(result.inserted_id))
@@ -370,6 +471,19 @@ class EnhancedMongoDBService:
                         project_id=project_id, error=str(e))
             return []
     
+    async def get_calculation_results_page(self, project_id: str, calculation_type: Optional[str] = None,
+                                           limit: int = DEFAULT_PAGE_SIZE, resume_token: Optional[str] = None,
+                                           fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Get one page of a project's calculation results, newest first."""
+        start_time = time.time()
+        query = {"project_id": project_id}
+        if calculation_type:
+            query["calculation_type"] = calculation_type
+
+        page = await self._find_page(self.db.calculations, query, limit, resume_token, fields)
+        await self._track_query_performance('get_calculation_results_page', start_time)
+        return page
+
     # User Data Management
     async def save_user_preferences(self, user_id: str, preferences: Dict[str, Any]) -> bool:
         """Save user preferences to MongoDB."""
@@ -406,145 +520,426 @@ class EnhancedMongoDBService:
 
     def _calculate_bounds(self, coordinates: List[List[float]]) -> Dict[str, float]:
         """Calculate bounding box for spatial coordinates."""
-        if not coordinates:
-            return {}
-
-        min_x = min_y = float('inf')
-        max_x = max_y = float('-inf')
-
-        for coord in coordinates:
-            if len(coord) >= 2:
-                x, y = coord[0], coord[1]
-                min_x = min(min_x, x)
-                max_x = max(max_x, x)
-                min_y = min(min_y, y)
-                max_y = max(max_y, y)
-
-        return {
-            'min_x': min_x,
-            'max_x': max_x,
-            'min_y': min_y,
-            'max_y': max_y
-        }
+        return calculate_bounds(coordinates)
+
+    def _index_spatial_fields(self, spatial_data: Dict[str, Any]):
+        """Add bounds and the quadtree key used by viewport queries."""
+        coordinates = spatial_data.get('coordinates')
+        if coordinates is None and isinstance(spatial_data.get('geometry'), dict):
+            coordinates = spatial_data['geometry'].get('coordinates')
+        if coordinates is None:
+            return
+
+        bounds = calculate_bounds(flatten_coordinates(coordinates))
+        if bounds:
+            spatial_data['bounds'] = bounds
+            spatial_data['spatial_key'] = spatial_quadtree.key_for_bounds(bounds)
+            spatial_data['_spatial_indexed'] = True
 
     async def _invalidate_spatial_cache(self, project_id: str):
         """Invalidate spatial data cache entries."""
         try:
-            if not self.query_cache_enabled or not db_performance_optimizer.redis_client:
+            if not self.query_cache_enabled:
                 return
 
-            cache_keys = [
-                f"spatial:project:{project_id}",
-                f"spatial:project:{project_id}:*"
-            ]
-
-            for key in cache_keys:
-                db_performance_optimizer.redis_client.delete(key)
+            await db_performance_optimizer.invalidate_cached_queries(
+                [f"spatial:project:{project_id}"], prefixes=[f"spatial:project:{project_id}:"]
+            )
 
         except Exception as e:
             logger.warning("Failed to invalidate spatial cache", error=str(e))
 
-    # Enhanced Aggregation Queries for HVAC Analytics
+    # Materialized HVAC Analytics
+    async def _record_calculation_analytics(self, project_id: str, calculation_data: Dict[str, Any]):
+        """Fold one saved calculation into the project's running totals and the dashboard rollups."""
+        try:
+            await self._record_calculation_rollups(calculation_data)
+        except Exception as e:
+            logger.warning("Failed to update calculation rollups", project_id=project_id, error=str(e))
+
+        stats = GroupStats()
+        stats.add(calculation_data.get('result_data'), calculation_data['created_at'])
+        increments = {"count": 1}
+        if stats.cfm_count:
+            increments.update(cfm_sum=stats.cfm_sum, cfm_count=1)
+        if stats.pressure_count:
+            increments.update(pressure_sum=stats.pressure_sum, pressure_count=1)
+
+        try:
+            await self.db.project_analytics.update_one(
+                {"project_id": project_id, "calculation_type": calculation_data.get('calculation_type')},
+                {"$inc": increments, "$max": {"last_calculation": stats.last_at}},
+                upsert=True
+            )
+        except Exception as e:
+            # The calculation itself is saved; a rebuild restores the totals
+            logger.warning("Failed to update project analytics",
+                         project_id=project_id, error=str(e))
+
+    # Dashboard Rollups
+    async def _rollups_cutoff(self) -> datetime:
+        """Creation time up to which the backfill counts calculations; later saves are recorded live."""
+        if self._rollup_cutoff is None:
+            marker = await self.db.calculation_rollups.find_one_and_update(
+                {"_id": ROLLUP_BACKFILL_ID},
+                {"$setOnInsert": {"cutoff": datetime.utcnow(), "done": False}},
+                upsert=True, return_document=ReturnDocument.AFTER
+            )
+            self._rollup_cutoff = marker["cutoff"]
+        return self._rollup_cutoff
+
+    async def _record_calculation_rollups(self, calculation_data: Dict[str, Any]):
+        """Add one saved calculation to the shared minute, hour and day buckets."""
+        row = _rollup_row(calculation_data)
+        if row['created_at'] <= await self._rollups_cutoff():
+            return  # The backfill counts it
+        keys, values = calculation_rollups.increments(row) or ([], [])
+        if not keys:
+            return
+
+        update: Dict[str, Any] = {"$inc": {"live.rows": 1}}
+        for name, value in values:
+            update["$inc"].update({f"live.measures.{name}.count": 1, f"live.measures.{name}.total": value})
+            update.setdefault("$min", {})[f"live.measures.{name}.min"] = value
+            update.setdefault("$max", {})[f"live.measures.{name}.max"] = value
+        await self.db.calculation_rollups.bulk_write(
+            [UpdateOne(_rollup_filter(key), update, upsert=True) for key in keys], ordered=False
+        )
+
+    async def backfill_calculation_rollups(self, store: RollupStore = calculation_rollups) -> bool:
+        """Fold the calculations saved up to the cutoff into the shared rollups; False if another worker is on it.
+
+        Backfilled totals are written to each bucket's ``base`` with $set and
+        live saves increment ``live``, so a retried backfill never counts a
+        calculation twice.
+        """
+        start_time = time.time()
+        cutoff = await self._rollups_cutoff()
+        now = datetime.utcnow()
+        claimed = await self.db.calculation_rollups.find_one_and_update(
+            {"_id": ROLLUP_BACKFILL_ID, "done": False,
+             "$or": [{"started_at": None}, {"started_at": {"$lt": now - ROLLUP_BACKFILL_TIMEOUT}}]},
+            {"$set": {"started_at": now}}
+        )
+        if claimed is None:
+            return False
+
+        backfill = store.empty()
+        projection = {field: 1 for field in ("calculation_type", "type", store.time_column)
+                      + store.dimensions + store.measures}
+        async for calculation in self.db.calculations.find({"created_at": {"$not": {"$gt": cutoff}}}, projection):
+            backfill.record(_rollup_row(calculation))
+        operations = [UpdateOne(_rollup_filter(key), {"$set": {"base": stats.to_dict()}}, upsert=True)
+                      for key, stats in backfill.items()]
+        if operations:
+            await self.db.calculation_rollups.bulk_write(operations, ordered=False)
+        await self.db.calculation_rollups.update_one({"_id": ROLLUP_BACKFILL_ID}, {"$set": {"done": True}})
+
+        await self._track_query_performance('backfill_calculation_rollups', start_time)
+        logger.info("Backfilled calculation rollups", calculations=backfill.stats['rows'], buckets=len(operations))
+        return True
+
+    def schedule_rollup_backfill(self, store: RollupStore = calculation_rollups) -> asyncio.Task:
+        """Run the rollup backfill in the background; one backfill per worker at a time."""
+        task = self._rollup_backfill
+        if task is None or task.done():
+            task = asyncio.ensure_future(self.backfill_calculation_rollups(store))
+            self._rollup_backfill = task
+
+            def forget(done: asyncio.Task):
+                if not done.cancelled() and done.exception():
+                    logger.error("Failed to backfill calculation rollups", error=str(done.exception()))
+
+            task.add_done_callback(forget)
+        return task
+
+    async def ensure_calculation_rollups(self, store: RollupStore = calculation_rollups) -> bool:
+        """Whether the rollups are backfilled; if not, starts the backfill in the background."""
+        marker = await self.db.calculation_rollups.find_one({"_id": ROLLUP_BACKFILL_ID})
+        if marker and marker.get("done"):
+            return True
+        self.schedule_rollup_backfill(store)
+        return False
+
+    async def load_calculation_rollups(self, store: RollupStore,
+                                       requests: Dict[Optional[str], List[Piece]]) -> Optional[RollupStore]:
+        """Copy of the shared buckets covering ``requests`` (dimension -> pieces), or None while building.
+
+        The backfill never runs inline: until it is done this returns None and
+        dashboards are computed from the calculations as before.
+        """
+        start_time = time.time()
+        if not await self.ensure_calculation_rollups(store):
+            return None
+        await self._evict_calculation_rollups(store)
+
+        clauses = []
+        for dimension, pieces in requests.items():
+            for granularity, first, end in pieces:
+                clause: Dict[str, Any] = {"granularity": granularity, "dimension": dimension}
+                bounds = {**({"$gte": first} if first is not None else {}), **({"$lt": end} if end is not None else {})}
+                if bounds:
+                    clause["start"] = bounds
+                clauses.append(clause)
+
+        loaded = store.empty()
+        if clauses:
+            async for doc in self.db.calculation_rollups.find({"$or": clauses}):
+                key = (doc["granularity"], doc["dimension"], doc["label"], doc["start"])
+                for part in ("base", "live"):
+                    if part in doc:
+                        loaded.merge_bucket(key, BucketStats.from_dict(doc[part]))
+        loaded.loaded = True
+
+        await self._track_query_performance('load_calculation_rollups', start_time)
+        return loaded
+
+    async def _evict_calculation_rollups(self, store: RollupStore):
+        """Drop minute and hour buckets past their retention, at most once a minute per worker."""
+        now = store.clock()
+        if now < self._rollups_evicted_at + 60:
+            return
+        self._rollups_evicted_at = now
+        for granularity, _ in GRANULARITIES:
+            cutoff = store.available_from(granularity, now)
+            if cutoff is not None:
+                await self.db.calculation_rollups.delete_many({"granularity": granularity, "start": {"$lt": cutoff}})
+
     async def get_project_analytics(self, project_id: str) -> Dict[str, Any]:
-        """Get comprehensive project analytics using optimized aggregation."""
+        """Get project analytics from the materialized per-type totals."""
         start_time = time.time()
-        cache_key = f"analytics:project:{project_id}"
 
         try:
-            # Check cache first
-            if self.query_cache_enabled:
-                cached_result = await db_performance_optimizer.get_cached_query(cache_key)
-                if cached_result:
-                    self.performance_metrics['cache_hits'] += 1
-                    return cached_result
-
-            # Optimized aggregation pipeline
-            pipeline = [
-                {"$match": {"project_id": project_id}},
-                {"$group": {
-                    "_id": "$calculation_type",
-                    "count": {"$sum": 1},
-                    "avg_cfm": {"$avg": "$result_data.cfm"},
-                    "total_cfm": {"$sum": "$result_data.cfm"},
-                    "avg_pressure": {"$avg": "$result_data.pressure_drop"},
-                    "last_calculation": {"$max": "$created_at"}
-                }},
-                {"$sort": {"count": -1}}
+            cursor = self.db.project_analytics.find({"project_id": project_id}).sort("count", -1)
+            groups = await cursor.to_list(length=None)
+            if not any(group["calculation_type"] == BUILT_MARKER for group in groups):
+                # Never rebuilt: totals only hold what was saved since analytics were materialized
+                await self.rebuild_project_analytics(project_id)
+                cursor = self.db.project_analytics.find({"project_id": project_id}).sort("count", -1)
+                groups = await cursor.to_list(length=None)
+            groups = [group for group in groups if group["calculation_type"] != BUILT_MARKER]
+
+            analytics = [
+                {
+                    "_id": group["calculation_type"],
+                    "count": group["count"],
+                    "avg_cfm": group["cfm_sum"] / group["cfm_count"] if group.get("cfm_count") else None,
+                    "total_cfm": group.get("cfm_sum", 0),
+                    "avg_pressure": (group["pressure_sum"] / group["pressure_count"]
+                                     if group.get("pressure_count") else None),
+                    "last_calculation": group.get("last_calculation")
+                }
+                for group in groups
             ]
 
-            # Execute aggregation
-            cursor = self.db.calculations.aggregate(pipeline)
-            analytics = await cursor.to_list(length=None)
-
-            # Add summary statistics
             summary = {
                 "total_calculations": sum(item["count"] for item in analytics),
                 "calculation_types": len(analytics),
-                "total_system_cfm": sum(item.get("total_cfm", 0) for item in analytics),
+                "total_system_cfm": sum(item["total_cfm"] for item in analytics),
                 "generated_at": datetime.utcnow().isoformat()
             }
 
-            result = {
+            await self._track_query_performance('get_project_analytics', start_time)
+            return {
                 "summary": summary,
                 "by_type": analytics
             }
 
-            # Cache the result
-            if self.query_cache_enabled:
-                await db_performance_optimizer.optimize_query_cache(
-                    cache_key, result, ttl=900  # 15 minutes
-                )
-
-            await self._track_query_performance('get_project_analytics', start_time)
-            return result
-
         except Exception as e:
             logger.error("Failed to get project analytics",
                         project_id=project_id, error=str(e))
             return {}
 
+    async def rebuild_project_analytics(self, project_id: str) -> List[Dict[str, Any]]:
+        """Recompute a project's analytics totals from its calculations.
+
+        Saves keep folding into the totals while the rebuild runs. Each group is
+        set to the recomputed totals of calculations created before the rebuild
+        started, plus whatever was added to the group since then, so those
+        increments are neither lost nor counted twice.
+        """
+        start_time = time.time()
+        cutoff = datetime.utcnow()
+        snapshot = {
+            doc["calculation_type"]: doc
+            for doc in await self.db.project_analytics.find({"project_id": project_id}).to_list(length=None)
+        }
+        pipeline = [
+            {"$match": {"project_id": project_id, "created_at": {"$not": {"$gt": cutoff}}}},
+            {"$group": {
+                "_id": "$calculation_type",
+                "count": {"$sum": 1},
+                "cfm_sum": {"$sum": "$result_data.cfm"},
+                "cfm_count": {"$sum": {"$cond": [{"$isNumber": "$result_data.cfm"}, 1, 0]}},
+                "pressure_sum": {"$sum": "$result_data.pressure_drop"},
+                "pressure_count": {"$sum": {"$cond": [{"$isNumber": "$result_data.pressure_drop"}, 1, 0]}},
+                "last_calculation": {"$max": "$created_at"}
+            }},
+            {"$sort": {"count": -1}}
+        ]
+
+        cursor = self.db.calculations.aggregate(pipeline)
+        groups = []
+        for item in await cursor.to_list(length=None):
+            groups.append({"project_id": project_id, "calculation_type": item.pop("_id"), **item})
+
+        # Groups that no longer have calculations drop to whatever was added since the snapshot
+        rebuilt_types = {group["calculation_type"] for group in groups}
+        emptied = [
+            {"project_id": project_id, "calculation_type": calculation_type, "last_calculation": None,
+             **{total: 0 for total in ANALYTICS_TOTALS}}
+            for calculation_type in snapshot
+            if calculation_type not in rebuilt_types and calculation_type != BUILT_MARKER
+        ]
+        operations = [
+            UpdateOne(
+                {"project_id": project_id, "calculation_type": group["calculation_type"]},
+                [{"$set": {
+                    **{
+                        total: {"$add": [group[total], {"$subtract": [
+                            {"$ifNull": [f"${total}", 0]},
+                            snapshot.get(group["calculation_type"], {}).get(total, 0)
+                        ]}]}
+                        for total in ANALYTICS_TOTALS
+                    },
+                    "last_calculation": {"$max": ["$last_calculation", group["last_calculation"]]}
+                }}],
+                upsert=True
+            )
+            for group in groups + emptied
+        ]
+        operations.append(UpdateOne(
+            {"project_id": project_id, "calculation_type": BUILT_MARKER},
+            {"$set": {"count": 0}},
+            upsert=True
+        ))
+
+        await self.db.project_analytics.bulk_write(operations, ordered=False)
+        await self.db.project_analytics.delete_many({
+            "project_id": project_id,
+            "calculation_type": {"$in": [group["calculation_type"] for group in emptied]},
+            "count": {"$lte": 0}
+        })
+
+        await self._track_query_performance('rebuild_project_analytics', start_time)
+        logger.info("Rebuilt project analytics", project_id=project_id, groups=len(groups))
+        return groups
+
+    def schedule_analytics_rebuild(self, project_id: str) -> asyncio.Task:
+        """Rebuild a project's analytics in the background; one rebuild per project at a time."""
+        task = self._analytics_rebuilds.get(project_id)
+        if task is None or task.done():
+            task = asyncio.ensure_future(self.rebuild_project_analytics(project_id))
+            self._analytics_rebuilds[project_id] = task
+
+            def forget(done: asyncio.Task):
+                if self._analytics_rebuilds.get(project_id) is done:
+                    del self._analytics_rebuilds[project_id]
+                if not done.cancelled() and done.exception():
+                    logger.error("Failed to rebuild project analytics",
+                                project_id=project_id, error=str(done.exception()))
+
+            task.add_done_callback(forget)
+        return task
+
     # Enhanced Spatial Queries with Geographic Optimization
-    async def find_spatial_data_in_bounds(self,
-                                         project_id: str,
-                                         bounds: Dict[str, float],
-                                         layer_type: str = None) -> List[Dict[str, Any]]:
-        """Find spatial data within geographic bounds using optimized queries."""
+    def _viewport_query(self, project_id: str, bounds: Dict[str, float],
+                        layer_type: Optional[str] = None, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """Viewport filter served by the (project_id, [layer_type,] spatial_key, _id) indexes.
+
+        Raises ValueError when ``cursor`` is not a document id.
+        """
+        query = {"project_id": project_id}
+        if layer_type:
+            query["layer_type"] = layer_type
+        query.update(spatial_quadtree.key_filter(bounds))
+        query.update(bounds_intersect_filter(bounds))
+        if cursor:
+            if not ObjectId.is_valid(cursor):
+                raise ValueError("Invalid cursor")
+            query["_id"] = {"$gt": ObjectId(cursor)}
+        return query
+
+    async def find_spatial_data_page(self,
+                                     project_id: str,
+                                     bounds: Dict[str, float],
+                                     layer_type: str = None,
+                                     limit: int = 500,
+                                     cursor: Optional[str] = None) -> Dict[str, Any]:
+        """Find one page of spatial data intersecting a viewport.
+
+        Pass the returned ``next_cursor`` back as ``cursor`` to fetch the
+        following page; it is None once the viewport is exhausted.
+        """
         start_time = time.time()
 
-        try:
-            # Build optimized query
-            query = {
-                "project_id": project_id,
-                "bounds.min_x": {"$lte": bounds["max_x"]},
-                "bounds.max_x": {"$gte": bounds["min_x"]},
-                "bounds.min_y": {"$lte": bounds["max_y"]},
-                "bounds.max_y": {"$gte": bounds["min_y"]}
-            }
+        query = self._viewport_query(project_id, bounds, layer_type, cursor)
 
-            if layer_type:
-                query["layer_type"] = layer_type
+        # Use projection to limit data transfer
+        projection = {
+            "large_geometry_data": 0,  # Exclude large fields
+            "raw_coordinates": 0
+        }
 
-            # Use projection to limit data transfer
-            projection = {
-                "large_geometry_data": 0,  # Exclude large fields
-                "raw_coordinates": 0
-            }
+        # Fetch one extra document to learn whether another page exists
+        documents = await self.db.spatial_data.find(query, projection) \
+            .sort("_id", 1).limit(limit + 1).to_list(length=limit + 1)
+        has_more = len(documents) > limit
+        documents = documents[:limit]
 
-            cursor = self.db.spatial_data.find(query, projection).sort("created_at", -1)
-            spatial_data = await cursor.to_list(length=1000)  # Limit results
+        for doc in documents:
+            doc['_id'] = str(doc['_id'])
 
-            # Convert ObjectIds to strings
-            for doc in spatial_data:
-                doc['_id'] = str(doc['_id'])
+        await self._track_query_performance('find_spatial_data_page', start_time)
+        return {
+            "spatial_data": documents,
+            "next_cursor": documents[-1]['_id'] if has_more else None
+        }
 
-            await self._track_query_performance('find_spatial_data_in_bounds', start_time)
-            return spatial_data
+    async def find_spatial_data_in_bounds(self,
+                                         project_id: str,
+                                         bounds: Dict[str, float],
+                                         layer_type: str = None,
+                                         limit: int = 1000) -> List[Dict[str, Any]]:
+        """Find spatial data within geographic bounds using the quadtree index."""
+        try:
+            page = await self.find_spatial_data_page(project_id, bounds, layer_type, limit=limit)
+            return page["spatial_data"]
 
         except Exception as e:
             logger.error("Failed to find spatial data in bounds",
                         project_id=project_id, error=str(e))
             return []
 
+    async def backfill_spatial_keys(self, batch_size: int = 1000) -> int:
+        """Add bounds and quadtree keys to spatial data saved before they existed."""
+        updated = 0
+        operations = []
+        query = {"spatial_key": {"$exists": False},
+                 "$or": [{"coordinates": {"$exists": True}}, {"geometry.coordinates": {"$exists": True}}]}
+
+        async for doc in self.db.spatial_data.find(query, {"coordinates": 1, "geometry.coordinates": 1}):
+            fields = dict(doc)
+            self._index_spatial_fields(fields)
+            if 'spatial_key' not in fields:
+                continue
+            operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": {
+                "bounds": fields["bounds"],
+                "spatial_key": fields["spatial_key"],
+                "_spatial_indexed": True
+            }}))
+            if len(operations) >= batch_size:
+                await self.db.spatial_data.bulk_write(operations, ordered=False)
+                updated += len(operations)
+                operations = []
+
+        if operations:
+            await self.db.spatial_data.bulk_write(operations, ordered=False)
+            updated += len(operations)
+
+        logger.info("Backfilled spatial keys", updated=updated)
+        return updated
+
     # Performance Monitoring and Metrics
     async def get_service_metrics(self) -> Dict[str, Any]:
         """Get MongoDB service performance metrics."""
@@ -605,6 +1000,7 @@ class EnhancedMongoDBService:
 
 # Global enhanced MongoDB service instance
 mongodb_service = EnhancedMongoDBService()
+calculation_rollups.loader = mongodb_service.load_calculation_rollups
 
 # Backward compatibility alias
 MongoDBService = EnhancedMongoDBService
@@ -0,0 +1,83 @@
+"""
+Materialized Project Analytics for SizeWise Suite
+
+Project analytics are kept as running totals per project and per
+calculation or segment type, updated as rows are written, instead of being
+aggregated over every row when a cache entry expires. A read fetches one
+small row per type whatever the size of the project. Averages are derived
+from sums and counts at read time, and a rebuild recomputes the totals from
+the source rows if they ever drift (deletes, imports that bypass the
+services).
+"""
+
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Optional
+
+# Group of the zero row a rebuild always writes. Until a project has it, its
+# totals may only hold rows written since analytics were materialized, so
+# reads rebuild it first; afterwards, including for projects with no rows,
+# they never do
+BUILT_MARKER = '__built__'
+
+def metric_value(data: Any, key: str) -> Optional[float]:
+    """Numeric ``key`` from a metrics mapping or JSON string, else None."""
+    if isinstance(data, str):
+        try:
+            data = json.loads(data)
+        except ValueError:
+            return None
+    if not isinstance(data, dict):
+        return None
+    value = data.get(key)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return float(value)
+
+@dataclass
+class GroupStats:
+    """Running totals for one project/type group."""
+    count: int = 0
+    cfm_sum: float = 0.0
+    cfm_count: int = 0
+    pressure_sum: float = 0.0
+    pressure_count: int = 0
+    last_at: Optional[datetime] = None
+
+    def add(self, metrics: Any = None, at: Optional[datetime] = None):
+        self.count += 1
+        cfm = metric_value(metrics, 'cfm')
+        if cfm is not None:
+            self.cfm_sum += cfm
+            self.cfm_count += 1
+        pressure = metric_value(metrics, 'pressure_drop')
+        if pressure is not None:
+            self.pressure_sum += pressure
+            self.pressure_count += 1
+        if at is not None and (self.last_at is None or at > self.last_at):
+            self.last_at = at
+
+    @property
+    def avg_cfm(self) -> Optional[float]:
+        return self.cfm_sum / self.cfm_count if self.cfm_count else None
+
+    @property
+    def avg_pressure(self) -> Optional[float]:
+        return self.pressure_sum / self.pressure_count if self.pressure_count else None
+
+def accumulate(records: Iterable[Dict[str, Any]], group_of: Callable[[Dict[str, Any]], Any],
+               metrics_of: Callable[[Dict[str, Any]], Any] = lambda record: None,
+               at: Optional[datetime] = None) -> Dict[Any, GroupStats]:
+    """Fold a batch of new rows into per-group deltas."""
+    groups: Dict[Any, GroupStats] = {}
+    for record in records:
+        group = group_of(record)
+        stats = groups.get(group)
+        if stats is None:
+            stats = groups[group] = GroupStats()
+        stats.add(metrics_of(record), at)
+    return groups
+
+def format_timestamp(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
@@ -0,0 +1,150 @@
+"""
+Quadtree Tile Keys for SizeWise Suite Spatial Data
+
+Floor plan geometry uses planar drawing coordinates rather than longitude
+and latitude, and most items (duct runs, rooms, equipment) are extents
+rather than points, so MongoDB's 2dsphere/2d indexes do not fit. Instead,
+every item is stored with the key of the smallest quadtree cell that fully
+encloses its bounding box. A cell's key is its parent's key plus a quadrant
+digit (0-3), so the key doubles as a path from the root.
+
+A viewport is covered by a handful of cells at one level. Items that
+intersect it either:
+
+- live in a descendant of a covering cell, which is a key prefix range, or
+- live in an ancestor of a covering cell, which is a short list of exact keys.
+
+Both are index range scans on (project_id, spatial_key), and the exact
+bounding-box test only runs on that small candidate set.
+"""
+
+import math
+import os
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Digits sort after every quadrant digit, closing descendant key ranges
+_RANGE_END = '4'
+
+def _extent_from_env() -> float:
+    return float(os.getenv('SPATIAL_INDEX_EXTENT', 2 ** 21))
+
+class QuadTree:
+    """Square quadtree over [origin, origin + size) on both axes."""
+
+    def __init__(self, origin_x: Optional[float] = None, origin_y: Optional[float] = None,
+                 size: Optional[float] = None, max_depth: int = 20, max_cover_cells: int = 16):
+        self.size = size if size is not None else _extent_from_env()
+        self.origin_x = origin_x if origin_x is not None else -self.size / 2
+        self.origin_y = origin_y if origin_y is not None else -self.size / 2
+        self.max_depth = max_depth
+        self.max_cover_cells = max_cover_cells
+
+    def _cell(self, x: float, y: float, depth: int) -> Tuple[int, int]:
+        cells = 1 << depth
+        cell_size = self.size / cells
+        column = int((x - self.origin_x) // cell_size)
+        row = int((y - self.origin_y) // cell_size)
+        return min(max(column, 0), cells - 1), min(max(row, 0), cells - 1)
+
+    @staticmethod
+    def _key(column: int, row: int, depth: int) -> str:
+        digits = []
+        for level in range(depth - 1, -1, -1):
+            digits.append(str(((row >> level) & 1) * 2 + ((column >> level) & 1)))
+        return ''.join(digits)
+
+    def _inside(self, bounds: Dict[str, float]) -> bool:
+        return (bounds['min_x'] >= self.origin_x and bounds['min_y'] >= self.origin_y and
+                bounds['max_x'] < self.origin_x + self.size and
+                bounds['max_y'] < self.origin_y + self.size)
+
+    def key_for_bounds(self, bounds: Dict[str, float]) -> str:
+        """Key of the smallest cell that fully encloses ``bounds``."""
+        if not bounds or not self._inside(bounds):
+            return ''  # The root cell is an ancestor of every viewport
+
+        low = self._cell(bounds['min_x'], bounds['min_y'], self.max_depth)
+        high = self._cell(bounds['max_x'], bounds['max_y'], self.max_depth)
+        depth = self.max_depth
+        # Walk up until both corners fall in the same cell
+        while low != high:
+            low = (low[0] >> 1, low[1] >> 1)
+            high = (high[0] >> 1, high[1] >> 1)
+            depth -= 1
+        return self._key(low[0], low[1], depth)
+
+    def cover(self, bounds: Dict[str, float]) -> List[str]:
+        """Keys of the cells at one level that together cover ``bounds``."""
+        width = max(bounds['max_x'] - bounds['min_x'], bounds['max_y'] - bounds['min_y'])
+        depth = self.max_depth
+        if width > 0:
+            depth = min(self.max_depth, max(0, int(math.floor(math.log2(self.size / width)))))
+
+        while True:
+            low = self._cell(bounds['min_x'], bounds['min_y'], depth)
+            high = self._cell(bounds['max_x'], bounds['max_y'], depth)
+            count = (high[0] - low[0] + 1) * (high[1] - low[1] + 1)
+            if count <= self.max_cover_cells or depth == 0:
+                break
+            depth -= 1
+
+        return [
+            self._key(column, row, depth)
+            for row in range(low[1], high[1] + 1)
+            for column in range(low[0], high[0] + 1)
+        ]
+
+    def key_filter(self, bounds: Dict[str, float], field: str = 'spatial_key') -> Dict[str, Any]:
+        """
+        MongoDB filter on ``field`` matching every cell that can intersect
+        ``bounds``. Bounds that are not finite or are inverted (min > max)
+        intersect nothing, and get a filter that matches nothing.
+        """
+        if not valid_bounds(bounds):
+            return {field: {'$in': []}}
+        cover = self.cover(bounds)
+        ancestors = sorted({key[:length] for key in cover for length in range(len(key))})
+        clauses: List[Dict[str, Any]] = [
+            {field: {'$gte': key, '$lt': key + _RANGE_END}} for key in cover
+        ]
+        if ancestors:
+            clauses.append({field: {'$in': ancestors}})
+        return {'$or': clauses}
+
+def valid_bounds(bounds: Dict[str, float]) -> bool:
+    """Whether every coordinate is finite and each min is at most its max."""
+    values = [bounds.get(key) for key in ('min_x', 'min_y', 'max_x', 'max_y')]
+    if not all(isinstance(value, (int, float)) and math.isfinite(value) for value in values):
+        return False
+    return bounds['min_x'] <= bounds['max_x'] and bounds['min_y'] <= bounds['max_y']
+
+def calculate_bounds(coordinates: Iterable[Sequence[float]]) -> Dict[str, float]:
+    """Bounding box of a flat list of [x, y, ...] points."""
+    points = [coord for coord in coordinates if len(coord) >= 2]
+    if not points:
+        return {}
+    xs = [point[0] for point in points]
+    ys = [point[1] for point in points]
+    return {'min_x': min(xs), 'max_x': max(xs), 'min_y': min(ys), 'max_y': max(ys)}
+
+def flatten_coordinates(coordinates: Any) -> List[Sequence[float]]:
+    """Flatten GeoJSON-style nested coordinate arrays into a list of points."""
+    if not coordinates:
+        return []
+    if isinstance(coordinates[0], (int, float)):
+        return [coordinates]
+    points = []
+    for item in coordinates:
+        points.extend(flatten_coordinates(item))
+    return points
+
+def bounds_intersect_filter(bounds: Dict[str, float]) -> Dict[str, Any]:
+    """Exact bounding-box intersection test applied to the candidate set."""
+    return {
+        'bounds.min_x': {'$lte': bounds['max_x']},
+        'bounds.max_x': {'$gte': bounds['min_x']},
+        'bounds.min_y': {'$lte': bounds['max_y']},
+        'bounds.max_y': {'$gte': bounds['min_y']}
+    }
+
+spatial_quadtree = QuadTree()
@@ -0,0 +1,311 @@
+"""
+Test suite for the event-driven alert rule engine
+Validates windowed aggregates, duration state machines and MetricsCollector wiring
+"""
+
+import asyncio
+import threading
+import pytest
+from unittest.mock import AsyncMock
+from flask import Flask
+from backend.monitoring import MetricsCollector as metrics_module
+from backend.monitoring.alert_rule_engine import (
+    AlertRuleEngine, AlertState, Aggregation, SlidingWindow
+)
+from backend.monitoring.MetricsCollector import MetricsCollector, AlertRule, AlertSeverity, init_request_metrics
+
+
+def make_rule(name, threshold, condition=">", duration=0, metric="cpu", **kwargs):
+    return AlertRule(
+        name=name,
+        metric_name=metric,
+        condition=condition,
+        threshold=threshold,
+        severity=AlertSeverity.WARNING,
+        duration_seconds=duration,
+        **kwargs
+    )
+
+
+class TestSlidingWindow:
+    """Test cases for SlidingWindow aggregates"""
+
+    def test_avg_sum_count_evict_old_samples(self):
+        """Test running aggregates drop samples outside the window"""
+        window = SlidingWindow(10)
+        window.add(0, 10)
+        window.add(5, 20)
+        window.add(12, 30)  # Evicts the sample at t=0
+
+        assert window.aggregate(Aggregation.COUNT) == 2
+        assert window.aggregate(Aggregation.SUM) == 50
+        assert window.aggregate(Aggregation.AVG) == 25
+        assert window.aggregate(Aggregation.LAST) == 30
+
+    def test_rate_handles_counter_reset(self):
+        """Test rate uses counter increases and tolerates resets"""
+        window = SlidingWindow(10)
+        window.add(0, 100)
+        window.add(5, 150)
+        window.add(8, 20)  # Counter reset counts as an increase of 20
+
+        assert window.aggregate(Aggregation.RATE) == pytest.approx(7.0)
+
+    def test_quantile(self):
+        """Test quantile over the sorted window values"""
+        window = SlidingWindow(100, track_quantiles=True)
+        for i, value in enumerate(range(1, 101)):
+            window.add(i * 0.5, value)
+
+        assert window.aggregate(Aggregation.QUANTILE, 0.95) == 95
+        assert window.aggregate(Aggregation.QUANTILE, 0.5) == 50
+
+    def test_empty_window(self):
+        """Test aggregates of an empty window are undefined"""
+        assert SlidingWindow(10).aggregate(Aggregation.AVG) is None
+
+
+class TestAlertRuleEngine:
+    """Test cases for AlertRuleEngine"""
+
+    def setup_method(self):
+        """Setup test environment"""
+        self.engine = AlertRuleEngine()
+
+    def test_unwatched_metric_is_ignored(self):
+        """Test samples for metrics without rules do no work"""
+        self.engine.add_rule(make_rule("cpu_high", 80))
+        assert self.engine.observe("memory", 99, 0) == []
+        assert self.engine.samples_observed == 0
+
+    def test_fires_immediately_without_duration(self):
+        """Test rules with no duration fire on the first matching sample"""
+        self.engine.add_rule(make_rule("cpu_high", 80))
+
+        transitions = self.engine.observe("cpu", 90, 0)
+
+        assert len(transitions) == 1
+        assert transitions[0].state == AlertState.FIRING
+        assert transitions[0].value == 90
+
+    def test_duration_state_machine(self):
+        """Test inactive -> pending -> firing -> inactive"""
+        self.engine.add_rule(make_rule("cpu_high", 80, duration=60))
+
+        assert self.engine.observe("cpu", 90, 0) == []
+        assert self.engine.get_rule_state("cpu_high").state == AlertState.PENDING
+
+        assert self.engine.observe("cpu", 95, 30) == []
+        transitions = self.engine.observe("cpu", 95, 61)
+        assert [t.state for t in transitions] == [AlertState.FIRING]
+        assert transitions[0].duration_seconds == 61
+
+        # Already firing: no duplicate transition
+        assert self.engine.observe("cpu", 95, 70) == []
+
+        transitions = self.engine.observe("cpu", 10, 80)
+        assert [t.state for t in transitions] == [AlertState.INACTIVE]
+        assert transitions[0].previous_state == AlertState.FIRING
+
+    def test_pending_resets_silently(self):
+        """Test a pending rule that clears emits no transition"""
+        self.engine.add_rule(make_rule("cpu_high", 80, duration=60))
+        self.engine.observe("cpu", 90, 0)
+
+        assert self.engine.observe("cpu", 50, 30) == []
+        assert self.engine.get_rule_state("cpu_high").state == AlertState.INACTIVE
+
+        # Duration restarts from the next breach
+        self.engine.observe("cpu", 90, 40)
+        assert self.engine.observe("cpu", 90, 90) == []
+
+    def test_evaluate_pending_without_new_samples(self):
+        """Test pending rules fire from the sweep once duration elapses"""
+        self.engine.add_rule(make_rule("cpu_high", 80, duration=60))
+        self.engine.observe("cpu", 90, 0)
+
+        assert self.engine.evaluate_pending(30) == []
+        transitions = self.engine.evaluate_pending(61)
+        assert [t.rule.name for t in transitions] == ["cpu_high"]
+
+    @pytest.mark.parametrize("condition,value,expected", [
+        (">", 80, []), (">", 81, ["r"]),
+        (">=", 80, ["r"]), (">=", 79, []),
+        ("<", 80, []), ("<", 79, ["r"]),
+        ("<=", 80, ["r"]), ("<=", 81, []),
+        ("==", 80, ["r"]), ("!=", 80, []),
+    ])
+    def test_conditions(self, condition, value, expected):
+        """Test every supported comparison operator"""
+        self.engine.add_rule(make_rule("r", 80, condition=condition))
+        assert [t.rule.name for t in self.engine.observe("cpu", value, 0)] == expected
+
+    def test_threshold_index_only_matches_breached_rules(self):
+        """Test sorted thresholds select exactly the breached rules"""
+        for threshold in range(0, 100, 10):
+            self.engine.add_rule(make_rule(f"gt_{threshold}", threshold))
+
+        fired = {t.rule.name for t in self.engine.observe("cpu", 35, 0)}
+        assert fired == {"gt_0", "gt_10", "gt_20", "gt_30"}
+
+    def test_windowed_avg_rule(self):
+        """Test avg aggregation smooths a single spike"""
+        self.engine.add_rule(make_rule("avg_high", 50, aggregation="avg", window_seconds=60))
+
+        self.engine.observe("cpu", 10, 0)
+        self.engine.observe("cpu", 10, 1)
+        assert self.engine.observe("cpu", 100, 2) == []  # avg 40
+        assert len(self.engine.observe("cpu", 100, 3)) == 1  # avg 55
+
+    def test_quantile_rule(self):
+        """Test quantile aggregation"""
+        self.engine.add_rule(make_rule(
+            "p95_slow", 2.0, aggregation="quantile", window_seconds=300, quantile=0.95
+        ))
+        for i in range(18):
+            assert self.engine.observe("cpu", 0.1, i) == []
+        # 1 slow sample in 19 is above the 95th percentile rank
+        assert len(self.engine.observe("cpu", 5.0, 18)) == 1
+
+    def test_sync_rules_preserves_state(self):
+        """Test reconciling the rule list keeps state for unchanged rules"""
+        rule = make_rule("cpu_high", 80, duration=60)
+        self.engine.sync_rules([rule])
+        self.engine.observe("cpu", 90, 0)
+
+        self.engine.sync_rules([rule, make_rule("other", 1, metric="mem")])
+        assert self.engine.get_rule_state("cpu_high").state == AlertState.PENDING
+
+        self.engine.sync_rules([make_rule("other", 1, metric="mem")])
+        assert self.engine.get_rule_state("cpu_high") is None
+        assert not self.engine.watches("cpu")
+
+    def test_sync_rules_picks_up_in_place_edits(self):
+        """Test editing a registered rule object re-registers it with the new threshold"""
+        rule = make_rule("cpu_high", 80)
+        self.engine.sync_rules([rule])
+        rule.threshold = 95
+        self.engine.sync_rules([rule])
+
+        assert self.engine.observe("cpu", 90, 0) == []
+        assert len(self.engine.observe("cpu", 99, 1)) == 1
+
+    def test_samples_from_many_threads(self):
+        """Test concurrent observers neither lose samples nor corrupt the windows"""
+        self.engine.add_rule(make_rule("avg_high", 1000, aggregation="avg", window_seconds=1e9))
+
+        def feed():
+            for i in range(2000):
+                self.engine.observe("cpu", 1, i)
+
+        threads = [threading.Thread(target=feed) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert self.engine.samples_observed == 8000
+        assert self.engine.get_last_value("cpu") == 1
+
+
+class TestMetricsCollectorAlerting:
+    """Test cases for MetricsCollector event-driven alerting"""
+
+    def setup_method(self):
+        """Setup test environment"""
+        self.collector = MetricsCollector()
+        asyncio.run(self.collector._initialize_alert_rules())
+        self.collector._fire_alert = AsyncMock()
+        self.collector._resolve_alert = AsyncMock()
+
+    def test_record_metric_fires_and_resolves(self):
+        """Test samples fire and resolve alerts without polling"""
+        self.collector.alert_rules.append(make_rule("test_rule", 1.0, metric="test_metric"))
+
+        asyncio.run(self.collector.record_metric("test_metric", 2.0, {"test": "true"}))
+        self.collector._fire_alert.assert_awaited_once()
+        assert "test_rule_test_metric" in self.collector.active_alerts
+
+        asyncio.run(self.collector.record_metric("test_metric", 0.5))
+        self.collector._resolve_alert.assert_awaited_once()
+        assert "test_rule_test_metric" not in self.collector.active_alerts
+
+    def test_record_http_request_feeds_error_rate(self):
+        """Test HTTP requests feed the windowed error-rate rule"""
+        engine = self.collector.alert_engine
+        asyncio.run(self.collector.record_http_request("GET", "/api/health", 500, 0.01))
+
+        state = engine.get_rule_state("high_error_rate")
+        assert state.state == AlertState.PENDING
+        assert state.last_value == 1.0
+
+    def test_labelled_rules_only_see_matching_samples(self):
+        """Test a rule with label matchers ignores samples from other series"""
+        self.collector.alert_rules.append(make_rule(
+            "slow_reports", 1.0, metric="sizewise_http_request_duration_seconds",
+            labels={"endpoint": "/api/reports"}
+        ))
+
+        asyncio.run(self.collector.record_http_request("GET", "/api/health", 200, 5.0))
+        assert self.collector.alert_engine.get_rule_state("slow_reports").state == AlertState.INACTIVE
+
+        asyncio.run(self.collector.record_http_request("GET", "/api/reports", 200, 5.0))
+        assert "slow_reports_sizewise_http_request_duration_seconds" in self.collector.active_alerts
+
+    def test_flask_requests_fire_rules(self, monkeypatch):
+        """Test a real request through the Flask middleware fires an alert rule"""
+        monkeypatch.setattr(metrics_module, "metrics_collector", self.collector)
+        self.collector.alert_rules.append(make_rule(
+            "server_errors", 0, condition=">", metric="sizewise_http_request_errors",
+            labels={"endpoint": "/api/items/<item_id>"}
+        ))
+        app = Flask(__name__)
+
+        @app.route("/api/items/<item_id>")
+        def item(item_id):
+            return ("boom", 500) if item_id == "bad" else "ok"
+
+        init_request_metrics(app)
+        client = app.test_client()
+
+        # Samples are evaluated on the collector's loop, not in the request thread
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        self.collector.loop = loop
+
+        def drain():
+            asyncio.run_coroutine_threadsafe(asyncio.sleep(0), loop).result(timeout=5)
+
+        try:
+            assert client.get("/api/items/good").status_code == 200
+            assert client.get("/missing").status_code == 404
+            drain()
+            self.collector._fire_alert.assert_not_awaited()
+
+            assert client.get("/api/items/bad").status_code == 500
+            drain()
+            self.collector._fire_alert.assert_awaited_once()
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+        requests = self.collector.metrics['http_requests_total']
+        assert requests.labels(method="GET", endpoint="<unmatched>", status_code="404")._value.get() >= 1
+
+    def test_requests_without_a_collector_loop_still_count(self, monkeypatch):
+        """Test requests only update Prometheus when the collector loop is not running"""
+        monkeypatch.setattr(metrics_module, "metrics_collector", self.collector)
+        app = Flask(__name__)
+
+        @app.route("/api/ping")
+        def ping():
+            return ("boom", 500)
+
+        init_request_metrics(app)
+        assert app.test_client().get("/api/ping").status_code == 500
+
+        requests = self.collector.metrics['http_requests_total']
+        assert requests.labels(method="GET", endpoint="/api/ping", status_code="500")._value.get() == 1
+        assert self.collector.alert_engine.samples_observed == 0
+
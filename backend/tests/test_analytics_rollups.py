@@ -0,0 +1,303 @@
+"""
+Test suite for incremental analytics rollups
+Validates bucket covering, retention, agreement with the columnar engine, fallback to raw rows
+and the shared MongoDB buckets
+"""
+
+import asyncio
+import random
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+from backend.analytics.columnar_engine import ColumnarReportEngine, ColumnarTable
+from backend.analytics.rollups import RollupPlanner, RollupStore, epoch_seconds
+from backend.services.mongodb_service import ROLLUP_BACKFILL_ID, EnhancedMongoDBService
+from backend.tests.test_columnar_engine import Aggregation, Chart, Kind
+
+NOW = datetime(2025, 6, 15, 12, 30)
+TYPES = ["Load Calculation", "Duct Sizing", "Equipment Selection"]
+REGIONS = ["Europe", "Asia", "Other"]
+
+
+def calculations(count=3000, seed=11):
+    rng = random.Random(seed)
+    return [{
+        "id": f"calc_{i}",
+        "type": rng.choice(TYPES),
+        "region": rng.choice(REGIONS),
+        "user_id": f"user_{rng.randrange(5)}",
+        "created_at": NOW - timedelta(seconds=rng.randrange(40 * 86400)),
+        "execution_time": round(rng.uniform(0.5, 30.0), 3)
+    } for i in range(count)]
+
+
+MERGEABLE_CHARTS = [
+    Chart("by_type", Kind.BAR, "type", "execution_time", Aggregation.AVERAGE,
+          filters={"time_range": "LAST_7_DAYS"}),
+    Chart("daily", Kind.LINE, "created_at", "count", Aggregation.COUNT, filters={"time_range": "LAST_30_DAYS"}),
+    Chart("daily_max", Kind.LINE, "created_at", "execution_time", Aggregation.MAX,
+          filters={"region": ["Asia"], "time_range": "LAST_24_HOURS"}),
+    Chart("regions", Kind.PIE, "region", "count", filters={"region": ["Europe", "Other"]}),
+    Chart("fastest", Kind.GAUGE, "type", "execution_time", Aggregation.MIN,
+          filters={"user_id": ["user_1", "user_2"], "time_range": "LAST_7_DAYS"}),
+    Chart("total", Kind.GAUGE, "type", "execution_time", Aggregation.SUM)
+]
+
+
+def calculation_store(**retention):
+    return RollupStore("created_at", dimensions=("type", "region", "user_id"), measures=("execution_time",),
+                       retention=retention, clock=lambda: epoch_seconds(NOW))
+
+
+class TestRollupStore:
+    """Test cases for bucket maintenance"""
+
+    def test_cover_uses_coarsest_buckets(self):
+        """Test a trailing window is covered by minutes, then hours, then days"""
+        store = calculation_store()
+        now = epoch_seconds(NOW)
+        start = epoch_seconds(datetime(2025, 6, 14, 10, 15))
+
+        pieces = store.cover(start, now)
+
+        assert [granularity for granularity, _, _ in pieces] == ['minute', 'hour', 'day']
+        assert pieces[0][1:] == (start, epoch_seconds(datetime(2025, 6, 14, 11)))
+        assert pieces[1][1:] == (pieces[0][2], epoch_seconds(datetime(2025, 6, 15)))
+        assert pieces[2] == ('day', pieces[1][2], None)
+
+    def test_old_windows_start_at_kept_granularity(self):
+        """Test minute buckets past retention are evicted and old windows begin on an hour"""
+        store = calculation_store(minute=86400)
+        store.record({"created_at": NOW - timedelta(days=1, minutes=5), "type": "Duct Sizing"})
+        store.record({"created_at": NOW - timedelta(minutes=5), "type": "Duct Sizing"})
+
+        assert len(store.buckets[('minute', 'type')]) == 1
+        assert len(store.buckets[('hour', 'type')]) == 2
+        pieces = store.cover(epoch_seconds(NOW - timedelta(days=3, minutes=10)), epoch_seconds(NOW))
+        assert pieces[0] == ('hour', epoch_seconds(datetime(2025, 6, 12, 12)), epoch_seconds(datetime(2025, 6, 13)))
+
+
+class TestRollupPlanner:
+    """Test cases for serving charts from rollups"""
+
+    def setup_method(self):
+        """Setup test environment"""
+        self.rows = calculations()
+        self.table = ColumnarTable.from_records(self.rows, time_column="created_at")
+        self.store = calculation_store(minute=None, hour=None)
+        for row in self.rows:
+            self.store.record(row)
+        self.store.loaded = True
+        self.engine = ColumnarReportEngine()
+        self.planner = RollupPlanner({"calculations": self.store}, self.engine)
+
+    @pytest.mark.parametrize("chart", MERGEABLE_CHARTS, ids=lambda chart: chart.id)
+    def test_matches_raw_rows(self, chart):
+        """Test rollup answers equal the engine's answers over the raw rows"""
+        served = self.planner.serve(chart, now=NOW)
+        computed = self.engine.compute_charts(self.table, [chart], now=NOW)[chart.id]
+
+        assert served["data"]
+        if chart.type == Kind.GAUGE:
+            assert served == computed
+        else:
+            assert served["data"] == [pytest.approx(point) for point in computed["data"]]
+
+    @pytest.mark.parametrize("chart", [
+        Chart("p95", Kind.BAR, "type", "execution_time", Aggregation.PERCENTILE),
+        Chart("two_dimensions", Kind.BAR, "type", "execution_time", filters={"region": ["Asia"]}),
+        Chart("dates", Kind.GAUGE, "type", "execution_time", filters={"date_range": {"start": "2025-06-01"}}),
+        Chart("unknown_measure", Kind.GAUGE, "type", "accuracy")
+    ], ids=lambda chart: chart.id)
+    def test_falls_back_to_rows(self, chart):
+        """Test charts rollups cannot answer exactly are left to the engine"""
+        assert self.planner.serve(chart, now=NOW) is None
+        assert self.planner.stats['fallbacks'] == 1
+
+    def test_new_rows_are_visible_immediately(self):
+        """Test a recorded calculation shows up in the next dashboard read"""
+        chart = Chart("count", Kind.GAUGE, "type", "count", Aggregation.COUNT, filters={"type": ["Audit"]})
+        assert self.planner.serve(chart, now=NOW)["data"]["value"] == 0
+
+        self.store.record({"created_at": NOW, "type": "Audit", "execution_time": 3.0})
+
+        assert self.planner.serve(chart, now=NOW)["data"]["value"] == 1
+
+
+def matches(doc, query):
+    """Evaluate the MongoDB filters the rollup service uses"""
+    for name, condition in query.items():
+        if name == '$or':
+            if not any(matches(doc, clause) for clause in condition):
+                return False
+            continue
+        value = doc.get(name)
+        if isinstance(condition, dict) and condition and all(key.startswith('$') for key in condition):
+            for operator, operand in condition.items():
+                if operator == '$not':
+                    if matches(doc, {name: operand}):
+                        return False
+                elif value is None or not {'$gt': value > operand, '$gte': value >= operand,
+                                           '$lt': value < operand}[operator]:
+                    return False
+        elif value != condition:
+            return False
+    return True
+
+
+def apply_update(doc, update, inserted):
+    """Apply $set/$inc/$min/$max (and $setOnInsert on insert) with dotted paths"""
+    for operator, fields in update.items():
+        if operator == '$setOnInsert' and not inserted:
+            continue
+        for path, value in fields.items():
+            *parents, leaf = path.split('.')
+            target = doc
+            for key in parents:
+                target = target.setdefault(key, {})
+            current = target.get(leaf)
+            if operator == '$inc':
+                value = (current or 0) + value
+            elif operator == '$min' and current is not None:
+                value = min(current, value)
+            elif operator == '$max' and current is not None:
+                value = max(current, value)
+            target[leaf] = value
+
+
+class FakeCollection:
+    """In-memory collection for the queries and updates the rollup service issues"""
+
+    def __init__(self, documents=()):
+        self.documents = [dict(doc) for doc in documents]
+        self.by_key = {}  # Documents upserted by an exact-match filter, for fast bucket updates
+        self.loose = list(self.documents)  # The others, searched one by one
+
+    def _upsert(self, query, update, upsert):
+        exact = not any(name.startswith('$') or isinstance(value, dict) for name, value in query.items())
+        key = tuple(sorted(query.items(), key=lambda item: item[0])) if exact else None
+        found = self.by_key.get(key) if exact else None
+        if found is None:
+            found = next((doc for doc in (self.loose if exact else self.documents) if matches(doc, query)), None)
+        if found is not None:
+            before = dict(found)
+            apply_update(found, update, inserted=False)
+            return before, found
+        if not upsert:
+            return None, None
+        doc = {name: value for name, value in query.items() if not name.startswith('$')}
+        apply_update(doc, update, inserted=True)
+        self.documents.append(doc)
+        if exact:
+            self.by_key[key] = doc
+        else:
+            self.loose.append(doc)
+        return None, doc
+
+    async def find_one(self, query):
+        return next((dict(doc) for doc in self.documents if matches(doc, query)), None)
+
+    async def find_one_and_update(self, query, update, upsert=False, return_document=False):
+        before, after = self._upsert(query, update, upsert)
+        return dict(after) if return_document and after else before
+
+    async def update_one(self, query, update, upsert=False):
+        self._upsert(query, update, upsert)
+
+    async def bulk_write(self, operations, ordered=True):
+        for operation in operations:
+            self._upsert(operation._filter, operation._doc, operation._upsert)
+
+    async def delete_many(self, query):
+        self.documents = [doc for doc in self.documents if not matches(doc, query)]
+        self.by_key = {key: doc for key, doc in self.by_key.items() if not matches(doc, query)}
+        self.loose = [doc for doc in self.loose if not matches(doc, query)]
+
+    async def insert_one(self, document):
+        self.documents.append(dict(document))
+        self.loose.append(self.documents[-1])
+
+    def find(self, query, projection=None):
+        found = [dict(doc) for doc in self.documents if matches(doc, query)]
+
+        async def cursor():
+            for doc in found:
+                yield doc
+
+        return cursor()
+
+
+class FakeRollupDatabase:
+    def __init__(self, calculations=()):
+        self.calculations = FakeCollection(calculations)
+        self.calculation_rollups = FakeCollection()
+
+
+class TestSharedRollups:
+    """Test cases for rollups kept in MongoDB and shared by every worker"""
+
+    def setup_method(self):
+        """Setup test environment"""
+        self.rows = calculations(count=1000)
+        self.cutoff = NOW - timedelta(days=10)  # Saves after this were recorded live
+        self.database = FakeRollupDatabase(self.rows)
+        self.database.calculation_rollups = FakeCollection(
+            [{'_id': ROLLUP_BACKFILL_ID, 'cutoff': self.cutoff, 'done': False}]
+        )
+        self.store = calculation_store(minute=None, hour=None)
+        self.engine = ColumnarReportEngine()
+        self.planner = RollupPlanner({"calculations": self.store}, self.engine)
+
+    def run(self, coroutine):
+        with patch('backend.services.mongodb_service.get_mongodb_database', return_value=self.database), \
+                patch('backend.services.mongodb_service.calculation_rollups', self.store):
+            return asyncio.run(coroutine)
+
+    def load(self, service):
+        requests = self.planner.requests(MERGEABLE_CHARTS, now=NOW)["calculations"]
+        return self.run(service.load_calculation_rollups(self.store, requests))
+
+    def load_when_built(self, service, requests):
+        async def load():
+            # The first load only starts the backfill; the request is not held up by it
+            assert await service.load_calculation_rollups(self.store, requests) is None
+            await service._rollup_backfill
+            return await service.load_calculation_rollups(self.store, requests)
+        return self.run(load())
+
+    def test_rollups_match_raw_rows_across_workers(self):
+        """Test backfilled and live-recorded buckets, read by another worker, equal the engine over the same rows"""
+        recorder = EnhancedMongoDBService()
+        for row in self.rows:
+            self.run(recorder._record_calculation_rollups(dict(row)))  # Rows up to the cutoff are left to the backfill
+
+        requests = self.planner.requests(MERGEABLE_CHARTS, now=NOW)["calculations"]
+        loaded = self.load_when_built(EnhancedMongoDBService(), requests)
+        table = ColumnarTable.from_records(self.rows, time_column="created_at")
+        computed = self.engine.compute_charts(table, MERGEABLE_CHARTS, now=NOW)
+        for chart in MERGEABLE_CHARTS:
+            served = self.planner.serve(chart, now=NOW, stores={"calculations": loaded})
+            if chart.type == Kind.GAUGE:
+                assert served["data"] == pytest.approx(computed[chart.id]["data"]), chart.id
+            else:
+                assert served["data"] == [pytest.approx(point) for point in computed[chart.id]["data"]], chart.id
+
+    def test_backfill_runs_once_and_is_repeatable(self):
+        """Test a second worker waits for a running backfill and a retried one does not double count"""
+        first, second = EnhancedMongoDBService(), EnhancedMongoDBService()
+        marker = self.database.calculation_rollups.documents[0]
+        marker['started_at'] = datetime.utcnow()  # Another worker is backfilling
+        assert self.load(second) is None
+        assert self.planner.serve(MERGEABLE_CHARTS[-1], now=NOW, stores={}) is None
+
+        marker['started_at'] = None
+        rows_before_cutoff = sum(1 for row in self.rows if row['created_at'] <= self.cutoff)
+        total = Chart("count", Kind.GAUGE, "type", "count", Aggregation.COUNT)
+        counts = []
+        for _ in range(2):
+            marker.update(done=False, started_at=None)
+            requests = self.planner.requests([total], now=NOW)["calculations"]
+            loaded = self.load_when_built(first, requests)
+            counts.append(self.planner.serve(total, now=NOW, stores={"calculations": loaded})["data"]["value"])
+        assert counts == [rows_before_cutoff, rows_before_cutoff]
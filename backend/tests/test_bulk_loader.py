@@ -0,0 +1,228 @@
+"""
+Test suite for the bulk loader
+Validates the SQLite executemany path, COPY CSV rendering and chunked PostgreSQL merges
+"""
+
+import json
+import sqlite3
+import pytest
+from pathlib import Path
+from backend.database.bulk_loader import (
+    CALCULATIONS_TABLE, SEGMENTS_TABLE, SQLITE_BULK_PRAGMAS, CSVRowStream, load_postgresql, load_sqlite,
+    prepare_rows
+)
+
+
+SCHEMA_FILE = Path(__file__).resolve().parents[1] / "database" / "schema.sql"
+
+
+def make_segments(count):
+    return [
+        {'user_id': 'u1', 'name': f"Duct {i}", 'segment_type': 'duct',
+         'calculation_data': {'cfm': i * 10}}
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def connection(tmp_path):
+    connection = sqlite3.connect(tmp_path / "sizewise.db")
+    connection.executescript(SCHEMA_FILE.read_text())
+    connection.execute("INSERT INTO users (id, email) VALUES ('u1', 'engineer@example.com')")
+    connection.execute("INSERT INTO projects (id, user_id, name) VALUES ('p1', 'u1', 'Office')")
+    connection.commit()
+    yield connection
+    connection.close()
+
+
+class FakeCursor:
+    """Records statements and COPY payloads sent by the loader"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.returned = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql):
+        self.connection.statements.append(sql)
+        if sql.startswith("INSERT"):
+            # Every staged row is returned as newly inserted unless the test says otherwise
+            staged = [line.split(',', 1)[0].strip('"') for line in self.connection.copies[-1].splitlines()]
+            self.returned = [(row_id, row_id not in self.connection.existing)
+                             for row_id in staged if row_id not in self.connection.foreign]
+
+    def fetchall(self):
+        return self.returned
+
+    def copy_expert(self, sql, stream):
+        payload = ''
+        while True:
+            data = stream.read(64)
+            if not data:
+                break
+            payload += data
+        if self.connection.fail_on_copy == len(self.connection.copies):
+            raise RuntimeError("copy failed")
+        self.connection.copies.append(payload)
+
+
+class FakePostgresConnection:
+    """psycopg2-shaped connection that tracks transactions"""
+
+    def __init__(self, fail_on_copy=None, existing=(), foreign=()):
+        self.existing = set(existing)  # IDs already stored for the same project
+        self.foreign = set(foreign)  # IDs stored for another project
+        self.statements = []
+        self.copies = []
+        self.commits = 0
+        self.rollbacks = 0
+        self.fail_on_copy = fail_on_copy
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class TestPrepareRows:
+    """Test cases for row preparation"""
+
+    def test_ids_defaults_and_json(self):
+        """Test IDs are generated, provided IDs kept and JSON serialized"""
+        rows = [{'id': 'calc-1', 'inputs': {'cfm': 100}}, {'results': [1, 2]}]
+        ids, values = prepare_rows(CALCULATIONS_TABLE, rows, overrides={'project_id': 'p1'})
+
+        assert ids[0] == 'calc-1'
+        assert len(ids[1]) == 36
+        record = dict(zip(CALCULATIONS_TABLE.columns, values[0]))
+        assert record['inputs'] == '{"cfm": 100}'
+        assert record['project_id'] == 'p1'
+        assert record['is_valid'] is True
+        assert 'id' not in rows[1]
+
+    def test_restricted_spec(self):
+        """Test columns missing from the live table are dropped"""
+        spec = SEGMENTS_TABLE.restricted_to(['id', 'project_id', 'name', 'created_at'])
+        assert spec.columns == ('id', 'project_id', 'name', 'created_at')
+        assert spec.update_columns == ('name',)
+
+
+class TestSQLiteLoader:
+    """Test cases for the offline SQLite path"""
+
+    def test_load_returns_ids_in_order(self, connection):
+        """Test rows land in one transaction and IDs follow input order"""
+        result = load_sqlite(connection, SEGMENTS_TABLE, make_segments(1000),
+                             overrides={'project_id': 'p1'})
+
+        assert result.rows == 1000
+        stored = dict(connection.execute("SELECT id, name FROM project_segments").fetchall())
+        assert [stored[row_id] for row_id in result.ids] == [f"Duct {i}" for i in range(1000)]
+        calculation = connection.execute(
+            "SELECT calculation_data FROM project_segments WHERE id = ?", (result.ids[3],)
+        ).fetchone()[0]
+        assert json.loads(calculation) == {'cfm': 30}
+
+    def test_reload_merges_instead_of_duplicating(self, connection):
+        """Test loading the same IDs again updates rows in place"""
+        first = load_sqlite(connection, SEGMENTS_TABLE, make_segments(10), overrides={'project_id': 'p1'})
+        renamed = [{**row, 'id': row_id, 'name': 'Renamed'}
+                   for row, row_id in zip(make_segments(10), first.ids)]
+        load_sqlite(connection, SEGMENTS_TABLE, renamed, overrides={'project_id': 'p1'})
+
+        names = connection.execute("SELECT DISTINCT name FROM project_segments").fetchall()
+        assert names == [('Renamed',)]
+
+    def test_bulk_pragmas_are_restored(self, connection):
+        """Test bulk PRAGMAs do not outlive the load on a pooled connection"""
+        before = [connection.execute(f"PRAGMA {name}").fetchone()[0] for name in SQLITE_BULK_PRAGMAS]
+        load_sqlite(connection, SEGMENTS_TABLE, make_segments(1), overrides={'project_id': 'p1'})
+
+        after = [connection.execute(f"PRAGMA {name}").fetchone()[0] for name in SQLITE_BULK_PRAGMAS]
+        assert after == before
+        assert connection.execute("PRAGMA synchronous").fetchone()[0] == 2
+
+    def test_rows_of_other_projects_are_not_taken_over(self, connection):
+        """Test an ID owned by another project is reported as a conflict and left unchanged"""
+        connection.execute("INSERT INTO projects (id, user_id, name) VALUES ('p2', 'u1', 'Lab')")
+        connection.commit()
+        first = load_sqlite(connection, SEGMENTS_TABLE, make_segments(2), overrides={'project_id': 'p1'})
+        hijack = [{**row, 'id': first.ids[0], 'name': 'Hijacked'} for row in make_segments(1)]
+
+        result = load_sqlite(connection, SEGMENTS_TABLE, hijack + make_segments(1), overrides={'project_id': 'p2'})
+
+        assert result.conflicts == [first.ids[0]]
+        assert result.inserted_ids == [result.ids[1]]
+        assert connection.execute("SELECT project_id, name FROM project_segments WHERE id = ?",
+                                  (first.ids[0],)).fetchone() == ('p1', 'Duct 0')
+
+    def test_duplicate_ids_keep_last_row(self, connection):
+        """Test a batch repeating an ID stores its last version once"""
+        rows = [{**row, 'id': 'seg-1'} for row in make_segments(3)]
+        result = load_sqlite(connection, SEGMENTS_TABLE, rows, overrides={'project_id': 'p1'})
+
+        assert result.rows == 1 and result.inserted_ids == ['seg-1']
+        assert connection.execute("SELECT name FROM project_segments").fetchall() == [('Duct 2',)]
+        updated = load_sqlite(connection, SEGMENTS_TABLE, rows, overrides={'project_id': 'p1'})
+        assert updated.inserted_ids == [] and updated.conflicts == []
+
+
+class TestPostgresLoader:
+    """Test cases for COPY staging and merge"""
+
+    def test_csv_rendering(self):
+        """Test NULLs, empty strings and quotes survive CSV encoding"""
+        stream = CSVRowStream([(None, '', 'say "hi"', 3)])
+        assert stream.read() == '\\N,"","say ""hi""","3"\n'
+        assert stream.read() == ''
+
+    def test_chunks_commit_as_one_transaction(self):
+        """Test each chunk is copied and merged separately and the load commits once"""
+        connection = FakePostgresConnection()
+        result = load_postgresql(connection, SEGMENTS_TABLE, make_segments(25),
+                                 overrides={'project_id': 'p1'}, chunk_size=10)
+
+        assert result.chunks == 3
+        assert connection.commits == 1
+        assert connection.statements.count("TRUNCATE project_segments_staging") == 2
+        assert [copy.count('\n') for copy in connection.copies] == [10, 10, 5]
+        assert connection.copies[0].startswith(f'"{result.ids[0]}","p1","u1","Duct 0"')
+        merge = connection.statements[1]
+        assert merge.startswith("INSERT INTO project_segments (id, project_id")
+        assert "FROM project_segments_staging ON CONFLICT (id) DO UPDATE SET" in merge
+        assert "created_at = EXCLUDED.created_at" not in merge
+        assert "project_id = EXCLUDED.project_id" not in merge.split(" WHERE ")[0]
+        assert "WHERE project_segments.project_id = EXCLUDED.project_id" in merge
+        assert result.inserted_ids == result.ids
+
+    def test_inserted_and_conflicting_ids_are_reported(self):
+        """Test rows updated in place and rows owned by another project are told apart"""
+        rows = [{**row, 'id': f"seg-{i % 4}"} for i, row in enumerate(make_segments(6))]
+        connection = FakePostgresConnection(existing={'seg-1'}, foreign={'seg-2'})
+
+        result = load_postgresql(connection, SEGMENTS_TABLE, rows, overrides={'project_id': 'p1'}, chunk_size=3)
+
+        assert result.rows == 4
+        assert [copy.count('\n') for copy in connection.copies] == [3, 1]
+        assert '"Duct 4"' in connection.copies[0]
+        assert result.inserted_ids == ['seg-0', 'seg-3']
+        assert result.conflicts == ['seg-2']
+
+    def test_failed_chunk_rolls_back(self):
+        """Test a failing chunk rolls back the chunks merged before it, so nothing is committed"""
+        connection = FakePostgresConnection(fail_on_copy=1)
+
+        with pytest.raises(RuntimeError):
+            load_postgresql(connection, SEGMENTS_TABLE, make_segments(25), chunk_size=10)
+
+        assert connection.commits == 0
+        assert connection.rollbacks == 1
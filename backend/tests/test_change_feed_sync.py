@@ -0,0 +1,175 @@
+"""
+Test suite for batched change_log sync
+Validates coalescing, per-client high-water marks, atomic batches and single-statement acknowledgements
+"""
+
+import json
+import sqlite3
+import pytest
+from pathlib import Path
+from sqlalchemy import create_engine, text
+from backend.database.change_feed_sync import (
+    ChangeApplier, ChangeFeedSync, ChangeLogReader, ChangeRecord, coalesce_changes
+)
+from backend.monitoring.hvac_metrics_collector import HVACMetricsCollector
+
+SCHEMA = (Path(__file__).resolve().parents[1] / "database" / "schema.sql").read_text()
+
+
+@pytest.fixture
+def client(tmp_path):
+    connection = sqlite3.connect(tmp_path / "client.db")
+    connection.executescript(SCHEMA)
+    connection.execute("INSERT INTO users (id, email) VALUES ('u1', 'u1@example.com')")
+    connection.commit()
+    yield connection
+    connection.close()
+
+
+@pytest.fixture
+def server(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'server.db'}")
+    raw = engine.raw_connection()
+    raw.executescript(SCHEMA)
+    raw.execute("INSERT INTO users (id, email) VALUES ('u1', 'u1@example.com')")
+    raw.commit()
+    raw.close()
+    yield engine
+    engine.dispose()
+
+
+def log(client, entity_id, operation, changes=None, entity_type='project'):
+    client.execute(
+        "INSERT INTO change_log (user_id, entity_type, entity_id, operation, changes) VALUES (?, ?, ?, ?, ?)",
+        ('u1', entity_type, entity_id, operation, json.dumps(changes or {}))
+    )
+    client.commit()
+
+
+def server_projects(server):
+    with server.connect() as connection:
+        return {row.id: row.name for row in connection.execute(text("SELECT id, name FROM projects"))}
+
+
+def record(id, entity_id, operation, changes=None, entity_type='project'):
+    return ChangeRecord(id, 'u1', entity_type, entity_id, operation, changes or {})
+
+
+class TestCoalescing:
+    """Test cases for folding changes to one entity"""
+
+    def test_insert_then_updates(self):
+        """Test updates fold into the insert"""
+        [change] = coalesce_changes([
+            record(1, 'p1', 'INSERT', {'name': 'A', 'user_id': 'u1'}),
+            record(2, 'p1', 'UPDATE', {'name': 'B'}),
+            record(3, 'p1', 'UPDATE', {'client': 'C'})
+        ])
+        assert (change.operation, change.changes) == ('INSERT', {'name': 'B', 'user_id': 'u1', 'client': 'C'})
+        assert change.change_ids == [1, 2, 3]
+
+    def test_insert_then_delete_cancels(self):
+        """Test an entity created and deleted in one batch produces no server write"""
+        [change] = coalesce_changes([record(1, 'p1', 'INSERT', {'name': 'A'}), record(2, 'p1', 'DELETE')])
+        assert change.operation is None
+
+    def test_update_then_delete(self):
+        """Test a delete supersedes earlier updates"""
+        [change] = coalesce_changes([record(1, 'p1', 'UPDATE', {'name': 'A'}), record(2, 'p1', 'DELETE')])
+        assert change.operation == 'DELETE'
+
+    def test_order_of_first_change(self):
+        """Test entities keep the order of their first change so parents precede children"""
+        changes = coalesce_changes([record(1, 'p2', 'INSERT'), record(2, 'p1', 'INSERT'),
+                                    record(3, 'p2', 'UPDATE', {'name': 'x'})])
+        assert [c.entity_id for c in changes] == ['p2', 'p1']
+
+    def test_update_does_not_overtake_referenced_insert(self):
+        """Test an update moving a child to a parent inserted later is applied after that insert"""
+        changes = coalesce_changes([
+            record(1, 's1', 'UPDATE', {'name': 'Main'}, entity_type='segment'),
+            record(2, 'p2', 'INSERT', {'name': 'P2'}),
+            record(3, 's1', 'UPDATE', {'project_id': 'p2'}, entity_type='segment')
+        ])
+        assert [(c.entity_id, c.change_ids) for c in changes] == [('s1', [1]), ('p2', [2]), ('s1', [3])]
+
+    def test_delete_does_not_overtake_other_changes(self):
+        """Test a delete stays behind changes made after the entity's earlier ones"""
+        changes = coalesce_changes([
+            record(1, 'p1', 'UPDATE', {'name': 'A'}),
+            record(2, 's1', 'DELETE', entity_type='segment'),
+            record(3, 'p1', 'DELETE')
+        ])
+        assert [(c.entity_id, c.operation) for c in changes] == [('p1', 'UPDATE'), ('s1', 'DELETE'), ('p1', 'DELETE')]
+
+
+class TestChangeFeedSync:
+    """Test cases for syncing a client's change_log to the server"""
+
+    def test_batches_are_applied_and_acknowledged(self, client, server):
+        """Test a backlog syncs in batches with one acknowledgement UPDATE per batch"""
+        for i in range(25):
+            log(client, f"p{i}", 'INSERT', {'user_id': 'u1', 'name': f"Project {i}"})
+            log(client, f"p{i}", 'UPDATE', {'name': f"Renamed {i}"})
+        log(client, 's1', 'INSERT', {'project_id': 'p0', 'user_id': 'u1', 'name': 'S', 'segment_type': 'duct',
+                                     'calculation_data': {'cfm': 100}}, entity_type='segment')
+
+        statements = []
+        client.set_trace_callback(statements.append)
+        collector = HVACMetricsCollector()
+        result = ChangeFeedSync(ChangeLogReader(client), ChangeApplier(server), 'laptop',
+                                batch_size=10, metrics_collector=collector).sync()
+        client.set_trace_callback(None)
+
+        assert result.success
+        assert (result.batches, result.changes_read, result.changes_applied) == (6, 51, 26)
+        assert server_projects(server)['p7'] == 'Renamed 7'
+        acknowledgements = [s for s in statements if s.startswith("UPDATE change_log SET sync_status = 'synced'")
+                            and "WHERE id IN" in s]
+        assert len(acknowledgements) == 6
+        assert client.execute("SELECT COUNT(*) FROM change_log WHERE sync_status = 'pending'").fetchone()[0] == 0
+        assert collector.sync_metrics[-1].records_processed == 51
+        with server.connect() as connection:
+            data = connection.execute(text("SELECT calculation_data FROM project_segments")).scalar()
+        assert json.loads(data) == {'cfm': 100}
+
+    def test_high_water_mark_is_per_client(self, client, server):
+        """Test each client resumes from its own high-water mark"""
+        log(client, 'p1', 'INSERT', {'user_id': 'u1', 'name': 'One'})
+        applier = ChangeApplier(server)
+        ChangeFeedSync(ChangeLogReader(client), applier, 'laptop').sync()
+        log(client, 'p1', 'UPDATE', {'name': 'Two'})
+        result = ChangeFeedSync(ChangeLogReader(client), applier, 'laptop').sync()
+
+        assert result.changes_read == 1
+        assert applier.get_high_water_mark('laptop') == 2
+        assert applier.get_high_water_mark('tablet') == 0
+
+    def test_lost_acknowledgement_is_not_reapplied(self, client, server):
+        """Test rows the server applied but the client never acknowledged are acknowledged on resume"""
+        log(client, 'p1', 'INSERT', {'user_id': 'u1', 'name': 'One'})
+        applier = ChangeApplier(server)
+        reader = ChangeLogReader(client)
+        applier.apply_batch('laptop', coalesce_changes(reader.read_batch(0, 10)), 1)  # Crash before the ack
+
+        with server.begin() as connection:
+            connection.execute(text("UPDATE projects SET name = 'Edited on server'"))
+        result = ChangeFeedSync(reader, applier, 'laptop').sync()
+
+        assert result.changes_read == 0
+        assert server_projects(server) == {'p1': 'Edited on server'}
+        assert client.execute("SELECT sync_status FROM change_log").fetchone()[0] == 'synced'
+        assert applier.apply_batch('laptop', coalesce_changes([record(1, 'p1', 'DELETE')]), 1) == 0
+
+    def test_failed_batch_rolls_back(self, client, server):
+        """Test a failing change rolls back its whole batch and leaves it pending"""
+        log(client, 'p1', 'INSERT', {'user_id': 'u1', 'name': 'One'})
+        log(client, 's1', 'INSERT', {'project_id': 'p1', 'user_id': 'u1', 'name': 'S', 'segment_type': 'pipe'},
+            entity_type='segment')  # Violates the segment_type CHECK on the server
+
+        result = ChangeFeedSync(ChangeLogReader(client), ChangeApplier(server), 'laptop').sync()
+
+        assert not result.success
+        assert server_projects(server) == {}
+        rows = client.execute("SELECT sync_status, sync_attempts, sync_error FROM change_log").fetchall()
+        assert all(row[0] == 'pending' and row[1] == 1 and row[2] for row in rows)
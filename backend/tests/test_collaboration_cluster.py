@@ -0,0 +1,172 @@
+"""
+Test suite for collaboration cluster membership
+Validates consistent hashing, heartbeat-based membership and document hand-off decisions
+"""
+
+import asyncio
+from collections import Counter
+import pytest
+from backend.collaboration.cluster import ACQUIRE_LEASE_SCRIPT, ClusterCoordinator, HashRing, LeaseHeld
+
+
+class FakeRedis:
+    """In-process stand-in for the hash, sorted-set and lease commands the coordinator uses"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.hashes = {}
+        self.zsets = {}
+        self.leases = {}  # lease key -> (node, expires at)
+        self.strings = {}
+
+    async def eval(self, script, numkeys, *args):
+        if script == ACQUIRE_LEASE_SCRIPT:
+            lease, owner, node, lease_ms, _ = args
+            holder = self.leases.get(lease)
+            if holder and holder[1] > self.clock() and holder[0] != node:
+                return None
+            token = self.strings.get(owner)
+            if not token or not token.startswith(f"{node}:"):
+                token = f"{node}:{int(token.rsplit(':', 1)[1]) + 1 if token else 1}"
+            self.leases[lease] = (node, self.clock() + lease_ms / 1000)
+            self.strings[owner] = token
+            return token
+        lease, node = args
+        if self.leases.get(lease, (None,))[0] == node:
+            del self.leases[lease]
+
+    async def hset(self, key, field, value):
+        self.hashes.setdefault(key, {})[field] = value
+
+    async def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    async def hdel(self, key, field):
+        self.hashes.get(key, {}).pop(field, None)
+
+    async def zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update(mapping)
+
+    async def zrem(self, key, member):
+        self.zsets.get(key, {}).pop(member, None)
+
+    async def zrangebyscore(self, key, low, high):
+        low = float(low)
+        high = float('inf') if high == '+inf' else float(high)
+        return [member for member, score in sorted(self.zsets.get(key, {}).items(), key=lambda item: item[1])
+                if low <= score <= high]
+
+    async def zremrangebyscore(self, key, low, high):
+        for member in await self.zrangebyscore(key, low, high):
+            del self.zsets[key][member]
+
+
+class TestHashRing:
+    """Test cases for consistent hashing"""
+
+    def test_owner_is_deterministic_and_balanced(self):
+        """Test ring order does not matter and virtual nodes spread documents evenly"""
+        documents = [f"doc-{i}" for i in range(3000)]
+        ring, reordered = HashRing(['a', 'b', 'c']), HashRing(['c', 'a', 'b'])
+        assert [ring.owner(d) for d in documents] == [reordered.owner(d) for d in documents]
+
+        shares = Counter(ring.owner(d) for d in documents)
+        assert min(shares.values()) > 700
+
+    def test_adding_a_node_moves_only_its_share(self):
+        """Test a new node takes documents only from others, about 1/N of them"""
+        documents = [f"doc-{i}" for i in range(3000)]
+        ring = HashRing(['a', 'b', 'c'])
+        before = {d: ring.owner(d) for d in documents}
+        ring.add('d')
+        moved = [d for d in documents if ring.owner(d) != before[d]]
+
+        assert all(ring.owner(d) == 'd' for d in moved)
+        assert 500 < len(moved) < 1000
+        ring.remove('d')
+        assert {d: ring.owner(d) for d in documents} == before
+
+    def test_empty_ring(self):
+        """Test an empty ring owns nothing"""
+        assert HashRing().owner('doc') is None
+
+
+class TestClusterCoordinator:
+    """Test cases for Redis-backed membership"""
+
+    def setup_method(self):
+        """Setup test environment"""
+        self.now = 1000.0
+        self.redis = FakeRedis(lambda: self.now)
+
+    def node(self, node_id):
+        return ClusterCoordinator(self.redis, node_id, f"http://{node_id}:3001", ttl=15,
+                                  clock=lambda: self.now)
+
+    def test_nodes_agree_on_owners(self):
+        """Test every node builds the same ring and redirects to the owner's address"""
+        a, b = self.node('a'), self.node('b')
+
+        async def join():
+            await a.heartbeat()
+            await b.heartbeat()
+            return await a.refresh(), await b.refresh()
+
+        assert asyncio.run(join()) == (True, True)
+        documents = [f"doc-{i}" for i in range(50)]
+        assert [a.owner(d) for d in documents] == [b.owner(d) for d in documents]
+        remote = next(d for d in documents if not a.is_owner(d))
+        assert a.owner_address(remote) == "http://b:3001"
+
+    def test_leaving_node_hands_off_its_documents(self):
+        """Test documents move on graceful leave and when a node stops heartbeating"""
+        a, b, c = self.node('a'), self.node('b'), self.node('c')
+
+        async def scenario():
+            for node in (a, b, c):
+                await node.heartbeat()
+            await a.refresh()
+            documents = [f"doc-{i}" for i in range(60)]
+            owned_by_a = [d for d in documents if a.is_owner(d)]
+
+            await a.leave()
+            await b.refresh()
+            moved = a.moved_documents(owned_by_a)
+            assert set(moved) == set(owned_by_a)
+            assert set(moved.values()) <= {"http://b:3001", "http://c:3001"}
+            assert all(b.owner(d) in ('b', 'c') for d in documents)
+
+            self.now += 20  # c stops heartbeating
+            await b.heartbeat()
+            assert await b.refresh()
+            assert all(b.is_owner(d) for d in documents)
+
+        asyncio.run(scenario())
+
+    def test_lease_passes_only_on_release_or_expiry(self):
+        """Test a new owner waits for the old owner's lease, and the old owner learns it lost it"""
+        a, b = self.node('a'), self.node('b')
+
+        async def scenario():
+            assert await a.acquire('doc') == 'a:1'
+            with pytest.raises(LeaseHeld):
+                await b.acquire('doc')
+
+            await a.release('doc')
+            assert await b.acquire('doc') == 'b:2'
+            assert not a.holds_lease('doc') and not await a.renew('doc')
+
+            self.now += 14
+            assert await b.renew('doc') and b.holds_lease('doc')
+            self.now += 15  # b stops renewing
+            assert not b.holds_lease('doc')
+            assert await a.acquire('doc') == 'a:3'
+            assert not await b.renew('doc')
+
+        asyncio.run(scenario())
+
+    def test_unregistered_node_keeps_serving_locally(self):
+        """Test a node with no live members in Redis owns everything itself"""
+        a = self.node('a')
+        assert not asyncio.run(a.refresh())
+        assert a.is_owner('doc-1')
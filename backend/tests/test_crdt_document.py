@@ -0,0 +1,141 @@
+"""
+Test suite for the CRDT collaboration document
+Validates hybrid logical clocks, OR-set membership, LWW fields, merge order independence and delta sync
+"""
+
+import itertools
+import json
+from datetime import datetime
+import pytest
+from backend.collaboration.crdt_document import (
+    ClockDriftError, CRDTDocument, Delta, HLC, HybridLogicalClock, decode_version_vector, encode_version_vector
+)
+from backend.collaboration.document_history import Operation
+
+
+def fixed_clock(seconds):
+    return lambda: seconds
+
+
+def replica(node_id, seconds=1000.0):
+    return CRDTDocument(node_id, HybridLogicalClock(node_id, fixed_clock(seconds)))
+
+
+def wire(delta):
+    return Delta.from_dict(json.loads(json.dumps(delta.to_dict())))
+
+
+class TestHybridLogicalClock:
+    """Test cases for HLC stamps"""
+
+    def test_monotonic_with_stalled_wall_clock(self):
+        """Test stamps keep increasing when wall time does not"""
+        clock = HybridLogicalClock('a', fixed_clock(1.0))
+        assert clock.now() < clock.now() < clock.now()
+
+    def test_observe_moves_past_remote(self):
+        """Test a node behind in wall time stamps after what it has seen"""
+        clock = HybridLogicalClock('a', fixed_clock(1.0))
+        clock.observe(HLC(5000, 3, 'b'))
+        assert clock.now() == HLC(5000, 4, 'a')
+        assert HLC.decode(HLC(5000, 4, 'a:1').encode()) == HLC(5000, 4, 'a:1')
+
+    def test_far_future_stamps_are_rejected(self):
+        """Test a stamp beyond the allowed drift neither moves the clock nor merges"""
+        document = replica('a')
+        clock = document.clock
+        with pytest.raises(ClockDriftError):
+            clock.observe(HLC(1000 * 1000 + 60001, 0, 'b'))
+        assert clock.now() == HLC(1000 * 1000, 0, 'a')
+
+        future = Delta(adds=[('d1', HLC(1000 * 1000, 5, 'b'))], fields=[('d1', 'kind', HLC(10 ** 13, 0, 'b'), 'duct')])
+        with pytest.raises(ClockDriftError):
+            document.merge(future)
+        assert document.elements() == {} and document.version_vector == {}
+
+
+class TestCRDTDocument:
+    """Test cases for merging element state"""
+
+    def test_concurrent_field_writes_converge(self):
+        """Test the later stamp wins on every replica regardless of merge order"""
+        a, b = replica('a'), replica('b', seconds=1001.0)
+        insert = a.insert('d1', {'kind': 'duct', 'size': {'width': 10}})
+        b.merge(wire(insert))
+        write_a = a.set('d1', ['size', 'width'], 12)
+        write_b = b.set('d1', ['size', 'width'], 14)
+        label = a.set('d1', ['label'], 'Main')
+
+        a.merge(wire(write_b))
+        b.merge(wire(write_a))
+        b.merge(wire(label))
+        assert a.elements() == b.elements() == {
+            'd1': {'kind': 'duct', 'size': {'width': 14}, 'label': 'Main'}
+        }
+
+    def test_merge_is_order_independent_and_idempotent(self):
+        """Test every permutation of deltas, applied twice, gives the same document"""
+        source = replica('a')
+        other = replica('b')
+        deltas = [source.insert('d1', {'kind': 'duct'}), source.set('d1', ['cfm'], 400),
+                  source.delete('d1'), other.insert('d2', {'kind': 'fitting'}), other.set('d2', ['angle'], 45)]
+
+        results = []
+        for order in itertools.permutations(deltas):
+            target = replica('c')
+            for delta in order + order:
+                target.merge(wire(delta))
+            results.append((target.elements(), target.version_vector))
+        assert all(result == results[0] for result in results)
+        assert results[0][0] == {'d2': {'kind': 'fitting', 'angle': 45}}
+
+    def test_insert_concurrent_with_delete_survives(self):
+        """Test an OR-set delete only removes the inserts it observed"""
+        a, b = replica('a'), replica('b')
+        b.merge(a.insert('d1', {'kind': 'duct'}))
+        delete = a.delete('d1')
+        reinsert = b.insert('d1', {'kind': 'elbow'})
+
+        a.merge(wire(reinsert))
+        b.merge(wire(delete))
+        assert a.contains('d1') and b.contains('d1')
+        assert a.elements() == b.elements()
+
+    def test_operations_translate_to_fields(self):
+        """Test collaboration operations become per-field writes"""
+        doc = replica('a')
+
+        def apply(type, path=(), new_value=None, position=None):
+            return doc.apply_operation(Operation(id='o', type=type, user_id='u', timestamp=datetime.utcnow(),
+                                                 element_id='d1', path=list(path), new_value=new_value,
+                                                 position=position))
+
+        apply('insert', new_value={'kind': 'duct'}, position={'x': 0, 'y': 0})
+        apply('move', position={'x': 3, 'y': 4})
+        apply('update', new_value={'cfm': 500})
+        apply('style', path=['style', 'color'], new_value='red')
+        assert doc.elements() == {'d1': {'kind': 'duct', 'position': {'x': 3, 'y': 4}, 'cfm': 500,
+                                         'style': {'color': 'red'}}}
+        apply('delete')
+        assert doc.elements() == {}
+
+
+class TestDeltaSync:
+    """Test cases for version-vector delta sync"""
+
+    def test_reconnecting_client_gets_only_newer_entries(self):
+        """Test a client that saw part of the document receives just the rest"""
+        server = replica('s')
+        server.insert('d1', {'kind': 'duct'})
+        client = replica('c')
+        client.merge(wire(server.delta_since()))
+        seen = decode_version_vector(json.loads(json.dumps(encode_version_vector(client.version_vector))))
+
+        server.set('d1', ['cfm'], 300)
+        server.merge(replica('t').insert('d2'))
+        missing = server.delta_since(seen)
+
+        assert (len(missing.adds), len(missing.fields)) == (1, 1)
+        client.merge(wire(missing))
+        assert client.elements() == server.elements()
+        assert not server.delta_since(client.version_vector)
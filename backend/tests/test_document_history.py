@@ -0,0 +1,113 @@
+"""
+Test suite for revisioned collaboration document history
+Validates revision numbering, base-revision transforms, snapshot compaction and resync
+"""
+
+import pytest
+from datetime import datetime
+from backend.collaboration.document_history import (
+    DocumentHistory, Operation, OperationalTransformEngine, ResyncRequired, apply_operation
+)
+
+
+def op(user_id, type, element_id, base_revision=None, path=(), new_value=None, position=None):
+    return Operation(id=f"{user_id}-{element_id}-{type}", type=type, user_id=user_id, timestamp=datetime.utcnow(),
+                     element_id=element_id, path=list(path), new_value=new_value, position=position,
+                     base_revision=base_revision)
+
+
+class CountingEngine(OperationalTransformEngine):
+    """Engine that counts pairwise transforms"""
+
+    def __init__(self):
+        self.transforms = 0
+
+    def transform_against(self, op1, op2):
+        self.transforms += 1
+        return super().transform_against(op1, op2)
+
+
+class TestApplyOperation:
+    """Test cases for materializing element state"""
+
+    def test_insert_update_move_delete(self):
+        """Test each operation type's effect on element state"""
+        state = {}
+        apply_operation(state, op('a', 'insert', 'd1', new_value={'kind': 'duct'}, position={'x': 0, 'y': 0}))
+        apply_operation(state, op('a', 'update', 'd1', path=['size', 'width'], new_value=12))
+        apply_operation(state, op('a', 'update', 'd1', new_value={'kind': 'fitting'}))
+        apply_operation(state, op('a', 'move', 'd1', position={'x': 5, 'y': 1}))
+        assert state == {'d1': {'kind': 'fitting', 'size': {'width': 12}, 'position': {'x': 5, 'y': 1}}}
+
+        apply_operation(state, op('a', 'delete', 'd1'))
+        apply_operation(state, op('b', 'update', 'd1', path=['label'], new_value='late'))
+        assert state == {}
+
+
+class TestDocumentHistory:
+    """Test cases for committing, compacting and catching up"""
+
+    def test_transforms_only_against_ops_after_base(self):
+        """Test an operation is transformed against other users' ops after its base, not the whole history"""
+        history = DocumentHistory()
+        engine = CountingEngine()
+        for i in range(100):
+            history.commit(op('a', 'insert', f"e{i}"), engine)
+        assert engine.transforms == 0
+
+        history.commit(op('b', 'update', 'e1', base_revision=97, path=['label'], new_value='b'), engine)
+        history.commit(op('a', 'update', 'e1', base_revision=98, path=['label'], new_value='a'), engine)
+        committed = history.commit(op('c', 'update', 'e1', base_revision=99, path=['label'], new_value='c'), engine)
+
+        assert (committed.revision, history.revision) == (103, 103)
+        assert engine.transforms == 2 + 2 + 3
+        assert committed.old_value == 'a'  # What it actually overwrote
+        assert history.state()['e1'] == {'label': 'c'}
+
+    def test_missing_base_is_treated_as_current(self):
+        """Test clients that send no base revision are not transformed"""
+        history = DocumentHistory()
+        engine = CountingEngine()
+        history.commit(op('a', 'insert', 'e1'), engine)
+        history.commit(op('b', 'move', 'e1', position={'x': 1}), engine)
+        assert engine.transforms == 0
+
+    def test_compaction_bounds_the_tail(self):
+        """Test compaction folds old ops into the snapshot without changing state"""
+        history = DocumentHistory(max_tail=50, retained_tail=10)
+        engine = OperationalTransformEngine()
+        for i in range(51):
+            history.commit(op('a', 'insert' if i % 5 == 0 else 'update', f"e{i // 5}", path=['n'], new_value=i),
+                           engine)
+        state = history.state()
+        assert history.needs_compaction
+
+        assert history.compact() == 41
+        assert (len(history.operations), history.revision) == (10, 51)
+        assert history.state() == state
+        assert [o.revision for o in history.operations_since(45)] == list(range(46, 52))
+
+    def test_base_before_snapshot_requires_resync(self):
+        """Test a client based on compacted revisions is told to resync"""
+        history = DocumentHistory(max_tail=4, retained_tail=2)
+        engine = OperationalTransformEngine()
+        for i in range(5):
+            history.commit(op('a', 'insert', f"e{i}"), engine)
+        history.compact()
+
+        with pytest.raises(ResyncRequired) as error:
+            history.commit(op('b', 'update', 'e0', base_revision=1, new_value={'x': 1}), engine)
+        assert error.value.snapshot_revision == 3
+        assert history.revision == 5
+
+    def test_reload_from_stored_tail(self):
+        """Test a history rebuilt from a serialized snapshot and tail resumes numbering and drops gaps"""
+        history = DocumentHistory()
+        engine = OperationalTransformEngine()
+        for i in range(4):
+            history.commit(op('a', 'insert', f"e{i}"), engine)
+        stored = [Operation.from_dict(o.to_dict()) for o in history.operations]
+
+        reloaded = DocumentHistory(operations=stored[:2] + stored[3:])
+        assert reloaded.revision == 2
+        assert reloaded.commit(op('b', 'insert', 'e9', base_revision=2), engine).revision == 3
@@ -0,0 +1,173 @@
+"""
+Test suite for ErrorTracker grouping and bounded storage
+Validates normalized fingerprints, reservoir sampling, LRU group eviction and rate-limited dispatch
+"""
+
+import asyncio
+import random
+import pytest
+from backend.monitoring.ErrorTracker import (
+    ErrorTracker, ErrorCategory, normalize_error_message
+)
+
+
+def raise_and_capture(tracker, exception):
+    try:
+        raise exception
+    except Exception as e:
+        return tracker.capture_error(e)
+
+
+def lookup_user(user_id):
+    raise KeyError(f"user {user_id} not found")
+
+
+def capture_lookup(tracker, user_id):
+    try:
+        lookup_user(user_id)
+    except Exception as e:
+        return tracker.capture_error(e)
+
+
+class TestFingerprinting:
+    """Test cases for normalized error fingerprints"""
+
+    def setup_method(self):
+        """Setup test environment"""
+        self.tracker = ErrorTracker()
+
+    @pytest.mark.parametrize("message,expected", [
+        ("user 123 not found", "user <num> not found"),
+        ("project 5f2b8c9e1a3d4e5f6a7b8c9d missing", "project <id> missing"),
+        ("session 3f1c2a4e-8b7d-4c6a-9e5f-1a2b3c4d5e6f expired", "session <uuid> expired"),
+        ("object at 0x7f3a2b1c", "object at <hex>"),
+        ("timeout after 2.5s", "timeout after <num>s"),
+    ])
+    def test_normalize_message(self, message, expected):
+        """Test IDs and numbers are replaced with placeholders"""
+        assert normalize_error_message(message) == expected
+
+    def test_messages_with_ids_share_one_group(self):
+        """Test errors differing only by ID group together"""
+        for user_id in range(50):
+            capture_lookup(self.tracker, user_id)
+
+        assert len(self.tracker.error_groups) == 1
+        group = next(iter(self.tracker.error_groups.values()))
+        assert group.count == 50
+        assert group.latest_event.message == "'user 49 not found'"
+
+    def test_different_call_sites_split_groups(self):
+        """Test the same message raised from different functions is not merged"""
+        capture_lookup(self.tracker, 1)
+        raise_and_capture(self.tracker, KeyError("user 1 not found"))
+
+        assert len(self.tracker.error_groups) == 2
+
+
+class TestBoundedStorage:
+    """Test cases for bounded error storage"""
+
+    def setup_method(self):
+        """Setup test environment"""
+        self.tracker = ErrorTracker()
+        self.tracker._rng = random.Random(7)
+
+    def test_reservoir_keeps_bounded_sample(self):
+        """Test a group keeps at most max_events_per_group sampled events"""
+        self.tracker.max_events_per_group = 10
+        for user_id in range(500):
+            capture_lookup(self.tracker, user_id)
+
+        group = next(iter(self.tracker.error_groups.values()))
+        assert group.count == 500
+        assert len(group.events) == 10
+        # Sampled events come from across the whole stream, not just the tail
+        assert min(int(e.message.split()[1]) for e in group.events) < 490
+
+    def test_stack_trace_is_formatted_lazily(self):
+        """Test stack traces are only rendered on demand"""
+        capture_lookup(self.tracker, 1)
+
+        event = next(iter(self.tracker.error_groups.values())).events[0]
+        assert event.stack_trace is None
+        trace = event.get_stack_trace()
+        assert "lookup_user" in trace
+        assert trace.endswith("KeyError: 'user 1 not found'\n")
+
+    def test_least_recent_groups_are_evicted(self):
+        """Test group count is capped by evicting the least recently seen"""
+        self.tracker.max_groups = 3
+        for name in ("a", "b", "c"):
+            raise_and_capture(self.tracker, ValueError(f"error {name}"))
+        raise_and_capture(self.tracker, ValueError("error a"))  # Refresh "a"
+        raise_and_capture(self.tracker, ValueError("error d"))
+
+        messages = {g.latest_event.message for g in self.tracker.error_groups.values()}
+        assert messages == {"error a", "error c", "error d"}
+        assert self.tracker.evicted_groups == 1
+
+    def test_event_history_is_bounded(self):
+        """Test the recent event buffer is capped"""
+        assert self.tracker.error_events.maxlen == self.tracker.max_total_events
+
+
+class TestDispatch:
+    """Test cases for queued handler dispatch"""
+
+    def setup_method(self):
+        """Setup test environment"""
+        self.tracker = ErrorTracker()
+        self.handled = []
+
+        async def handler(event):
+            self.handled.append(event.error_id)
+
+        self.tracker.register_error_handler(ErrorCategory.VALIDATION, handler)
+
+    def test_capture_outside_event_loop(self):
+        """Test capturing without a running loop queues handlers instead of failing"""
+        error_id = raise_and_capture(self.tracker, ValueError("bad airflow -100"))
+
+        assert error_id
+        assert self.handled == []
+        asyncio.run(self.tracker.drain_dispatch_queue())
+        assert self.handled == [error_id]
+
+    def test_dispatch_is_rate_limited(self):
+        """Test an error storm only dispatches up to the burst size"""
+        self.tracker.dispatch_rate_per_second = 0.0
+        self.tracker.dispatch_burst = 5
+        self.tracker._dispatch_tokens = 5.0
+
+        for i in range(100):
+            raise_and_capture(self.tracker, ValueError(f"bad value {i}"))
+
+        asyncio.run(self.tracker.drain_dispatch_queue())
+        # The new-group alert has its own budget, so every handler token is used
+        assert len(self.handled) == 5
+        assert self.tracker.dispatch_stats['rate_limited'] == 95
+
+    def test_new_group_alert_survives_handler_storm(self):
+        """Test the first alert for a new group is queued after handlers exhaust their budget"""
+        self.tracker.dispatch_rate_per_second = 0.0
+        self.tracker._dispatch_tokens = 0.0
+        alerted = []
+
+        async def alert(group):
+            alerted.append(group.fingerprint)
+
+        self.tracker._alert_new_error_group = alert
+        raise_and_capture(self.tracker, KeyError("missing duct"))
+
+        asyncio.run(self.tracker.drain_dispatch_queue())
+        assert len(alerted) == 1
+        assert self.handled == []
+
+    def test_error_groups_listing(self):
+        """Test group listing includes sampled events"""
+        raise_and_capture(self.tracker, ValueError("bad value 1"))
+
+        result = asyncio.run(self.tracker.get_error_groups())
+        assert result['total_error_groups'] == 1
+        assert result['groups'][0]['samples'][0]['stack_trace'].startswith("Traceback")
@@ -0,0 +1,154 @@
+"""
+Test suite for the HealthMonitor check scheduler
+Validates per-check scheduling, dependency ordering, bounded history and cached snapshots
+"""
+
+import asyncio
+import time
+import pytest
+from collections import deque
+from datetime import datetime, timedelta
+from backend.monitoring.HealthMonitor import (
+    HealthMonitor, HealthCheck, HealthCheckResult, HealthCheckType, HealthStatus, HealthThreshold
+)
+
+
+def make_check(name, status=HealthStatus.HEALTHY, value=None, delay=0.0, calls=None, **kwargs):
+    async def check():
+        if calls is not None:
+            calls.append((name, time.perf_counter()))
+        if delay:
+            await asyncio.sleep(delay)
+        return HealthCheckResult(check_name=name, status=status, value=value)
+    return HealthCheck(name=name, check_type=HealthCheckType.CUSTOM, check_function=check, **kwargs)
+
+
+class TestHealthMonitorScheduler:
+    """Test cases for the central health check scheduler"""
+
+    def setup_method(self):
+        """Setup test environment with no default checks"""
+        self.monitor = HealthMonitor()
+        self.monitor.health_checks.clear()
+        self.monitor.health_results.clear()
+        self.monitor.next_run.clear()
+
+    def test_due_checks_run_in_parallel(self):
+        """Test due checks run concurrently rather than one after another"""
+        for i in range(5):
+            self.monitor.register_health_check(make_check(f"slow_{i}", delay=0.1))
+
+        started = time.perf_counter()
+        results = asyncio.run(self.monitor.run_due_checks(now=time.monotonic() + 60))
+        elapsed = time.perf_counter() - started
+
+        assert len(results) == 5
+        assert elapsed < 0.3
+
+    def test_only_due_checks_run_and_are_rescheduled_with_jitter(self):
+        """Test checks are rescheduled one jittered interval ahead"""
+        self.monitor.register_health_check(make_check("fast", interval_seconds=10))
+        self.monitor.register_health_check(make_check("slow", interval_seconds=300))
+        now = time.monotonic() + 20
+        self.monitor.next_run["slow"] = now + 100
+
+        results = asyncio.run(self.monitor.run_due_checks(now=now))
+
+        assert [r.check_name for r in results] == ["fast"]
+        assert now + 9 <= self.monitor.next_run["fast"] <= now + 11
+        assert asyncio.run(self.monitor.run_due_checks(now=now)) == []
+
+    def test_slow_check_does_not_hold_back_others(self):
+        """Test each due check is its own task, so a slow one neither delays nor duplicates"""
+        calls = []
+        self.monitor.register_health_check(make_check("slow", delay=0.5, calls=calls))
+        self.monitor.register_health_check(make_check("fast", calls=calls, interval_seconds=1))
+
+        async def scenario():
+            now = time.monotonic() + 60
+            tasks = self.monitor.start_due_checks(now=now)
+            await asyncio.sleep(0.05)
+            assert "fast" in self.monitor.latest_results
+            assert "slow" not in self.monitor.latest_results
+
+            # A later tick runs fast again but does not start a second slow check
+            later = self.monitor.start_due_checks(now=now + 30)
+            assert len(later) == 1
+            await asyncio.gather(*tasks, *later)
+
+        asyncio.run(scenario())
+        assert sorted(name for name, _ in calls) == ["fast", "fast", "slow"]
+
+    def test_dependencies_run_first_and_gate_dependents(self):
+        """Test a dependency runs before its dependent and can skip it"""
+        calls = []
+        self.monitor.register_health_check(make_check("dependent", calls=calls, dependencies=["base"]))
+        self.monitor.register_health_check(make_check("base", status=HealthStatus.CRITICAL, calls=calls))
+
+        results = asyncio.run(self.monitor.run_checks(["dependent", "base"]))
+
+        assert [name for name, _ in calls] == ["base"]
+        assert [r.check_name for r in results] == ["base"]
+
+    def test_thresholds_and_timeouts(self):
+        """Test thresholds set status and timeouts mark checks critical"""
+        self.monitor.register_health_check(make_check(
+            "cpu", value=90.0,
+            thresholds=HealthThreshold(warning_threshold=80.0, critical_threshold=95.0)
+        ))
+        self.monitor.register_health_check(make_check("hung", delay=1.0, timeout_seconds=0.05))
+
+        asyncio.run(self.monitor.run_checks(["cpu", "hung"]))
+
+        assert self.monitor.latest_results["cpu"].status == HealthStatus.WARNING
+        assert self.monitor.latest_results["hung"].status == HealthStatus.CRITICAL
+
+    def test_history_is_a_bounded_ring_buffer(self):
+        """Test stored results never exceed the per-check limit"""
+        self.monitor.max_results_per_check = 3
+        self.monitor.register_health_check(make_check("cpu"))
+
+        for _ in range(10):
+            asyncio.run(self.monitor.run_checks(["cpu"]))
+
+        assert isinstance(self.monitor.health_results["cpu"], deque)
+        assert len(self.monitor.health_results["cpu"]) == 3
+
+
+class TestHealthSnapshot:
+    """Test cases for cached health snapshots"""
+
+    def setup_method(self):
+        """Setup test environment with no default checks"""
+        self.monitor = HealthMonitor()
+        self.monitor.health_checks.clear()
+        self.monitor.health_results.clear()
+        self.monitor.next_run.clear()
+        self.monitor.register_health_check(make_check("db", interval_seconds=60))
+
+    def test_snapshot_reports_unknown_before_first_run(self):
+        """Test checks without results count as unknown"""
+        snapshot = self.monitor.get_cached_snapshot()
+        assert snapshot['overall_status'] == 'unknown'
+        assert snapshot['checks']['db']['fresh'] is False
+
+    def test_snapshot_is_cached_until_new_result(self):
+        """Test repeated probes reuse one snapshot until a result arrives"""
+        asyncio.run(self.monitor.run_checks(["db"]))
+        first = self.monitor.get_cached_snapshot()
+        assert first['overall_status'] == 'healthy'
+        assert self.monitor.get_cached_snapshot() is first
+
+        asyncio.run(self.monitor.run_checks(["db"]))
+        assert self.monitor.get_cached_snapshot() is not first
+
+    def test_stale_results_are_reported_unknown(self):
+        """Test results older than the freshness window do not count as healthy"""
+        asyncio.run(self.monitor.run_checks(["db"]))
+        self.monitor.latest_results["db"].timestamp = datetime.utcnow() - timedelta(minutes=5)
+        self.monitor._snapshot_dirty = True
+
+        snapshot = self.monitor.get_cached_snapshot()
+        assert snapshot['checks']['db']['fresh'] is False
+        assert snapshot['summary']['stale'] == 1
+        assert snapshot['overall_status'] == 'unknown'
@@ -0,0 +1,380 @@
+"""
+Test suite for the index advisor
+Validates fingerprinting, shape parsing, candidate ranking, scratch-copy validation and migration output
+"""
+
+import asyncio
+import sqlite3
+import pytest
+from contextlib import contextmanager, nullcontext
+from types import SimpleNamespace
+from sqlalchemy import create_engine
+from backend.database.index_advisor import (
+    IndexAdvisor, IndexCandidate, MongoQueryCapture, QueryShape, QueryStats, QueryWorkload,
+    candidate_for_shape, is_covered, merge_candidates, mongodb_query_shape, normalize_statement,
+    parse_query_shapes, render_mongodb_migration, validate_mongodb, validate_postgresql, write_migration
+)
+from backend.database.performance_analyzer import SyntheticDataConfig, build_benchmark_database, parse_query_plan
+
+
+PENDING_SYNC = ("SELECT * FROM change_log WHERE user_id = '{user}' AND sync_status = 'pending' "
+                "ORDER BY timestamp DESC LIMIT 50")
+
+
+def stats(statement, calls=10, total_time=1.0, shape=None):
+    return QueryStats(statement, statement, 'mongodb' if shape else 'sql', calls, total_time, shape=shape)
+
+
+class TestFingerprinting:
+    """Test cases for statement normalization"""
+
+    def test_literals_and_parameters_are_removed(self):
+        """Test statements differing only in values share a fingerprint"""
+        workload = QueryWorkload()
+        workload.record_sql("SELECT * FROM projects WHERE id = 'a' AND size > 10", 0.1)
+        workload.record_sql("select *  from projects\n where id = :id and size > %(size)s -- lookup", 0.3)
+        workload.record_sql("SELECT * FROM projects WHERE id IN (1, 2, 3) AND size > $1", 0.2)
+        workload.record_sql("SELECT * FROM projects WHERE id IN (4) AND size > ?", 0.2)
+
+        [first, second] = workload.top()
+        assert first.statement == "select * from projects where id = ? and size > ?"
+        assert (first.calls, first.total_time, first.max_time) == (2, 0.4, 0.3)
+        assert second.statement == "select * from projects where id in (?) and size > ?"
+
+    def test_inserts_are_not_captured(self):
+        """Test statements no index can speed up are ignored"""
+        workload = QueryWorkload()
+        workload.record_sql("INSERT INTO projects (id) VALUES (1), (2)", 0.1)
+        assert workload.top() == []
+        assert normalize_statement("INSERT INTO t VALUES (1, 'a'), (2, 'b')") == "insert into t values (?, ?)"
+
+    def test_workload_is_bounded(self):
+        """Test the cheapest fingerprint makes room for a more expensive one"""
+        workload = QueryWorkload(max_fingerprints=2)
+        workload.record_sql("SELECT * FROM a WHERE x = 1", 1.0)
+        workload.record_sql("SELECT * FROM b WHERE x = 1", 0.1)
+        workload.record_sql("SELECT * FROM c WHERE x = 1", 0.5)
+        workload.record_sql("SELECT * FROM d WHERE x = 1", 0.01)
+
+        assert [q.statement.split()[3] for q in workload.top()] == ['a', 'c']
+
+    def test_save_and_load(self, tmp_path):
+        """Test a workload with MongoDB shapes round-trips through JSON"""
+        workload = QueryWorkload()
+        workload.record_sql("SELECT * FROM a WHERE x = 1", 1.0)
+        workload.record_mongodb(QueryShape('calculations', ['project_id'], order_by=[('created_at', True)]),
+                                'find', 0.5)
+        workload.save(str(tmp_path / "workload.json"))
+
+        loaded = QueryWorkload.load(str(tmp_path / "workload.json"))
+        assert [(q.statement, q.calls) for q in loaded.top()] == [(q.statement, q.calls) for q in workload.top()]
+        assert loaded.top(source='mongodb')[0].shape.order_by == [('created_at', True)]
+
+
+class TestShapeParsing:
+    """Test cases for predicate and sort key extraction"""
+
+    def test_equality_range_and_sort(self):
+        """Test equality, range and sort columns are separated"""
+        [shape] = parse_query_shapes(normalize_statement(
+            "SELECT * FROM change_log WHERE sync_status = 'pending' AND timestamp BETWEEN 1 AND 2 "
+            "AND entity_type IN ('a', 'b') ORDER BY timestamp"
+        ))
+        assert shape == QueryShape('change_log', ['sync_status', 'entity_type'], ['timestamp'],
+                                   [('timestamp', False)])
+
+    def test_join_keys_get_their_own_shape(self):
+        """Test join columns are proposed as lookups rather than mixed into the driving filter"""
+        shapes = parse_query_shapes(normalize_statement(
+            "SELECT p.*, COUNT(ps.id) FROM projects p LEFT JOIN project_segments ps ON p.id = ps.project_id "
+            "WHERE p.user_id = :user_id GROUP BY p.id ORDER BY p.updated_at DESC LIMIT 10"
+        ))
+        assert QueryShape('projects', ['user_id'], order_by=[('updated_at', True)]) in shapes
+        assert QueryShape('project_segments', ['project_id']) in shapes
+
+    def test_unparseable_predicates_are_skipped(self):
+        """Test OR, expressions and subqueries produce no guesses"""
+        assert parse_query_shapes(normalize_statement("SELECT * FROM t WHERE a = 1 OR b = 2")) == []
+        [shape] = parse_query_shapes(normalize_statement(
+            "SELECT * FROM t WHERE (a = 1 OR b = 2) AND lower(name) = 'x' AND c > 3 ORDER BY length(name)"
+        ))
+        assert shape == QueryShape('t', ranges=['c'])
+        assert parse_query_shapes(normalize_statement(
+            "SELECT * FROM t WHERE id IN (SELECT id FROM u WHERE x = 1)"
+        )) == []
+
+    def test_unqualified_columns_in_joins(self):
+        """Test reflected columns attribute unqualified columns to their table"""
+        statement = normalize_statement("SELECT * FROM a JOIN b ON a.id = b.a_id WHERE status = 1")
+        columns = {'a': {'id', 'status'}, 'b': {'a_id'}}
+        assert QueryShape('a', ['status']) in parse_query_shapes(statement, columns)
+        assert QueryShape('a', ['status']) not in parse_query_shapes(statement)
+
+    def test_mongodb_commands(self):
+        """Test find and aggregate commands reduce to shapes"""
+        find = mongodb_query_shape('find', {
+            'find': 'calculations', 'filter': {'project_id': 'p1', 'created_at': {'$gte': 1},
+                                               '$or': [{'a': 1}], 'type': {'$in': ['x']}},
+            'sort': {'created_at': -1}
+        })
+        aggregate = mongodb_query_shape('aggregate', {
+            'aggregate': 'calculations', 'pipeline': [{'$match': {'project_id': 'p1'}}, {'$group': {}}]
+        })
+
+        assert find == QueryShape('calculations', ['project_id', 'type'], ['created_at'], [('created_at', True)])
+        assert aggregate == QueryShape('calculations', ['project_id'])
+        assert mongodb_query_shape('insert', {'insert': 'calculations'}) is None
+
+    def test_mongodb_capture(self):
+        """Test the command listener records durations of successful queries only"""
+        workload = QueryWorkload()
+        capture = MongoQueryCapture(workload)
+        command = {'find': 'projects', 'filter': {'user_id': 'u1'}}
+        for request_id, outcome in ((1, 'succeeded'), (2, 'failed'), (3, 'succeeded')):
+            capture.started(SimpleNamespace(command_name='find', command=command,
+                                            connection_id=('db', 27017), request_id=request_id))
+            getattr(capture, outcome)(SimpleNamespace(connection_id=('db', 27017), request_id=request_id,
+                                                      duration_micros=2000))
+
+        [query] = workload.top()
+        assert (query.statement, query.calls, query.total_time) == ('projects.find({"user_id": "?"})', 2, 0.004)
+
+
+class TestCandidates:
+    """Test cases for candidate construction and ranking"""
+
+    def test_equality_sort_range_order(self):
+        """Test columns are ordered equality, sort, then one range column"""
+        candidate = candidate_for_shape(QueryShape('t', ['a'], ['r1', 'r2'], [('s', True)]))
+        assert candidate.columns == [('a', False), ('s', True), ('r1', False)]
+        assert candidate.ddl() == "CREATE INDEX IF NOT EXISTS idx_t_a_s_r1 ON t(a, s DESC, r1)"
+
+    def test_coverage_ignores_equality_order(self):
+        """Test an existing index with the same equality columns in another order covers a candidate"""
+        candidate = candidate_for_shape(QueryShape('t', ['a', 'b'], order_by=[('c', False)]))
+        assert is_covered(candidate, ['b', 'a', 'c', 'd'])
+        assert not is_covered(candidate, ['a', 'c', 'b'])
+        assert not is_covered(candidate, ['a', 'b'])
+
+    def test_prefixes_merge_and_rank_by_total_time(self):
+        """Test a prefix candidate folds into the wider one with its queries"""
+        narrow = candidate_for_shape(QueryShape('t', ['a']))
+        narrow.serve([stats('q1', total_time=5.0)])
+        wide = candidate_for_shape(QueryShape('t', ['a'], order_by=[('b', False)]))
+        wide.serve([stats('q2', total_time=1.0)])
+        other = candidate_for_shape(QueryShape('u', ['x']))
+        other.serve([stats('q3', total_time=2.0)])
+
+        merged = merge_candidates([narrow, other, wide])
+
+        assert [c.name for c in merged] == ['idx_t_a_b', 'idx_u_x']
+        assert (merged[0].calls, merged[0].total_time, merged[0].statements) == (20, 6.0, ['q2', 'q1'])
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = str(tmp_path / "sizewise.db")
+    build_benchmark_database(path, SyntheticDataConfig(users=4, projects_per_user=5, segments_per_project=10,
+                                                       change_log_rows=2000, feature_flags_per_user=2),
+                             apply_migrations=False)
+    return path
+
+
+class TestSQLiteAdvice:
+    """Test cases for advice against a SQLite database"""
+
+    def test_advice_is_validated_and_written(self, database, tmp_path):
+        """Test a hot unindexed query yields a validated migration that the planner then uses"""
+        workload = QueryWorkload()
+        for i in range(20):
+            workload.record_sql(PENDING_SYNC.format(user=f"user-{i % 4}"), 0.02)
+            workload.record_sql(f"SELECT * FROM project_segments WHERE project_id = 'p{i}'", 0.01)
+        engine = create_engine(f"sqlite:///{database}")
+        advisor = IndexAdvisor(workload)
+
+        candidates = advisor.validate_sql(engine, advisor.propose_sql(engine))
+        engine.dispose()
+
+        [candidate] = candidates  # project_id lookups are already served by idx_segments_project
+        assert candidate.columns == [('user_id', False), ('sync_status', False), ('timestamp', True)]
+        assert candidate.validated and 'SCAN' not in candidate.evidence[0].split('->')[1]
+
+        migrations_dir = tmp_path / "migrations"
+        migrations_dir.mkdir()
+        (migrations_dir / "001_add_performance_indexes.sql").write_text("")
+        path = write_migration(candidates, migrations_dir=migrations_dir)
+
+        assert path.name == "002_advised_indexes.sql"
+        connection = sqlite3.connect(database)
+        connection.executescript(path.read_text())
+        plan = [row[3] for row in connection.execute(
+            f"EXPLAIN QUERY PLAN {PENDING_SYNC.format(user='user-1')}"
+        ).fetchall()]
+        connection.close()
+        assert parse_query_plan(plan)[0] == [candidate.name]
+
+    def test_nothing_to_write(self, tmp_path):
+        """Test unvalidated candidates are not written unless asked for"""
+        candidate = IndexCandidate('t', [('a', False)], queries=[stats('q')])
+        assert write_migration([candidate], migrations_dir=tmp_path) is None
+        assert write_migration([candidate], migrations_dir=tmp_path, include_unvalidated=True).name == \
+            "001_advised_indexes.sql"
+
+
+class FakePostgresConnection:
+    """Connection answering the statements validate_postgresql issues"""
+
+    def __init__(self, version):
+        self.version = version
+        self.statements = []
+        self.hypothetical = False
+
+    def exec_driver_sql(self, sql):
+        self.statements.append(sql)
+        if sql == "SELECT hypopg_reset()":
+            self.hypothetical = False
+        if "GENERIC_PLAN" in sql and self.version < 160000:
+            raise RuntimeError('unrecognized EXPLAIN option "generic_plan"')
+        value = {"SHOW server_version_num": str(self.version)}.get(sql, 1)
+        if sql.startswith("EXPLAIN"):
+            value = [{"Plan": {"Total Cost": 20.0 if self.hypothetical else 100.0}}]
+        return SimpleNamespace(scalar=lambda: value)
+
+    def execute(self, statement, parameters):
+        self.hypothetical = True
+
+    def begin_nested(self):
+        return nullcontext()
+
+    def rollback(self):
+        pass
+
+
+class TestPostgreSQLAdvice:
+    """Test cases for hypothetical-index costing"""
+
+    def validate(self, version):
+        connection = FakePostgresConnection(version)
+
+        @contextmanager
+        def connect():
+            yield connection
+
+        statement = normalize_statement(PENDING_SYNC.format(user="user-1"))
+        candidate = IndexCandidate('change_log', [('user_id', False)], queries=[stats(statement)])
+        [candidate] = validate_postgresql(SimpleNamespace(connect=connect), [candidate])
+        return candidate, connection.statements
+
+    def test_generic_plan_on_postgresql_16(self):
+        """Test newer servers explain the parameterized statement directly"""
+        candidate, statements = self.validate(160002)
+
+        assert candidate.validated and candidate.evidence == ["cost 100.0 -> 20.0"]
+        assert not any(sql.startswith("PREPARE") for sql in statements)
+
+    def test_prepared_statement_before_postgresql_16(self):
+        """Test PostgreSQL 15 costs a prepared statement's forced generic plan instead"""
+        candidate, statements = self.validate(150004)
+
+        assert candidate.validated and candidate.evidence == ["cost 100.0 -> 20.0"]
+        assert not any("GENERIC_PLAN" in sql for sql in statements)
+        prepare = next(sql for sql in statements if sql.startswith("PREPARE"))
+        assert "user_id = $1 and sync_status = $2" in prepare and "limit $3" in prepare
+        assert "EXPLAIN (FORMAT JSON) EXECUTE index_advisor_cost(NULL, NULL, NULL)" in statements
+        assert statements.count("DEALLOCATE index_advisor_cost") == 2
+        assert "SET LOCAL plan_cache_mode = force_generic_plan" in statements
+
+
+class FakeMongoCursor:
+    """Cursor whose explain() scans the first index covering the filter"""
+
+    def __init__(self, collection, query):
+        self.collection = collection
+        self.query = query
+
+    def sort(self, keys):
+        return self
+
+    async def explain(self):
+        for name, keys in self.collection.indexes.items():
+            if set(self.query) <= {key for key, _ in keys}:
+                plan = {'stage': 'FETCH', 'inputStage': {'stage': 'IXSCAN', 'indexName': name}}
+                break
+        else:
+            plan = {'stage': 'COLLSCAN'}
+        return {'queryPlanner': {'winningPlan': plan}}
+
+
+class FakeMongoCollection:
+    """Collection with the calls validate_mongodb makes"""
+
+    def __init__(self, documents=None):
+        self.documents = list(documents or [])
+        self.indexes = {}
+
+    async def drop(self):
+        self.documents, self.indexes = [], {}
+
+    def aggregate(self, pipeline):
+        sample = self.documents[:pipeline[0]['$sample']['size']]
+        return SimpleNamespace(to_list=lambda length: asyncio.sleep(0, result=list(sample)))
+
+    async def insert_many(self, documents):
+        self.documents.extend(documents)
+
+    async def create_index(self, keys, name):
+        self.indexes[name] = keys
+
+    async def drop_index(self, name):
+        del self.indexes[name]
+
+    async def find_one(self, query):
+        return next((d for d in self.documents if all(column in d for column in query)), None)
+
+    def find(self, query):
+        return FakeMongoCursor(self, query)
+
+
+class TestMongoDBAdvice:
+    """Test cases for MongoDB proposals"""
+
+    def test_existing_indexes_and_migration(self, tmp_path):
+        """Test covered shapes are skipped and the generated migration is valid Python"""
+        workload = QueryWorkload()
+        for _ in range(10):
+            workload.record_mongodb(QueryShape('calculations', ['project_id', 'calculation_type']), 'find', 0.01)
+            workload.record_mongodb(QueryShape('calculations', ['user_id'], order_by=[('created_at', True)]),
+                                    'find', 0.02)
+
+        class Collection:
+            async def index_information(self):
+                return {'_id_': {'key': [('_id', 1)]},
+                        'by_type': {'key': [('project_id', 1), ('calculation_type', 1), ('created_at', -1)]}}
+
+        candidates = asyncio.run(IndexAdvisor(workload).propose_mongodb({'calculations': Collection()}))
+
+        [candidate] = candidates
+        assert candidate.columns == [('user_id', False), ('created_at', True)]
+        source = render_mongodb_migration(candidates)
+        compile(source, "migration.py", "exec")
+        assert "IndexModel([('user_id', ASCENDING), ('created_at', DESCENDING)]" in source
+        path = write_migration(candidates, 'mongodb', migrations_dir=tmp_path, include_unvalidated=True)
+        assert path.name == "001_mongodb_advised_indexes.py"
+
+    def test_candidates_are_validated_on_a_scratch_collection(self):
+        """Test MongoDB candidates are explained on a sampled scratch copy, never the live collection"""
+        calculations = FakeMongoCollection([{'user_id': 'u1', 'created_at': 3}, {'user_id': 'u2', 'created_at': 1}])
+        database = {'calculations': calculations}
+        database['index_advisor_scratch_calculations'] = scratch = FakeMongoCollection()
+        used = IndexCandidate('calculations', [('user_id', False), ('created_at', True)], equality_count=1,
+                              queries=[stats('find calculations', shape=QueryShape(
+                                  'calculations', ['user_id'], order_by=[('created_at', True)]))])
+        unsampled = IndexCandidate('calculations', [('room_id', False)], equality_count=1,
+                                   queries=[stats('find rooms', shape=QueryShape('calculations', ['room_id']))])
+
+        asyncio.run(validate_mongodb(database, [used, unsampled]))
+
+        assert used.validated and used.evidence == ['find calculations -> FETCH <- IXSCAN']
+        assert unsampled.validated is False
+        assert calculations.indexes == {} and len(calculations.documents) == 2
+        assert scratch.documents == [] and scratch.indexes == {}
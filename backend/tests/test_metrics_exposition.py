@@ -0,0 +1,80 @@
+"""
+Test suite for Prometheus exposition in MetricsCollector
+Validates scrape output caching and multiprocess aggregation across workers
+"""
+
+import os
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+from backend.monitoring.MetricsCollector import MetricsCollector
+
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+WORKER_SCRIPT = textwrap.dedent("""
+    from backend.monitoring.MetricsCollector import MetricsCollector
+    collector = MetricsCollector()
+    collector.metrics['http_requests_total'].labels(
+        method='GET', endpoint='/api/health', status_code='200'
+    ).inc(3)
+    collector.metrics['http_request_duration_seconds'].labels(
+        method='GET', endpoint='/api/health'
+    ).observe(0.02)
+    collector.metrics['database_connections_active'].labels(
+        database_type='postgresql', database_name='sizewise'
+    ).set(4)
+""")
+
+
+def run_worker(multiprocess_dir):
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(multiprocess_dir))
+    subprocess.run([sys.executable, "-c", WORKER_SCRIPT], cwd=REPO_ROOT, env=env, check=True)
+
+
+class TestExpositionCache:
+    """Test cases for cached exposition output"""
+
+    def setup_method(self):
+        """Setup test environment"""
+        self.collector = MetricsCollector()
+        self.collector.multiprocess_dir = None
+        self.counter = self.collector.metrics['http_requests_total'].labels(
+            method='GET', endpoint='/api/health', status_code='200'
+        )
+
+    def test_output_is_cached_for_scrape_interval(self):
+        """Test repeated scrapes within the interval reuse one rendering"""
+        self.collector.exposition_cache_seconds = 60
+        first = self.collector.get_prometheus_metrics()
+        self.counter.inc()
+
+        assert self.collector.get_prometheus_metrics() is first
+        assert self.collector.get_prometheus_metrics(use_cache=False) != first
+
+    def test_cache_expires(self):
+        """Test a zero interval renders on every scrape"""
+        self.collector.exposition_cache_seconds = 0
+        first = self.collector.get_prometheus_metrics()
+        self.counter.inc()
+
+        assert self.collector.get_prometheus_metrics() != first
+
+
+class TestMultiprocessExposition:
+    """Test cases for multiprocess metric aggregation"""
+
+    def test_workers_are_aggregated(self, tmp_path):
+        """Test one scrape returns the sum over every worker's values"""
+        run_worker(tmp_path)
+        run_worker(tmp_path)
+
+        collector = MetricsCollector()
+        collector.multiprocess_dir = str(tmp_path)
+        output = collector.get_prometheus_metrics(use_cache=False)
+
+        assert ('sizewise_http_requests_total{endpoint="/api/health",method="GET",status_code="200"} 6.0'
+                in output)
+        assert ('sizewise_http_request_duration_seconds_count{endpoint="/api/health",method="GET"} 2.0'
+                in output)
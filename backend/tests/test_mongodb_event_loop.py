@@ -0,0 +1,129 @@
+"""
+Test suite for the shared MongoDB event loop
+Validates that Flask handlers reuse one background loop and one Motor client per worker
+"""
+
+import asyncio
+import threading
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+from flask import Flask
+from backend.config.mongodb_config import (
+    MongoDBConfig, MongoDBEventLoop, mongodb_config, run_mongodb_coroutine
+)
+from backend.api.mongodb_api import mongodb_bp
+from backend.services.mongodb_service import mongodb_service
+
+
+async def loop_identity():
+    return threading.current_thread().name, id(asyncio.get_running_loop())
+
+
+class TestMongoDBEventLoop:
+    """Test cases for the background event loop thread"""
+
+    def setup_method(self):
+        """Setup test environment"""
+        self.runner = MongoDBEventLoop()
+
+    def teardown_method(self):
+        """Cleanup test environment"""
+        self.runner.stop()
+
+    def test_coroutines_share_one_loop_thread(self):
+        """Test every call runs on the same long-lived loop"""
+        first = self.runner.run(loop_identity())
+        second = self.runner.run(loop_identity())
+
+        assert first == second
+        assert first[0] == "mongodb-event-loop"
+
+    def test_concurrent_submissions_from_request_threads(self):
+        """Test many handler threads can submit coroutines at once"""
+        async def work(i):
+            await asyncio.sleep(0.01)
+            return i
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda i: self.runner.run(work(i)), range(32)))
+
+        assert results == list(range(32))
+
+    def test_exceptions_propagate(self):
+        """Test coroutine errors surface in the calling thread"""
+        async def fail():
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError):
+            self.runner.run(fail())
+
+    def test_timeout(self):
+        """Test slow coroutines time out and are cancelled"""
+        with pytest.raises(asyncio.TimeoutError):
+            self.runner.run(asyncio.sleep(5), timeout=0.05)
+
+    def test_restart_after_stop(self):
+        """Test the loop starts again on demand"""
+        self.runner.run(loop_identity())
+        self.runner.stop()
+        assert self.runner.run(loop_identity())[0] == "mongodb-event-loop"
+
+
+class TestSharedClient:
+    """Test cases for the shared Motor client"""
+
+    def test_database_handle_is_reused(self):
+        """Test the service reuses one client and database handle"""
+        assert mongodb_service.db is mongodb_service.db
+        assert mongodb_service.db.client is mongodb_config.get_async_client()
+
+    def test_pool_options_from_environment(self, monkeypatch):
+        """Test pool sizing is configurable"""
+        monkeypatch.setenv('MONGODB_MAX_POOL_SIZE', '20')
+        monkeypatch.setenv('MONGODB_MIN_POOL_SIZE', '2')
+
+        options = MongoDBConfig()._pool_options()
+        assert options['maxPoolSize'] == 20
+        assert options['minPoolSize'] == 2
+
+    def test_handlers_run_on_shared_loop(self):
+        """Test blueprint handlers submit coroutines to the shared loop"""
+        app = Flask(__name__)
+        app.register_blueprint(mongodb_bp, url_prefix='/api/v1/mongodb')
+        threads = []
+
+        async def get_project(project_id):
+            threads.append(threading.current_thread().name)
+            return {'id': project_id}
+
+        with patch.object(mongodb_service, 'get_project', get_project):
+            client = app.test_client()
+            for _ in range(3):
+                response = client.get('/api/v1/mongodb/projects/abc')
+                assert response.status_code == 200
+
+        assert threads == ["mongodb-event-loop"] * 3
+        assert run_mongodb_coroutine(loop_identity())[0] == "mongodb-event-loop"
+
+    def test_health_check_pings_on_shared_loop(self):
+        """Test the health route reports connected when the ping succeeds on the loop thread"""
+        app = Flask(__name__)
+        app.register_blueprint(mongodb_bp, url_prefix='/api/v1/mongodb')
+        threads = []
+
+        class Admin:
+            async def command(self, name):
+                threads.append(threading.current_thread().name)
+                return {'ok': 1.0}
+
+        class Client:
+            admin = Admin()
+
+        with patch.object(mongodb_config, 'get_async_client', return_value=Client()):
+            response = app.test_client().get('/api/v1/mongodb/health')
+
+        assert response.status_code == 200
+        assert response.get_json()['status'] == 'connected'
+        assert threads == ["mongodb-event-loop"]
+
@@ -0,0 +1,226 @@
+"""
+Test suite for keyset pagination and streamed listings in the MongoDB service
+Validates resume tokens, projections and chunked JSON responses
+"""
+
+import asyncio
+import json
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from bson import ObjectId
+from flask import Flask
+from backend.api.mongodb_api import mongodb_bp
+from backend.services.mongodb_service import (
+    decode_resume_token, encode_resume_token, mongodb_service
+)
+
+
+def _compare(value, condition):
+    if isinstance(condition, dict):
+        return all(
+            value is not None and value < operand if op == '$lt' else False
+            for op, operand in condition.items()
+        )
+    return value == condition
+
+
+def matches(doc, query):
+    """Evaluate the subset of the MongoDB query language used by the service"""
+    for field, condition in query.items():
+        if field == '$and':
+            if not all(matches(doc, clause) for clause in condition):
+                return False
+        elif field == '$or':
+            if not any(matches(doc, clause) for clause in condition):
+                return False
+        elif not _compare(doc.get(field), condition):
+            return False
+    return True
+
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def sort(self, keys):
+        for field, direction in reversed(keys):
+            # MongoDB orders missing/null below every value
+            self.documents.sort(key=lambda d: (d.get(field) is not None, d.get(field) or 0),
+                                reverse=direction < 0)
+        return self
+
+    def limit(self, count):
+        self.documents = self.documents[:count]
+        return self
+
+    async def to_list(self, length=None):
+        return self.documents[:length]
+
+
+class FakeCollection:
+    def __init__(self, documents):
+        self.documents = documents
+        self.queries = []
+
+    def find(self, query, projection=None):
+        self.queries.append(query)
+        found = []
+        for doc in self.documents:
+            if matches(doc, query):
+                if projection:
+                    doc = {k: v for k, v in doc.items() if k in projection or k == '_id'}
+                found.append(dict(doc))
+        return FakeCursor(found)
+
+
+class FakeDatabase:
+    def __init__(self, documents):
+        self.spatial_data = FakeCollection(documents)
+        self.hvac_systems = FakeCollection(documents)
+        self.calculations = FakeCollection(documents)
+
+
+def make_documents(count):
+    base = datetime(2024, 1, 1)
+    documents = [
+        {'_id': ObjectId(), 'project_id': 'p1', 'name': f"doc {i}", 'layer_type': 'ducts',
+         'payload': 'x' * 10, 'created_at': base + timedelta(seconds=i // 3)}  # Ties on created_at
+        for i in range(count)
+    ]
+    documents.append({'_id': ObjectId(), 'project_id': 'p1', 'name': 'legacy', 'layer_type': 'ducts'})
+    return documents
+
+
+@pytest.fixture
+def database():
+    database = FakeDatabase(make_documents(250))
+    with patch('backend.services.mongodb_service.get_mongodb_database', return_value=database):
+        yield database
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class TestResumeTokens:
+    """Test cases for resume token encoding"""
+
+    def test_round_trip(self):
+        """Test tokens carry created_at and _id"""
+        doc = {'_id': ObjectId(), 'created_at': datetime(2024, 5, 1, 12, 30, 0, 123000)}
+        assert decode_resume_token(encode_resume_token(doc)) == (doc['created_at'], doc['_id'])
+
+    def test_invalid_token(self):
+        """Test malformed tokens raise ValueError"""
+        with pytest.raises(ValueError):
+            decode_resume_token("not-a-token")
+
+
+class TestKeysetPagination:
+    """Test cases for keyset pages"""
+
+    def test_pages_cover_every_document_once(self, database):
+        """Test paging visits every document exactly once, newest first"""
+        seen = []
+        token = None
+        while True:
+            page = run(mongodb_service.get_spatial_data_page('p1', limit=40, resume_token=token))
+            seen.extend(page['items'])
+            token = page['next_cursor']
+            if not token:
+                break
+
+        assert len(seen) == 251
+        assert len({doc['_id'] for doc in seen}) == 251
+        dated = [doc['created_at'] for doc in seen if 'created_at' in doc]
+        assert dated == sorted(dated, reverse=True)
+        assert seen[-1]['name'] == 'legacy'
+
+    def test_projection(self, database):
+        """Test callers choose the returned fields"""
+        page = run(mongodb_service.get_hvac_systems_page('p1', limit=5, fields=['name']))
+
+        assert set(page['items'][0]) == {'_id', 'name', 'created_at'}
+
+    def test_filters_are_combined_with_position(self, database):
+        """Test resume positions are ANDed with the caller's filter"""
+        missing = run(mongodb_service.get_calculation_results_page('p1', 'airflow', limit=1))
+        assert missing == {'items': [], 'next_cursor': None}
+
+        page = run(mongodb_service.get_spatial_data_page('p1', 'ducts', limit=1))
+        run(mongodb_service.get_spatial_data_page('p1', 'ducts', limit=1, resume_token=page['next_cursor']))
+        query = database.spatial_data.queries[-1]
+        assert query['$and'][0] == {'project_id': 'p1', 'layer_type': 'ducts'}
+
+
+class TestStreamingEndpoints:
+    """Test cases for paged and streamed blueprint responses"""
+
+    def setup_method(self):
+        """Setup test environment"""
+        app = Flask(__name__)
+        app.register_blueprint(mongodb_bp, url_prefix='/api/v1/mongodb')
+        self.client = app.test_client()
+
+    def test_full_listing_is_streamed(self, database):
+        """Test listings without a limit stream every document in one JSON body"""
+        response = self.client.get('/api/v1/mongodb/projects/p1/spatial-data?fields=name')
+
+        assert response.is_streamed and 'Content-Length' not in response.headers
+        body = json.loads(response.get_data(as_text=True))
+        assert body['success'] is True
+        assert len(body['spatial_data']) == 251
+        assert 'payload' not in body['spatial_data'][0]
+
+    def test_later_page_failure_ends_with_error_marker(self, database):
+        """Test a page failing mid-stream still yields valid JSON flagged as failed"""
+        get_page = mongodb_service.get_spatial_data_page
+
+        async def failing_page(project_id, layer_type=None, limit=200, resume_token=None, fields=None):
+            if resume_token:
+                raise RuntimeError("connection reset")
+            return await get_page(project_id, layer_type, limit=limit, resume_token=resume_token, fields=fields)
+
+        with patch.object(mongodb_service, 'get_spatial_data_page', failing_page):
+            response = self.client.get('/api/v1/mongodb/projects/p1/spatial-data')
+
+        assert response.status_code == 200
+        body = json.loads(response.get_data(as_text=True))
+        assert body['success'] is False
+        assert len(body['spatial_data']) == 200
+        assert 'incomplete' in body['error']
+
+    def test_short_listing_is_not_streamed(self):
+        """Test a listing that fits in one page is returned as a plain response"""
+        with patch('backend.services.mongodb_service.get_mongodb_database',
+                   return_value=FakeDatabase(make_documents(5))):
+            response = self.client.get('/api/v1/mongodb/projects/p1/hvac-systems')
+
+        assert response.headers['Content-Length']
+        assert response.get_json()['success'] is True
+        assert len(response.get_json()['hvac_systems']) == 6
+
+    def test_single_page(self, database):
+        """Test limit returns one page with a cursor for the next"""
+        response = self.client.get('/api/v1/mongodb/projects/p1/calculations?limit=10')
+        body = response.get_json()
+
+        assert len(body['calculations']) == 10
+        assert body['next_cursor']
+
+        response = self.client.get(f"/api/v1/mongodb/projects/p1/calculations?cursor={body['next_cursor']}")
+        assert response.get_json()['calculations'][0]['_id'] != body['calculations'][-1]['_id']
+
+    def test_invalid_cursor(self, database):
+        """Test malformed cursors are rejected"""
+        response = self.client.get('/api/v1/mongodb/projects/p1/hvac-systems?cursor=bogus')
+        assert response.status_code == 400
+
+    def test_empty_listing(self):
+        """Test an empty project returns an empty list"""
+        with patch('backend.services.mongodb_service.get_mongodb_database',
+                   return_value=FakeDatabase([])):
+            response = self.client.get('/api/v1/mongodb/projects/p1/hvac-systems')
+
+        assert json.loads(response.get_data(as_text=True)) == {'success': True, 'hvac_systems': []}
@@ -0,0 +1,252 @@
+"""
+Test suite for the write-behind collaboration operation journal
+Validates compact batch encoding, pipelined flushes, retry on failure and snapshot trimming
+"""
+
+import asyncio
+import json
+from datetime import datetime
+import pytest
+from backend.collaboration.document_history import Operation
+from backend.collaboration import op_journal
+from backend.collaboration.op_journal import (
+    APPEND_BATCH_SCRIPT, JournalBacklogFull, JournalTruncated, OperationJournal, decode_batch, encode_batch
+)
+
+
+def op(revision, user_id='user-1', element_id='duct-17', **fields):
+    return Operation(id=f"op-{revision}", type=fields.pop('type', 'update'), user_id=user_id,
+                     timestamp=datetime(2025, 1, 2, 3, 4, 5, 678000), element_id=element_id,
+                     path=fields.pop('path', ['size', 'width']), revision=revision, **fields)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __len__(self):
+        return len(self.commands)
+
+    def eval(self, script, numkeys, *args):
+        if script == APPEND_BATCH_SCRIPT:
+            journal_key, owner_key, snapshot_key, token, entry_id, format, payload, ttl = args
+            self.commands.append(('append', journal_key, owner_key, token, {'f': format, 'b': payload}, entry_id,
+                                  snapshot_key))
+        else:
+            snapshot_key, journal_key, owner_key, revision, state, ttl, token = args
+            self.commands.append(('snapshot', snapshot_key, owner_key, token, journal_key, revision, state))
+
+    async def execute(self, raise_on_error=True):
+        self.redis.round_trips += 1
+        if self.redis.down:
+            raise ConnectionError("Redis unavailable")
+        results = [self.redis.run(*command) for command in self.commands]
+        if self.redis.drop_replies:
+            raise ConnectionError("Connection lost before the replies arrived")
+        return results
+
+
+class FakeRedis:
+    """Stream and hash commands the journal uses, with round trips counted"""
+
+    def __init__(self):
+        self.streams = {}
+        self.hashes = {}
+        self.strings = {}
+        self.expirations = []  # Keys whose expiry was refreshed, in order
+        self.round_trips = 0
+        self.down = False
+        self.drop_replies = False
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def run(self, command, key, owner_key, token, *args):
+        if token and self.strings.get(owner_key) != token:
+            return Exception("FENCED")
+        if command == 'append':
+            fields, entry_id, snapshot_key = args
+            stream = self.streams.setdefault(key, [])
+            if stream and int(entry_id.split('-')[0]) <= int(stream[-1][0].split('-')[0]):
+                return Exception("The ID specified in XADD is equal or smaller than the target stream top item")
+            stream.append((entry_id, {name.encode(): value for name, value in fields.items()}))
+            self.expirations += [key, snapshot_key]
+            return entry_id
+        if command == 'snapshot':
+            journal_key, revision, state = args
+            self.hashes[key] = {b'revision': str(revision).encode(), b'state': state.encode()}
+            self.streams[journal_key] = [entry for entry in self.streams.get(journal_key, [])
+                                         if int(entry[0].split('-')[0]) > revision]
+            return 1
+
+    async def hgetall(self, key):
+        return self.hashes.get(key, {})
+
+    async def xrange(self, key, min='-', max='+'):
+        low = int(min.split('-')[0])
+        return [entry for entry in self.streams.get(key, []) if int(entry[0].split('-')[0]) >= low]
+
+
+@pytest.fixture(params=['json', 'msgpack'])
+def codec(request, monkeypatch):
+    """Run a test with each batch format"""
+    module = pytest.importorskip('msgpack') if request.param == 'msgpack' else None
+    monkeypatch.setattr(op_journal, 'msgpack', module)
+    return request.param.encode()
+
+
+class TestBatchEncoding:
+    """Test cases for the compact batch format"""
+
+    def test_round_trip(self, codec):
+        """Test operations survive encoding, including trailing and interned fields"""
+        operations = [op(1, type='insert', path=[], new_value={'kind': 'duct'}, position={'x': 1, 'y': 2}),
+                      op(2, new_value=12, old_value=10, base_revision=1),
+                      op(3, type='custom', user_id='user-2', element_id='fitting-3', metadata={'tool': 'pen'})]
+        format, payload = encode_batch(operations)
+        assert format == codec
+        assert decode_batch(format, payload) == operations
+
+    def test_interning_shrinks_batches(self, codec):
+        """Test a typical batch is far smaller than per-operation JSON documents"""
+        operations = [op(revision, new_value=revision) for revision in range(1, 101)]
+        _, payload = encode_batch(operations)
+        as_json = sum(len(json.dumps(operation.to_dict())) for operation in operations)
+        assert len(payload) < as_json / 2
+
+
+class TestOperationJournal:
+    """Test cases for write-behind persistence"""
+
+    def setup_method(self):
+        """Setup test environment"""
+        self.redis = FakeRedis()
+        self.journal = OperationJournal(self.redis)
+
+    def test_flush_batches_all_documents_in_one_round_trip(self):
+        """Test appends do no I/O and one flush writes one entry per document"""
+        for revision in range(1, 51):
+            self.journal.append('doc-a', op(revision))
+        self.journal.append('doc-b', op(1))
+        assert self.redis.round_trips == 0
+
+        asyncio.run(self.journal.flush())
+
+        assert self.redis.round_trips == 1
+        assert [entry_id for entry_id, _ in self.redis.streams['doc:doc-a:journal']] == ['50-0']
+        _, _, operations = asyncio.run(self.journal.load('doc-a'))
+        assert [o.revision for o in operations] == list(range(1, 51))
+        assert self.journal.stats['operations'] == 51
+
+    def test_failed_flush_is_retried_in_order(self):
+        """Test operations queued during an outage are written in revision order once Redis is back"""
+        self.journal.append('doc', op(1))
+        self.redis.down = True
+        with pytest.raises(ConnectionError):
+            asyncio.run(self.journal.flush())
+        self.journal.append('doc', op(2))
+        self.redis.down = False
+
+        asyncio.run(self.journal.flush())
+
+        _, _, operations = asyncio.run(self.journal.load('doc'))
+        assert [o.revision for o in operations] == [1, 2]
+        assert self.journal.stats['failures'] == 1
+
+    def test_batches_written_twice_load_once(self):
+        """Test a batch retried after it reached Redis is not replayed twice"""
+        self.journal.append('doc', op(1))
+        self.redis.drop_replies = True
+        with pytest.raises(ConnectionError):
+            asyncio.run(self.journal.flush())
+        self.redis.drop_replies = False
+        self.journal.append('doc', op(2))
+        asyncio.run(self.journal.flush())
+
+        assert [entry_id for entry_id, _ in self.redis.streams['doc:doc:journal']] == ['1-0', '2-0']
+        _, _, operations = asyncio.run(self.journal.load('doc'))
+        assert [o.revision for o in operations] == [1, 2]
+
+    def test_flush_loop_backs_off_while_redis_is_down(self):
+        """Test retries slow down exponentially during an outage"""
+        journal = OperationJournal(self.redis, flush_interval=0.001, max_retry_interval=0.05)
+        journal.append('doc', op(1))
+        self.redis.down = True
+
+        async def run_for(seconds):
+            task = asyncio.create_task(journal.run())
+            await asyncio.sleep(seconds)
+            task.cancel()
+
+        asyncio.run(run_for(0.3))
+        assert 3 < self.redis.round_trips < 15
+
+    def test_snapshot_trims_covered_batches(self):
+        """Test a snapshot replaces the batches it covers and load returns only the tail"""
+        for revision in range(1, 4):
+            self.journal.append('doc', op(revision))
+            asyncio.run(self.journal.flush())
+        self.journal.append('doc', op(4))
+        self.journal.save_snapshot('doc', 3, {'duct-17': {'size': {'width': None}}})
+        asyncio.run(self.journal.flush())
+
+        state, snapshot_revision, operations = asyncio.run(self.journal.load('doc'))
+        assert (snapshot_revision, [o.revision for o in operations]) == (3, [4])
+        assert state == {'duct-17': {'size': {'width': None}}}
+        assert len(self.redis.streams['doc:doc:journal']) == 1
+
+    def test_appends_keep_the_snapshot_alive(self):
+        """Test appends refresh the snapshot's expiry along with the journal's"""
+        self.journal.append('doc', op(1))
+        asyncio.run(self.journal.flush())
+
+        assert self.redis.expirations == ['doc:doc:journal', 'doc:doc:snapshot']
+
+    def test_journal_without_its_snapshot_is_refused(self):
+        """Test a trimmed journal whose snapshot is gone is not loaded as a truncated document"""
+        for revision in range(1, 4):
+            self.journal.append('doc', op(revision))
+            asyncio.run(self.journal.flush())
+        self.journal.save_snapshot('doc', 2, {'duct-17': {}})
+        asyncio.run(self.journal.flush())
+        del self.redis.hashes['doc:doc:snapshot']
+
+        with pytest.raises(JournalTruncated):
+            asyncio.run(self.journal.load('doc'))
+
+    def test_stale_owner_is_fenced(self):
+        """Test writes carrying an outdated fencing token are refused and dropped"""
+        self.redis.strings['doc:doc:owner'] = 'a:1'
+        self.journal.fence('doc', 'a:1')
+        self.journal.append('doc', op(1))
+        asyncio.run(self.journal.flush())
+
+        self.redis.strings['doc:doc:owner'] = 'b:2'  # Node b took the document over
+        self.journal.append('doc', op(2))
+        self.journal.save_snapshot('doc', 2, {})
+        asyncio.run(self.journal.flush())
+
+        _, snapshot_revision, operations = asyncio.run(self.journal.load('doc'))
+        assert (snapshot_revision, [o.revision for o in operations]) == (0, [1])
+        assert self.journal.fenced == {'doc'} and not self.journal.pending
+        assert self.journal.stats['fenced'] == 1
+
+        self.journal.discard('doc')
+        assert not self.journal.fenced and 'doc' not in self.journal.fences
+
+    def test_backlog_is_bounded(self):
+        """Test a full backlog refuses new operations instead of dropping queued ones"""
+        journal = OperationJournal(self.redis, max_pending=10)
+        for revision in range(1, 11):
+            journal.check_capacity('doc')
+            journal.append('doc', op(revision))
+        with pytest.raises(JournalBacklogFull):
+            journal.check_capacity('doc')
+        journal.check_capacity('other-doc')
+        assert journal.stats['rejected'] == 1
+
+        asyncio.run(journal.flush())
+        journal.check_capacity('doc')
+        _, _, operations = asyncio.run(journal.load('doc'))
+        assert [o.revision for o in operations] == list(range(1, 11))
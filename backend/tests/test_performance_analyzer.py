@@ -0,0 +1,169 @@
+"""
+Test suite for the database benchmark suite
+Validates synthetic data generation, plan capture and baseline regression detection
+"""
+
+import sqlite3
+import pytest
+from backend.database.performance_analyzer import (
+    DatabasePerformanceAnalyzer, QueryBenchmarkResult, SyntheticDataConfig,
+    build_benchmark_database, parse_query_plan, percentiles
+)
+
+
+SMALL = SyntheticDataConfig(users=4, projects_per_user=5, segments_per_project=20,
+                            change_log_rows=400, feature_flags_per_user=3)
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = str(tmp_path / "benchmark.db")
+    dataset = build_benchmark_database(path, SMALL)
+    return path, dataset
+
+
+def run(path, dataset, baseline=None):
+    analyzer = DatabasePerformanceAnalyzer(path)
+    analyzer.connect()
+    try:
+        return analyzer.run_benchmark(baseline=baseline, dataset=dataset,
+                                      warm_repetitions=3, cold_repetitions=2)
+    finally:
+        analyzer.disconnect()
+
+
+def result(name, plan, p95=1.0):
+    indexes, full_scans, temp_sorts = parse_query_plan(plan)
+    return QueryBenchmarkResult(name, plan, indexes, full_scans, temp_sorts, 1,
+                                {'p95': p95}, {'p50': p95, 'p95': p95})
+
+
+class TestHelpers:
+    """Test cases for percentile and plan parsing helpers"""
+
+    def test_percentiles(self):
+        """Test nearest-rank percentiles"""
+        stats = percentiles([float(i) for i in range(1, 101)])
+        assert (stats['p50'], stats['p95'], stats['p99'], stats['max']) == (50, 95, 99, 100)
+        assert percentiles([]) == {}
+
+    def test_parse_query_plan(self):
+        """Test index use, unindexed scans and temp sorts are extracted"""
+        indexes, full_scans, temp_sorts = parse_query_plan([
+            "SEARCH projects USING INDEX idx_projects_user (user_id=?)",
+            "  SCAN ps",
+            "  SCAN p USING COVERING INDEX idx_projects_status",
+            "USE TEMP B-TREE FOR ORDER BY"
+        ])
+
+        assert indexes == ['idx_projects_status', 'idx_projects_user']
+        assert full_scans == ['ps']
+        assert temp_sorts == 1
+
+
+class TestBenchmarkSuite:
+    """Test cases for benchmark runs against a synthetic database"""
+
+    def test_synthetic_dataset(self, database):
+        """Test the dataset is sized by the config and contains the test IDs"""
+        path, dataset = database
+
+        assert dataset == {'users': 4, 'projects': 20, 'segments': 400,
+                           'feature_flags': 12, 'change_log': 400}
+        connection = sqlite3.connect(path)
+        assert connection.execute(
+            "SELECT COUNT(*) FROM project_segments WHERE project_id = 'test-project-456'"
+        ).fetchone()[0] == 20
+        connection.close()
+
+    def test_migrated_schema_passes(self, database):
+        """Test every query is planned and timed and indexed queries pass"""
+        path, dataset = database
+        report = run(path, dataset)
+
+        assert report.passed, report.findings
+        assert all(r.warm_ms and r.cold_ms and r.plan for r in report.results)
+
+    def test_dropped_index_fails_against_baseline(self, database, tmp_path):
+        """Test losing an index the baseline relied on fails the benchmark"""
+        path, dataset = database
+        baseline_path = str(tmp_path / "baseline.json")
+        DatabasePerformanceAnalyzer.save_baseline(run(path, dataset), baseline_path)
+
+        connection = sqlite3.connect(path)
+        connection.execute("DROP INDEX idx_change_log_sync_timestamp")
+        connection.commit()
+        connection.close()
+
+        report = run(path, dataset, DatabasePerformanceAnalyzer.load_baseline(baseline_path))
+
+        assert not report.passed
+        assert any(f.kind == 'index_lost' and f.query_name == 'pending_sync_operations'
+                   for f in report.findings)
+
+
+class TestBaselineComparison:
+    """Test cases for baseline diffing rules"""
+
+    def setup_method(self):
+        """Setup test environment"""
+        self.analyzer = DatabasePerformanceAnalyzer(":memory:")
+        self.indexed = ["SEARCH change_log USING INDEX idx_change_log_user_sync (user_id=?)"]
+        self.baseline = {'results': [
+            {'query_name': 'user_sync_history', 'plan': self.indexed,
+             'indexes_used': ['idx_change_log_user_sync'], 'warm_ms': {'p95': 1.0}}
+        ]}
+
+    def test_full_scan_fails_without_baseline(self):
+        """Test an unindexed scan fails even on the first run"""
+        findings = self.analyzer.compare_to_baseline(
+            [result('user_sync_history', ["SCAN change_log"])], None
+        )
+        assert [f.kind for f in findings] == ['full_scan']
+
+    def test_allowed_full_scan(self):
+        """Test leading-wildcard searches may scan"""
+        assert self.analyzer.compare_to_baseline([result('project_name_search', ["SCAN projects"])], None) == []
+
+    def test_latency_needs_relative_and_absolute_growth(self):
+        """Test sub-millisecond noise does not fail the run"""
+        noisy = self.analyzer.compare_to_baseline([result('user_sync_history', self.indexed, 1.9)],
+                                                  self.baseline)
+        slow = self.analyzer.compare_to_baseline([result('user_sync_history', self.indexed, 3.0)],
+                                                 self.baseline)
+
+        assert noisy == []
+        assert [f.kind for f in slow] == ['latency']
+
+    def test_plan_change_is_informational(self):
+        """Test a different plan that keeps its indexes is reported but passes"""
+        plan = self.indexed + ["USE TEMP B-TREE FOR ORDER BY"]
+        findings = self.analyzer.compare_to_baseline([result('user_sync_history', plan)], self.baseline)
+
+        assert [(f.kind, f.failing) for f in findings] == [('plan_changed', False)]
+
+    def test_switching_index_without_scan_is_not_a_loss(self):
+        """Test using a different index with no new scan or sort is only a plan change"""
+        plan = ["SEARCH change_log USING INDEX idx_change_log_sync_timestamp (user_id=?)"]
+        findings = self.analyzer.compare_to_baseline([result('user_sync_history', plan)], self.baseline)
+
+        assert [(f.kind, f.failing) for f in findings] == [('plan_changed', False)]
+
+    def test_lost_index_with_temp_sort_fails(self):
+        """Test losing an index fails once the query has to sort in a temp B-tree"""
+        plan = ["SEARCH change_log USING INDEX idx_change_log_sync_timestamp (user_id=?)",
+                "USE TEMP B-TREE FOR ORDER BY"]
+        findings = self.analyzer.compare_to_baseline([result('user_sync_history', plan)], self.baseline)
+
+        assert [f.kind for f in findings if f.failing] == ['index_lost']
+
+    def test_different_dataset_skips_plan_and_latency(self):
+        """Test a baseline taken on another dataset size is not diffed"""
+        baseline = dict(self.baseline, dataset={'users': 100})
+        findings = self.analyzer.compare_to_baseline(
+            [result('user_sync_history', ["SCAN change_log USING INDEX idx_other"], 50.0)], baseline,
+            dataset={'users': 4}
+        )
+
+        assert [(f.kind, f.failing) for f in findings] == [('dataset_changed', False)]
+
@@ -0,0 +1,208 @@
+"""
+Test suite for connection pool telemetry and adaptive pool sizing
+Validates checkout wait and timeout recording, live resizing and the sizing controller
+"""
+
+import asyncio
+import os
+import pytest
+import redis
+from types import SimpleNamespace
+from sqlalchemy import create_engine, exc, text
+from pymongo import monitoring
+from backend.database.PerformanceOptimizer import (
+    AdaptivePoolController, DatabasePerformanceOptimizer, InstrumentedQueuePool, InstrumentedRedisPool,
+    MongoPoolListener, PoolSizingPolicy, PoolWindow
+)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=InstrumentedQueuePool,
+                           pool_size=1, max_overflow=0, pool_timeout=0.05)
+    yield engine
+    engine.dispose()
+
+
+class TestInstrumentedQueuePool:
+    """Test cases for the SQLAlchemy pool"""
+
+    def test_checkouts_and_timeouts_are_recorded(self, engine):
+        """Test waits are timed and an exhausted pool's timeout is counted"""
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+            assert engine.pool.usage() == (1, 0)
+            with pytest.raises(exc.TimeoutError):
+                engine.connect()
+
+        stats = engine.pool.telemetry.to_dict()
+        assert (stats['checkouts'], stats['timeouts']) == (1, 1)
+        assert stats['wait']['max_time'] >= 0.05
+        assert engine.pool.usage() == (0, 1)
+
+    def test_resize_lifts_the_limit(self, engine):
+        """Test growing the pool lets a second connection in without recreating the engine"""
+        assert engine.pool.resize(2) == 2
+        with engine.connect(), engine.connect():
+            assert engine.pool.usage() == (2, 0)
+
+        assert engine.pool.resize(0) == 1  # pool_size is the floor
+        assert engine.pool.telemetry.timeouts == 0
+
+    def test_dispose_keeps_size_and_telemetry(self, engine):
+        """Test the pool engine.dispose() swaps in keeps the resized limit and history"""
+        telemetry = engine.pool.telemetry
+        engine.pool.resize(3)
+        engine.dispose()
+
+        assert engine.pool.telemetry is telemetry
+        assert engine.pool.max_size == 3
+
+    def test_window_is_drained(self, engine):
+        """Test each window only covers activity since the previous tick"""
+        with engine.connect():
+            window = engine.pool.telemetry.take_window()
+            assert (window.checkouts, window.peak_in_use) == (1, 1)
+            assert engine.pool.telemetry.take_window(in_use=1) == PoolWindow(peak_in_use=1)
+
+
+class FakeRedisConnection:
+    """Connection that is always ready, so no server is needed"""
+
+    def __init__(self, **kwargs):
+        self.pid = os.getpid()
+
+    async def connect(self):
+        pass
+
+    async def can_read_destructive(self):
+        return False
+
+    async def disconnect(self):
+        pass
+
+
+class TestInstrumentedRedisPool:
+    """Test cases for the asyncio Redis pool"""
+
+    def test_exhausted_pool_counts_as_timeout(self):
+        """Test "Too many connections" is recorded and a resize lifts the limit"""
+        pool = InstrumentedRedisPool(connection_class=FakeRedisConnection, max_connections=1)
+
+        async def checkout():
+            first = await pool.get_connection('GET')
+            with pytest.raises(redis.ConnectionError, match="Too many connections"):
+                await pool.get_connection('GET')
+            pool.resize(2)
+            await pool.get_connection('GET')
+            await pool.release(first)
+
+        asyncio.run(checkout())
+
+        stats = pool.telemetry.to_dict()
+        assert (stats['checkouts'], stats['timeouts']) == (2, 1)
+        assert pool.usage() == (1, 1)
+
+    def test_resize_keeps_configured_limit(self):
+        """Test shrinking stops at the configured max_connections"""
+        pool = InstrumentedRedisPool(connection_class=FakeRedisConnection, max_connections=4)
+
+        assert pool.resize(8) == 8
+        assert pool.resize(2) == 4
+
+
+class TestMongoPoolListener:
+    """Test cases for the PyMongo pool listener"""
+
+    def test_events_update_usage_and_waits(self):
+        """Test checkout events feed waits and open/in-use counts; only timeouts count as timeouts"""
+        listener = MongoPoolListener()
+        address = ('localhost', 27017)
+        for connection_id in (1, 2):
+            listener.connection_created(monitoring.ConnectionCreatedEvent(address, connection_id))
+        listener.connection_checked_out(monitoring.ConnectionCheckedOutEvent(address, 1, 0.002))
+        listener.connection_check_out_failed(monitoring.ConnectionCheckOutFailedEvent(
+            address, monitoring.ConnectionCheckOutFailedReason.TIMEOUT, 1.0
+        ))
+        listener.connection_check_out_failed(monitoring.ConnectionCheckOutFailedEvent(
+            address, monitoring.ConnectionCheckOutFailedReason.CONN_ERROR, 0.1
+        ))
+
+        assert listener.usage() == (1, 1)
+        assert listener.telemetry.to_dict()['timeouts'] == 1
+        listener.connection_checked_in(monitoring.ConnectionCheckedInEvent(address, 1))
+        assert listener.usage() == (0, 2)
+
+
+class TestAdaptivePoolController:
+    """Test cases for sizing decisions"""
+
+    def setup_method(self):
+        """Setup test environment"""
+        self.controller = AdaptivePoolController('postgresql', PoolSizingPolicy(min_size=10, max_size=30))
+
+    def test_grows_on_timeouts_and_waits(self):
+        """Test starvation grows the pool by one step up to the bound"""
+        assert self.controller.decide(20, PoolWindow(checkouts=50, timeouts=2, peak_in_use=20)).target_size == 25
+        assert self.controller.decide(28, PoolWindow(checkouts=50, wait_p95=0.1, peak_in_use=28)).target_size == 30
+        assert self.controller.decide(30, PoolWindow(timeouts=5, peak_in_use=30)).target_size == 30
+
+    def test_backs_off_when_database_is_saturated(self):
+        """Test a saturated database shrinks the pool even while it is starved"""
+        decision = self.controller.decide(20, PoolWindow(timeouts=3, peak_in_use=20), saturation=0.95)
+        assert decision.target_size == 15
+        assert "connection limit" in decision.reason
+
+    def test_shrinks_when_mostly_idle(self):
+        """Test low peak usage shrinks the pool but never below the peak or the floor"""
+        assert self.controller.decide(30, PoolWindow(checkouts=10, peak_in_use=2)).target_size == 25
+        assert self.controller.decide(12, PoolWindow(checkouts=10, peak_in_use=1)).target_size == 10
+
+    def test_holds_when_healthy(self):
+        """Test moderate usage with short waits keeps the size"""
+        decision = self.controller.decide(20, PoolWindow(checkouts=100, wait_p95=0.001, peak_in_use=15))
+        assert (decision.target_size, decision.reason) == (20, "")
+
+
+class TestOptimizerPoolSizing:
+    """Test cases for the optimizer's pool controller tick"""
+
+    def test_starved_pool_is_resized_and_reported(self, engine):
+        """Test a tick grows a starved PostgreSQL pool and the report shows the pool state"""
+        optimizer = DatabasePerformanceOptimizer()
+        optimizer.pg_engine = engine
+        optimizer.pool_controllers['postgresql'].policy = PoolSizingPolicy(min_size=1, max_size=4, step=2)
+        with engine.connect(), pytest.raises(exc.TimeoutError):
+            engine.connect()
+
+        [decision] = asyncio.run(optimizer.adjust_pools())
+
+        assert (decision.current_size, decision.target_size, decision.applied) == (1, 3, True)
+        assert engine.pool.max_size == 3
+        stats = optimizer.get_pool_stats()['postgresql']
+        assert (stats['max_size'], stats['timeouts'], stats['resizable']) == (3, 1, True)
+
+    def test_registered_service_pool_is_resized(self, engine):
+        """Test another service's engine registered with the optimizer is sized on each tick"""
+        optimizer = DatabasePerformanceOptimizer()
+        optimizer.register_pool('postgresql_service', engine, PoolSizingPolicy(min_size=1, max_size=4, step=2))
+        with engine.connect(), pytest.raises(exc.TimeoutError):
+            engine.connect()
+
+        [decision] = asyncio.run(optimizer.adjust_pools())
+
+        assert (decision.database_type, decision.target_size, decision.applied) == ('postgresql_service', 3, True)
+        assert engine.pool.max_size == 3
+        optimizer.unregister_pool('postgresql_service')
+        assert asyncio.run(optimizer.adjust_pools()) == []
+
+    def test_mongodb_sizing_is_advisory(self):
+        """Test MongoDB pools are only recommended a new size"""
+        optimizer = DatabasePerformanceOptimizer()
+        optimizer.mongo_client = SimpleNamespace()  # Saturation lookup fails and is skipped
+        optimizer.mongo_pool_listener.telemetry.record_timeout(1.0)
+
+        [decision] = asyncio.run(optimizer.adjust_pools())
+
+        assert (decision.target_size, decision.applied) == (55, False)
+        assert optimizer._pool_recommendations() == ["Set mongodb pool size to 55 (1 checkout timeouts)"]
@@ -0,0 +1,168 @@
+"""
+Test suite for EnhancedPostgreSQLService query execution
+Validates off-loop query execution, statement preparation, pool sizing and latency histograms
+"""
+
+import asyncio
+import threading
+import time
+import pytest
+from sqlalchemy import create_engine, text
+from backend.services.enhanced_postgresql_service import (
+    EnhancedPostgreSQLService, LatencyHistogram
+)
+
+
+SCHEMA = [
+    """CREATE TABLE projects (
+        id TEXT PRIMARY KEY, user_id TEXT, name TEXT, updated_at TIMESTAMP
+    )""",
+    """CREATE TABLE project_segments (
+        id TEXT PRIMARY KEY, project_id TEXT, user_id TEXT, name TEXT, segment_type TEXT,
+        calculation_data TEXT, created_at TIMESTAMP, updated_at TIMESTAMP
+    )""",
+]
+
+
+@pytest.fixture
+def service(tmp_path):
+    database_url = f"sqlite:///{tmp_path / 'sizewise.db'}"
+    engine = create_engine(database_url)
+    with engine.begin() as connection:
+        for statement in SCHEMA:
+            connection.execute(text(statement))
+        connection.execute(text(
+            "INSERT INTO projects VALUES ('p1', 'u1', 'Office', '2024-01-01'), "
+            "('p2', 'u1', 'Lab', '2024-02-01'), ('p3', 'u2', 'Shop', '2024-03-01')"
+        ))
+        connection.execute(text(
+            "INSERT INTO project_segments (id, project_id, segment_type) "
+            "VALUES ('s1', 'p1', 'duct'), ('s2', 'p1', 'fitting')"
+        ))
+    engine.dispose()
+
+    service = EnhancedPostgreSQLService(database_url)
+    service.query_cache_enabled = False
+    asyncio.run(service.initialize())
+    yield service
+    asyncio.run(service.cleanup())
+
+
+class TestQueryExecution:
+    """Test cases for queries run through the service"""
+
+    def test_user_projects(self, service):
+        """Test projects load with segment counts, newest first"""
+        projects = asyncio.run(service.get_user_projects_optimized('u1'))
+
+        assert [p['id'] for p in projects] == ['p2', 'p1']
+        assert projects[1]['segment_count'] == 2
+
+    def test_queries_run_off_the_event_loop(self, service):
+        """Test queries execute on the query thread pool"""
+        threads = []
+        original = service._query_user_projects
+
+        def query(user_id, limit):
+            threads.append(threading.current_thread().name)
+            return original(user_id, limit)
+
+        service._query_user_projects = query
+        asyncio.run(service.get_user_projects_optimized('u1'))
+
+        assert threads[0].startswith("postgresql-query")
+
+    def test_concurrent_project_loads_overlap(self, service):
+        """Test concurrent loads run in parallel instead of queueing"""
+        original = service._query_user_projects
+
+        def slow_query(user_id, limit):
+            time.sleep(0.1)
+            return original(user_id, limit)
+
+        service._query_user_projects = slow_query
+
+        async def load_all():
+            started = time.perf_counter()
+            results = await asyncio.gather(
+                *(service.get_user_projects_optimized('u1') for _ in range(8))
+            )
+            return results, time.perf_counter() - started
+
+        results, elapsed = asyncio.run(load_all())
+        assert all(len(r) == 2 for r in results)
+        assert elapsed < 0.5
+
+    def test_bulk_insert_segments(self, service):
+        """Test large batches go through the bulk loader and return IDs in order"""
+        segments = [{'segment_type': 'duct', 'name': f"Run {i}", 'geometry_data': {}} for i in range(60)]
+        segments[0]['id'] = 'first'
+        ids = asyncio.run(service.bulk_insert_segments('p3', segments))
+
+        assert len(ids) == 60
+        assert ids[0] == 'first'
+        assert service.metrics.bulk_operations == 1
+        assert service.query_histograms['bulk_insert_segments'].count == 1
+        with service.get_db_session() as session:
+            names = session.execute(text(
+                "SELECT name FROM project_segments WHERE project_id = 'p3'"
+            )).scalars().all()
+        assert sorted(names) == sorted(f"Run {i}" for i in range(60))
+
+
+class TestStatementPreparation:
+    """Test cases for common statement preparation"""
+
+    def test_statements_are_compiled_once(self, service):
+        """Test common statements are built at initialization"""
+        assert service.metrics.prepared_statements == 4
+        assert service.server_side_prepare is False
+
+    def test_server_side_statements(self, service):
+        """Test PREPARE/EXECUTE forms use positional parameters in bind order"""
+        prepare_sql, execute_clause = service._server_statements['get_calculation_results']
+
+        assert prepare_sql.startswith("PREPARE get_calculation_results AS")
+        assert "project_id = $1 AND calculation_type = $2" in prepare_sql
+        assert "LIMIT $3" in prepare_sql
+        assert str(execute_clause) == (
+            "EXECUTE get_calculation_results(:project_id, :calculation_type, :limit)"
+        )
+
+
+class TestPoolAndLatency:
+    """Test cases for pool sizing and latency tracking"""
+
+    def test_pool_sizing_from_environment(self, monkeypatch):
+        """Test pool size comes from the environment and bounds the thread pool"""
+        monkeypatch.setenv('POSTGRES_POOL_SIZE', '5')
+        monkeypatch.setenv('POSTGRES_MAX_OVERFLOW', '3')
+
+        service = EnhancedPostgreSQLService("postgresql://localhost/sizewise")
+        options = service._engine_options()
+
+        assert options['pool_size'] == 5
+        assert options['max_overflow'] == 3
+        assert "statement_timeout=30s" in options['connect_args']['options']
+
+    def test_per_query_histograms(self, service):
+        """Test named queries and SQL verbs get latency histograms"""
+        for _ in range(3):
+            asyncio.run(service.get_user_projects_optimized('u1'))
+
+        histogram = service.query_histograms['get_user_projects']
+        assert histogram.count == 3
+        assert service.query_times['SELECT'].count >= 3
+        assert sum(histogram.to_dict()['buckets'].values()) == 3
+
+    def test_histogram_percentiles(self):
+        """Test percentiles resolve to bucket upper bounds"""
+        histogram = LatencyHistogram()
+        for _ in range(90):
+            histogram.observe(0.002)
+        for _ in range(10):
+            histogram.observe(0.3)
+
+        assert histogram.percentile(50) == 0.005
+        assert histogram.percentile(95) == 0.5
+        assert histogram.to_dict()['buckets']['0.5'] == 10
@@ -0,0 +1,115 @@
+"""
+Test suite for collaboration presence frames
+Validates per-tick coalescing, delta encoding, keyframes for late joiners, idle dropout and frame size
+"""
+
+from backend.collaboration.presence import PresenceHub, decode_frame
+
+
+class TestPresenceHub:
+    """Test cases for coalesced cursor frames"""
+
+    def setup_method(self):
+        """Setup test environment"""
+        self.hub = PresenceHub(tick_rate=20, idle_after=10)
+
+    def test_updates_between_ticks_are_coalesced(self):
+        """Test only each user's latest cursor goes out, all in one frame"""
+        for step in range(50):
+            self.hub.update_cursor('doc', 'alice', {'x': step, 'y': 1.25}, now=0)
+        self.hub.update_cursor('doc', 'bob', {'x': 3, 'y': 4, 'elementId': 'd1'}, now=0)
+
+        frames = self.hub.flush(now=0.05)
+        sequence, entries = decode_frame(frames['doc'])
+
+        assert sequence == 1
+        assert entries == [
+            {'slot': 0, 'user_id': 'alice', 'position': (490, 12)},
+            {'slot': 1, 'user_id': 'bob', 'position': (30, 40), 'extra': {'elementId': 'd1'}}
+        ]
+        assert self.hub.flush(now=0.1) == {}
+
+    def test_later_frames_carry_deltas_of_changed_cursors(self):
+        """Test unchanged cursors are left out and moved ones are sent as deltas"""
+        self.hub.update_cursor('doc', 'alice', {'x': 10, 'y': 10}, now=0)
+        self.hub.update_cursor('doc', 'bob', {'x': 0, 'y': 0}, now=0)
+        self.hub.flush(now=0.05)
+
+        self.hub.update_cursor('doc', 'alice', {'x': 12.5, 'y': 9}, now=0.06)
+        self.hub.update_cursor('doc', 'bob', {'x': 0, 'y': 0}, now=0.06)
+        self.hub.update_cursor('doc', 'carol', {'x': 5000, 'y': 0}, now=0.06)
+        self.hub.update_cursor('doc', 'carol', {'x': 0, 'y': 0}, now=0.07)
+        sequence, entries = decode_frame(self.hub.flush(now=0.1)['doc'])
+
+        assert sequence == 2
+        assert entries == [{'slot': 0, 'delta': (25, -10)}, {'slot': 2, 'user_id': 'carol', 'position': (0, 0)}]
+
+        self.hub.update_cursor('doc', 'carol', {'x': 5000, 'y': 0}, now=0.11)
+        _, entries = decode_frame(self.hub.flush(now=0.15)['doc'])
+        assert entries == [{'slot': 2, 'position': (50000, 0)}]  # Too far for a 16-bit delta
+
+    def test_late_joiner_keyframe(self):
+        """Test a client joining after the first frame can resolve the deltas that follow"""
+        self.hub.update_cursor('doc', 'alice', {'x': 10, 'y': 10}, now=0)
+        self.hub.update_cursor('doc', 'bob', {'x': 1, 'y': 2, 'elementId': 'd1'}, now=0)
+        self.hub.flush(now=0.05)
+        self.hub.update_cursor('doc', 'alice', {'x': 11, 'y': 10}, now=0.06)
+        self.hub.flush(now=0.1)
+        self.hub.update_cursor('doc', 'carol', {'x': 0, 'y': 0}, now=0.11)  # Not framed yet
+
+        sequence, entries = decode_frame(self.hub.keyframe('doc'))
+        assert sequence == 2
+        assert entries == [
+            {'slot': 0, 'user_id': 'alice', 'position': (110, 100)},
+            {'slot': 1, 'user_id': 'bob', 'position': (10, 20), 'extra': {'elementId': 'd1'}}
+        ]
+
+        # Replay the joiner's view: keyframe, then the next frame on top of it
+        users, positions = {}, {}
+        for entry in entries:
+            users[entry['slot']], positions[entry['slot']] = entry['user_id'], entry['position']
+        self.hub.update_cursor('doc', 'alice', {'x': 12, 'y': 9}, now=0.12)
+        next_sequence, entries = decode_frame(self.hub.flush(now=0.15)['doc'])
+        for entry in entries:
+            users.setdefault(entry['slot'], entry.get('user_id'))
+            if 'delta' in entry:
+                x, y = positions[entry['slot']]
+                positions[entry['slot']] = (x + entry['delta'][0], y + entry['delta'][1])
+            else:
+                positions[entry['slot']] = entry['position']
+
+        assert next_sequence == sequence + 1
+        assert {users[slot]: position for slot, position in positions.items()} == {
+            'alice': (120, 90), 'bob': (10, 20), 'carol': (0, 0)
+        }
+        assert self.hub.keyframe('empty') is None
+
+    def test_idle_and_departed_users_drop_out(self):
+        """Test idle users and users who leave are reported once as gone"""
+        self.hub.update_cursor('doc', 'alice', {'x': 1, 'y': 1}, now=0)
+        self.hub.update_cursor('doc', 'bob', {'x': 2, 'y': 2}, now=0)
+        self.hub.flush(now=0.05)
+
+        self.hub.update_cursor('doc', 'bob', {'x': 3, 'y': 2}, now=9)
+        self.hub.flush(now=9.05)
+        _, entries = decode_frame(self.hub.flush(now=10.1)['doc'])
+        assert entries == [{'slot': 0, 'gone': True}]
+
+        self.hub.remove_user('doc', 'bob')
+        _, entries = decode_frame(self.hub.flush(now=10.15)['doc'])
+        assert entries == [{'slot': 1, 'gone': True}]
+        assert self.hub.rooms == {}
+
+    def test_frame_size_is_linear_in_changed_cursors(self):
+        """Test a busy room sends one compact frame per tick, a few bytes per moving cursor"""
+        users = [f"user-{i}" for i in range(30)]
+        for user in users:
+            self.hub.update_cursor('doc', user, {'x': 0, 'y': 0}, now=0)
+        self.hub.flush(now=0.05)
+
+        for step in range(1, 20):
+            for user in users:
+                self.hub.update_cursor('doc', user, {'x': step, 'y': step}, now=step * 0.05)
+            frames = self.hub.flush(now=step * 0.05 + 0.01)
+            assert list(frames) == ['doc']
+            assert len(frames['doc']) == 7 + 30 * 7
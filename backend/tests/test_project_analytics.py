@@ -0,0 +1,416 @@
+"""
+Test suite for materialized project analytics
+Validates incremental totals on write, rebuilds from source rows and O(1) reads
+"""
+
+import asyncio
+import pytest
+from datetime import datetime
+from unittest.mock import patch
+from sqlalchemy import create_engine, text
+from backend.services.enhanced_postgresql_service import EnhancedPostgreSQLService
+from backend.services.mongodb_service import EnhancedMongoDBService
+from backend.services.project_analytics import accumulate, metric_value
+
+
+SCHEMA = [
+    """CREATE TABLE projects (
+        id TEXT PRIMARY KEY, user_id TEXT, name TEXT, updated_at TIMESTAMP
+    )""",
+    """CREATE TABLE project_segments (
+        id TEXT PRIMARY KEY, project_id TEXT, user_id TEXT, name TEXT, segment_type TEXT,
+        calculation_data TEXT, geometry_data TEXT, validation_results TEXT,
+        created_at TIMESTAMP, updated_at TIMESTAMP
+    )""",
+    """CREATE TABLE calculations (
+        id TEXT PRIMARY KEY, project_id TEXT, user_id TEXT, calculation_type TEXT, inputs TEXT,
+        results TEXT, metadata TEXT, created_at TIMESTAMP, is_valid BOOLEAN
+    )""",
+]
+
+
+@pytest.fixture
+def service(tmp_path):
+    database_url = f"sqlite:///{tmp_path / 'sizewise.db'}"
+    engine = create_engine(database_url)
+    with engine.begin() as connection:
+        for statement in SCHEMA:
+            connection.execute(text(statement))
+        connection.execute(text("INSERT INTO projects VALUES ('p1', 'u1', 'Office', '2024-01-01')"))
+    engine.dispose()
+
+    service = EnhancedPostgreSQLService(database_url)
+    service.query_cache_enabled = False
+    asyncio.run(service.initialize())
+    yield service
+    asyncio.run(service.cleanup())
+
+
+def segments(count, segment_type='duct', cfm=100.0):
+    return [
+        {'user_id': 'u1', 'name': f"S{i}", 'segment_type': segment_type,
+         'calculation_data': {'cfm': cfm, 'pressure_drop': 0.5}}
+        for i in range(count)
+    ]
+
+
+class TestAccumulate:
+    """Test cases for batch deltas"""
+
+    def test_groups_and_metrics(self):
+        """Test non-numeric metrics are counted but excluded from averages"""
+        groups = accumulate(
+            [{'t': 'a', 'm': {'cfm': 10}}, {'t': 'a', 'm': '{"cfm": 30}'},
+             {'t': 'a', 'm': {'cfm': 'n/a'}}, {'t': 'b', 'm': None}],
+            lambda record: record['t'], lambda record: record['m']
+        )
+
+        assert groups['a'].count == 3
+        assert groups['a'].avg_cfm == 20
+        assert groups['b'].avg_cfm is None
+
+    def test_booleans_are_not_metrics(self):
+        """Test boolean flags are not mistaken for numbers"""
+        assert metric_value({'cfm': True}, 'cfm') is None
+
+
+class TestSQLAnalytics:
+    """Test cases for the SQL materialized analytics"""
+
+    def test_inserts_update_totals(self, service):
+        """Test bulk and individual segment inserts and calculation loads update the totals"""
+        asyncio.run(service.bulk_insert_segments('p1', segments(60)))
+        # Small batches take the per-row path; reflected SQLite columns need JSON text
+        small_batch = [{**segment, 'calculation_data': '{"cfm": 50.0}'} for segment in segments(2, 'fitting')]
+        asyncio.run(service.bulk_insert_segments('p1', small_batch))
+        asyncio.run(service.bulk_insert_calculations('p1', [
+            {'user_id': 'u1', 'calculation_type': 'airflow', 'results': {}} for _ in range(3)
+        ]))
+
+        analytics = asyncio.run(service.get_project_analytics_optimized('p1'))
+
+        assert analytics['segments'][0] == {
+            'segment_type': 'duct', 'count': 60, 'avg_cfm': 100.0,
+            'total_cfm': 6000.0, 'avg_pressure': 0.5
+        }
+        assert analytics['segments'][1]['total_cfm'] == 100.0
+        assert analytics['calculations'][0]['calculation_type'] == 'airflow'
+        assert analytics['calculations'][0]['calc_count'] == 3
+        assert analytics['calculations'][0]['last_calculation']
+
+    def test_reads_do_not_scan_source_rows(self, service):
+        """Test reads come from the materialized rows until a rebuild"""
+        asyncio.run(service.rebuild_project_analytics('p1'))
+        asyncio.run(service.bulk_insert_segments('p1', segments(60)))
+        with service.engine.begin() as connection:
+            connection.execute(text("DELETE FROM project_segments WHERE segment_type = 'duct'"))
+
+        analytics = asyncio.run(service.get_project_analytics_optimized('p1'))
+        assert analytics['segments'][0]['count'] == 60
+
+        asyncio.run(service.rebuild_project_analytics('p1'))
+        assert asyncio.run(service.get_project_analytics_optimized('p1'))['segments'] == []
+
+    def test_rebuild_matches_incremental(self, service):
+        """Test a rebuild reproduces the incrementally maintained totals"""
+        asyncio.run(service.rebuild_project_analytics('p1'))
+        asyncio.run(service.bulk_insert_segments('p1', segments(60) + segments(5, 'fitting', cfm=20.0)))
+        asyncio.run(service.bulk_insert_calculations('p1', [
+            {'user_id': 'u1', 'calculation_type': kind, 'results': {}} for kind in ('airflow', 'airflow', 'duct')
+        ]))
+        incremental = asyncio.run(service.get_project_analytics_optimized('p1'))
+
+        asyncio.run(service.rebuild_project_analytics('p1'))
+        rebuilt = asyncio.run(service.get_project_analytics_optimized('p1'))
+
+        assert rebuilt['segments'] == incremental['segments']
+        assert [c['calc_count'] for c in rebuilt['calculations']] == [2, 1]
+
+    def test_existing_projects_are_backfilled_on_read(self, service):
+        """Test projects written before materialization are rebuilt on first read"""
+        with service.engine.begin() as connection:
+            connection.execute(text(
+                "INSERT INTO project_segments (id, project_id, segment_type, calculation_data, created_at) "
+                "VALUES ('s1', 'p1', 'duct', '{\"cfm\": 40}', '2024-01-01'), "
+                "('s2', 'p1', 'duct', '{\"cfm\": 60}', '2024-01-02')"
+            ))
+
+        analytics = asyncio.run(service.get_project_analytics_optimized('p1'))
+
+        assert analytics['segments'][0]['avg_cfm'] == 50
+        assert analytics['segments'][0]['avg_pressure'] is None
+
+    def test_projects_without_rows_are_rebuilt_once(self, service):
+        """Test an empty project is marked built instead of being rebuilt on every read"""
+        with patch.object(service, '_rebuild_project_analytics',
+                          wraps=service._rebuild_project_analytics) as rebuild:
+            for _ in range(3):
+                analytics = asyncio.run(service.get_project_analytics_optimized('p1'))
+
+        assert analytics == {'segments': [], 'calculations': []}
+        assert rebuild.call_count == 1
+
+    def test_existing_projects_are_backfilled_after_a_write(self, service):
+        """Test rows written before materialization are counted even when a write came first"""
+        with service.engine.begin() as connection:
+            connection.execute(text(
+                "INSERT INTO project_segments (id, project_id, segment_type, calculation_data, created_at) "
+                "VALUES " + ", ".join(f"('old-{i}', 'p1', 'duct', '{{\"cfm\": 10}}', '2024-01-01')"
+                                      for i in range(50))
+            ))
+        asyncio.run(service.bulk_insert_segments('p1', [{**segment, 'calculation_data': '{"cfm": 10}'}
+                                                        for segment in segments(2)]))
+
+        for _ in range(2):
+            analytics = asyncio.run(service.get_project_analytics_optimized('p1'))
+            assert [(s['segment_type'], s['count'], s['total_cfm']) for s in analytics['segments']] == \
+                [('duct', 52, 520.0)]
+
+    def test_reloaded_rows_are_not_counted_twice(self, service):
+        """Test merging rows that already exist leaves the totals matching the stored rows"""
+        rows = [{**segment, 'id': f"seg-{i}"} for i, segment in enumerate(segments(60))]
+        asyncio.run(service.bulk_insert_segments('p1', rows))
+        asyncio.run(service.bulk_insert_segments('p1', rows[:30] + [
+            {**segment, 'id': f"new-{i}"} for i, segment in enumerate(segments(60, 'fitting'))
+        ]))
+
+        analytics = asyncio.run(service.get_project_analytics_optimized('p1'))
+        assert [(s['segment_type'], s['count']) for s in analytics['segments']] == [('duct', 60), ('fitting', 60)]
+
+    def test_only_inserted_rows_are_counted(self, service):
+        """Test a load of new rows and rows owned by another project only counts the new rows"""
+        with service.engine.begin() as connection:
+            connection.execute(text("INSERT INTO projects VALUES ('p2', 'u1', 'Lab', '2024-01-01')"))
+        foreign = [{**segment, 'id': f"seg-{i}"} for i, segment in enumerate(segments(60))]
+        asyncio.run(service.bulk_insert_segments('p2', foreign))
+
+        asyncio.run(service.bulk_insert_segments('p1', foreign[:10] + segments(55, 'fitting')))
+
+        analytics = asyncio.run(service.get_project_analytics_optimized('p1'))
+        assert [(s['segment_type'], s['count']) for s in analytics['segments']] == [('fitting', 55)]
+
+    def test_failed_fold_forces_a_rebuild(self, service):
+        """Test a committed load whose analytics update fails is counted by the next read"""
+        asyncio.run(service.rebuild_project_analytics('p1'))
+        with patch.object(service, '_apply_analytics_delta', side_effect=RuntimeError("connection lost")):
+            ids = asyncio.run(service.bulk_insert_segments('p1', segments(60)))
+
+        assert len(ids) == 60
+        analytics = asyncio.run(service.get_project_analytics_optimized('p1'))
+        assert [(s['segment_type'], s['count']) for s in analytics['segments']] == [('duct', 60)]
+
+    def test_background_rebuilds_are_deduplicated(self, service):
+        """Test concurrent rebuild requests for a project share one task"""
+        async def schedule_twice():
+            first = service.schedule_analytics_rebuild('p1')
+            second = service.schedule_analytics_rebuild('p1')
+            await first
+            return first is second
+
+        assert asyncio.run(schedule_twice())
+        assert service._analytics_rebuilds == {}
+
+
+def evaluate(expression, doc):
+    """Evaluate the aggregation expressions used by analytics rebuilds"""
+    if isinstance(expression, str) and expression.startswith('$'):
+        return doc.get(expression[1:])
+    if isinstance(expression, dict):
+        (operator, operands), = expression.items()
+        values = [evaluate(operand, doc) for operand in operands]
+        if operator == '$add':
+            return sum(values)
+        if operator == '$subtract':
+            return values[0] - values[1]
+        if operator == '$ifNull':
+            return values[0] if values[0] is not None else values[1]
+        if operator == '$max':
+            present = [value for value in values if value is not None]
+            return max(present) if present else None
+    return expression
+
+
+class FakeAnalyticsCollection:
+    """Applies the $inc/$max upserts and pipeline updates used for materialized analytics"""
+
+    def __init__(self):
+        self.documents = {}
+        self.bulk_operations = []
+        self.deleted = []
+
+    async def update_one(self, query, update, upsert=False):
+        key = (query['project_id'], query['calculation_type'])
+        doc = self.documents.setdefault(key, dict(query))
+        for field, amount in update['$inc'].items():
+            doc[field] = doc.get(field, 0) + amount
+        for field, value in update['$max'].items():
+            if doc.get(field) is None or value > doc[field]:
+                doc[field] = value
+
+    def find(self, query):
+        documents = [doc for key, doc in self.documents.items() if key[0] == query['project_id']]
+
+        class Cursor:
+            def sort(self, field, direction):
+                documents.sort(key=lambda doc: doc[field], reverse=direction < 0)
+                return self
+
+            async def to_list(self, length=None):
+                return [dict(doc) for doc in documents]
+
+        return Cursor()
+
+    async def bulk_write(self, operations, ordered=True):
+        self.bulk_operations.extend(operations)
+        for operation in operations:
+            query = operation._filter
+            doc = self.documents.setdefault((query['project_id'], query['calculation_type']), dict(query))
+            if isinstance(operation._doc, list):
+                for stage in operation._doc:
+                    doc.update({field: evaluate(value, doc) for field, value in stage['$set'].items()})
+            else:
+                doc.update(operation._doc['$set'])
+
+    async def delete_many(self, query):
+        self.deleted.append(query)
+        for key, doc in list(self.documents.items()):
+            if (key[0] == query['project_id'] and key[1] in query['calculation_type']['$in']
+                    and doc.get('count', 0) <= 0):
+                del self.documents[key]
+
+
+class FakeCalculations:
+    """Seeded per-type groups plus saved calculations, grouped as the rebuild pipeline does"""
+
+    def __init__(self, groups=(), during_aggregate=None):
+        self.groups = list(groups)
+        self.documents = []
+        self.during_aggregate = during_aggregate
+        self.aggregations = 0
+
+    async def insert_one(self, document):
+        self.documents.append(dict(document))
+
+        class Result:
+            inserted_id = 'c1'
+        return Result()
+
+    def aggregate(self, pipeline):
+        cutoff = pipeline[0]['$match']['created_at']['$not']['$gt']
+        self.aggregations += 1
+        calculations = self
+        during_aggregate = self.during_aggregate
+
+        class Cursor:
+            async def to_list(self, length=None):
+                if during_aggregate:
+                    await during_aggregate()
+                groups = {group['_id']: dict(group) for group in calculations.groups}
+                for document in calculations.documents:
+                    if document['created_at'] > cutoff:
+                        continue
+                    group = groups.setdefault(document['calculation_type'], {
+                        '_id': document['calculation_type'], 'count': 0, 'cfm_sum': 0, 'cfm_count': 0,
+                        'pressure_sum': 0, 'pressure_count': 0, 'last_calculation': None
+                    })
+                    cfm = document.get('result_data', {}).get('cfm')
+                    group['count'] += 1
+                    group['cfm_sum'] += cfm or 0
+                    group['cfm_count'] += cfm is not None
+                    group['last_calculation'] = max(filter(None, [group['last_calculation'],
+                                                                  document['created_at']]))
+                return list(groups.values())
+
+        return Cursor()
+
+
+class FakeDatabase:
+    def __init__(self, groups=(), during_aggregate=None):
+        self.calculations = FakeCalculations(groups, during_aggregate)
+        self.project_analytics = FakeAnalyticsCollection()
+
+
+class TestMongoAnalytics:
+    """Test cases for the MongoDB materialized analytics"""
+
+    def setup_method(self):
+        """Setup test environment"""
+        self.service = EnhancedMongoDBService()
+
+    def test_saves_update_totals(self):
+        """Test each saved calculation is folded into its type's totals"""
+        database = FakeDatabase()
+        with patch('backend.services.mongodb_service.get_mongodb_database', return_value=database):
+            for cfm in (100, 300):
+                asyncio.run(self.service.save_calculation_result(
+                    'p1', {'calculation_type': 'airflow', 'result_data': {'cfm': cfm}}
+                ))
+            asyncio.run(self.service.save_calculation_result('p1', {'calculation_type': 'pressure'}))
+            analytics = asyncio.run(self.service.get_project_analytics('p1'))
+
+        assert analytics['summary']['total_calculations'] == 3
+        assert analytics['summary']['total_system_cfm'] == 400
+        airflow = analytics['by_type'][0]
+        assert (airflow['_id'], airflow['count'], airflow['avg_cfm'], airflow['avg_pressure']) == \
+            ('airflow', 2, 200, None)
+        assert isinstance(airflow['last_calculation'], datetime)
+
+    def test_empty_projects_are_rebuilt(self):
+        """Test a project without materialized totals is rebuilt from its calculations"""
+        database = FakeDatabase([{'_id': 'airflow', 'count': 4, 'cfm_sum': 80, 'cfm_count': 4,
+                                  'pressure_sum': 0, 'pressure_count': 0, 'last_calculation': None}])
+        with patch('backend.services.mongodb_service.get_mongodb_database', return_value=database):
+            analytics = asyncio.run(self.service.get_project_analytics('p1'))
+
+        assert analytics['by_type'][0]['avg_cfm'] == 20
+        assert len(database.project_analytics.bulk_operations) == 2
+        assert database.project_analytics.documents[('p1', 'airflow')]['count'] == 4
+
+    def test_projects_without_calculations_are_rebuilt_once(self):
+        """Test an empty project is marked built instead of being rebuilt on every read"""
+        database = FakeDatabase()
+        with patch('backend.services.mongodb_service.get_mongodb_database', return_value=database):
+            for _ in range(3):
+                analytics = asyncio.run(self.service.get_project_analytics('p1'))
+
+        assert analytics['by_type'] == []
+        assert analytics['summary']['total_calculations'] == 0
+        assert database.calculations.aggregations == 1
+
+    def test_existing_projects_are_backfilled_after_a_save(self):
+        """Test calculations saved before materialization are counted even when a save came first"""
+        database = FakeDatabase([{'_id': 'airflow', 'count': 50, 'cfm_sum': 500, 'cfm_count': 50,
+                                  'pressure_sum': 0, 'pressure_count': 0, 'last_calculation': None}])
+        with patch('backend.services.mongodb_service.get_mongodb_database', return_value=database):
+            for _ in range(2):
+                asyncio.run(self.service.save_calculation_result(
+                    'p1', {'calculation_type': 'airflow', 'result_data': {'cfm': 10}}
+                ))
+            for _ in range(2):
+                analytics = asyncio.run(self.service.get_project_analytics('p1'))
+                assert (analytics['summary']['total_calculations'], analytics['summary']['total_system_cfm']) == \
+                    (52, 520)
+
+        assert database.calculations.aggregations == 1
+
+    def test_rebuild_keeps_concurrent_increments(self):
+        """Test saves landing while a rebuild aggregates are not overwritten by the rebuilt totals"""
+        database = FakeDatabase([{'_id': 'airflow', 'count': 2, 'cfm_sum': 200, 'cfm_count': 2,
+                                  'pressure_sum': 0, 'pressure_count': 0, 'last_calculation': None}])
+
+        async def concurrent_saves():
+            for calculation_type in ('airflow', 'pressure'):
+                await self.service.save_calculation_result(
+                    'p1', {'calculation_type': calculation_type, 'result_data': {'cfm': 50}}
+                )
+
+        with patch('backend.services.mongodb_service.get_mongodb_database', return_value=database):
+            asyncio.run(self.service.save_calculation_result('p1', {'calculation_type': 'stale'}))
+            database.calculations.documents.clear()  # Deleted without going through the service
+            database.calculations.during_aggregate = concurrent_saves
+            asyncio.run(self.service.rebuild_project_analytics('p1'))
+
+        documents = database.project_analytics.documents
+        assert (documents[('p1', 'airflow')]['count'], documents[('p1', 'airflow')]['cfm_sum']) == (3, 250)
+        assert documents[('p1', 'pressure')]['count'] == 1
+        assert ('p1', 'stale') not in documents
@@ -0,0 +1,199 @@
+"""
+Test suite for the DatabasePerformanceOptimizer query cache
+Validates the in-process L1 tier, pipelined async Redis access and TTL routing by query type
+"""
+
+import asyncio
+import time
+import pytest
+from backend.database.PerformanceOptimizer import (
+    CacheConfig, DatabasePerformanceOptimizer, LocalQueryCache, QueryType
+)
+
+
+class FakePipeline:
+    """Collects commands and runs them in one round trip"""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def setex(self, key, ttl, value):
+        self.commands.append(('setex', key, ttl, value))
+
+    def unlink(self, *keys):
+        self.commands.append(('unlink', keys))
+
+    async def execute(self):
+        self.redis.round_trips += 1
+        for command in self.commands:
+            if command[0] == 'setex':
+                _, key, ttl, value = command
+                self.redis.data[key] = value
+                self.redis.ttls[key] = ttl
+            else:
+                for key in command[1]:
+                    self.redis.data.pop(key, None)
+
+
+class FakeAsyncRedis:
+    """Minimal asyncio Redis stand-in that counts network round trips"""
+
+    def __init__(self, latency=0.0):
+        self.data = {}
+        self.ttls = {}
+        self.round_trips = 0
+        self.latency = latency
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def mget(self, keys):
+        self.round_trips += 1
+        await asyncio.sleep(self.latency)
+        return [self.data.get(key) for key in keys]
+
+    async def scan_iter(self, match=None, count=None):
+        prefix = match.rstrip('*')
+        for key in list(self.data):
+            if key.startswith(prefix):
+                yield key
+
+
+def make_optimizer(redis=None):
+    optimizer = DatabasePerformanceOptimizer(cache_config=CacheConfig())
+    if redis is not None:
+        optimizer.redis_enabled = True
+        optimizer._get_redis_client = lambda: redis
+    return optimizer
+
+
+class TestLocalQueryCache:
+    """Test cases for the L1 tier"""
+
+    def test_entries_expire(self):
+        """Test entries are not served past their TTL"""
+        cache = LocalQueryCache()
+        cache.set("a", "1", ttl=0.01)
+        assert cache.get("a") == "1"
+        time.sleep(0.02)
+        assert cache.get("a") is None
+
+    def test_lru_eviction(self):
+        """Test the least recently used entry is evicted first"""
+        cache = LocalQueryCache(max_entries=2)
+        cache.set("a", "1", 60)
+        cache.set("b", "2", 60)
+        cache.get("a")
+        cache.set("c", "3", 60)
+        assert cache.get("b") is None
+        assert cache.get("a") == "1"
+
+    def test_prefix_delete(self):
+        """Test prefix invalidation"""
+        cache = LocalQueryCache()
+        cache.set("projects:user:1:limit:10", "x", 60)
+        cache.set("projects:user:2:limit:10", "y", 60)
+        cache.delete(prefixes=["projects:user:1:"])
+        assert len(cache) == 1
+
+
+class TestQueryCacheTiers:
+    """Test cases for L1 + Redis query caching"""
+
+    def test_ttl_routing_by_query_type(self):
+        """Test query types choose TTLs and explicit TTLs win"""
+        redis = FakeAsyncRedis()
+        optimizer = make_optimizer(redis)
+
+        asyncio.run(optimizer.optimize_query_cache("calculation-free-key", {"a": 1},
+                                                   query_type=QueryType.ANALYTICS))
+        asyncio.run(optimizer.optimize_query_cache("calc", {"a": 1}, query_type=QueryType.CALCULATION))
+        asyncio.run(optimizer.optimize_query_cache("other", {"a": 1}, ttl=42,
+                                                   query_type=QueryType.CALCULATION))
+        asyncio.run(optimizer.optimize_query_cache("untyped-calculation", {"a": 1}))
+
+        assert redis.ttls["query_cache:calculation-free-key"] == 900
+        assert redis.ttls["query_cache:calc"] == 7200
+        assert redis.ttls["query_cache:other"] == 42
+        assert redis.ttls["query_cache:untyped-calculation"] == 3600
+
+    def test_l1_serves_repeat_reads_without_redis(self):
+        """Test warm reads are answered in-process"""
+        redis = FakeAsyncRedis()
+        optimizer = make_optimizer(redis)
+        asyncio.run(optimizer.optimize_query_cache("project:1", {"name": "A"}, query_type=QueryType.PROJECT))
+        trips = redis.round_trips
+
+        for _ in range(10):
+            assert asyncio.run(optimizer.get_cached_query("project:1")) == {"name": "A"}
+        assert redis.round_trips == trips
+
+    def test_redis_hits_fill_l1(self):
+        """Test a value cached by another worker is read once from Redis"""
+        redis = FakeAsyncRedis()
+        redis.data["query_cache:project:2"] = '{"name": "B"}'
+        optimizer = make_optimizer(redis)
+
+        assert asyncio.run(optimizer.get_cached_query("project:2")) == {"name": "B"}
+        assert asyncio.run(optimizer.get_cached_query("project:2")) == {"name": "B"}
+        assert redis.round_trips == 1
+
+    def test_multi_get_is_one_round_trip(self):
+        """Test several misses are fetched with a single MGET"""
+        redis = FakeAsyncRedis()
+        for i in range(5):
+            redis.data[f"query_cache:k{i}"] = str(i)
+        optimizer = make_optimizer(redis)
+
+        found = asyncio.run(optimizer.get_cached_queries([f"k{i}" for i in range(6)]))
+        assert found == {f"k{i}": i for i in range(5)}
+        assert redis.round_trips == 1
+
+    def test_results_are_not_shared_between_callers(self):
+        """Test callers get independent copies"""
+        optimizer = make_optimizer()
+        asyncio.run(optimizer.optimize_query_cache("project:3", {"tags": []}))
+
+        first = asyncio.run(optimizer.get_cached_query("project:3"))
+        first["tags"].append("mutated")
+        assert asyncio.run(optimizer.get_cached_query("project:3")) == {"tags": []}
+
+    def test_invalidation_clears_both_tiers(self):
+        """Test exact and prefix invalidation reach L1 and Redis"""
+        redis = FakeAsyncRedis()
+        optimizer = make_optimizer(redis)
+        asyncio.run(optimizer.cache_query_results({
+            "projects:user:1": [1], "projects:user:1:limit:50": [1], "projects:user:2": [2]
+        }, query_type=QueryType.PROJECT_LIST))
+
+        asyncio.run(optimizer.invalidate_cached_queries(
+            ["projects:user:1"], prefixes=["projects:user:1:"]
+        ))
+
+        assert set(redis.data) == {"query_cache:projects:user:2"}
+        assert asyncio.run(optimizer.get_cached_query("projects:user:1:limit:50")) is None
+
+    def test_concurrent_lookups_overlap(self):
+        """Test cache I/O does not serialize concurrent coroutines"""
+        redis = FakeAsyncRedis(latency=0.05)
+        optimizer = make_optimizer(redis)
+
+        async def lookups():
+            started = time.perf_counter()
+            await asyncio.gather(*(optimizer.get_cached_query(f"miss:{i}") for i in range(10)))
+            return time.perf_counter() - started
+
+        assert asyncio.run(lookups()) < 0.25
+
+    def test_works_without_redis(self):
+        """Test the L1 tier still works when Redis is unavailable"""
+        optimizer = make_optimizer()
+        asyncio.run(optimizer.optimize_query_cache("k", {"v": 1}))
+        assert asyncio.run(optimizer.get_cached_query("k")) == {"v": 1}
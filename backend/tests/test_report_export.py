@@ -0,0 +1,71 @@
+"""
+Test suite for streamed report exports
+Validates JSON and CSV output, chunking and on-the-fly gzip compression
+"""
+
+import csv
+import gzip
+import io
+import json
+from datetime import datetime
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from backend.analytics.report_export import CHUNK_SIZE, export_chunks
+
+
+def report(rows=3):
+    return SimpleNamespace(
+        id="report_1",
+        name="Executive Summary",
+        generated_at=datetime(2025, 6, 1, 8, 30),
+        data={
+            "status": {"chart_type": "PIE", "total": rows,
+                       "data": [{"label": f"s{i}", "value": i, "percentage": 1.5} for i in range(rows)]},
+            "rows": {"chart_type": "TABLE", "data": [{"id": "c1", "created_at": datetime(2025, 5, 1),
+                                                      "score": np.float64(2.5)}]},
+            "gauge": {"chart_type": "GAUGE", "data": {"value": 4, "max": 10}}
+        }
+    )
+
+
+class TestReportExport:
+    """Test cases for export generators"""
+
+    def test_json_export(self):
+        """Test the streamed JSON document holds the whole report"""
+        document = json.loads(b''.join(export_chunks(report(), "json")))
+
+        assert document["report"]["id"] == "report_1"
+        assert document["report"]["generated_at"] == "2025-06-01T08:30:00"
+        assert document["report"]["data"]["status"]["total"] == 3
+        assert document["report"]["data"]["status"]["data"][2] == {"label": "s2", "value": 2, "percentage": 1.5}
+        assert document["report"]["data"]["rows"]["data"] == [
+            {"id": "c1", "created_at": "2025-05-01T00:00:00", "score": 2.5}
+        ]
+        assert document["report"]["data"]["gauge"]["data"] == {"value": 4, "max": 10}
+
+    def test_csv_export(self):
+        """Test CSV rows flatten each chart's data points"""
+        rows = list(csv.reader(io.StringIO(b''.join(export_chunks(report(), "csv")).decode())))
+
+        assert rows[0] == ['Chart', 'Data Type', 'Value']
+        assert rows[1:4] == [['status', 'label', 's0'], ['status', 'value', '0'], ['status', 'percentage', '1.5']]
+        assert len(rows) == 1 + 3 * 3 + 3
+
+    def test_large_exports_are_chunked_and_gzipped(self):
+        """Test big reports are produced in bounded chunks and gzip decompresses to the plain export"""
+        large = report(rows=50000)
+        plain = list(export_chunks(large, "csv"))
+        compressed = b''.join(export_chunks(large, "csv", compress=True))
+
+        assert len(plain) > 10
+        assert max(len(chunk) for chunk in plain) < 2 * CHUNK_SIZE
+        assert gzip.decompress(compressed) == b''.join(plain)
+        assert len(compressed) < len(b''.join(plain)) / 4
+
+    def test_unknown_format(self):
+        """Test unsupported formats are rejected before streaming starts"""
+        with pytest.raises(ValueError):
+            export_chunks(report(), "xlsx")
@@ -0,0 +1,207 @@
+"""
+Test suite for background report generation
+Validates job state transitions, waiting, pool and queue bounds, failure reporting
+and job state shared between worker processes
+"""
+
+import asyncio
+import importlib
+import threading
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from backend.analytics import report_jobs
+from backend.analytics.report_jobs import ReportJobQueue, ReportQueueFull, ReportStore, shared_report_store
+
+
+class SlowGenerator:
+    """Report coroutine that blocks until released, tracking concurrency"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.running = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    async def __call__(self, template_id, parameters):
+        with self.lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        try:
+            while not self.release.is_set():
+                await asyncio.sleep(0.001)
+            if template_id == "broken":
+                raise ValueError("Report template not found: broken")
+            status = "FAILED" if template_id == "empty" else "COMPLETED"
+            return SimpleNamespace(id=f"report_{template_id}", status=status)
+        finally:
+            with self.lock:
+                self.running -= 1
+
+
+class FakeRedis:
+    """The string commands the report store uses"""
+
+    def __init__(self):
+        self.values = {}
+        self.ttls = {}
+
+    def setex(self, key, ttl, value):
+        self.values[key] = value.encode() if isinstance(value, str) else value
+        self.ttls[key] = ttl
+
+    def get(self, key):
+        return self.values.get(key)
+
+
+class TestReportJobQueue:
+    """Test cases for the report job queue"""
+
+    def setup_method(self):
+        """Setup test environment"""
+        self.generator = SlowGenerator()
+        self.queue = ReportJobQueue(self.generator, max_workers=2, max_pending=3)
+
+    def teardown_method(self):
+        """Cleanup test environment"""
+        self.generator.release.set()
+        self.queue.shutdown()
+
+    def test_submit_returns_before_generation(self):
+        """Test a job is queued immediately and completes in the background"""
+        job = self.queue.submit("exec_summary", {"user_id": "u1"})
+        assert job["status"] == "QUEUED" and job["report_id"] is None
+
+        self.generator.release.set()
+        done = self.queue.wait(job["job_id"], timeout=5)
+
+        assert done["status"] == "COMPLETED"
+        assert done["report_id"] == "report_exec_summary"
+        assert done["started_at"] and done["finished_at"]
+
+    def test_wait_returns_on_change_or_timeout(self):
+        """Test waiting past a version returns once the job moves on, and times out otherwise"""
+        job = self.queue.submit("exec_summary")
+        running = self.queue.wait(job["job_id"], after_version=job["version"], timeout=5)
+        assert running["status"] == "RUNNING"
+
+        still_running = self.queue.wait(job["job_id"], after_version=running["version"], timeout=0.05)
+        assert still_running == running
+        assert self.queue.wait("job_missing", timeout=0.01) is None
+
+    def test_pool_and_queue_are_bounded(self):
+        """Test at most max_workers reports run at once and excess submissions are refused"""
+        jobs = [self.queue.submit(f"t{i}") for i in range(2)]
+        for job in jobs:
+            self.queue.wait(job["job_id"], after_version=0, timeout=5)
+        # Jobs are marked running just before their coroutine starts
+        deadline = time.monotonic() + 5
+        while self.generator.running < 2 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        jobs += [self.queue.submit(f"t{i}") for i in range(2, 5)]
+
+        with pytest.raises(ReportQueueFull):
+            self.queue.submit("one_too_many")
+
+        self.generator.release.set()
+        for job in jobs:
+            assert self.queue.wait(job["job_id"], timeout=5)["status"] == "COMPLETED"
+        assert self.generator.peak == 2
+        assert self.queue.stats == {'submitted': 5, 'completed': 5, 'failed': 0, 'rejected': 1}
+
+    def test_failures_are_reported(self):
+        """Test raised errors and failed report instances both mark the job failed"""
+        self.generator.release.set()
+        raised = self.queue.wait(self.queue.submit("broken")["job_id"], timeout=5)
+        failed = self.queue.wait(self.queue.submit("empty")["job_id"], timeout=5)
+
+        assert (raised["status"], raised["error"]) == ("FAILED", "Report template not found: broken")
+        assert (failed["status"], failed["report_id"]) == ("FAILED", "report_empty")
+
+    def test_old_finished_jobs_are_forgotten(self):
+        """Test job history is bounded"""
+        queue = ReportJobQueue(self.generator, max_jobs=3)
+        self.generator.release.set()
+        ids = [queue.submit("t")["job_id"] for _ in range(5)]
+        for job_id in ids:
+            queue.wait(job_id, timeout=5)
+        queue.submit("t")
+        queue.shutdown()
+
+        assert len(queue.jobs) == 3
+        assert queue.get(ids[0]) is None
+
+    def test_background_jobs_are_on_unless_disabled(self, monkeypatch):
+        """Test background jobs are the default and can be switched off"""
+        try:
+            monkeypatch.delenv("REPORT_JOBS_ENABLED", raising=False)
+            assert importlib.reload(report_jobs).REPORT_JOBS_ENABLED is True
+
+            monkeypatch.setenv("REPORT_JOBS_ENABLED", "false")
+            assert importlib.reload(report_jobs).REPORT_JOBS_ENABLED is False
+        finally:
+            monkeypatch.undo()
+            importlib.reload(report_jobs)
+
+
+class TestSharedReportStore:
+    """Test cases for job state shared through Redis"""
+
+    def setup_method(self):
+        """Setup test environment"""
+        self.generator = SlowGenerator()
+        self.store = ReportStore(FakeRedis())
+        # Two worker processes: one runs the job, the other only shares the store
+        self.runner = ReportJobQueue(self.generator, store=self.store)
+        self.other = ReportJobQueue(self.generator, store=self.store)
+
+    def teardown_method(self):
+        """Cleanup test environment"""
+        self.generator.release.set()
+        self.runner.shutdown()
+        self.other.shutdown()
+
+    def test_other_workers_follow_the_job(self):
+        """Test a worker that did not run a job can read and wait for it"""
+        job = self.runner.submit("exec_summary")
+        assert self.other.get(job["job_id"])["status"] in ("QUEUED", "RUNNING")
+
+        running = self.other.wait(job["job_id"], after_version=0, timeout=5)
+        assert running["status"] == "RUNNING"
+        self.generator.release.set()
+        done = self.other.wait(job["job_id"], timeout=5)
+
+        assert (done["status"], done["report_id"]) == ("COMPLETED", "report_exec_summary")
+        assert done == self.runner.get(job["job_id"])
+        assert not self.other.jobs
+        assert self.other.get("job_missing") is None
+
+    def test_remote_wait_times_out(self):
+        """Test waiting on another worker's job returns its current state after the timeout"""
+        job = self.runner.submit("exec_summary")
+        self.runner.wait(job["job_id"], after_version=0, timeout=5)
+
+        started = time.monotonic()
+        state = self.other.wait(job["job_id"], timeout=0.3)
+        assert state["status"] == "RUNNING"
+        assert 0.25 < time.monotonic() - started < 2
+
+    def test_reports_round_trip(self):
+        """Test stored reports keep their data, including NumPy values and datetimes"""
+        self.store.save_report("report_1", {"id": "report_1", "generated_at": "2025-06-01T08:30:00",
+                                            "data": {"gauge": {"value": np.float64(2.5),
+                                                               "at": datetime(2025, 6, 1)}}})
+
+        report = self.store.load_report("report_1")
+        assert report["data"]["gauge"] == {"value": 2.5, "at": "2025-06-01T00:00:00"}
+        assert self.store.client.ttls["sizewise:reports:report:report_1"] == report_jobs.REPORT_STORE_TTL_SECONDS
+        assert self.store.load_report("report_2") is None
+
+    def test_unreachable_redis_means_no_store(self, monkeypatch):
+        """Test an unreachable Redis leaves reports to be generated inline"""
+        monkeypatch.setenv("REDIS_HOST", "127.0.0.1")
+        monkeypatch.setenv("REDIS_PORT", "1")
+        assert shared_report_store() is None
@@ -0,0 +1,122 @@
+"""
+Test suite for the in-process request profiler
+Validates request sampling, phase timing and stack export formats
+"""
+
+import time
+import pytest
+from flask import Flask, jsonify
+from backend.monitoring.request_profiler import RequestProfiler, profile_phase
+
+
+def busy_handler(seconds):
+    """Spin so the stack sampler has something to catch"""
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+class TestRequestProfiler:
+    """Test cases for RequestProfiler middleware"""
+
+    def setup_method(self):
+        """Setup test environment"""
+        self.app = Flask(__name__)
+        self.app.config['TESTING'] = True
+        self.profiler = RequestProfiler(self.app, sample_rate=1.0, sampling_interval=0.001)
+
+        @self.app.route('/api/calc/<int:size>', methods=['POST'])
+        def calc(size):
+            with profile_phase('validation'):
+                time.sleep(0.002)
+            with profile_phase('calculator'):
+                busy_handler(0.05)
+            with profile_phase('serialization'):
+                return jsonify({'size': size})
+
+        self.client = self.app.test_client()
+
+    def teardown_method(self):
+        """Cleanup test environment"""
+        self.profiler.stop()
+
+    def test_phase_timing_recorded(self):
+        """Test every request records dispatch and custom phases"""
+        response = self.client.post('/api/calc/12')
+        assert response.status_code == 200
+
+        summary = self.profiler.get_summary()
+        endpoint = summary['endpoints'][0]
+        assert endpoint['endpoint'] == 'POST /api/calc/<int:size>'
+        assert endpoint['requests'] == 1
+        for phase in ('middleware', 'view', 'response', 'validation', 'calculator', 'serialization'):
+            assert endpoint['phases'][phase]['count'] == 1
+        assert endpoint['phases']['calculator']['avg_ms'] >= 40
+
+    def test_requests_aggregate_by_url_rule(self):
+        """Test different path parameters aggregate into one endpoint"""
+        self.client.post('/api/calc/1')
+        self.client.post('/api/calc/2')
+
+        endpoints = self.profiler.get_summary()['endpoints']
+        assert len(endpoints) == 1
+        assert endpoints[0]['requests'] == 2
+
+    def test_unmatched_paths_share_one_endpoint(self):
+        """Test requests that match no route are bucketed together instead of by raw path"""
+        for path in ('/wp-admin', '/.env', '/api/calc/abc'):
+            assert self.client.post(path).status_code == 404
+
+        endpoints = self.profiler.get_summary()['endpoints']
+        assert [(e['endpoint'], e['requests']) for e in endpoints] == [('POST <unmatched>', 3)]
+
+    def test_stack_sampling_and_collapsed_export(self):
+        """Test sampled requests produce collapsed stacks reaching the handler"""
+        self.client.post('/api/calc/3')
+
+        collapsed = self.profiler.get_collapsed_stacks()
+        assert collapsed
+        lines = collapsed.strip().splitlines()
+        assert all(line.startswith('POST_/api/calc/<int:size>;') for line in lines)
+        assert any('busy_handler' in line for line in lines)
+        assert all(line.rsplit(' ', 1)[1].isdigit() for line in lines)
+
+    def test_flame_graph_tree(self):
+        """Test flame graph node values sum over children"""
+        self.client.post('/api/calc/4')
+
+        tree = self.profiler.get_flame_graph()
+        assert tree['name'] == 'root'
+        assert tree['value'] > 0
+        assert tree['value'] == sum(child['value'] for child in tree['children'])
+
+    def test_unsampled_requests_skip_stack_sampling(self):
+        """Test sample rate zero records timing but no stacks"""
+        self.profiler.sample_rate = 0.0
+        self.client.post('/api/calc/5')
+
+        endpoint = self.profiler.get_summary()['endpoints'][0]
+        assert endpoint['requests'] == 1
+        assert endpoint['sampled_requests'] == 0
+        assert self.profiler.get_collapsed_stacks() == ''
+        assert self.profiler._sampled_threads == {}
+
+    def test_distinct_stacks_are_bounded(self):
+        """Test stack table size per endpoint is capped"""
+        self.profiler.max_stacks_per_endpoint = 1
+        self.client.post('/api/calc/6')
+
+        stacks = self.profiler.endpoints['POST /api/calc/<int:size>'].stacks
+        assert len(stacks) <= 2  # One real stack plus the truncation bucket
+
+    def test_reset(self):
+        """Test reset clears aggregated data"""
+        self.client.post('/api/calc/7')
+        self.profiler.reset()
+        assert self.profiler.get_summary()['endpoints'] == []
+
+    def test_profile_phase_outside_request(self):
+        """Test profile_phase is a no-op outside a request context"""
+        with profile_phase('calculator'):
+            value = 42
+        assert value == 42
@@ -0,0 +1,143 @@
+"""
+Test suite for windowed SLA computation
+Validates rolling window buckets, error-budget burn rates and multi-window breach alerting
+"""
+
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock
+from backend.monitoring.sla_monitoring import (
+    RollingWindow, SLAMonitoringManager, SLAMetricType, SLAWindowSet
+)
+
+
+START = datetime(2026, 1, 1, 12, 0, 0)
+
+
+class TestRollingWindow:
+    """Test cases for RollingWindow buckets"""
+
+    def test_running_totals(self):
+        """Test counts, bad counts and sums accumulate"""
+        window = RollingWindow(60, 60)
+        window.add(0, 100, bad=False)
+        window.add(10, 300, bad=True)
+
+        assert window.count == 2
+        assert window.bad == 1
+        assert window.average() == 200
+        assert window.bad_fraction() == 0.5
+
+    def test_buckets_expire(self):
+        """Test samples leave the window once their bucket ages out"""
+        window = RollingWindow(60, 60)
+        window.add(0, 100, bad=True)
+        window.add(30, 100)
+        window.add(61, 100)
+
+        assert window.count == 2
+        assert window.bad == 0
+
+        window.expire(1000)
+        assert window.count == 0
+        assert window.average() is None
+
+    def test_samples_older_than_window_are_ignored(self):
+        """Test late samples outside the window are dropped"""
+        window = RollingWindow(60, 60)
+        window.add(100, 1)
+        assert window.add(10, 1) is False
+        assert window.add(90, 1) is True
+        assert window.count == 2
+
+    def test_error_budget_remaining(self):
+        """Test remaining budget over a window"""
+        windows = SLAWindowSet({"1h": (3600, 60)})
+        for i in range(200):
+            windows.observe(i, 1.0, bad=(i == 0))
+
+        assert windows.burn_rate("1h", 0.01) == pytest.approx(0.5)
+        assert windows.error_budget_remaining("1h", 0.01) == pytest.approx(0.5)
+
+
+class TestBurnRateAlerting:
+    """Test cases for multi-window burn-rate breach detection"""
+
+    def setup_method(self):
+        """Setup test environment"""
+        self.manager = SLAMonitoringManager()
+        self.metric = SLAMetricType.API_RESPONSE_TIME
+
+    def record(self, value, seconds):
+        return asyncio.run(self.manager.record_measurement(
+            self.metric, value, timestamp=START + timedelta(seconds=seconds)
+        ))
+
+    def test_single_slow_sample_does_not_open_breach(self):
+        """Test one bad sample against healthy history stays within budget"""
+        for i in range(200):
+            self.record(150.0, i * 15)
+        self.record(900.0, 200 * 15)
+
+        assert self.manager.breaches == {}
+        assert self.manager.open_burn_alerts == {}
+
+    def test_lone_outlier_without_history_does_not_alert(self):
+        """Test a single extreme sample cannot open a breach or an incident on its own"""
+        self.manager._create_sla_incident = AsyncMock()
+        self.record(99999.0, 0)
+
+        evaluation = self.manager.evaluate_burn_rate(self.metric)
+        assert evaluation.burn_rates["5m"] == pytest.approx(100.0)
+        assert not evaluation.firing
+        assert self.manager.breaches == {}
+        self.manager._create_sla_incident.assert_not_awaited()
+
+    def test_sustained_burn_opens_one_breach_and_resolves(self):
+        """Test fast burn opens a single breach that closes once the burn stops"""
+        for i in range(100):
+            self.record(150.0, i * 15)
+        for i in range(100, 130):
+            self.record(900.0, i * 15)
+
+        assert len(self.manager.breaches) == 1
+        breach = next(iter(self.manager.breaches.values()))
+        assert breach.severity == "CRITICAL"
+        assert breach.breach_end is None
+
+        for i in range(130, 400):
+            self.record(150.0, i * 15)
+
+        assert breach.breach_end is not None
+        assert self.manager.open_burn_alerts == {}
+
+    def test_status_reports_windows_and_budget(self):
+        """Test current status exposes per-window burn rates"""
+        asyncio.run(self.manager.record_measurement(self.metric, 150.0))
+
+        status = self.manager.get_current_sla_status()
+        metric_status = status['metrics'][self.metric.value]
+        assert set(metric_status['windows']) == {"1m", "5m", "1h", "30d"}
+        assert metric_status['error_budget_remaining'] == 1.0
+
+    def test_measurements_are_bounded(self):
+        """Test raw measurement history is capped"""
+        manager = SLAMonitoringManager(max_measurements=5)
+        for i in range(10):
+            asyncio.run(manager.record_measurement(self.metric, 150.0))
+        assert len(manager.measurements) == 5
+
+    def test_reports_count_beyond_raw_history(self):
+        """Test reports are derived from window buckets, not the capped raw measurements"""
+        manager = SLAMonitoringManager(max_measurements=5)
+        for i in range(120):
+            asyncio.run(manager.record_measurement(
+                self.metric, 150.0 if i % 4 else 300.0, timestamp=START + timedelta(minutes=i)
+            ))
+
+        report = asyncio.run(manager.generate_sla_report(START, START + timedelta(hours=2)))
+        assert len(manager.measurements) == 5
+        assert report.metric_compliance[self.metric] == pytest.approx(75.0)
+        assert manager.compliance_counts(self.metric, START + timedelta(hours=1), START + timedelta(hours=2)) == (60, 45)
+
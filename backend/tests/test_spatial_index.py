@@ -0,0 +1,179 @@
+"""
+Test suite for quadtree spatial keys
+Validates that indexed viewport filters never miss what a full bounding-box scan finds
+"""
+
+import random
+import pytest
+from unittest.mock import patch
+from flask import Flask
+from backend.services.spatial_index import QuadTree, calculate_bounds, flatten_coordinates
+from backend.services.mongodb_service import mongodb_service
+from backend.api.mongodb_api import mongodb_bp
+
+
+def matches_key_filter(key, key_filter):
+    """Evaluate a spatial_key $or filter the way MongoDB would"""
+    for clause in key_filter['$or']:
+        condition = clause['spatial_key']
+        if '$in' in condition and key in condition['$in']:
+            return True
+        if '$gte' in condition and condition['$gte'] <= key < condition['$lt']:
+            return True
+    return False
+
+
+def intersects(a, b):
+    return (a['min_x'] <= b['max_x'] and a['max_x'] >= b['min_x'] and
+            a['min_y'] <= b['max_y'] and a['max_y'] >= b['min_y'])
+
+
+def random_box(rng, extent, max_size):
+    x, y = rng.uniform(-extent, extent), rng.uniform(-extent, extent)
+    return {'min_x': x, 'min_y': y,
+            'max_x': x + rng.uniform(0, max_size), 'max_y': y + rng.uniform(0, max_size)}
+
+
+class TestQuadTree:
+    """Test cases for quadtree keys and covers"""
+
+    def setup_method(self):
+        """Setup test environment"""
+        self.tree = QuadTree(origin_x=0, origin_y=0, size=1024, max_depth=10)
+
+    def test_key_is_smallest_enclosing_cell(self):
+        """Test keys get longer as items get smaller"""
+        # 4-unit cell at the origin
+        assert self.tree.key_for_bounds({'min_x': 1, 'min_y': 1, 'max_x': 2, 'max_y': 2}) == '00000000'
+        # 64-unit cell [576, 640) x [0, 64)
+        assert self.tree.key_for_bounds({'min_x': 600, 'min_y': 10, 'max_x': 620, 'max_y': 20}) == '1001'
+        assert self.tree.key_for_bounds({'min_x': 600, 'min_y': 10, 'max_x': 700, 'max_y': 20}) == '10'
+        # Straddling the centre only fits the root
+        assert self.tree.key_for_bounds({'min_x': 500, 'min_y': 500, 'max_x': 600, 'max_y': 600}) == ''
+
+    def test_out_of_extent_items_use_root(self):
+        """Test items outside the indexed extent remain findable"""
+        key = self.tree.key_for_bounds({'min_x': -50, 'min_y': 0, 'max_x': 10, 'max_y': 10})
+        assert key == ''
+        viewport = {'min_x': 0, 'min_y': 0, 'max_x': 5, 'max_y': 5}
+        assert matches_key_filter(key, self.tree.key_filter(viewport))
+
+    def test_invalid_bounds_match_nothing(self):
+        """Test inverted or non-finite viewports get a valid filter that matches nothing"""
+        for viewport in ({'min_x': 10, 'min_y': 0, 'max_x': 5, 'max_y': 5},
+                         {'min_x': 0, 'min_y': float('nan'), 'max_x': 5, 'max_y': 5},
+                         {'min_x': 0, 'min_y': 0, 'max_x': float('inf'), 'max_y': 5}):
+            assert self.tree.key_filter(viewport) == {'spatial_key': {'$in': []}}
+
+    def test_cover_is_bounded(self):
+        """Test viewports are covered by a bounded number of cells"""
+        for viewport in ({'min_x': 0, 'min_y': 0, 'max_x': 1023, 'max_y': 1023},
+                         {'min_x': 100, 'min_y': 100, 'max_x': 101, 'max_y': 400},
+                         {'min_x': 3, 'min_y': 3, 'max_x': 3, 'max_y': 3}):
+            assert 1 <= len(self.tree.cover(viewport)) <= self.tree.max_cover_cells
+
+    @pytest.mark.parametrize("seed", range(5))
+    def test_filter_matches_full_scan(self, seed):
+        """Test the indexed filter returns every intersecting item and prunes most others"""
+        rng = random.Random(seed)
+        tree = QuadTree(size=2000, max_depth=16)
+        items = [random_box(rng, 1000, rng.choice([1, 10, 100, 800])) for _ in range(2000)]
+        keys = [tree.key_for_bounds(item) for item in items]
+
+        candidates_total = 0
+        for _ in range(50):
+            viewport = random_box(rng, 1000, rng.choice([5, 50, 300]))
+            key_filter = tree.key_filter(viewport)
+            candidates = {i for i, key in enumerate(keys) if matches_key_filter(key, key_filter)}
+            expected = {i for i, item in enumerate(items) if intersects(item, viewport)}
+            assert expected <= candidates
+            candidates_total += len(candidates)
+
+        # Candidate sets are a small fraction of the collection
+        assert candidates_total / 50 < len(items) * 0.25
+
+
+class TestSpatialFields:
+    """Test cases for bounds and key extraction on save"""
+
+    def test_geojson_geometry(self):
+        """Test nested GeoJSON coordinates produce bounds and a key"""
+        data = {'geometry': {'type': 'Polygon',
+                             'coordinates': [[[0, 0], [10, 0], [10, 5], [0, 5], [0, 0]]]}}
+        mongodb_service._index_spatial_fields(data)
+
+        assert data['bounds'] == {'min_x': 0, 'max_x': 10, 'min_y': 0, 'max_y': 5}
+        assert isinstance(data['spatial_key'], str)
+
+    def test_flatten_and_bounds(self):
+        """Test point extraction ignores malformed coordinates"""
+        points = flatten_coordinates([[1, 2], [[3, 4], [5]]])
+        assert calculate_bounds(points) == {'min_x': 1, 'max_x': 3, 'min_y': 2, 'max_y': 4}
+
+    def test_viewport_query(self):
+        """Test viewport queries combine the key filter, exact bounds and cursor"""
+        query = mongodb_service._viewport_query(
+            'p1', {'min_x': 0, 'min_y': 0, 'max_x': 10, 'max_y': 10},
+            layer_type='ducts', cursor='5f2b8c9e1a3d4e5f6a7b8c9d'
+        )
+
+        assert query['project_id'] == 'p1'
+        assert query['layer_type'] == 'ducts'
+        assert query['$or']
+        assert query['bounds.min_x'] == {'$lte': 10}
+        assert str(query['_id']['$gt']) == '5f2b8c9e1a3d4e5f6a7b8c9d'
+
+
+class TestViewportEndpoint:
+    """Test cases for the viewport API"""
+
+    def setup_method(self):
+        """Setup test environment"""
+        app = Flask(__name__)
+        app.register_blueprint(mongodb_bp, url_prefix='/api/v1/mongodb')
+        self.client = app.test_client()
+
+    def test_returns_page_and_cursor(self):
+        """Test the endpoint passes viewport and cursor through"""
+        calls = []
+
+        async def find_page(project_id, bounds, layer_type=None, limit=500, cursor=None):
+            calls.append((bounds, limit, cursor))
+            return {'spatial_data': [{'_id': 'a'}], 'next_cursor': 'a'}
+
+        with patch.object(mongodb_service, 'find_spatial_data_page', find_page):
+            response = self.client.get(
+                '/api/v1/mongodb/projects/p1/spatial-data/viewport'
+                '?min_x=0&min_y=0&max_x=10&max_y=20&limit=1&cursor=z'
+            )
+
+        assert response.status_code == 200
+        assert response.get_json()['next_cursor'] == 'a'
+        assert calls == [({'min_x': 0.0, 'min_y': 0.0, 'max_x': 10.0, 'max_y': 20.0}, 1, 'z')]
+
+    def test_requires_bounds(self):
+        """Test missing viewport coordinates are rejected"""
+        response = self.client.get('/api/v1/mongodb/projects/p1/spatial-data/viewport?min_x=0')
+        assert response.status_code == 400
+
+    @pytest.mark.parametrize('query', ['min_x=10&min_y=0&max_x=5&max_y=20',
+                                       'min_x=0&min_y=nan&max_x=10&max_y=20',
+                                       'min_x=-inf&min_y=0&max_x=10&max_y=20'])
+    def test_rejects_invalid_bounds(self, query):
+        """Test inverted and non-finite viewports are client errors"""
+        with patch.object(mongodb_service, 'find_spatial_data_page') as find_page:
+            response = self.client.get(f'/api/v1/mongodb/projects/p1/spatial-data/viewport?{query}')
+
+        assert response.status_code == 400
+        find_page.assert_not_called()
+
+    def test_rejects_malformed_cursor(self):
+        """Test a cursor that is not a document id is a client error, not a server error"""
+        response = self.client.get(
+            '/api/v1/mongodb/projects/p1/spatial-data/viewport'
+            '?min_x=0&min_y=0&max_x=10&max_y=20&cursor=not-an-object-id'
+        )
+
+        assert response.status_code == 400
+        assert response.get_json()['error'] == 'Invalid cursor'
+